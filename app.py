@@ -1,9 +1,18 @@
+import json
 import uvicorn
 from loguru import logger
-from fastapi import FastAPI, Query
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from contextlib import asynccontextmanager
 
 from multi_agents.pipeline import MultiAgents
+from multi_agents.utils.concurrency import PipelineOverloaded
+from multi_agents.agents.llm_registry import get_llm_registry
+from multi_agents.mcp.coalescer import get_product_coalescer
+from multi_agents.mcp.prefetch import prefetch_metrics
+from multi_agents.agents.structured_output import structured_output_metrics
+from multi_agents.cache.completion_cache import get_completion_cache
 
 async def startup_hook(app: FastAPI):
     app.state.multi_agents = MultiAgents()
@@ -11,16 +20,17 @@ async def startup_hook(app: FastAPI):
     logger.info("Multi Agents is starting up...")
 
 async def shutdown_hook(app: FastAPI):
+    app.state.multi_agents.close()
     app.state.multi_agents = None
 
     logger.info("Multi Agents is shutting down...")
-    
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await startup_hook(app)
     yield
     await shutdown_hook(app)
-    
+
 app = FastAPI(
     title="Multi Agents Function Calling",
     description="Self-built Multi Function calling AI Agent",
@@ -30,23 +40,101 @@ app = FastAPI(
     lifespan=lifespan
     )
 
+def parse_context(initial_context_data: Optional[str]) -> Optional[dict]:
+    if not initial_context_data:
+        return None
+    try:
+        context = json.loads(initial_context_data)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"initial_context_data is not valid JSON: {str(e)}")
+    if not isinstance(context, dict):
+        raise HTTPException(status_code=400, detail="initial_context_data must be a JSON object")
+    return context
+
+def overloaded_response(error: PipelineOverloaded) -> JSONResponse:
+    return JSONResponse(
+        status_code=error.status_code,
+        content={"error": error.reason, "queue": error.metrics},
+        headers={"Retry-After": "1" if error.status_code == 429 else "5"},
+    )
+
 @app.get("/chat", summary="Chat with Multi Agents")
 async def chat(
     query: str = Query(..., description="User query to chat with the agents"),
-    initial_context_data: dict = Query(default=None, description="Initial context data for the agents")
+    initial_context_data: Optional[str] = Query(default=None, description="Initial context data for the agents, as a JSON object")
 ):
     """
     Chat with the multi-agents system.
-    
+
     Args:
         query (str): The user query to chat with the agents.
-        
+        initial_context_data (str): JSON object with customer context (conversation_id, customer_name, ...).
+
     Returns:
-        dict: The response from the multi-agents system.
+        dict: The response from the multi-agents system, or 429/503 with queue metrics when overloaded.
     """
-    response = await app.state.multi_agents.run(query, initial_context_data=initial_context_data)
+    context = parse_context(initial_context_data)
+    try:
+        response = await app.state.multi_agents.arun(query, initial_context_data=context)
+    except PipelineOverloaded as e:
+        logger.warning(f"Rejected /chat request: {e.reason} {e.metrics}")
+        return overloaded_response(e)
     return {"response": response}
 
+@app.get("/chat/stream", summary="Chat with Multi Agents, streaming progress as Server-Sent Events")
+async def chat_stream(
+    request: Request,
+    query: str = Query(..., description="User query to chat with the agents"),
+    initial_context_data: Optional[str] = Query(default=None, description="Initial context data for the agents, as a JSON object")
+):
+    """
+    Server-Sent Events variant of /chat. Emits 'stage', 'route', 'step', 'tool_result' and
+    'token' events while the crew runs, then 'final' with the same payload as /chat.
+    Disconnecting cancels the crew at its next step.
+    """
+    context = parse_context(initial_context_data)
+    events = app.state.multi_agents.astream(query, initial_context_data=context)
+    try:
+        # Admission happens on the first step: reject before the 200 response is committed.
+        first_event = await anext(events)
+    except PipelineOverloaded as e:
+        logger.warning(f"Rejected /chat/stream request: {e.reason} {e.metrics}")
+        return overloaded_response(e)
+    except StopAsyncIteration:
+        first_event = None
+
+    async def event_source():
+        try:
+            event = first_event
+            while event is not None:
+                if await request.is_disconnected():
+                    logger.info("Client disconnected from /chat/stream, cancelling run")
+                    break
+                yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+                event = await anext(events, None)
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/metrics", summary="Runtime metrics")
+async def metrics():
+    completion_cache = get_completion_cache()
+    response_cache = app.state.multi_agents.response_cache
+    return {
+        "pipeline": app.state.multi_agents.admission.metrics(),
+        "llm_cache": completion_cache.stats() if completion_cache else {"mode": "off"},
+        "response_cache": response_cache.stats() if response_cache else {"enabled": False},
+        "llm": get_llm_registry().stats(),
+        "product_lookups": get_product_coalescer().stats(),
+        "speculative_inventory": prefetch_metrics(),
+        "structured_outputs": structured_output_metrics(),
+    }
+
 if __name__ == "__main__":
     logger.info("Starting Multi Agents Function Calling server...")
-    uvicorn.run(app, host="0.0.0.0", port=2206)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=2206)
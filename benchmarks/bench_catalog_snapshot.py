@@ -0,0 +1,73 @@
+"""
+Product lookups served from the MCP server's in-memory catalog snapshot: load time and size
+of the snapshot, per-lookup latency for exact, prefix and substring queries, and the cost of
+applying a changed product. With --mongo-uri the same queries also run against MongoDB
+through MongoDBClient.get_products (the catalog is written to a separate database).
+
+    python benchmarks/bench_catalog_snapshot.py --skus 100000
+    python benchmarks/bench_catalog_snapshot.py --skus 100000 --mongo-uri mongodb://localhost:27017
+"""
+import time
+import random
+import argparse
+import tracemalloc
+from bson import ObjectId
+from pymongo import InsertOne
+
+from multi_agents.db.snapshot import CatalogSnapshot
+from multi_agents.db.connector import MongoDBClient, build_search_keys
+from bench_product_search import synthetic_catalog, timed
+
+
+def report(name: str, result):
+    print(f"{name:<26} mean={result[0]:8.3f}ms  p50={result[1]:8.3f}ms  p99={result[2]:8.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skus", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--mongo-uri", default=None, help="also time the queries against this MongoDB")
+    parser.add_argument("--db", default="inventory_bench")
+    args = parser.parse_args()
+
+    catalog = [{"_id": ObjectId(), **product} for product in synthetic_catalog(args.skus)]
+    snapshot = CatalogSnapshot(db_client=None)
+    tracemalloc.start()
+    start = time.perf_counter()
+    snapshot.load(catalog)
+    load_ms = (time.perf_counter() - start) * 1000
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"Snapshot of {args.skus} SKUs indexed in {load_ms:.0f}ms, index structures {index_bytes / 1e6:.1f}MB "
+          f"(documents shared with the loader), {len(snapshot._product_keys)} distinct product keys")
+
+    rng = random.Random(11)
+    sample = rng.sample(catalog, args.queries)
+    exact = [(p["product"], p["storage"], p["color"] if rng.random() < 0.5 else None) for p in sample]
+    prefix = [(" ".join(p["product"].split()[:2]), p["storage"], None) for p in sample]
+    substring = [(p["product"].split()[-1], None, None) for p in sample]
+
+    report("snapshot exact", timed(snapshot.get_products, exact))
+    report("snapshot prefix", timed(snapshot.get_products, prefix))
+    report("snapshot substring", timed(snapshot.get_products, substring[: max(1, args.queries // 10)]))
+
+    def apply_change(product):
+        snapshot.upsert({**product, "quantity": product["quantity"] + 1, "search": build_search_keys(product)})
+
+    report("apply one change", timed(apply_change, [(p,) for p in sample]))
+
+    if args.mongo_uri:
+        client = MongoDBClient(uri=args.mongo_uri, db_name=args.db)
+        client.db.products.drop()
+        for i in range(0, len(catalog), 10_000):
+            client.db.products.bulk_write([InsertOne(product) for product in catalog[i:i + 10_000]], ordered=False)
+        client.ensure_indexes()
+        report("mongodb exact", timed(client.get_products, exact))
+        report("mongodb prefix", timed(client.get_products, prefix))
+        report("mongodb substring", timed(client.get_products, substring[: max(1, args.queries // 10)]))
+        client.db.products.drop()
+
+
+if __name__ == "__main__":
+    main()
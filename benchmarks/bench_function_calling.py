@@ -0,0 +1,290 @@
+"""
+Latency and tokens per request of the two engines over the same tools: the CrewAI task pipeline
+(ReAct prompts, one LLM conversation per task) versus FunctionCallingAgent's single loop over
+native tool calls, with independent calls of a turn executed concurrently.
+
+Both run end to end against a scripted local OpenAI-compatible stand-in: it recognizes the task
+(or, for tool-calling requests, the turn) and answers what a model following the prompts would,
+as ReAct text or as tool_calls. Prompts cost `--prefill-us` per token and answers `--decode-ms`
+per token (words and punctuation approximate tokens; the function definitions count as prompt
+tokens). Tools go through the real MCP session pool to a stand-in MCP server with canned results
+and `--tool-ms` latency per call. The intent fast path and speculative lookup are off, so both
+engines answer every request with the LLM.
+
+    python benchmarks/bench_function_calling.py --requests 8
+"""
+import io
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+import statistics
+import contextlib
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOKEN = re.compile(r"\w+|[^\w\s]")
+IPHONE = {"product": "iPhone 15 Pro Max", "storage": "256GB", "color": "Titan tự nhiên"}
+GALAXY = {"product": "Samsung Galaxy S23 Ultra", "storage": "512GB", "color": "Đen"}
+CATALOG = {
+    "iPhone 15 Pro Max": {**IPHONE, "product_id": "IP15PM-256-TTN", "price": 32990000, "quantity": 5},
+    "Samsung Galaxy S23 Ultra": {**GALAXY, "product_id": "S23U-512-DEN", "price": 26990000, "quantity": 3},
+    "Xiaomi 13T": {"product": "Xiaomi 13T", "storage": "256GB", "color": "Xanh", "product_id": "X13T-256-XANH", "price": 11990000, "quantity": 8},
+}
+
+
+def analysis(query: str, details: str, intent: str, inventory: bool, order: bool, **extra) -> dict:
+    return {"product_details": details, "customer_intent": intent, "original_query": query,
+            "requires_inventory_check": inventory, "requires_order_placement": order, **extra}
+
+
+# Per scenario: the customer message, the tool calls a tool-calling model makes in its first turn,
+# and the ReAct actions and final answers of each CrewAI task.
+SCENARIOS = [
+    {
+        "query": "Cho mình hỏi iPhone 15 Pro Max 256GB màu Titan tự nhiên còn hàng không, giá bao nhiêu?",
+        "calls": [("get_product_info", IPHONE)],
+        "analyze": ([], analysis("", "iPhone 15 Pro Max 256GB Titan tự nhiên", "check_inventory_price", True, False)),
+        "inventory": ([("Check inventory detail", IPHONE)], {**IPHONE, "stock_status": "in_stock", "price": 32990000}),
+        "answer": "Dạ, iPhone 15 Pro Max 256GB màu Titan tự nhiên còn 5 máy, giá 32.990.000đ ạ.",
+    },
+    {
+        "query": "So sánh giá Samsung Galaxy S23 Ultra 512GB và iPhone 15 Pro Max 256GB, máy nào còn hàng?",
+        "calls": [("get_product_info", GALAXY), ("get_product_info", IPHONE)],
+        "analyze": ([], analysis("", "Samsung Galaxy S23 Ultra 512GB, iPhone 15 Pro Max 256GB", "check_inventory_price", True, False)),
+        "inventory": ([("Check inventory detail", GALAXY), ("Check inventory detail", IPHONE)],
+                      {"products": [{**GALAXY, "price": 26990000}, {**IPHONE, "price": 32990000}], "stock_status": "in_stock"}),
+        "answer": "Dạ, cả hai máy đều còn hàng: Galaxy S23 Ultra 512GB giá 26.990.000đ, iPhone 15 Pro Max 256GB giá 32.990.000đ ạ.",
+    },
+    {
+        "query": "Tôi muốn mua iPhone 15 Pro Max 256GB màu Titan tự nhiên",
+        "calls": [("reserve_and_create_order", {**IPHONE, "quantity": 1})],
+        "analyze": ([], analysis("", "iPhone 15 Pro Max 256GB Titan tự nhiên", "place_order", False, True)),
+        "order": ([("Reserve and create order", {**IPHONE, "quantity": 1})],
+                  {"order_created": True, "order_details": {"order_id": "bench-order", **IPHONE, "quantity": 1, "total_price": 32990000}, "message": "Đơn hàng đã được tạo."}),
+        "answer": "Dạ, đơn hàng iPhone 15 Pro Max 256GB màu Titan tự nhiên đã được tạo, tổng 32.990.000đ ạ.",
+    },
+    {
+        "query": "Mình muốn tìm điện thoại dưới 15 triệu, còn hàng",
+        "calls": [("search_products", {"max_price": 15000000, "min_stock": 1})],
+        "analyze": ([("Search products", {"max_price": 15000000, "min_stock": 1})],
+                    analysis("", "điện thoại dưới 15 triệu", "general_query", False, False,
+                             shortlist=[{"product": "Xiaomi 13T", "storage": "256GB", "color": "Xanh", "price": 11990000, "quantity": 8}])),
+        "answer": "Dạ, trong tầm giá dưới 15 triệu shop có Xiaomi 13T 256GB màu xanh giá 11.990.000đ, còn 8 máy ạ.",
+    },
+]
+TASK_MARKERS = [
+    ("analyze", "Phân tích kỹ lưỡng"),
+    ("inventory", "Dựa trên kết quả phân tích từ Task 1 (đặc biệt"),
+    ("order", "Reserve and create order` ĐÚNG MỘT"),
+    ("answer", "Tổng hợp tất cả"),
+]
+NAMES = ["Nguyễn Văn A", "Trần Thị B", "Lê Văn C"]
+
+
+def serve_mcp(port: int, tool_ms: float):
+    """Stand-in MCP server: the tools the engines call, with canned results after `tool_ms`."""
+    import asyncio
+    from typing import Optional
+    from mcp.server.fastmcp import FastMCP
+
+    mcp = FastMCP("bench catalog", port=port, log_level="WARNING")
+
+    def find(product: str) -> list:
+        return [item for name, item in CATALOG.items() if name.lower() in product.lower()]
+
+    @mcp.tool(name="get_product_info")
+    async def get_product_info(product: str, storage: Optional[str] = None, color: Optional[str] = None) -> str:
+        await asyncio.sleep(tool_ms / 1000)
+        found = find(product)
+        return json.dumps({"status": "success", "products": found} if found else {"status": "not_found"}, ensure_ascii=False)
+
+    @mcp.tool(name="get_products_bulk")
+    async def get_products_bulk(lookups: list) -> str:
+        await asyncio.sleep(tool_ms / 1000)
+        results = [{"status": "success", "products": find(lookup["product"])} for lookup in lookups]
+        return json.dumps({"status": "success", "results": results}, ensure_ascii=False)
+
+    @mcp.tool(name="search_products")
+    async def search_products(min_price: Optional[int] = None, max_price: Optional[int] = None, storage: Optional[str] = None,
+                              color: Optional[str] = None, brand: Optional[str] = None, min_stock: Optional[int] = None,
+                              sort_by: str = "price", descending: bool = False, limit: int = 10) -> str:
+        await asyncio.sleep(tool_ms / 1000)
+        found = [item for item in CATALOG.values() if item["price"] <= (max_price or 10 ** 12) and item["quantity"] >= (min_stock or 0)]
+        return json.dumps({"status": "success", "products": found}, ensure_ascii=False)
+
+    @mcp.tool(name="reserve_and_create_order")
+    async def reserve_and_create_order(product: str, customer_name: str, conversation_id: str, storage: Optional[str] = None,
+                                       color: Optional[str] = None, quantity: int = 1) -> str:
+        await asyncio.sleep(tool_ms / 1000)
+        item = find(product)[0]
+        return json.dumps({"status": "success", "order_id": f"bench-{conversation_id}", "unit_price": item["price"],
+                           "total_price": item["price"] * quantity, "remaining_stock": item["quantity"] - quantity}, ensure_ascii=False)
+
+    mcp.run(transport="sse")
+
+
+def react(actions: list, final, step: int) -> str:
+    """ReAct text of a CrewAI task: its actions one per LLM call, then the final answer."""
+    if step < len(actions):
+        tool, arguments = actions[step]
+        return f"Thought: Cần tra cứu bằng công cụ.\nAction: {tool}\nAction Input: {json.dumps(arguments, ensure_ascii=False)}"
+    if not isinstance(final, str):
+        final = json.dumps(final, ensure_ascii=False)
+    return f"Thought: I now know the final answer\nFinal Answer: {final}"
+
+
+def reply(body: dict) -> dict:
+    """Assistant message of the scripted model for a chat completion request."""
+    messages = body["messages"]
+    conversation = "\n".join(str(message.get("content") or "") for message in messages)
+    scenario = next(item for item in SCENARIOS if item["query"] in conversation)
+
+    if body.get("tools"):
+        if any(message["role"] == "tool" for message in messages) or body.get("tool_choice") == "none":
+            return {"role": "assistant", "content": scenario["answer"]}
+        context = json.loads(messages[-1]["content"].split("initial_context_data: ", 1)[1])
+        calls = []
+        for index, (name, arguments) in enumerate(scenario["calls"]):
+            if name == "reserve_and_create_order":
+                arguments = {**arguments, "customer_name": context["customer_name"], "conversation_id": context["conversation_id"]}
+            calls.append({"id": f"call_{index}", "type": "function",
+                          "function": {"name": name, "arguments": json.dumps(arguments, ensure_ascii=False)}})
+        return {"role": "assistant", "content": None, "tool_calls": calls}
+
+    task_prompt = next(message["content"] for message in messages if message["role"] == "user")
+    task = next(name for name, marker in TASK_MARKERS if marker in task_prompt)
+    step = sum(message["role"] == "assistant" for message in messages)
+    if task == "answer":
+        return {"role": "assistant", "content": react([], scenario["answer"], step)}
+    actions, final = scenario[task]
+    if task == "analyze":
+        final = {**final, "original_query": scenario["query"]}
+    return {"role": "assistant", "content": react(actions, final, step)}
+
+
+def start_llm_server(prefill_us: float, decode_ms: float, calls: list) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            prompt = "".join(f"<|{m['role']}|>\n{m.get('content') or ''}{json.dumps(m.get('tool_calls') or '')}\n" for m in body["messages"])
+            prompt_tokens = len(TOKEN.findall(prompt + json.dumps(body.get("tools") or "", ensure_ascii=False)))
+            message = reply(body)
+            completion_tokens = len(TOKEN.findall((message.get("content") or "") + json.dumps(message.get("tool_calls") or "", ensure_ascii=False)))
+            time.sleep(prompt_tokens * prefill_us / 1e6 + completion_tokens * decode_ms / 1000)
+            calls.append((prompt_tokens, completion_tokens))
+            payload = json.dumps({
+                "id": "bench", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                "choices": [{"index": 0, "finish_reason": "tool_calls" if message.get("tool_calls") else "stop", "message": message}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+            }, ensure_ascii=False).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def wait_for_mcp(timeout: float = 15.0):
+    from multi_agents.mcp.session_pool import get_session_pool
+
+    deadline = time.time() + timeout
+    while True:
+        try:
+            get_session_pool().call_tool("get_product_info", {"product": "warmup"})
+            return
+        except Exception:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+def run(name: str, pipeline, requests: list, calls: list) -> dict:
+    calls.clear()
+    latencies, per_request = [], []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for customer_input, context in requests:
+            before = len(calls)
+            start = time.perf_counter()
+            result = pipeline.run(customer_input, context)
+            latencies.append((time.perf_counter() - start) * 1000)
+            per_request.append(len(calls) - before)
+            assert result["customer_response"], f"{name} gave no answer to {customer_input!r}"
+    prompt_tokens = sum(call[0] for call in calls)
+    completion_tokens = sum(call[1] for call in calls)
+    latencies.sort()
+    print(f"{name:<17} LLM calls/request={statistics.mean(per_request):4.2f}  prompt tokens/request={prompt_tokens / len(requests):7.0f}  "
+          f"completion tokens/request={completion_tokens / len(requests):5.0f}  latency mean={statistics.mean(latencies):7.1f}ms "
+          f"p50={latencies[len(latencies) // 2]:7.1f}ms max={latencies[-1]:7.1f}ms")
+    return {"latency": statistics.mean(latencies), "prompt": prompt_tokens, "completion": completion_tokens}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--prefill-us", type=float, default=150, help="prefill time per prompt token in microseconds")
+    parser.add_argument("--decode-ms", type=float, default=10, help="decode time per completion token in milliseconds")
+    parser.add_argument("--tool-ms", type=float, default=50, help="stand-in latency of each MCP tool call")
+    parser.add_argument("--mcp-port", type=int, default=8766)
+    parser.add_argument("--serve-mcp", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_mcp:
+        serve_mcp(args.mcp_port, args.tool_ms)
+        return
+
+    calls = []
+    server = start_llm_server(args.prefill_us, args.decode_ms, calls)
+    mcp_server = subprocess.Popen([sys.executable, __file__, "--serve-mcp", "--mcp-port", str(args.mcp_port), "--tool-ms", str(args.tool_ms)])
+    # Settings are read at import: point the agents and tools at the stand-ins and turn off what would skip LLM calls.
+    os.environ.update({
+        "API_URL_LLM": f"http://127.0.0.1:{server.server_address[1]}/v1",
+        "API_KEY": "bench",
+        "LLM_MODEL": "bench",
+        "LLM_STREAM": "false",
+        "LLM_CACHE_MODE": "off",
+        "RESPONSE_CACHE_ENABLED": "false",
+        "PIPELINE_INTENT_FAST_PATH": "false",
+        "PIPELINE_SPECULATIVE_INVENTORY": "false",
+        "MCP_SERVER_BASE_URL": f"http://127.0.0.1:{args.mcp_port}/sse",
+        "OTEL_SDK_DISABLED": "true",
+    })
+    from multi_agents.pipeline import MultiAgents
+    from multi_agents.config.settings import PipelineEngine
+    from multi_agents.mcp.session_pool import get_session_pool
+
+    try:
+        wait_for_mcp()
+        requests = [
+            (SCENARIOS[i % len(SCENARIOS)]["query"], {"customer_name": NAMES[i % len(NAMES)], "conversation_id": f"bench-{i}"})
+            for i in range(args.requests)
+        ]
+        print(f"{args.requests} requests over {len(SCENARIOS)} scenarios (price check, two-product comparison, order, search), "
+              f"{args.prefill_us:.0f}us/prompt token, {args.decode_ms:.0f}ms/completion token, {args.tool_ms:.0f}ms/tool call")
+        results = {}
+        for engine in (PipelineEngine.CREWAI, PipelineEngine.FUNCTION_CALLING):
+            pipeline = MultiAgents(engine=engine)
+            results[engine] = run(engine.value, pipeline, requests, calls)
+            pipeline.close()
+        crew, single = results[PipelineEngine.CREWAI], results[PipelineEngine.FUNCTION_CALLING]
+        print(f"function_calling vs crewai: latency {single['latency'] / crew['latency']:.2f}x, "
+              f"prompt tokens {single['prompt'] / crew['prompt']:.2f}x, completion tokens {single['completion'] / crew['completion']:.2f}x")
+    finally:
+        get_session_pool().close()
+        mcp_server.terminate()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
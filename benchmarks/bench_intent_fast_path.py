@@ -0,0 +1,132 @@
+"""
+Bypass rate and accuracy of the rule-based fast path in front of Task 1 on a labeled set of
+customer messages: product questions, orders and greetings it should answer (with noisy product
+mentions: shorthand, typos, missing spaces or accents), and requests only the LLM handles
+(comparisons, advice, price ranges, after-sales, refusals, quantities, unknown wording) that must
+fall through.
+
+A message is bypassed when IntentClassifier's confidence reaches the threshold; a bypass is
+correct when product_details, customer_intent and both requires_* flags equal the label. Product
+resolution runs on a local ProductResolver over the synthetic catalog of bench_product_resolver,
+as the MCP server's resolve_product would.
+
+    python benchmarks/bench_intent_fast_path.py --queries 2000
+"""
+import time
+import random
+import argparse
+import statistics
+
+from multi_agents.config.settings import pipeline_config
+from multi_agents.db.resolver import ProductResolver
+from multi_agents.agents.intent import IntentClassifier
+from multi_agents.utils.text import fold_diacritics
+from bench_product_resolver import build_catalog, noisy_mention
+
+CHECK = ("check_inventory_price", True, False)
+ORDER = ("place_order", False, True)
+ORDER_AND_CHECK = ("place_order", True, True)
+# (template, label); {p} is a noisy product mention, {s} its storage and {c} its color.
+TEMPLATES = [
+    ("{p} còn hàng không", CHECK),
+    ("{p} {s} giá bao nhiêu vậy shop?", CHECK),
+    ("Cho mình hỏi {p} {s} màu {c} còn hàng không, giá bao nhiêu?", CHECK),
+    ("shop ơi {p} còn không ạ", CHECK),
+    ("{p} {s} bao nhiêu tiền", CHECK),
+    ("{p}", CHECK),
+    ("{p} {s} màu {c}", CHECK),
+    ("Tôi muốn mua {p} {s} màu {c}", ORDER),
+    ("đặt mua {p} {s}", ORDER),
+    ("chốt đơn {p} màu {c} nhé", ORDER),
+    ("Mình muốn mua {p}, giá bao nhiêu?", ORDER_AND_CHECK),
+]
+GREETINGS = ["Xin chào shop", "chào em", "Cảm ơn shop nhé", "alo shop ơi"]
+# Requests the LLM must see; any bypass of these is wrong.
+OUT_OF_SCOPE = [
+    "So sánh {p} và {q}",
+    "{p} có nên mua không?",
+    "Mình muốn tìm điện thoại dưới 15 triệu, pin trâu, còn hàng",
+    "{p} có trả góp không?",
+    "{p} bảo hành bao lâu vậy?",
+    "Tôi muốn hủy đơn hàng hôm qua",
+    "{p} hay {q} tốt hơn?",
+    "{p} chụp ảnh đêm có đẹp không",
+    "Máy nào chơi game mượt nhất shop",
+    "{p} với {q} cái nào rẻ hơn",
+    "Tôi không mua {p} nữa",
+    "Tôi không muốn mua {p}",
+    "không cần mua {p}",
+    "anh ko lấy {p} nữa",
+    "thôi đừng đặt {p}",
+    "Mình muốn mua 2 chiếc {p}",
+    "{p} có sạc nhanh không",
+]
+
+
+def noisy(text: str, rng: random.Random) -> str:
+    return fold_diacritics(text).lower() if rng.random() < 0.3 else text
+
+
+def labeled_queries(catalog: list, count: int, rng: random.Random) -> list:
+    """(message, expected analysis or None); about a quarter are out of scope, a few are greetings."""
+    queries = []
+    for _ in range(count):
+        sku, other = rng.sample(catalog, 2)
+        mention = noisy_mention(sku["product"], rng)
+        roll = rng.random()
+        if roll < 0.25:
+            text = rng.choice(OUT_OF_SCOPE).format(p=mention, q=noisy_mention(other["product"], rng))
+            queries.append((noisy(text, rng), None))
+            continue
+        if roll < 0.3:
+            queries.append((rng.choice(GREETINGS), ("", "general_query", False, False)))
+            continue
+        template, (intent, inventory, order) = rng.choice(TEMPLATES)
+        storage = sku["storage"] if "{s}" in template else None
+        color = sku["color"] if "{c}" in template else None
+        text = template.format(p=mention, s=rng.choice([storage, (storage or "").lower()]), c=color)
+        details = " ".join(part for part in (sku["product"], storage, color) if part)
+        queries.append((noisy(text, rng), (details, intent, inventory, order)))
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--catalog", default="storage/inventory.json", help="real products added to the synthetic ones")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--thresholds", default="0.5,0.6,0.7,0.8,0.85,0.9,0.95")
+    args = parser.parse_args()
+
+    resolver = ProductResolver(build_catalog(args.catalog))
+    classifier = IntentClassifier(resolve=lambda product, storage, color: resolver.resolve(product, storage, color, limit=2))
+    queries = labeled_queries(build_catalog(args.catalog), args.queries, random.Random(7))
+
+    results, latencies = [], []
+    for text, label in queries:
+        start = time.perf_counter()
+        analysis, confidence = classifier.classify(text)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        got = None if analysis is None else (
+            analysis["product_details"], analysis["customer_intent"],
+            analysis["requires_inventory_check"], analysis["requires_order_placement"],
+        )
+        results.append((text, label, got, confidence))
+
+    total = len(results)
+    in_scope = sum(label is not None for _, label, _, _ in results)
+    latencies.sort()
+    print(f"{total} labeled messages ({in_scope} the rules should answer, {total - in_scope} for the LLM), "
+          f"classify mean={statistics.mean(latencies):5.0f}us p50={latencies[total // 2]:5.0f}us p99={latencies[int(total * 0.99)]:5.0f}us")
+    for threshold in (float(value) for value in args.thresholds.split(",")):
+        bypassed = [(text, label, got) for text, label, got, confidence in results if got is not None and confidence >= threshold]
+        correct = sum(label == got for _, label, got in bypassed)
+        out_of_scope = sum(label is None for _, label, _ in bypassed)
+        print(f"threshold={threshold:4.2f}  bypass={len(bypassed) / total:6.1%}  bypass accuracy={correct / max(1, len(bypassed)):6.1%}  "
+              f"wrong bypasses={len(bypassed) - correct:>4} ({out_of_scope} out of scope)  in-scope recall={correct / in_scope:6.1%}")
+        if threshold == pipeline_config.intent_min_confidence:
+            for text, label, got in [item for item in bypassed if item[1] != item[2]][:5]:
+                print(f"  wrong: {text!r} -> {got} (expected {label})")
+
+
+if __name__ == "__main__":
+    main()
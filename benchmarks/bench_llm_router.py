@@ -0,0 +1,129 @@
+"""
+Chat-completion latency against several OpenAI-compatible replicas with heavy-tailed latency:
+a single endpoint, the LLMRouter without hedging, and the LLMRouter with hedged requests.
+
+Replicas are local stand-in servers answering after `--latency` ms, except for a fraction of
+requests (`--tail-rate`, higher on the last replica) that take `--tail` ms. With `--stream`
+they answer like a streaming vLLM server: headers at once, the first token after the delay.
+
+    python benchmarks/bench_llm_router.py --calls 400 --concurrency 8 [--stream]
+"""
+import json
+import time
+import httpx
+import random
+import argparse
+import statistics
+import threading
+from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from multi_agents.agents.llm_router import LLMRouter
+
+
+def start_replica(latency: float, tail: float, tail_rate: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            delay = tail if random.random() < tail_rate else latency
+            if request.get("stream"):
+                self.stream(delay)
+                return
+            time.sleep(delay)
+            body = json.dumps({
+                "id": "bench",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": "bench",
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 1, "total_tokens": 11},
+            }).encode()
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # hedged loser closed by the client
+
+        def stream(self, delay: float):
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                self.wfile.flush()
+                time.sleep(delay)
+                for content, finish in (("ok", None), ("", "stop")):
+                    chunk = {"id": "bench", "object": "chat.completion.chunk", "created": 0, "model": "bench",
+                             "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": finish}]}
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # hedged loser closed by the client
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(name: str, endpoints: list, calls: int, concurrency: int, hedge: bool, warmup: int, stream: bool):
+    limits = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+    router = LLMRouter(endpoints, limits, hedge_enabled=hedge, hedge_min_samples=warmup, hedge_min_delay=0.01)
+    client = OpenAI(base_url=endpoints[0], api_key="bench", http_client=httpx.Client(transport=router, timeout=30), max_retries=0)
+
+    def call(_):
+        start = time.perf_counter()
+        response = client.chat.completions.create(model="bench", messages=[{"role": "user", "content": "hi"}], stream=stream)
+        if stream:
+            for _ in response:
+                pass
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(warmup)))
+        latencies = sorted(pool.map(call, range(calls)))
+
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<22} mean={statistics.mean(latencies):7.1f}ms  p50={p50:7.1f}ms  p99={p99:7.1f}ms  hedged={router.hedged} hedge_wins={router.hedge_wins}")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=50, help="normal response time in ms")
+    parser.add_argument("--tail", type=float, default=1000, help="tail response time in ms")
+    parser.add_argument("--tail-rate", type=float, default=0.01)
+    parser.add_argument("--warmup", type=int, default=40)
+    parser.add_argument("--stream", action="store_true", help="streamed completions (LLM_STREAM=true)")
+    args = parser.parse_args()
+
+    servers = []
+    for i in range(args.replicas):
+        # The last replica is the degraded one.
+        tail_rate = args.tail_rate * (5 if i == args.replicas - 1 else 1)
+        servers.append(start_replica(args.latency / 1000, args.tail / 1000, tail_rate))
+    endpoints = [f"http://127.0.0.1:{server.server_address[1]}/v1" for server in servers]
+
+    print(f"{args.calls} {'streamed ' if args.stream else ''}calls, concurrency {args.concurrency}, {args.replicas} replicas")
+    run("single endpoint", endpoints[-1:], args.calls, args.concurrency, hedge=False, warmup=args.warmup, stream=args.stream)
+    run("router", endpoints, args.calls, args.concurrency, hedge=False, warmup=args.warmup, stream=args.stream)
+    run("router + hedging", endpoints, args.calls, args.concurrency, hedge=True, warmup=args.warmup, stream=args.stream)
+
+    for server in servers:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+get_product_info throughput against N concurrent MCP client sessions: a blocking tool (the
+previous sync handler, which runs on the server's event loop and serializes every call)
+versus the async tool used by mcp_server.py.
+
+Without --mongo-uri the product query is a stand-in: an in-memory lookup plus --latency-ms of
+simulated database time (time.sleep for the blocking tool, asyncio.sleep for the async one).
+With --mongo-uri both variants query that MongoDB through MongoDBClient / AsyncMongoDBClient.
+Clients and server share the machine, so on few cores the MCP/SSE framing cost itself caps
+the async numbers.
+
+    python benchmarks/bench_mcp_server_load.py --clients 1 4 16 64 --duration 5
+    python benchmarks/bench_mcp_server_load.py --mongo-uri mongodb://localhost:27017 --product "iPhone 15"
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.server.fastmcp import FastMCP
+
+from multi_agents.utils.concurrency import ToolLimiter
+from multi_agents.db.connector import AsyncMongoDBClient, MongoDBClient, normalize_search_key
+
+STANDIN_PRODUCTS = [
+    {"product_name": "iPhone 15 Pro Max", "storage": "256GB", "color": "Titan tự nhiên", "price": 27990000, "quantity": 12},
+    {"product_name": "iPhone 15", "storage": "128GB", "color": "Đen", "price": 19990000, "quantity": 30},
+    {"product_name": "Samsung Galaxy S24 Ultra", "storage": "512GB", "color": "Xám", "price": 29990000, "quantity": 8},
+]
+
+
+def standin_lookup(product: str) -> list:
+    key = normalize_search_key(product)
+    return [p for p in STANDIN_PRODUCTS if key in normalize_search_key(p["product_name"])]
+
+
+def serve(port: int, mode: str, latency: float, mongo_uri: str, concurrency: int):
+    mcp = FastMCP("bench server", port=port, log_level="WARNING")
+
+    if mode == "blocking":
+        db = MongoDBClient(uri=mongo_uri) if mongo_uri else None
+
+        @mcp.tool(name="get_product_info")
+        def get_product_info(product: str) -> str:
+            if db is not None:
+                products = db.get_products(product_name=product)
+            else:
+                time.sleep(latency)
+                products = standin_lookup(product)
+            return json.dumps({"status": "success", "products": products}, ensure_ascii=False)
+    else:
+        db = AsyncMongoDBClient(uri=mongo_uri) if mongo_uri else None
+        limiter = ToolLimiter("products", concurrency, timeout=30)
+
+        async def query(product: str) -> list:
+            if db is not None:
+                return await db.get_products(product_name=product)
+            await asyncio.sleep(latency)
+            return standin_lookup(product)
+
+        @mcp.tool(name="get_product_info")
+        async def get_product_info(product: str) -> str:
+            products = await limiter.run(query, product)
+            return json.dumps({"status": "success", "products": products}, ensure_ascii=False)
+
+    mcp.run(transport="sse")
+
+
+async def client_loop(url: str, product: str, ready: asyncio.Barrier, window: dict, counts: list):
+    async with sse_client(url=url) as streams:
+        async with ClientSession(*streams) as session:
+            await session.initialize()
+            await session.call_tool("get_product_info", {"product": product})
+            # The timed window starts once every session is connected and warmed up.
+            await ready.wait()
+            while time.perf_counter() < window["deadline"]:
+                result = await session.call_tool("get_product_info", {"product": product})
+                assert not result.isError, result
+                counts.append(1)
+
+
+async def measure(url: str, clients: int, duration: float, product: str) -> float:
+    counts = []
+    window = {}
+    ready = asyncio.Barrier(clients + 1)
+    tasks = [asyncio.create_task(client_loop(url, product, ready, window, counts)) for _ in range(clients)]
+    window["deadline"] = float("inf")
+    await ready.wait()
+    start = time.perf_counter()
+    window["deadline"] = start + duration
+    await asyncio.gather(*tasks)
+    return len(counts) / (time.perf_counter() - start)
+
+
+async def wait_for_server(url: str, timeout: float = 15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            async with sse_client(url=url) as streams:
+                async with ClientSession(*streams) as session:
+                    await session.initialize()
+                    return
+        except Exception:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"MCP bench server did not start at {url}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per measurement")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated query time of the stand-in")
+    parser.add_argument("--mongo-uri", default=None, help="query this MongoDB instead of the stand-in")
+    parser.add_argument("--product", default="iPhone 15")
+    parser.add_argument("--concurrency", type=int, default=32, help="async tool concurrency limit")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--serve", choices=["blocking", "async"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.serve, args.latency_ms / 1000, args.mongo_uri, args.concurrency)
+        return
+
+    url = f"http://127.0.0.1:{args.port}/sse"
+    backend = args.mongo_uri or f"stand-in, {args.latency_ms:g}ms per query"
+    print(f"get_product_info calls/s ({backend})")
+    print(f"{'clients':>8} {'blocking':>10} {'async':>10}")
+    results = {}
+    for mode in ("blocking", "async"):
+        command = [sys.executable, __file__, "--serve", mode, "--port", str(args.port),
+                   "--latency-ms", str(args.latency_ms), "--concurrency", str(args.concurrency)]
+        if args.mongo_uri:
+            command += ["--mongo-uri", args.mongo_uri]
+        server = subprocess.Popen(command)
+        try:
+            asyncio.run(wait_for_server(url))
+            for clients in args.clients:
+                results[(mode, clients)] = asyncio.run(measure(url, clients, args.duration, args.product))
+        finally:
+            server.terminate()
+            server.wait()
+    for clients in args.clients:
+        print(f"{clients:>8} {results[('blocking', clients)]:>10.0f} {results[('async', clients)]:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
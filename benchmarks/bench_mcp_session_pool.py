@@ -0,0 +1,96 @@
+"""
+Per-call latency of MCP tool calls: a fresh SSE connection + initialize per call
+(the previous behaviour of the CrewAI MCP tools) versus the pooled sessions.
+
+    python benchmarks/bench_mcp_session_pool.py --calls 200
+"""
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+import subprocess
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.server.fastmcp import FastMCP
+
+from multi_agents.mcp.session_pool import MCPSessionPool
+
+
+def serve(port: int):
+    mcp = FastMCP("bench server", port=port, log_level="WARNING")
+
+    @mcp.tool(name="echo")
+    def echo(text: str) -> str:
+        return text
+
+    mcp.run(transport="sse")
+
+
+async def call_fresh_connection(url: str) -> None:
+    async with sse_client(url=url) as streams:
+        async with ClientSession(*streams) as session:
+            await session.initialize()
+            await session.call_tool("echo", {"text": "ping"})
+
+
+def wait_for_server(url: str, timeout: float = 15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            asyncio.run(call_fresh_connection(url))
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError(f"MCP bench server did not start at {url}")
+
+
+def report(name: str, latencies: list):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<18} mean={statistics.mean(latencies):7.2f}ms  p50={p50:7.2f}ms  p99={p99:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    url = f"http://127.0.0.1:{args.port}/sse"
+    server = subprocess.Popen([sys.executable, __file__, "--serve", "--port", str(args.port)])
+    try:
+        wait_for_server(url)
+
+        fresh = []
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            asyncio.run(call_fresh_connection(url))
+            fresh.append((time.perf_counter() - start) * 1000)
+
+        pool = MCPSessionPool(url=url, size=args.pool_size)
+        pool.call_tool("echo", {"text": "warmup"})
+        pooled = []
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            pool.call_tool("echo", {"text": "ping"})
+            pooled.append((time.perf_counter() - start) * 1000)
+        pool.close()
+
+        print(f"{args.calls} sequential calls to a local FastMCP server")
+        report("fresh connection", fresh)
+        report("pooled session", pooled)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
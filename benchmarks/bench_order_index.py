@@ -0,0 +1,99 @@
+"""
+get_order latency over a directory of synthetic order files: the previous os.listdir +
+filename prefix scan versus the SQLite order index, plus listing a conversation's orders.
+
+    python benchmarks/bench_order_index.py --orders 100000 --lookups 200
+"""
+import os
+import json
+import time
+import uuid
+import random
+import argparse
+import tempfile
+import statistics
+
+from multi_agents.orders.index import OrderIndex
+from multi_agents.orders.backend import FileOrderBackend
+
+
+def populate(orders_dir: str, count: int) -> list:
+    os.makedirs(orders_dir, exist_ok=True)
+    order_ids = []
+    for i in range(count):
+        order_id = str(uuid.uuid4())
+        conversation_id = str(i // 4)
+        order = {
+            "order_details": {
+                "order_id": order_id,
+                "product": "iPhone 15 Pro Max",
+                "color": "Titan tự nhiên",
+                "storage": "256GB",
+                "quantity": 1,
+                "total_price": 27990000,
+                "customer_info": {"customer_name": f"Khách hàng {i % 5000}", "conversation_id": conversation_id},
+            },
+            "message": "Đơn hàng đã được tạo.",
+        }
+        with open(os.path.join(orders_dir, f"order_{order_id}_{conversation_id}.json"), "w", encoding="utf-8") as f:
+            json.dump(order, f, ensure_ascii=False)
+        order_ids.append(order_id)
+    return order_ids
+
+
+def scan_lookup(orders_dir: str, order_id: str) -> str:
+    """The lookup get_order used to do."""
+    for filename in os.listdir(orders_dir):
+        if filename.startswith(f"order_{order_id}") and filename.endswith(".json"):
+            with open(os.path.join(orders_dir, filename), "r", encoding="utf-8") as f:
+                return f.read()
+    return None
+
+
+def index_lookup(index: OrderIndex, order_id: str) -> str:
+    with open(index.locate(order_id), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def measure(name: str, fn, args_list: list):
+    latencies = []
+    for args in args_list:
+        start = time.perf_counter()
+        assert fn(*args) is not None
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<26} mean={statistics.mean(latencies):9.3f}ms  p50={latencies[len(latencies) // 2]:9.3f}ms  p99={p99:9.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        orders_dir = os.path.join(workdir, "orders")
+        start = time.perf_counter()
+        order_ids = populate(orders_dir, args.orders)
+        print(f"Wrote {args.orders} order files in {time.perf_counter() - start:.1f}s")
+
+        index = OrderIndex(path=os.path.join(workdir, "index.sqlite"))
+        backends = [FileOrderBackend(orders_dir)]
+        start = time.perf_counter()
+        summary = index.sync(backends)
+        print(f"Initial index sync: {summary} in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        index.sync(backends)
+        print(f"Incremental sync (nothing new): {time.perf_counter() - start:.2f}s")
+
+        targets = [(random.choice(order_ids),) for _ in range(args.lookups)]
+        measure("get_order, directory scan", lambda order_id: scan_lookup(orders_dir, order_id), targets[: max(1, args.lookups // 10)])
+        measure("get_order, index", lambda order_id: index_lookup(index, order_id), targets)
+        conversations = [(str(random.randrange(args.orders // 4)),) for _ in range(args.lookups)]
+        measure("list by conversation", lambda conversation_id: index.by_conversation(conversation_id), conversations)
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
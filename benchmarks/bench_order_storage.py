@@ -0,0 +1,78 @@
+"""
+Order write throughput with concurrent writers: one pretty-printed JSON file per order (the
+previous create_order behaviour, with and without fsync) versus the segment log with group
+commit.
+
+    python benchmarks/bench_order_storage.py --orders 20000 --writers 16
+"""
+import os
+import time
+import uuid
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from multi_agents.orders.segment_log import SegmentLogBackend
+from multi_agents.orders.backend import FileOrderBackend
+
+
+def make_order(i: int) -> dict:
+    return {
+        "order_details": {
+            "order_id": str(uuid.uuid4()),
+            "product": "iPhone 15 Pro Max",
+            "color": "Titan tự nhiên",
+            "storage": "256GB",
+            "quantity": 1,
+            "total_price": 27990000,
+            "customer_info": {"customer_name": f"Khách hàng {i % 5000}", "conversation_id": str(i // 4)},
+        },
+        "message": "Đơn hàng đã được tạo.",
+    }
+
+
+class FsyncFileOrderBackend(FileOrderBackend):
+    """One file per order made durable: fsync the file and its directory entry."""
+
+    def save(self, order: dict) -> str:
+        filepath = super().save(order)
+        with open(filepath, "rb") as f:
+            os.fsync(f.fileno())
+        dir_fd = os.open(self.orders_dir, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        return filepath
+
+
+def run(name: str, backend, orders: list, writers: int):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=writers) as pool:
+        list(pool.map(backend.save, orders))
+    elapsed = time.perf_counter() - start
+    extra = ""
+    if isinstance(backend, SegmentLogBackend):
+        stats = backend.stats()
+        extra = f"  fsyncs={stats['fsyncs']}  orders/fsync={stats['appends_per_fsync']}"
+    print(f"{name:<28} {len(orders) / elapsed:9.0f} orders/s  ({elapsed:.2f}s){extra}")
+    backend.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=20_000)
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--window-ms", type=float, default=0.2, help="group commit window")
+    args = parser.parse_args()
+
+    orders = [make_order(i) for i in range(args.orders)]
+    print(f"{args.orders} orders, {args.writers} concurrent writers")
+    with tempfile.TemporaryDirectory() as workdir:
+        run("file per order (no fsync)", FileOrderBackend(os.path.join(workdir, "files")), orders, args.writers)
+        run("file per order + fsync", FsyncFileOrderBackend(os.path.join(workdir, "files_fsync")), orders, args.writers)
+        run("segment log, group commit", SegmentLogBackend(os.path.join(workdir, "log"), group_commit_window=args.window_ms / 1000), orders, args.writers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Concurrent inventory checks from several crews: one get_product_info call per lookup (the
+previous GetDetailTool) versus the coalescer, which batches lookups into get_products_bulk
+calls and shares in-flight identical lookups.
+
+The server is a stand-in: each tool call costs --latency-ms of simulated database time
+regardless of how many lookups it carries (one $or query), and at most --db-concurrency
+queries run at once, like a bounded connection pool.
+
+    python benchmarks/bench_product_coalescing.py --crews 32 --lookups 20
+"""
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from mcp.server.fastmcp import FastMCP
+
+from multi_agents.mcp.coalescer import ProductLookupCoalescer
+from multi_agents.mcp.session_pool import MCPSessionPool, result_text
+from multi_agents.utils.concurrency import ToolLimiter
+from multi_agents.db.connector import normalize_search_key
+
+PRODUCTS = [
+    "iPhone 15 Pro Max", "iPhone 15 Pro", "iPhone 15", "iPhone 14", "Samsung Galaxy S24 Ultra",
+    "Samsung Galaxy Z Fold5", "Xiaomi 14", "OPPO Find N3", "Google Pixel 8", "Vivo X100",
+]
+
+
+def serve(port: int, latency: float, db_concurrency: int):
+    mcp = FastMCP("bench server", port=port, log_level="WARNING")
+    limiter = ToolLimiter("products", db_concurrency, timeout=60)
+    calls = {"get_product_info": 0, "get_products_bulk": 0}
+
+    async def query(products: list) -> list:
+        await asyncio.sleep(latency)
+        return [[{"product": name, "quantity": 1}] for name in products]
+
+    @mcp.tool(name="get_product_info")
+    async def get_product_info(product: str, storage: Optional[str] = None, color: Optional[str] = None) -> str:
+        calls["get_product_info"] += 1
+        products = (await limiter.run(query, [product]))[0]
+        return json.dumps({"status": "success", "products": products}, ensure_ascii=False)
+
+    @mcp.tool(name="get_products_bulk")
+    async def get_products_bulk(lookups: list) -> str:
+        calls["get_products_bulk"] += 1
+        matches = await limiter.run(query, [lookup["product"] for lookup in lookups])
+        results = [{"status": "success", "products": products} for products in matches]
+        return json.dumps({"status": "success", "results": results}, ensure_ascii=False)
+
+    @mcp.tool(name="server_stats")
+    def server_stats() -> str:
+        return json.dumps(calls)
+
+    mcp.run(transport="sse")
+
+
+def run(name: str, lookup, pool: MCPSessionPool, workload: list, crews: int):
+    before = json.loads(result_text(pool.call_tool("server_stats", {})))
+    latencies = []
+
+    def crew(lookups: list):
+        for product in lookups:
+            start = time.perf_counter()
+            payload = json.loads(lookup({"product": product, "storage": None, "color": None}))
+            assert payload["status"] == "success" and normalize_search_key(payload["products"][0]["product"]) == normalize_search_key(product)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=crews) as executor:
+        list(executor.map(crew, workload))
+    elapsed = time.perf_counter() - start
+
+    after = json.loads(result_text(pool.call_tool("server_stats", {})))
+    calls = sum(after.values()) - sum(before.values())
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<22} {len(latencies) / elapsed:8.0f} lookups/s  p50={p50:7.1f}ms  p99={p99:7.1f}ms  server calls={calls}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--crews", type=int, default=32, help="concurrent callers")
+    parser.add_argument("--lookups", type=int, default=20, help="lookups per caller")
+    parser.add_argument("--latency-ms", type=float, default=10.0, help="simulated query time per tool call")
+    parser.add_argument("--db-concurrency", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=4, help="MCP client sessions")
+    parser.add_argument("--window-ms", type=float, default=5.0)
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.latency_ms / 1000, args.db_concurrency)
+        return
+
+    url = f"http://127.0.0.1:{args.port}/sse"
+    server = subprocess.Popen([sys.executable, __file__, "--serve", "--port", str(args.port),
+                              "--latency-ms", str(args.latency_ms), "--db-concurrency", str(args.db_concurrency)])
+    pool = MCPSessionPool(url=url, size=args.pool_size, connect_timeout=15)
+    try:
+        for _ in range(50):
+            try:
+                pool.call_tool("server_stats", {})
+                break
+            except Exception:
+                time.sleep(0.2)
+
+        rng = random.Random(0)
+        # Popular models are asked about far more often than the rest.
+        workload = [rng.choices(PRODUCTS, weights=[1 / (i + 1) for i in range(len(PRODUCTS))], k=args.lookups)
+                    for _ in range(args.crews)]
+        print(f"{args.crews} crews x {args.lookups} lookups, {args.latency_ms:g}ms per query, {args.pool_size} sessions")
+        run("one call per lookup", lambda arguments: result_text(pool.call_tool("get_product_info", arguments)),
+            pool, workload, args.crews)
+        coalescer = ProductLookupCoalescer(pool=pool, window=args.window_ms / 1000)
+        run("coalesced", coalescer.lookup, pool, workload, args.crews)
+        print(f"coalescer: {coalescer.stats()}")
+    finally:
+        pool.close()
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Structured product search (price range, storage, color, brand, stock, sorted top-k) over a
+synthetic catalog: ColumnarCatalog's vectorized masks versus a Python scan of the product
+documents, which is what filtering the snapshot or the get_products results would cost.
+With --mongo-uri the same searches also run as MongoDB find().sort().limit() queries (the
+catalog is written to a separate database).
+
+    python benchmarks/bench_product_filter_search.py --skus 1000000
+    python benchmarks/bench_product_filter_search.py --skus 1000000 --mongo-uri mongodb://localhost:27017
+"""
+import time
+import argparse
+from pymongo import ASCENDING, DESCENDING, InsertOne
+
+from multi_agents.db.connector import MongoDBClient
+from multi_agents.db.columnar import COLUMNS, ColumnarCatalog, brand_of, storage_gb
+from bench_product_search import synthetic_catalog, timed
+
+SEARCHES = [
+    {"max_price": 25_000_000, "storage": "512GB", "min_stock": 1},
+    {"brand": "iPhone", "color": "titan", "sort_by": "price", "descending": True},
+    {"brand": "Samsung", "min_price": 10_000_000, "max_price": 20_000_000},
+    {"color": "xanh", "min_stock": 15, "sort_by": "quantity", "descending": True},
+    {"storage": "1TB", "sort_by": "price"},
+    {},
+]
+
+
+def python_search(catalog, min_price=None, max_price=None, storage=None, color=None, brand=None,
+                  min_stock=None, sort_by="price", descending=False, limit=10):
+    gb = storage_gb(storage) if storage else None
+    wanted_brand = brand_of(brand) if brand else None
+    # Per-SKU work only; brand and storage of each name are precomputed like the columnar build does.
+    rows = [
+        product for product in catalog
+        if (min_price is None or product["price"] >= min_price)
+        and (max_price is None or product["price"] <= max_price)
+        and (gb is None or product["_gb"] == gb)
+        and (wanted_brand is None or product["_brand"] == wanted_brand)
+        and (color is None or color.lower() in product["color"].lower())
+        and (min_stock is None or product["quantity"] >= min_stock)
+    ]
+    key = "_gb" if sort_by == "storage" else sort_by
+    rows.sort(key=lambda product: product[key], reverse=descending)
+    return len(rows), rows[:limit]
+
+
+def mongo_query(search):
+    query = {}
+    if "min_price" in search or "max_price" in search:
+        query["price"] = {op: search[field] for op, field in (("$gte", "min_price"), ("$lte", "max_price")) if field in search}
+    if "storage" in search:
+        query["storage"] = search["storage"]
+    if "min_stock" in search:
+        query["quantity"] = {"$gte": search["min_stock"]}
+    if "color" in search:
+        query["search.color"] = {"$regex": search["color"]}
+    if "brand" in search:
+        query["search.product"] = {"$regex": f"^{search['brand'].lower()}"}
+    return query
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skus", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--mongo-uri", default=None, help="also time the searches against this MongoDB")
+    parser.add_argument("--db", default="inventory_bench")
+    args = parser.parse_args()
+
+    catalog = list(synthetic_catalog(args.skus))
+    start = time.perf_counter()
+    columnar = ColumnarCatalog(catalog)
+    build_ms = (time.perf_counter() - start) * 1000
+    column_bytes = sum(getattr(columnar, name).nbytes for name in COLUMNS)
+    print(f"ColumnarCatalog of {args.skus} SKUs built in {build_ms:.0f}ms, columns {column_bytes / 1e6:.1f}MB, "
+          f"{len(columnar.brands)} brands, {len(columnar.colors)} colors")
+
+    for product in catalog:
+        product["_gb"] = storage_gb(product["storage"])
+    brands = {name: brand_of(name) for name in {product["product"] for product in catalog}}
+    for product in catalog:
+        product["_brand"] = brands[product["product"]]
+
+    for search in SEARCHES:
+        total, _ = columnar.search(**search)
+        label = ", ".join(f"{key}={value}" for key, value in search.items()) or "no filter"
+        columnar_ms = timed(lambda: columnar.search(**search), [()] * args.repeat)
+        python_ms = timed(lambda: python_search(catalog, **search), [()] * max(1, args.repeat // 10))
+        print(f"{label:<58} matches={total:>7}  columnar p50={columnar_ms[1]:7.3f}ms  "
+              f"python scan p50={python_ms[1]:8.1f}ms  ({python_ms[1] / columnar_ms[1]:.0f}x)")
+
+    if args.mongo_uri:
+        client = MongoDBClient(uri=args.mongo_uri, db_name=args.db)
+        client.db.products.drop()
+        for i in range(0, len(catalog), 10_000):
+            client.db.products.bulk_write([InsertOne(product) for product in catalog[i:i + 10_000]], ordered=False)
+        client.ensure_indexes()
+        client.db.products.create_index([("price", ASCENDING)])
+        for search in SEARCHES:
+            sort = ("_gb" if search.get("sort_by") == "storage" else search.get("sort_by", "price"),
+                    DESCENDING if search.get("descending") else ASCENDING)
+            mongo_ms = timed(lambda: list(client.db.products.find(mongo_query(search)).sort([sort]).limit(10)), [()] * 10)
+            print(f"{str(search):<58} mongodb p50={mongo_ms[1]:8.1f}ms")
+        client.db.products.drop()
+
+
+if __name__ == "__main__":
+    main()
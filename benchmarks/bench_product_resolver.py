@@ -0,0 +1,134 @@
+"""
+Accuracy and latency of product-name resolution on a labeled set of noisy mentions (missing
+spaces, shorthand such as "ip 15 pm", typos, filler words, dropped brand, reordered words,
+lower case without diacritics). Compares the search tiers of get_products, which either find
+the product or not, against ProductResolver's top-1 / top-3 ranking.
+
+    python benchmarks/bench_product_resolver.py --mentions 2000
+"""
+import json
+import time
+import random
+import argparse
+import statistics
+from bson import ObjectId
+
+from multi_agents.db.snapshot import CatalogSnapshot
+from multi_agents.db.resolver import ProductResolver
+from multi_agents.db.connector import build_search_keys
+from multi_agents.utils.text import fold_diacritics
+
+MODELS = {
+    "iPhone": ["11", "12", "13", "14", "15", "16"],
+    "Samsung Galaxy": ["S22", "S23", "S24", "A54", "A35", "Z Fold5", "Z Flip5"],
+    "Xiaomi": ["13T", "14", "Redmi Note 13"],
+    "OPPO": ["Reno10", "Reno11", "Find X7", "A79"],
+    "MacBook": ["Air M2", "Air M3", "Pro 14 inch M3", "Pro 16 inch M3 Pro"],
+}
+TIERS = {"iPhone": ["", "Plus", "Pro", "Pro Max"], "Samsung Galaxy": ["", "Plus", "Ultra"]}
+STORAGES = ["128GB", "256GB", "512GB", "1TB"]
+COLORS = ["Titan tự nhiên", "Titan xanh", "Đen", "Trắng", "Xanh dương", "Hồng", "Phantom Black", "Silver"]
+SHORTHAND = [("iPhone", "ip"), ("Pro Max", "pm"), ("Pro Max", "promax"), ("Samsung", "ss"), ("MacBook Pro", "mbp")]
+FILLER = ["điện thoại", "máy", "con", "chiếc", "dt"]
+
+
+def build_catalog(path: str) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+    rng = random.Random(3)
+    index = len(catalog)
+    for brand, models in MODELS.items():
+        for model in models:
+            for tier in TIERS.get(brand, [""]):
+                name = " ".join(part for part in (brand, model, tier) if part)
+                for storage in rng.sample(STORAGES, 2):
+                    for color in rng.sample(COLORS, 3):
+                        index += 1
+                        catalog.append({"product_id": str(index), "product": name, "storage": storage, "color": color,
+                                        "price": rng.randrange(5_000_000, 50_000_000, 10_000), "quantity": rng.randrange(0, 20)})
+    return catalog
+
+
+def typo(word: str, rng: random.Random) -> str:
+    if len(word) < 4 or word.isdigit():
+        return word
+    i = rng.randrange(1, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def noisy_mention(name: str, rng: random.Random) -> str:
+    mention = name
+    for _ in range(rng.randint(1, 2)):
+        kind = rng.choice(["nospace", "shorthand", "typo", "filler", "drop_brand", "reorder", "lower"])
+        words = mention.split()
+        if kind == "nospace" and len(words) > 1:
+            i = rng.randrange(len(words) - 1)
+            mention = " ".join(words[:i] + [words[i] + words[i + 1]] + words[i + 2:])
+        elif kind == "shorthand":
+            for full, short in SHORTHAND:
+                if full in mention:
+                    mention = mention.replace(full, short)
+                    break
+        elif kind == "typo":
+            i = rng.randrange(len(words))
+            words[i] = typo(words[i], rng)
+            mention = " ".join(words)
+        elif kind == "filler":
+            mention = f"{rng.choice(FILLER)} {mention}"
+        elif kind == "drop_brand" and mention.startswith("Samsung Galaxy "):
+            mention = mention[len("Samsung "):]
+        elif kind == "reorder" and len(words) > 2:
+            mention = " ".join(words[1:] + words[:1])
+        else:
+            mention = fold_diacritics(mention).lower()
+    return mention
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--catalog", default="storage/inventory.json", help="real products added to the synthetic ones")
+    parser.add_argument("--mentions", type=int, default=2000)
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.catalog)
+    names = sorted({product["product"] for product in catalog})
+    start = time.perf_counter()
+    resolver = ProductResolver(catalog)
+    print(f"{len(catalog)} SKUs, {len(names)} product names, resolver built in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    snapshot = CatalogSnapshot(db_client=None)
+    snapshot.load([{"_id": ObjectId(), **product, "search": build_search_keys(product)} for product in catalog])
+
+    rng = random.Random(5)
+    labeled = [(noisy_mention(name, rng), name) for name in (rng.choice(names) for _ in range(args.mentions))]
+
+    found = unique = 0
+    for mention, name in labeled:
+        products = {product["product"] for product in snapshot.get_products(mention)}
+        found += name in products
+        unique += products == {name}
+
+    top1 = top3 = 0
+    latencies = []
+    misses = []
+    for mention, name in labeled:
+        start = time.perf_counter()
+        matches = resolver.resolve(mention)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        ranked = [match["product"] for match in matches]
+        top1 += ranked[:1] == [name]
+        top3 += name in ranked[:3]
+        if ranked[:1] != [name]:
+            misses.append((mention, name, ranked[:1]))
+
+    total = len(labeled)
+    latencies.sort()
+    print(f"{'get_products tiers':<20} found={found / total:6.1%}  only the right product={unique / total:6.1%}")
+    print(f"{'resolver':<20} top1={top1 / total:6.1%}  top3={top3 / total:6.1%}  "
+          f"mean={statistics.mean(latencies):6.0f}us  p50={latencies[total // 2]:6.0f}us  p99={latencies[int(total * 0.99)]:6.0f}us")
+    for mention, name, got in misses[:5]:
+        print(f"  miss: {mention!r} -> {got} (expected {name!r})")
+
+
+if __name__ == "__main__":
+    main()
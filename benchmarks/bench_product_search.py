@@ -0,0 +1,102 @@
+"""
+Product lookup latency over a synthetic catalog: the previous unanchored, case-insensitive
+regex filters versus the normalized search keys used by MongoDBClient.get_products.
+
+Needs a running mongod; the catalog is written to a separate database.
+
+    python benchmarks/bench_product_search.py --skus 100000
+    python benchmarks/bench_product_search.py --skus 1000000 --queries 500
+"""
+import time
+import random
+import argparse
+import statistics
+from pymongo import InsertOne
+
+from multi_agents.config.settings import db_config
+from multi_agents.db.connector import MongoDBClient, build_search_keys
+
+BRANDS = {
+    "iPhone": ["12", "13", "14", "15", "16"],
+    "Samsung Galaxy": ["S22", "S23", "S24", "A54", "Z Fold5"],
+    "Xiaomi": ["13T", "14", "Redmi Note 13"],
+    "OPPO": ["Reno10", "Find X7", "A79"],
+}
+TIERS = ["", "Plus", "Pro", "Pro Max", "Ultra", "Lite"]
+STORAGES = ["64GB", "128GB", "256GB", "512GB", "1TB"]
+COLORS = ["Titan tự nhiên", "Titan xanh", "Đen", "Trắng", "Xanh dương", "Hồng", "Vàng", "Tím"]
+
+
+def synthetic_catalog(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    for index in range(size):
+        brand = rng.choice(list(BRANDS))
+        name = " ".join(part for part in [brand, rng.choice(BRANDS[brand]), rng.choice(TIERS), f"Gen{index % 997}"] if part)
+        product = {
+            "product_id": str(index),
+            "product": name,
+            "storage": rng.choice(STORAGES),
+            "color": rng.choice(COLORS),
+            "price": rng.randrange(3_000_000, 50_000_000, 10_000),
+            "quantity": rng.randrange(0, 20),
+        }
+        product["search"] = build_search_keys(product)
+        yield product
+
+
+def legacy_get_products(db, product_name, storage=None, color=None):
+    query = {"product": {"$regex": product_name, "$options": "i"}}
+    if storage:
+        query["storage"] = {"$regex": storage, "$options": "i"}
+    if color:
+        query["color"] = {"$regex": color, "$options": "i"}
+    return list(db.products.find(query))
+
+
+def timed(fn, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        fn(*query)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.mean(latencies), latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skus", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--uri", default=db_config.mongo_uri)
+    parser.add_argument("--db", default="inventory_bench")
+    args = parser.parse_args()
+
+    client = MongoDBClient(uri=args.uri, db_name=args.db)
+    client.db.products.drop()
+
+    start = time.perf_counter()
+    batch = []
+    for product in synthetic_catalog(args.skus):
+        batch.append(InsertOne(product))
+        if len(batch) == 10_000:
+            client.db.products.bulk_write(batch, ordered=False)
+            batch = []
+    if batch:
+        client.db.products.bulk_write(batch, ordered=False)
+    client.ensure_indexes()
+    print(f"Loaded {args.skus} SKUs in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(11)
+    sample = list(client.db.products.aggregate([{"$sample": {"size": args.queries}}]))
+    queries = [(p["product"], p["storage"], p["color"] if rng.random() < 0.5 else None) for p in sample]
+
+    legacy = timed(lambda *q: legacy_get_products(client.db, *q), queries)
+    indexed = timed(client.get_products, queries)
+    print(f"{'legacy regex':<16} mean={legacy[0]:8.2f}ms  p50={legacy[1]:8.2f}ms  p99={legacy[2]:8.2f}ms")
+    print(f"{'search keys':<16} mean={indexed[0]:8.2f}ms  p50={indexed[1]:8.2f}ms  p99={indexed[2]:8.2f}ms")
+
+    client.db.products.drop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Prefix-cache reuse of the pipeline's task prompts: the request-first layout (customer input and
+context at the top of each task description, as before) versus TaskPrompt's stable prefix with
+the request data appended last.
+
+The pipeline runs end to end against a local OpenAI-compatible stand-in server that models
+automatic prefix caching like vLLM's: prompts are cut into blocks of `--block` tokens (words and
+punctuation approximate tokens), a block is reused when the whole prompt up to it was seen
+before, and only uncached tokens are prefilled at `--prefill-us` per token before the first
+token is streamed. The server reports cached tokens in usage.prompt_tokens_details, which is
+where the pipeline's token_usage.cached_prompt_tokens comes from.
+
+    python benchmarks/bench_prompt_prefix_cache.py --requests 12
+"""
+import io
+import os
+import re
+import json
+import time
+import hashlib
+import argparse
+import threading
+import statistics
+import contextlib
+from unittest import mock
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOKEN = re.compile(r"\w+|[^\w\s]")
+QUERIES = [
+    "Cho mình hỏi iPhone 15 Pro Max 256GB màu titan tự nhiên còn hàng không, giá bao nhiêu?",
+    "Samsung Galaxy S23 Ultra 512GB giá bao nhiêu vậy shop?",
+    "Mình muốn tìm điện thoại dưới 15 triệu, pin trâu, còn hàng",
+    "iPhone 13 128GB màu xanh còn không em?",
+    "Xiaomi 14 bản 256GB có màu đen không?",
+    "OPPO Reno10 giá thế nào, có trả góp không?",
+]
+NAMES = ["Nguyễn Văn A", "Trần Thị B", "Lê Văn C", "Phạm Thị D"]
+ANALYSIS = {
+    "product_details": "iPhone 15 Pro Max 256GB Titan tự nhiên",
+    "customer_intent": "check_inventory_price",
+    "original_query": "",
+    "requires_inventory_check": True,
+    "requires_order_placement": False,
+}
+
+
+class PrefixCache:
+    """Block-level prefix cache: block i is identified by the hash of every token up to its end; LRU eviction."""
+
+    def __init__(self, block_tokens: int, capacity_blocks: int):
+        self.block_tokens = block_tokens
+        self.capacity_blocks = capacity_blocks
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def admit(self, tokens: list) -> int:
+        """Number of leading tokens served from the cache; the prompt's full blocks are cached afterwards."""
+        digest, cached, hit = hashlib.sha1(), 0, True
+        with self._lock:
+            for start in range(0, len(tokens) - self.block_tokens + 1, self.block_tokens):
+                digest.update("\x00".join(tokens[start:start + self.block_tokens]).encode())
+                key = digest.hexdigest()
+                if hit and key in self._blocks:
+                    cached += self.block_tokens
+                    self._blocks.move_to_end(key)
+                    continue
+                hit = False
+                self._blocks[key] = True
+                if len(self._blocks) > self.capacity_blocks:
+                    self._blocks.popitem(last=False)
+        return cached
+
+
+def reply(messages: list) -> str:
+    last = messages[-1]["content"]
+    if "Phân tích kỹ lưỡng" in last:
+        return "Thought: done\nFinal Answer: " + json.dumps(ANALYSIS, ensure_ascii=False)
+    if "Tổng hợp tất cả" in last:
+        return "Thought: done\nFinal Answer: Dạ, sản phẩm còn hàng với giá 27.990.000đ ạ."
+    return 'Thought: done\nFinal Answer: {"product_name": "iPhone 15 Pro Max", "stock_status": "in_stock", "price": 27990000}'
+
+
+def start_server(cache: PrefixCache, prefill_us: float, decode_ms: float, calls: list) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            start = time.perf_counter()
+            prompt = "".join(f"<|{m['role']}|>\n{m.get('content') or ''}\n" for m in body["messages"])
+            tokens = TOKEN.findall(prompt)
+            cached = cache.admit(tokens)
+            time.sleep((len(tokens) - cached) * prefill_us / 1e6)
+            content = reply(body["messages"])
+            usage = {
+                "prompt_tokens": len(tokens),
+                "completion_tokens": len(TOKEN.findall(content)),
+                "total_tokens": len(tokens) + len(TOKEN.findall(content)),
+                "prompt_tokens_details": {"cached_tokens": cached},
+            }
+            if not body.get("stream"):
+                payload = json.dumps({
+                    "id": "bench", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+                    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                    "usage": usage,
+                }).encode()
+                calls.append((len(tokens), cached, (time.perf_counter() - start) * 1000))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for i in range(0, len(content), 16):
+                chunk = {"id": "bench", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                         "choices": [{"index": 0, "delta": {"content": content[i:i + 16]}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                if i == 0:
+                    calls.append((len(tokens), cached, (time.perf_counter() - start) * 1000))
+                time.sleep(decode_ms / 1000)
+            chunk = {"id": "bench", "object": "chat.completion.chunk", "created": 0, "model": body["model"],
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n".encode())
+            self.wfile.flush()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def request_first(self, **request) -> str:
+    """The previous layout: request data at the top of the description, instructions after it."""
+    if not self.request:
+        return self.prefix
+    return f"{self.request.format(**request)}\n\n{self.prefix}"
+
+
+def run(name: str, pipeline, requests: list, calls: list, layout=None):
+    calls.clear()
+    reported = 0
+    patch = mock.patch("multi_agents.agents.prompt.TaskPrompt.description", layout) if layout else contextlib.nullcontext()
+    with patch, contextlib.redirect_stdout(io.StringIO()):
+        for customer_input, context in requests:
+            reported += pipeline.run(customer_input, context)["token_usage"]["cached_prompt_tokens"]
+    prompt_tokens = sum(call[0] for call in calls)
+    cached = sum(call[1] for call in calls)
+    ttft = sorted(call[2] for call in calls)
+    print(f"{name:<16} calls={len(calls):>3}  prompt tokens={prompt_tokens:>7}  cached={cached:>7} ({cached / prompt_tokens:5.1%})  "
+          f"prefilled={prompt_tokens - cached:>7}  TTFT mean={statistics.mean(ttft):6.1f}ms p50={ttft[len(ttft) // 2]:6.1f}ms  "
+          f"token_usage.cached_prompt_tokens={reported}")
+    return prompt_tokens - cached
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=12)
+    parser.add_argument("--block", type=int, default=16, help="tokens per cache block")
+    parser.add_argument("--capacity", type=int, default=100_000, help="cache capacity in blocks")
+    parser.add_argument("--prefill-us", type=float, default=150, help="prefill time per uncached token in microseconds")
+    parser.add_argument("--decode-ms", type=float, default=1, help="time per streamed chunk")
+    args = parser.parse_args()
+
+    calls = []
+    cache = PrefixCache(args.block, args.capacity)
+    server = start_server(cache, args.prefill_us, args.decode_ms, calls)
+    # Settings are read at import: point the agents at the stand-in and turn the caches that would skip LLM calls off.
+    os.environ.update({
+        "API_URL_LLM": f"http://127.0.0.1:{server.server_address[1]}/v1",
+        "API_KEY": "bench",
+        "LLM_MODEL": "bench",
+        "LLM_CACHE_MODE": "off",
+        "RESPONSE_CACHE_ENABLED": "false",
+        "OTEL_SDK_DISABLED": "true",
+    })
+    from multi_agents.pipeline import MultiAgents
+
+    pipeline = MultiAgents()
+    requests = [
+        (QUERIES[i % len(QUERIES)], {"customer_name": NAMES[i % len(NAMES)], "conversation_id": f"bench-{i}"})
+        for i in range(args.requests)
+    ]
+    print(f"{args.requests} pipeline runs, {args.prefill_us:.0f}us prefill per uncached token, {args.block}-token blocks")
+    before = run("request first", pipeline, requests, calls, layout=request_first)
+    cache.__init__(args.block, args.capacity)
+    after = run("stable prefix", pipeline, requests, calls)
+    print(f"Prefill tokens saved: {before - after} ({1 - after / before:.1%})")
+    pipeline.close()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
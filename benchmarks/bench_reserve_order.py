@@ -0,0 +1,129 @@
+"""
+Concurrent order placement on a few hot SKUs: the previous flow, where stock is read first and
+written back after a gap (the LLM turn between get_product_info and create_order), versus
+reserve_and_create_order's conditional find_one_and_update plus order write and hold commit.
+Reports units sold against the stock that existed (oversell) and orders per second.
+
+Needs a running mongod; the products are written to a separate database.
+
+    python benchmarks/bench_reserve_order.py --skus 10 --stock 200 --buyers 64
+"""
+import os
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+from multi_agents.config.settings import db_config
+from multi_agents.db.connector import AsyncMongoDBClient
+from multi_agents.orders.index import OrderIndex
+from multi_agents.orders.store import OrderStore
+from multi_agents.orders.segment_log import SegmentLogBackend
+
+
+def make_products(skus: int, stock: int):
+    return [
+        {"product_id": f"hot-{i}", "product": f"iPhone 15 Pro Max Hot{i}", "storage": "256GB",
+         "color": "Titan tự nhiên", "price": 27_990_000, "quantity": stock}
+        for i in range(skus)
+    ]
+
+
+def make_order(product: dict, order_id: str, buyer: int) -> dict:
+    return {
+        "order_details": {
+            "order_id": order_id,
+            "product_id": product["product_id"],
+            "product": product["product"],
+            "color": product["color"],
+            "storage": product["storage"],
+            "quantity": 1,
+            "unit_price": product["price"],
+            "total_price": product["price"],
+            "customer_info": {"customer_name": f"Khách hàng {buyer}", "conversation_id": str(uuid.uuid4())},
+        },
+        "message": "Đơn hàng đã được tạo.",
+    }
+
+
+async def read_then_write(db: AsyncMongoDBClient, store: OrderStore, product_id: str, buyer: int, gap: float) -> bool:
+    """Read the stock, wait like the agent turn would, then write back the decremented value and save the order."""
+    product = await db.get_product_by_id(product_id)
+    if product["quantity"] < 1:
+        return False
+    await asyncio.sleep(gap)
+    await db.db.products.update_one({"product_id": product_id}, {"$set": {"quantity": product["quantity"] - 1}})
+    await asyncio.to_thread(store.save, make_order(product, str(uuid.uuid4()), buyer))
+    return True
+
+
+async def reserve_and_create(db: AsyncMongoDBClient, store: OrderStore, product_id: str, buyer: int, gap: float) -> bool:
+    """What reserve_and_create_order does once the SKU is known."""
+    order_id = str(uuid.uuid4())
+    expires_at = datetime.now(timezone.utc) + timedelta(minutes=5)
+    product = await db.reserve_stock(product_id, 1, order_id, expires_at)
+    if product is None:
+        return False
+    await asyncio.to_thread(store.save, make_order(product, order_id, buyer))
+    await db.commit_reservation(product_id, order_id)
+    await db.bump_catalog_version()
+    return True
+
+
+async def run(name: str, place, db: AsyncMongoDBClient, store: OrderStore, args) -> None:
+    products = make_products(args.skus, args.stock)
+    await db.db.products.delete_many({})
+    await db.db.products.insert_many([dict(product) for product in products])
+    rng = random.Random(5)
+    open_skus = [product["product_id"] for product in products]
+    sold, latencies = 0, []
+
+    async def buyer(index: int):
+        nonlocal sold
+        while open_skus:
+            product_id = rng.choice(open_skus)
+            start = time.perf_counter()
+            placed = await place(db, store, product_id, index, args.gap_ms / 1000)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if placed:
+                sold += 1
+            elif product_id in open_skus:
+                open_skus.remove(product_id)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(buyer(index) for index in range(args.buyers)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    stock = args.skus * args.stock
+    left = sum([product["quantity"] async for product in db.db.products.find({}, {"quantity": 1})])
+    holds = await db.db.products.count_documents({"holds.0": {"$exists": True}})
+    print(f"{name:<22} orders={sold:>6}  stock={stock}  oversold={max(0, sold - stock):>5}  left={left:>4}  open holds={holds}  "
+          f"{sold / elapsed:7.0f} orders/s  p50={latencies[len(latencies) // 2]:6.2f}ms  p99={latencies[int(len(latencies) * 0.99)]:6.2f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skus", type=int, default=10)
+    parser.add_argument("--stock", type=int, default=200, help="units of each SKU")
+    parser.add_argument("--buyers", type=int, default=64, help="concurrent buyers")
+    parser.add_argument("--gap-ms", type=float, default=5.0, help="time between the stock read and the write in the read-then-write flow")
+    parser.add_argument("--uri", default=db_config.mongo_uri)
+    parser.add_argument("--db", default="inventory_bench_orders")
+    args = parser.parse_args()
+
+    db = AsyncMongoDBClient(uri=args.uri, db_name=args.db, max_pool_size=args.buyers)
+    print(f"{args.buyers} buyers on {args.skus} SKUs x {args.stock} units")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, place in (("read then write", read_then_write), ("reserve_and_create", reserve_and_create)):
+            store = OrderStore(SegmentLogBackend(os.path.join(workdir, name.replace(" ", "_"))), OrderIndex(os.path.join(workdir, f"{name}.sqlite")))
+            await run(name, place, db, store, args)
+            store.close()
+    await db.client.drop_database(args.db)
+    await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
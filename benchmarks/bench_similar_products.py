@@ -0,0 +1,66 @@
+"""
+Latency of similar_products lookups (nearest in-stock alternatives by brand, model family,
+storage, price and color) over a synthetic catalog: ColumnarCatalog.similar, which widens from
+the product's family only as far as needed, versus scoring every in-stock SKU, and the cost of
+keeping the index current as stock changes versus rebuilding it.
+
+    python benchmarks/bench_similar_products.py --skus 1000000
+"""
+import time
+import random
+import argparse
+import numpy as np
+
+from multi_agents.db.columnar import ColumnarCatalog
+from bench_product_search import synthetic_catalog, timed
+
+
+def score_all(catalog: ColumnarCatalog, product_id: str, limit: int):
+    row = catalog._rows[product_id]
+    rows = np.flatnonzero(catalog.quantity >= 1)
+    rows = rows[rows != row]
+    distances = catalog._distance(row, rows)
+    return rows[np.lexsort((rows, distances))[:limit]]
+
+
+def report(name: str, result):
+    print(f"{name:<34} mean={result[0]:8.3f}ms  p50={result[1]:8.3f}ms  p99={result[2]:8.3f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skus", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    catalog = list(synthetic_catalog(args.skus))
+    start = time.perf_counter()
+    columnar = ColumnarCatalog(catalog)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Index of {args.skus} SKUs built in {build_ms:.0f}ms, {len(columnar.families)} model families, "
+          f"feature vectors {columnar.features.nbytes / 1e6:.1f}MB")
+
+    rng = random.Random(13)
+    queries = [(product["product_id"], args.limit) for product in rng.sample(catalog, args.queries)]
+    mismatches = sum(
+        [columnar._rows[product["product_id"]] for product in columnar.similar(product_id, limit)] != score_all(columnar, product_id, limit).tolist()
+        for product_id, limit in queries[:50]
+    )
+    print(f"Results identical to scoring every in-stock SKU: {50 - mismatches}/50")
+
+    report("similar (family first)", timed(columnar.similar, queries))
+    report("score every in-stock SKU", timed(lambda product_id, limit: score_all(columnar, product_id, limit), queries[: max(1, args.queries // 10)]))
+
+    def stock_change(product):
+        columnar.upsert([{**product, "quantity": rng.randrange(0, 20)}])
+
+    report("apply one stock change", timed(stock_change, [(product,) for product in rng.sample(catalog, args.queries)]))
+    start = time.perf_counter()
+    ColumnarCatalog(catalog)
+    print(f"{'rebuild instead':<34} {(time.perf_counter() - start) * 1000:8.0f}ms")
+    report("similar after the changes", timed(columnar.similar, queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Hit rate and latency saved by the speculative inventory lookup: for each labeled customer message
+of bench_intent_fast_path that needs an inventory check, InventoryPrefetch is started from the raw
+message, Task 1 is stood in for by a sleep of `--task1-ms`, and the prefetch is then claimed with
+the labeled analysis, as the pipeline does with the LLM's. A hit means Task 2 gets the lookup
+with its prompt instead of spending a tool call (and an LLM turn) on it.
+
+Needs a running MCP server (python mcp_server.py) whose catalog holds the products of
+bench_product_resolver.build_catalog; --catalog must point at the same inventory file.
+
+    python benchmarks/bench_speculative_inventory.py --queries 300 --task1-ms 800
+"""
+import time
+import random
+import argparse
+import statistics
+
+from multi_agents.config.schemas import RequestAnalysis
+from multi_agents.agents.intent import IntentClassifier
+from multi_agents.mcp.prefetch import InventoryPrefetch, prefetch_metrics
+from multi_agents.mcp.session_pool import get_session_pool
+from bench_product_resolver import build_catalog
+from bench_intent_fast_path import labeled_queries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--catalog", default="storage/inventory.json", help="real products added to the synthetic ones")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--task1-ms", type=float, default=800, help="stand-in duration of the LLM analysis task")
+    args = parser.parse_args()
+
+    classifier = IntentClassifier()
+    queries = [
+        (text, RequestAnalysis(product_details=label[0], customer_intent=label[1], requires_inventory_check=label[2], requires_order_placement=label[3]))
+        for text, label in labeled_queries(build_catalog(args.catalog), args.queries, random.Random(7))
+        if label is not None and label[2]
+    ]
+    # Warm the session pool so connection setup is not counted as lookup time.
+    get_session_pool().call_tool("get_catalog_version", {})
+
+    reports = []
+    for text, analysis in queries:
+        prefetch = InventoryPrefetch(classifier)
+        prefetch.start(text)
+        time.sleep(args.task1_ms / 1000)
+        prefetch.claim(analysis)
+        reports.append(prefetch.report)
+
+    total = len(reports)
+    attempted = [report for report in reports if report["attempted"]]
+    hits = [report for report in attempted if report["hit"]]
+    reasons = {}
+    for report in attempted:
+        if not report["hit"]:
+            reasons[report.get("reason")] = reasons.get(report.get("reason"), 0) + 1
+    lookups = sorted(report["lookup_ms"] for report in attempted)
+    print(f"{total} messages needing an inventory check, Task 1 stand-in {args.task1_ms:.0f}ms")
+    print(f"attempted={len(attempted) / total:6.1%}  hit rate={len(hits) / total:6.1%} of messages, {len(hits) / max(1, len(attempted)):6.1%} of attempts  misses={reasons}")
+    if lookups:
+        print(f"prefetch lookup mean={statistics.mean(lookups):6.1f}ms p50={lookups[len(lookups) // 2]:6.1f}ms  "
+              f"waited after Task 1 mean={statistics.mean(report['waited_ms'] for report in attempted):5.1f}ms")
+    if hits:
+        print(f"lookup time taken off Task 2 per hit: mean={statistics.mean(report['saved_ms'] for report in hits):6.1f}ms "
+              f"(plus the LLM turn of the tool call)")
+    print(f"process totals: {prefetch_metrics()}")
+    get_session_pool().close()
+
+
+if __name__ == "__main__":
+    main()
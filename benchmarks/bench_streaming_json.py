@@ -0,0 +1,131 @@
+"""
+How early Task 1's routing fields are known when its answer is read while it streams, instead of
+after the last token.
+
+The answers are Qwen3-style Task 1 answers (the generator of bench_structured_outputs.py: <think>
+preambles with braces, ```json fences, prose after the object, string booleans, Python literals,
+trailing commas, truncation), behind the ReAct 'Thought: ... Final Answer:' lines CrewAI asks
+for, cut into the 1-3 token deltas an OpenAI-compatible server streams.
+
+- full parse: repair_json_object once the stream has ended (what the pipeline waits for).
+- re-parse per chunk: repair_json_object on the accumulated text after every chunk, the naive way
+  to decide early; quadratic in the answer length.
+- streaming: StreamingJSONParser fed chunk by chunk; each field is reported once complete.
+
+Both field orders are measured: the former prompt (original_query echoed before the flags) and
+the current one (flags first). "decided" is the point where product_details and both flags are
+known, which is when the pipeline can redirect the speculative inventory lookup.
+
+    python benchmarks/bench_streaming_json.py --answers 2000 --decode-ms 20
+"""
+import re
+import time
+import random
+import argparse
+import statistics
+
+from bench_structured_outputs import ANSWERS, noisy_answer
+from multi_agents.config.schemas import RequestAnalysis
+from multi_agents.utils.parser import StreamingJSONParser, repair_json_object
+from multi_agents.utils.streaming import FINAL_ANSWER_MARKER
+
+TOKEN = re.compile(r"\w+|\s+|[^\w\s]", re.UNICODE)
+DECISION = ("product_details", "requires_inventory_check", "requires_order_placement")
+FORMER_ORDER = ("product_details", "customer_intent", "original_query", "requires_inventory_check", "requires_order_placement", "shortlist")
+CURRENT_ORDER = tuple(RequestAnalysis.model_fields)
+THOUGHTS = [
+    "Khách hỏi về tồn kho và giá của sản phẩm, không có ý định đặt hàng ngay.",
+    "Khách muốn mua sản phẩm, cần chuyển sang bước đặt hàng.",
+    "Khách mô tả nhu cầu theo tiêu chí, đã tìm được các sản phẩm phù hợp.",
+]
+
+
+def reorder(answer: dict, order: tuple) -> dict:
+    return {field: answer[field] for field in order if field in answer}
+
+
+def chunks(text: str, rng: random.Random) -> list:
+    tokens = TOKEN.findall(text)
+    result, i = [], 0
+    while i < len(tokens):
+        size = rng.choice((1, 1, 2, 3))
+        result.append("".join(tokens[i:i + size]))
+        i += size
+    return result
+
+
+def replay(stream: list):
+    """Chunks consumed until the decision fields are known (None if never), and the parser's time."""
+    parser = StreamingJSONParser(RequestAnalysis, start_marker=FINAL_ANSWER_MARKER)
+    decided = None
+    start = time.perf_counter()
+    for i, chunk in enumerate(stream, 1):
+        parser.feed(chunk)
+        if decided is None and all(field in parser.fields for field in DECISION):
+            decided = i
+    elapsed = time.perf_counter() - start
+    return decided, parser.fields, elapsed
+
+
+def reparse(stream: list) -> float:
+    text, start = "", time.perf_counter()
+    for chunk in stream:
+        text += chunk
+        repair_json_object(text.split(FINAL_ANSWER_MARKER, 1)[-1])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", type=int, default=2000)
+    parser.add_argument("--decode-ms", type=float, default=20, help="time per streamed token")
+    parser.add_argument("--reparse", type=int, default=300, help="answers timed with the re-parse-per-chunk approach")
+    args = parser.parse_args()
+
+    print(f"{args.answers} Task 1 answers, {args.decode_ms}ms per token")
+    for label, order in (("former field order", FORMER_ORDER), ("current field order", CURRENT_ORDER)):
+        rng = random.Random(11)
+        early, saved_ms, fractions, disagreements, compared = 0, [], [], 0, 0
+        stream_us, full_us, reparse_us, chars = [], [], [], []
+        for n in range(args.answers):
+            answer = reorder(rng.choice(ANSWERS[RequestAnalysis]), order)
+            text = f"Thought: {rng.choice(THOUGHTS)}\n{FINAL_ANSWER_MARKER} {noisy_answer(answer, rng)}"
+            stream = chunks(text, rng)
+            tokens = len(TOKEN.findall(text))
+            chars.append(len(text))
+
+            decided, fields, elapsed = replay(stream)
+            stream_us.append(elapsed * 1e6)
+            start = time.perf_counter()
+            final = repair_json_object(text.split(FINAL_ANSWER_MARKER, 1)[-1])
+            full_us.append((time.perf_counter() - start) * 1e6)
+            if n < args.reparse:
+                reparse_us.append(reparse(stream) * 1e6)
+
+            if decided is not None:
+                early += 1
+                consumed = len(TOKEN.findall("".join(stream[:decided])))
+                fractions.append(consumed / tokens)
+                saved_ms.append((tokens - consumed) * args.decode_ms)
+            if final is not None:
+                try:
+                    expected = RequestAnalysis.model_validate(final)
+                except ValueError:
+                    continue
+                for field in DECISION:
+                    if field in fields:
+                        compared += 1
+                        disagreements += fields[field] != getattr(expected, field)
+
+        print(f"\n{label}")
+        print(f"  decided mid-stream        {early / args.answers:6.1%} of answers, "
+              f"after {statistics.mean(fractions):5.1%} of the tokens on average")
+        print(f"  earlier than full parse   mean={statistics.mean(saved_ms):7.1f}ms  "
+              f"p50={statistics.median(saved_ms):7.1f}ms")
+        print(f"  field events differing from the full parse: {disagreements / compared:6.2%} of {compared}")
+        print(f"  parse cost per answer ({statistics.mean(chars):.0f} chars)  streaming={statistics.mean(stream_us):7.1f}us  "
+              f"full parse={statistics.mean(full_us):6.1f}us  re-parse per chunk={statistics.mean(reparse_us):8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
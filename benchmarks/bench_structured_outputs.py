@@ -0,0 +1,161 @@
+"""
+Parse failures and conversion calls for the JSON answers of Tasks 1-3, before and after the
+Pydantic output models.
+
+The answers are generated in the shapes Qwen3 models produce for these prompts: mostly clean JSON,
+otherwise with a <think> preamble (which may contain braces), ```json fences, prose after the
+object, string booleans ("true", "có"), prices as text ("32.990.000đ"), trailing commas, Python
+literals, single quotes, an object cut off by max_tokens, a missing field, or a renamed field.
+
+- before: the prose-only prompts; the pipeline read Task 1 with extract_json_object and the UI
+  json.loads'ed Task 3 (failures are misrouted runs and order details not shown).
+- crewai converter: output_pydantic with CrewAI's default converter; every answer that does not
+  validate costs a conversion LLM call, retried up to 3 times.
+- after: output_pydantic with TaskOutputConverter; the local repair pass first, then one
+  guided-decoding call (response_format json_schema, always valid) for what it cannot repair.
+
+    python benchmarks/bench_structured_outputs.py --answers 3000
+"""
+import io
+import re
+import json
+import time
+import random
+import argparse
+import statistics
+import contextlib
+from types import SimpleNamespace
+from crewai.utilities.converter import Converter, ConverterError, convert_to_model
+
+from multi_agents.config.schemas import InventoryCheck, OrderResult, RequestAnalysis
+from multi_agents.agents.structured_output import TaskOutputConverter
+from multi_agents.utils.parser import extract_json_object
+
+ANSWERS = {
+    RequestAnalysis: [
+        {"product_details": "iPhone 15 Pro Max 256GB màu Titan tự nhiên", "customer_intent": "check_inventory_price",
+         "original_query": "ip 15 pm 256gb titan tự nhiên còn hàng không", "requires_inventory_check": True, "requires_order_placement": False},
+        {"product_details": "Samsung Galaxy S23 Ultra 512GB", "customer_intent": "place_order",
+         "original_query": "Tôi muốn mua S23 Ultra 512GB", "requires_inventory_check": False, "requires_order_placement": True},
+        {"product_details": "điện thoại dưới 15 triệu", "customer_intent": "general_query", "original_query": "máy nào dưới 15 triệu còn hàng",
+         "requires_inventory_check": False, "requires_order_placement": False,
+         "shortlist": [{"product": "Xiaomi 13T", "storage": "256GB", "color": "Xanh", "price": 11990000, "quantity": 8}]},
+    ],
+    InventoryCheck: [
+        {"product_name": "iPhone 15 Pro Max", "storage": "256GB", "color": "Titan tự nhiên", "stock_status": "in_stock", "price": 32990000, "message": ""},
+        {"product_name": "iPhone 13", "storage": "128GB", "color": "Xanh", "stock_status": "out_of_stock", "price": 13990000,
+         "alternatives": [{"product": "iPhone 14", "storage": "128GB", "color": "Xanh", "price": 17990000}], "message": "Sản phẩm đã hết hàng"},
+    ],
+    OrderResult: [
+        {"order_created": True, "order_details": {"order_id": "a1b2c3d4-e5f6-7890-1234-567890abcdef", "product": "iPhone 15 Pro Max",
+         "color": "Titan tự nhiên", "storage": "256GB", "quantity": 1, "unit_price": 32990000, "total_price": 32990000, "remaining_stock": 4},
+         "message": "Đơn hàng đã được tạo."},
+        {"order_created": False, "message": "Sản phẩm đã hết hàng, chỉ còn 0 máy."},
+    ],
+}
+FLAGS = ("requires_inventory_check", "requires_order_placement", "order_created")
+PRICES = ("price", "unit_price", "total_price")
+RENAMES = {"customer_intent": "intent", "stock_status": "status", "order_created": "created"}
+guided_calls = []
+
+
+def noisy_answer(answer: dict, rng: random.Random) -> str:
+    """One answer in a shape a Qwen3 model produces; about half are clean JSON."""
+    answer = json.loads(json.dumps(answer))
+    roll = rng.random()
+    if roll < 0.08:
+        for flag in FLAGS:
+            if flag in answer:
+                answer[flag] = rng.choice(["true", "false", "có"]) if answer[flag] else "false"
+    elif roll < 0.14:
+        for field in PRICES:
+            if answer.get(field):
+                answer[field] = f"{answer[field]:,}đ".replace(",", ".")
+        if isinstance(answer.get("order_details"), dict) and answer["order_details"].get("total_price"):
+            answer["order_details"]["total_price"] = f"{answer['order_details']['total_price']:,} VND"
+    elif roll < 0.16:
+        answer.pop(next(key for key in answer if key in RENAMES or key in FLAGS or key == "stock_status"))
+    elif roll < 0.18:
+        key = next(key for key in answer if key in RENAMES)
+        answer[RENAMES[key]] = answer.pop(key)
+    text = json.dumps(answer, ensure_ascii=False, indent=rng.choice([None, 2]))
+
+    roll = rng.random()
+    if roll < 0.05:
+        text = re.sub(r"(\"|\d|true|false|null|\]|\})(\s*)(\n?\s*\})$", r"\1,\2\3", text)
+    elif roll < 0.08:
+        text = text.replace("true", "True").replace("false", "False").replace("null", "None")
+    elif roll < 0.10:
+        text = text.replace('"', "'")
+    elif roll < 0.13:
+        text = text[:int(len(text) * rng.uniform(0.7, 0.95))]
+
+    roll = rng.random()
+    if roll < 0.2:
+        text = f"<think>\nKhách hỏi về sản phẩm, cần trả về JSON dạng {{...}} theo yêu cầu.\n</think>\n\n{text}"
+    elif roll < 0.3:
+        text = f"```json\n{text}\n```"
+    elif roll < 0.36:
+        text = f"{text}\n\nHy vọng thông tin trên hữu ích cho bạn."
+    return text
+
+
+class _UnconvertedConverter(Converter):
+    """Stands in for CrewAI's default converter, whose LLM conversion is not run."""
+
+    def to_pydantic(self, current_attempt=1):
+        return ConverterError("not converted")
+
+
+class _OfflineConverter(TaskOutputConverter):
+    """TaskOutputConverter with the guided-decoding call counted instead of sent; its answer always validates."""
+
+    def _guided_conversion(self, client):
+        guided_calls.append(self.text)
+        return self.model.model_construct()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--answers", type=int, default=3000, help="answers per task")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    agent = SimpleNamespace(function_calling_llm=None, llm=SimpleNamespace(openai_client=object(), model="bench", supports_function_calling=lambda: False))
+    print(f"{args.answers} answers per task, about half with a formatting slip")
+    for model, answers in ANSWERS.items():
+        texts = [noisy_answer(rng.choice(answers), rng) for _ in range(args.answers)]
+
+        no_object = sum(extract_json_object(text) is None for text in texts)
+        not_json = 0
+        for text in texts:
+            try:
+                json.loads(text)
+            except json.JSONDecodeError:
+                not_json += 1
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            crewai_failed = sum(
+                not isinstance(convert_to_model(text, model, None, agent, _UnconvertedConverter), model) for text in texts
+            )
+
+        guided_calls.clear()
+        latencies = []
+        with contextlib.redirect_stdout(io.StringIO()):
+            for text in texts:
+                start = time.perf_counter()
+                convert_to_model(text, model, None, agent, _OfflineConverter)
+                latencies.append((time.perf_counter() - start) * 1e6)
+        latencies.sort()
+
+        total = len(texts)
+        print(f"\n{model.__name__}")
+        print(f"  before            no JSON object={no_object / total:6.1%}  json.loads fails={not_json / total:6.1%}")
+        print(f"  crewai converter  answers needing an LLM conversion call (up to 3 attempts)={crewai_failed / total:6.1%}")
+        print(f"  after             guided conversion calls={len(guided_calls) / total:6.1%}  parse failures=0.0% "
+              f"(with LLM_GUIDED_DECODING off: {len(guided_calls) / total:6.1%})  "
+              f"parse+repair mean={statistics.mean(latencies):6.1f}us p99={latencies[int(total * 0.99)]:6.1f}us")
+
+
+if __name__ == "__main__":
+    main()
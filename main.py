@@ -24,6 +24,7 @@ def main():
         print(f"Task 1: {pipeline_output_data.get('task1_output')}")
         print(f"Task 2: {pipeline_output_data.get('task2_output')}")
         print(f"Task 3: {pipeline_output_data.get('task3_output')}")
+        print(f"Stages run: {pipeline_output_data.get('stages_run')}")
         print(f"Token usage: {pipeline_output_data.get('token_usage')}")
 
     except Exception as e:
@@ -1,129 +1,312 @@
-import os
+import time
 import uuid
 import json
+import asyncio
+from datetime import datetime, timedelta, timezone
 from loguru import logger
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from mcp.server.fastmcp import FastMCP
 
-from multi_agents.db.connector import MongoDBClient
+from multi_agents.db.snapshot import CatalogSnapshot
+from multi_agents.db.columnar import ColumnarCatalog
+from multi_agents.db.resolver import ProductResolver
+from multi_agents.orders.store import get_order_store
+from multi_agents.utils.concurrency import ToolLimiter
+from multi_agents.db.connector import AsyncMongoDBClient, MongoDBClient, same_model
+from multi_agents.config.settings import catalog_snapshot_config, mcp_server_config, order_config
 
 
 mcp = FastMCP("mcp server")
 
 try:
     db_client = MongoDBClient()
+    db_client.ensure_indexes()
     logger.info("MongoDB client initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize MongoDB client: {str(e)}")
     db_client = None
 
+# Tools are coroutines: MongoDB is queried through the async driver and order storage runs in
+# worker threads, so one slow call no longer stalls every other connected agent.
+async_db = AsyncMongoDBClient() if db_client is not None else None
+# Product reads are answered from memory while the snapshot is fresh; MongoDB serves the rest.
+catalog_snapshot = CatalogSnapshot(async_db) if async_db is not None and catalog_snapshot_config.enabled else None
+order_store = get_order_store()
+product_limiter = ToolLimiter("products", mcp_server_config.product_tool_concurrency, mcp_server_config.tool_timeout)
+order_limiter = ToolLimiter("orders", mcp_server_config.order_tool_concurrency, mcp_server_config.tool_timeout)
+# Resolver and columnar catalog built from MongoDB when the snapshot is unavailable, kept until the catalog version changes.
+_db_indexes: Dict[str, Any] = {"version": None}
+reservation_stats = {"orders": 0, "out_of_stock": 0, "released": 0, "expired_committed": 0, "expired_released": 0}
+_last_hold_sweep = 0.0
+
 
 @mcp.tool(name="create_order")
-def create_order(order_details: dict) -> str:
+async def create_order(order_details: dict) -> str:
     """
-    Saves the given order data (dictionary) to a file in the 'orders' subdirectory, with a standardized format.
-    Returns a success message with the filename or an error message.
+    Deprecated: use reserve_and_create_order. Kept for older clients; the order goes through the
+    same stock reservation, so the order_id and prices come from the catalog, not from the input.
+    Returns the reserve_and_create_order result.
     """
+    input_data = order_details
+    if not isinstance(input_data, dict):
+        return json.dumps({"error": f"Input data is not a valid dictionary, received: {type(input_data)}", "status": "error"})
+    input_data = input_data.get("order_details", input_data)
+    if not input_data.get("product"):
+        return json.dumps({"error": "Missing required field: product", "status": "error"})
+    customer_info = input_data.get("customer_info") or {}
+    logger.warning("create_order is deprecated; placing the order through reserve_and_create_order")
     try:
-        orders_dir = "orders"
-        if not os.path.exists(orders_dir):
-            os.makedirs(orders_dir)
-            
-        input_data = order_details
+        quantity = int(input_data.get("quantity") or 1)
+    except (TypeError, ValueError):
+        return json.dumps({"error": f"Invalid quantity: {input_data.get('quantity')}", "status": "error"})
+    return await reserve_and_create_order(
+        product=input_data["product"],
+        customer_name=customer_info.get("customer_name") or "Guest",
+        conversation_id=customer_info.get("conversation_id") or str(uuid.uuid4()),
+        storage=input_data.get("storage"),
+        color=input_data.get("color"),
+        quantity=quantity,
+    )
+
+async def sweep_expired_holds():
+    """
+    Resolve stock holds older than ORDER_RESERVATION_TTL, left by calls that stopped between taking
+    the units and confirming the saved order (timeout, crash): commit them if the order was saved,
+    otherwise give the units back. Runs at most every ORDER_RESERVATION_SWEEP_INTERVAL seconds.
+    """
+    global _last_hold_sweep
+    now = time.monotonic()
+    if now - _last_hold_sweep < order_config.reservation_sweep_interval:
+        return
+    _last_hold_sweep = now
+    for hold in await async_db.expired_holds(datetime.now(timezone.utc)):
+        if await asyncio.to_thread(order_store.get, hold["order_id"]) is not None:
+            if await async_db.commit_reservation(hold["product_id"], hold["order_id"]):
+                reservation_stats["expired_committed"] += 1
+        elif await async_db.release_reservation(hold["product_id"], hold["order_id"], hold["quantity"]):
+            reservation_stats["expired_released"] += 1
+            logger.warning(f"Released expired stock hold of order {hold['order_id']}: {hold['quantity']} x {hold['product_id']}")
+
 
-        if not isinstance(input_data, dict):
-            return f"Error: Input data is not a valid dictionary, received: {type(input_data)}"
+@mcp.tool(name="reserve_and_create_order")
+async def reserve_and_create_order(
+    product: str,
+    customer_name: str,
+    conversation_id: str,
+    storage: Optional[str] = None,
+    color: Optional[str] = None,
+    quantity: int = 1,
+) -> str:
+    """
+    Places an order in one call: finds the product (name, and optionally storage and color), takes
+    `quantity` units only if that many are in stock, and saves the order at the current price.
+    Returns the order with unit price, total price and the stock left, or why it was not placed
+    (not_found, ambiguous with the matching variants, out_of_stock with the units available).
+    """
+    try:
+        if async_db is None:
+            logger.error("MongoDB client not initialized")
+            return json.dumps({"error": "Cannot connect to MongoDB database", "status": "error"})
+        if quantity < 1:
+            return json.dumps({"error": f"Quantity must be at least 1, got {quantity}", "status": "error"})
+        try:
+            await sweep_expired_holds()
+        except Exception as e:
+            logger.warning(f"Sweeping expired stock holds failed: {str(e)}")
 
-        if "order_details" in input_data:
-            input_data = input_data["order_details"]
+        matching_products = await find_products(product, storage, color)
+        if not matching_products:
+            return json.dumps(product_result(product, storage, color, matching_products), ensure_ascii=False)
+        matching_products = same_model(matching_products, product)
+        if len(matching_products) > 1:
+            variants = [{field: match.get(field) for field in ("product", "storage", "color", "price", "quantity")} for match in matching_products]
+            return json.dumps({
+                "error": f"{len(variants)} products match, specify storage and color",
+                "status": "ambiguous",
+                "products": variants[:mcp_server_config.search_max_results],
+            }, ensure_ascii=False)
 
-        required_fields = ["order_id", "product", "color", "storage", "quantity", "total_price", "customer_info"]
-        missing_fields = [field for field in required_fields if field not in input_data]
-        if missing_fields:
-            return f"Error: Missing required fields: {', '.join(missing_fields)}"        
+        product_id = matching_products[0]["product_id"]
+        order_id = str(uuid.uuid4())
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=order_config.reservation_ttl)
+        reserved = await product_limiter.run(async_db.reserve_stock, product_id, quantity, order_id, expires_at)
+        if reserved is None:
+            reservation_stats["out_of_stock"] += 1
+            current = await product_limiter.run(async_db.get_product_by_id, product_id)
+            available = current["quantity"] if current else 0
+            return json.dumps({
+                "error": f"Only {available} in stock, {quantity} requested",
+                "status": "out_of_stock",
+                "product": matching_products[0]["product"],
+                "storage": matching_products[0].get("storage"),
+                "color": matching_products[0].get("color"),
+                "available": available,
+            }, ensure_ascii=False)
 
-        standard_order = {
+        order = {
             "order_details": {
-                "order_id": input_data.get("order_id", f"{uuid.uuid4()}"),
-                "product": input_data.get("product", "Unknown Product"),
-                "color": input_data.get("color", "Unknown Color"),
-                "storage": input_data.get("storage", "Unknown Storage"),
-                "quantity": input_data.get("quantity", 1),
-                "total_price": input_data.get("total_price", 0),
-                "customer_info": {
-                    "customer_name": input_data.get("customer_info", {}).get("customer_name", "Guest"),
-                    "conversation_id": input_data.get("customer_info", {}).get("conversation_id", f"{uuid.uuid4()}")
-                }
+                "order_id": order_id,
+                "product_id": product_id,
+                "product": reserved["product"],
+                "color": reserved.get("color"),
+                "storage": reserved.get("storage"),
+                "quantity": quantity,
+                "unit_price": reserved["price"],
+                "total_price": reserved["price"] * quantity,
+                "customer_info": {"customer_name": customer_name or "Guest", "conversation_id": conversation_id},
             },
-            "message": input_data.get("message", "Đơn hàng đã được tạo.")
+            "message": "Đơn hàng đã được tạo.",
         }
+        try:
+            location = await order_limiter.run(asyncio.to_thread, order_store.save, order)
+        except asyncio.TimeoutError:
+            # The write may still finish; the sweep commits or releases the hold once it expires.
+            # The units are taken either way until then.
+            try:
+                await async_db.bump_catalog_version()
+            except Exception as e:
+                logger.warning(f"Bumping the catalog version after order {order_id} failed: {str(e)}")
+            return json.dumps({
+                "error": f"Saving the order timed out after {order_limiter.timeout}s; check it with get_order",
+                "status": "timeout",
+                "order_id": order_id,
+            })
+        except Exception:
+            if await async_db.release_reservation(product_id, order_id, quantity):
+                reservation_stats["released"] += 1
+            raise
 
-        order_id = standard_order["order_details"]["order_id"]
-        conversation_id = standard_order["order_details"]["customer_info"]["conversation_id"]
-
-        filename_base = f"order_{order_id}_{conversation_id}"
-        filename = f"{filename_base}.json"
-        filepath = os.path.join(orders_dir, filename)
-
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(standard_order, f, ensure_ascii=False, indent=4)
-
-        return f"Order data successfully saved to file: {filepath}"
+        # The order is saved from here on: a failure below must not report it as failed, or the agent
+        # tells the customer so or orders again.
+        reservation_stats["orders"] += 1
+        try:
+            await async_db.commit_reservation(product_id, order_id)
+        except Exception as e:
+            # The hold stays; sweep_expired_holds commits it once it expires, since the order exists.
+            logger.warning(f"Committing the stock hold of saved order {order_id} failed: {str(e)}")
+        try:
+            # Stock changed: catalog snapshots in polling mode and cached responses pick it up from the version.
+            await async_db.bump_catalog_version()
+        except Exception as e:
+            logger.warning(f"Bumping the catalog version after order {order_id} failed: {str(e)}")
+        return json.dumps({
+            "status": "success",
+            **order["order_details"],
+            "remaining_stock": reserved["quantity"],
+            "location": location,
+        }, ensure_ascii=False)
+    except asyncio.TimeoutError:
+        return json.dumps({"error": f"Reserving stock timed out after {product_limiter.timeout}s", "status": "timeout"})
     except Exception as e:
-        return f"Error saving order to file: {str(e)}"
+        logger.error(f"Error reserving stock and creating order: {str(e)}")
+        return json.dumps({"error": f"Error creating order: {str(e)}", "status": "error"}, ensure_ascii=False)
+
 
 @mcp.tool(name="get_order")
-def get_order(order_id: str) -> dict:
+async def get_order(order_id: str) -> dict:
     """
     Retrieves the content of an order file by its order_id.
     Returns a dictionary with file_content or error message.
     """
     try:
-        orders_dir = "orders"
-        for filename in os.listdir(orders_dir):
-            if filename.startswith(f"order_{order_id}") and filename.endswith(".json"):
-                file_path = os.path.join(orders_dir, filename)
-                with open(file_path, "r", encoding="utf-8") as f:
-                    file_content = f.read()
-                return {"file_content": file_content}
-
-        return {"error": f"Order file with ID {order_id} not found", "status": 404}
+        order = await order_limiter.run(asyncio.to_thread, order_store.get, order_id)
+        if order is None:
+            return {"error": f"Order file with ID {order_id} not found", "status": 404}
+        return {"file_content": json.dumps(order, ensure_ascii=False, indent=4)}
+    except asyncio.TimeoutError:
+        return {"error": f"Retrieving order timed out after {order_limiter.timeout}s", "status": 504}
     except Exception as e:
         return {"error": f"Error retrieving order file: {str(e)}", "status": 500}
 
 
+@mcp.tool(name="list_orders_by_conversation")
+async def list_orders_by_conversation(conversation_id: str, limit: int = order_config.list_limit) -> dict:
+    """
+    Lists the orders created in a conversation, newest first.
+    Returns a dictionary with the orders or an error message.
+    """
+    try:
+        orders = await order_limiter.run(asyncio.to_thread, order_store.list_by_conversation, conversation_id, limit)
+        return {"status": "success", "orders": orders}
+    except asyncio.TimeoutError:
+        return {"error": f"Listing orders timed out after {order_limiter.timeout}s", "status": 504}
+    except Exception as e:
+        return {"error": f"Error listing orders: {str(e)}", "status": 500}
+
+
+@mcp.tool(name="list_orders_by_customer")
+async def list_orders_by_customer(customer_name: str, limit: int = order_config.list_limit) -> dict:
+    """
+    Lists the orders of a customer (name matched case-insensitively), newest first.
+    Returns a dictionary with the orders or an error message.
+    """
+    try:
+        orders = await order_limiter.run(asyncio.to_thread, order_store.list_by_customer, customer_name, limit)
+        return {"status": "success", "orders": orders}
+    except asyncio.TimeoutError:
+        return {"error": f"Listing orders timed out after {order_limiter.timeout}s", "status": 504}
+    except Exception as e:
+        return {"error": f"Error listing orders: {str(e)}", "status": 500}
+
+
+@mcp.tool(name="get_catalog_version")
+async def get_catalog_version() -> str:
+    """
+    Returns the current catalog version, a counter bumped whenever products change.
+    """
+    try:
+        if async_db is None:
+            return json.dumps({"error": "Cannot connect to MongoDB database", "status": "error"})
+        version = await product_limiter.run(async_db.get_catalog_version)
+        return json.dumps({"status": "success", "version": version})
+    except asyncio.TimeoutError:
+        return json.dumps({"error": f"Reading the catalog version timed out after {product_limiter.timeout}s", "status": "timeout"})
+    except Exception as e:
+        logger.error(f"Error retrieving catalog version: {str(e)}")
+        return json.dumps({"error": f"Error retrieving catalog version: {str(e)}", "status": "error"})
+
+
+async def find_products(product: str, storage: Optional[str] = None, color: Optional[str] = None) -> List[Dict[str, Any]]:
+    if catalog_snapshot is not None and catalog_snapshot.ready():
+        return catalog_snapshot.get_products(product, storage, color)
+    return await product_limiter.run(async_db.get_products, product_name=product, storage=storage, color=color)
+
+
+def product_result(product: str, storage: Optional[str], color: Optional[str], matching_products: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Payload of get_product_info for one lookup; also used per lookup by get_products_bulk."""
+    if not matching_products:
+        logger.warning(f"No product found for: {product}")
+        return {
+            "error": f"No product found matching product='{product}', "
+                     f"storage='{storage or 'any'}', color='{color or 'any'}'",
+            "status": "not_found"
+        }
+    return {
+        "status": "success",
+        "products": matching_products
+    }
+
+
 @mcp.tool(name="get_product_info")
-def get_product_info(product: str, storage: Optional[str] = None, color: Optional[str] = None) -> str:
+async def get_product_info(product: str, storage: Optional[str] = None, color: Optional[str] = None) -> str:
     """
     Retrieves inventory details from storage based on the product. 
     Input is a JSON string or object with product name, and optionally storage and color.
     """
     try:
-        if db_client is None:
+        if async_db is None:
             logger.error("MongoDB client not initialized")
             return json.dumps({"error": "Cannot connect to MongoDB database", "status": "error"})
 
-        matching_products = db_client.get_products(
-            product_name=product,
-            storage=storage,
-            color=color
-        )
-
-        if not matching_products:
-            logger.warning(f"No product found for: {product}")
-            return json.dumps({
-                "error": f"No product found matching product='{product}', "
-                            f"storage='{storage or 'any'}', color='{color or 'any'}'",
-                            "status": "not_found"
-                })
+        matching_products = await find_products(product, storage, color)
 
-        result = {
-            "status": "success",
-            "products": matching_products
-        }
+        result = product_result(product, storage, color, matching_products)
         logger.debug(f"Found products: {result}")
         return json.dumps(result, ensure_ascii=False)
 
+    except asyncio.TimeoutError:
+        logger.error(f"Product lookup timed out after {product_limiter.timeout}s: {product}")
+        return json.dumps({"error": f"Product lookup timed out after {product_limiter.timeout}s", "status": "timeout"})
     except Exception as e:
         logger.error(f"Error retrieving product info: {str(e)}")
         return json.dumps({
@@ -132,6 +315,164 @@ def get_product_info(product: str, storage: Optional[str] = None, color: Optiona
         }, ensure_ascii=False, indent=4)
 
 
+@mcp.tool(name="get_products_bulk")
+async def get_products_bulk(lookups: List[Dict[str, Optional[str]]]) -> str:
+    """
+    Retrieves inventory details for several products at once.
+    Input is a list of objects with product name, and optionally storage and color.
+    Returns one result per lookup, in order, each shaped like the get_product_info result.
+    """
+    try:
+        if async_db is None:
+            logger.error("MongoDB client not initialized")
+            return json.dumps({"error": "Cannot connect to MongoDB database", "status": "error"})
+        if len(lookups) > mcp_server_config.bulk_max_lookups:
+            return json.dumps({
+                "error": f"At most {mcp_server_config.bulk_max_lookups} lookups per call, got {len(lookups)}",
+                "status": "error"
+            })
+        if any(not lookup.get("product") for lookup in lookups):
+            return json.dumps({"error": "Every lookup needs a product name", "status": "error"})
+
+        if catalog_snapshot is not None and catalog_snapshot.ready():
+            matches = [catalog_snapshot.get_products(lookup["product"], lookup.get("storage"), lookup.get("color")) for lookup in lookups]
+        else:
+            matches = await product_limiter.run(async_db.get_products_bulk, lookups)
+        results = [
+            product_result(lookup["product"], lookup.get("storage"), lookup.get("color"), matching_products)
+            for lookup, matching_products in zip(lookups, matches)
+        ]
+        return json.dumps({"status": "success", "results": results}, ensure_ascii=False)
+
+    except asyncio.TimeoutError:
+        logger.error(f"Bulk product lookup timed out after {product_limiter.timeout}s: {len(lookups)} lookups")
+        return json.dumps({"error": f"Product lookup timed out after {product_limiter.timeout}s", "status": "timeout"})
+    except Exception as e:
+        logger.error(f"Error retrieving products in bulk: {str(e)}")
+        return json.dumps({"error": f"Error retrieving product info: {str(e)}", "status": "error"}, ensure_ascii=False)
+
+
+async def _db_index(kind: str, build):
+    """Index of the given kind over the products in MongoDB, rebuilt once the catalog version moved."""
+    version = await product_limiter.run(async_db.get_catalog_version)
+    if _db_indexes["version"] != version:
+        _db_indexes.clear()
+        _db_indexes["version"] = version
+    if kind not in _db_indexes:
+        if "products" not in _db_indexes:
+            _db_indexes["products"] = await product_limiter.run(async_db.get_all_products)
+        _db_indexes[kind] = build(_db_indexes["products"])
+    return _db_indexes[kind]
+
+
+async def get_resolver() -> ProductResolver:
+    if catalog_snapshot is not None and catalog_snapshot.ready():
+        return catalog_snapshot.resolver()
+    return await _db_index("resolver", ProductResolver)
+
+
+async def get_columnar() -> ColumnarCatalog:
+    if catalog_snapshot is not None and catalog_snapshot.ready():
+        return catalog_snapshot.columnar()
+    return await _db_index("columnar", ColumnarCatalog)
+
+
+@mcp.tool(name="resolve_product")
+async def resolve_product(product: str, storage: Optional[str] = None, color: Optional[str] = None, limit: int = 5) -> str:
+    """
+    Resolves a loosely written product mention (shorthand, typos, missing spaces or accents) to canonical catalog products.
+    Returns up to `limit` matches, best first, with a score between 0 and 1, the storage and color found
+    among the product's variants and the product_ids of the matching SKUs.
+    """
+    try:
+        if async_db is None:
+            logger.error("MongoDB client not initialized")
+            return json.dumps({"error": "Cannot connect to MongoDB database", "status": "error"})
+        resolver = await get_resolver()
+        matches = resolver.resolve(product, storage, color, limit)
+        return json.dumps({"status": "success", "matches": matches}, ensure_ascii=False)
+    except asyncio.TimeoutError:
+        return json.dumps({"error": f"Product resolution timed out after {product_limiter.timeout}s", "status": "timeout"})
+    except Exception as e:
+        logger.error(f"Error resolving product: {str(e)}")
+        return json.dumps({"error": f"Error resolving product: {str(e)}", "status": "error"}, ensure_ascii=False)
+
+
+@mcp.tool(name="search_products")
+async def search_products(
+    min_price: Optional[int] = None,
+    max_price: Optional[int] = None,
+    storage: Optional[str] = None,
+    color: Optional[str] = None,
+    brand: Optional[str] = None,
+    min_stock: Optional[int] = None,
+    sort_by: str = "price",
+    descending: bool = False,
+    limit: int = 10,
+) -> str:
+    """
+    Searches the catalog by criteria instead of by name: price range in VND, storage (e.g. '512GB'),
+    color (e.g. 'xanh', 'Titan'), brand or product line (e.g. 'Apple', 'Samsung') and minimum stock
+    (1 for products in stock). Results are sorted by 'price', 'quantity' or 'storage', ascending unless
+    descending is true. Returns the number of matching products and the first `limit` of them.
+    """
+    try:
+        if async_db is None:
+            logger.error("MongoDB client not initialized")
+            return json.dumps({"error": "Cannot connect to MongoDB database", "status": "error"})
+        limit = max(1, min(limit, mcp_server_config.search_max_results))
+        columnar = await get_columnar()
+        total, products = columnar.search(min_price, max_price, storage, color, brand, min_stock, sort_by, descending, limit)
+        return json.dumps({"status": "success", "total": total, "products": products}, ensure_ascii=False)
+    except ValueError as e:
+        return json.dumps({"error": str(e), "status": "error"}, ensure_ascii=False)
+    except asyncio.TimeoutError:
+        return json.dumps({"error": f"Product search timed out after {product_limiter.timeout}s", "status": "timeout"})
+    except Exception as e:
+        logger.error(f"Error searching products: {str(e)}")
+        return json.dumps({"error": f"Error searching products: {str(e)}", "status": "error"}, ensure_ascii=False)
+
+
+@mcp.tool(name="similar_products")
+async def similar_products(product: str, storage: Optional[str] = None, color: Optional[str] = None, limit: int = 5) -> str:
+    """
+    Finds in-stock alternatives to a product, e.g. when it is out of stock: the closest SKUs by brand,
+    model family, storage, price and color. Input is the product name, and optionally storage and color.
+    Returns the product they were compared with and up to `limit` alternatives, closest first, each with
+    a similarity between 0 and 1.
+    """
+    try:
+        if async_db is None:
+            logger.error("MongoDB client not initialized")
+            return json.dumps({"error": "Cannot connect to MongoDB database", "status": "error"})
+        matching_products = await find_products(product, storage, color)
+        if not matching_products:
+            return json.dumps(product_result(product, storage, color, matching_products), ensure_ascii=False)
+        # The SKU the customer could not get, if the name matched several.
+        reference = next((match for match in matching_products if not match.get("quantity")), matching_products[0])
+        columnar = await get_columnar()
+        alternatives = columnar.similar(reference["_id"], max(1, min(limit, mcp_server_config.search_max_results)))
+        return json.dumps({"status": "success", "reference": reference, "alternatives": alternatives}, ensure_ascii=False)
+    except asyncio.TimeoutError:
+        return json.dumps({"error": f"Similar product lookup timed out after {product_limiter.timeout}s", "status": "timeout"})
+    except Exception as e:
+        logger.error(f"Error finding similar products: {str(e)}")
+        return json.dumps({"error": f"Error finding similar products: {str(e)}", "status": "error"}, ensure_ascii=False)
+
+
+@mcp.tool(name="get_server_metrics")
+def get_server_metrics() -> str:
+    """
+    Returns runtime metrics of the MCP server: catalog snapshot age, size and refresh cost, tool concurrency
+    and stock reservation outcomes.
+    """
+    return json.dumps({
+        "catalog_snapshot": catalog_snapshot.stats() if catalog_snapshot is not None else {"enabled": False},
+        "tools": {"products": product_limiter.metrics(), "orders": order_limiter.metrics()},
+        "reservations": reservation_stats,
+    })
+
+
 if __name__ == "__main__":
     logger.info("Starting MCP server...")
     mcp.run(transport="sse")
\ No newline at end of file
@@ -1,16 +1,12 @@
-from crewai import Agent, LLM
+from crewai import Agent
 
-from multi_agents.config.settings import api_config
+from multi_agents.config.settings import AgentRole
+from multi_agents.agents.llm_registry import get_llm_registry
 
 
 class ConsultantAgent:
     def __init__(self, tools=None):
-        self.llm = LLM(
-            model="openai/Qwen/Qwen3-8B",
-            base_url=api_config.base_url_llm,
-            api_key=api_config.api_key,
-            temperature=0.5,
-        )
+        self.llm = get_llm_registry().llm(AgentRole.CONSULTANT)
         
         self.crewai_agent = Agent(
             role="Tư vấn khách hàng",
@@ -23,12 +19,7 @@ class ConsultantAgent:
 
 class InventoryAgent:
     def __init__(self, tools=None):
-        self.llm = LLM(
-            model="openai/Qwen/Qwen3-8B",
-            base_url=api_config.base_url_llm,
-            api_key=api_config.api_key,
-            temperature=0.5,
-        )
+        self.llm = get_llm_registry().llm(AgentRole.INVENTORY)
         
         self.crewai_agent = Agent(
             role="Kiểm tra kho",
@@ -41,12 +32,7 @@ class InventoryAgent:
 
 class OrderAgent:
     def __init__(self, tools=None):
-        self.llm = LLM(
-            model="openai/Qwen/Qwen3-8B",
-            base_url=api_config.base_url_llm,
-            api_key=api_config.api_key,
-            temperature=0.5,
-        )
+        self.llm = get_llm_registry().llm(AgentRole.ORDER)
         
         self.crewai_agent = Agent(
             role="Lên đơn hàng",
@@ -2,7 +2,9 @@ from openai import OpenAI
 from loguru import logger
 from typing import Dict, Optional
 
-from multi_agents.config.settings import llm_config, Role
+from multi_agents.config.settings import agent_model_config, llm_config, AgentRole, Role
+from multi_agents.agents.llm_registry import get_llm_registry
+from multi_agents.cache.completion_cache import get_completion_cache
 
 
 class BaseAgent:
@@ -11,10 +13,14 @@ class BaseAgent:
         llm: Optional[OpenAI] = None,
         system_prompt: Optional[str] = None,
         prompt_template: Optional[str] = None,
+        role: AgentRole = AgentRole.CONSULTANT,
     ):
+        settings = agent_model_config.for_role(role)
         if llm is None:
-            llm = OpenAI(api_key=llm_config.api_key, base_url=llm_config.base_url)
+            llm = get_llm_registry().openai_client(settings["base_url"], settings["api_key"])
         self.llm = llm
+        self.model = settings["model"]
+        self.temperature = settings["temperature"]
         self.system_prompt = system_prompt
         self.prompt_template = prompt_template
 
@@ -22,19 +28,26 @@ class BaseAgent:
         logger.info("=== Prompt ===")
         print(prompt)
         
-        response = self.llm.chat.completions.create(
-            seed=llm_config.seed,
-            temperature=llm_config.temperature,
-            top_p=llm_config.top_p,
-            model=llm_config.model,
-            messages=[
+        request = {
+            "seed": llm_config.seed,
+            "temperature": self.temperature,
+            "top_p": llm_config.top_p,
+            "model": self.model,
+            "messages": [
                 {"role": Role.SYSTEM, "content": self.system_prompt},
                 {"role": Role.USER, "content": prompt},
             ],
-            response_format={"type": "json_object"},
-        )
-        content = response.choices[0].message.content
-        return content
+            "response_format": {"type": "json_object"},
+        }
+
+        def create_completion():
+            response = self.llm.chat.completions.create(**request)
+            return response.choices[0].message.content
+
+        cache = get_completion_cache()
+        if cache is None:
+            return create_completion()
+        return cache.complete({**request, "base_url": str(self.llm.base_url)}, create_completion)
 
     def process_input(self, input_data: str, context: Optional[Dict] = None) -> Dict:
         """Xử lý input và tạo prompt từ template."""
@@ -0,0 +1,184 @@
+import json
+import time
+import asyncio
+from loguru import logger
+from openai import OpenAI
+from pydantic import ValidationError
+from crewai.tools import BaseTool
+from typing import Any, Dict, List, Optional
+
+from multi_agents.config.settings import llm_config, pipeline_config, AgentRole, Role
+from multi_agents.agents.custom_agent import BaseAgent
+from multi_agents.agents.prompt import request_json
+from multi_agents.cache.completion_cache import get_completion_cache
+from multi_agents.mcp.session_pool import get_session_pool
+from multi_agents.utils.streaming import RunEmitter
+
+SYSTEM_PROMPT = """
+Bạn là một trợ lý bán hàng tận tâm, trả lời khách hàng bằng tiếng Việt và dùng các công cụ để tra cứu kho và đặt hàng.
+Yêu cầu của khách hàng và 'initial_context_data' nằm trong tin nhắn của người dùng.
+Quy trình:
+1. Xác định sản phẩm khách quan tâm (tên, dung lượng, màu sắc) và ý định của khách (hỏi thông tin, hỏi giá, kiểm tra tồn kho, đặt hàng).
+2. Nếu khách hỏi giá hoặc tồn kho, hoặc chỉ nhắc đến tên sản phẩm: gọi `get_product_info` với product, và storage, color nếu được đề cập.
+   Nếu sản phẩm hết hàng (quantity bằng 0), gọi `similar_products` MỘT lần với cùng product, storage, color để gợi ý sản phẩm còn hàng.
+3. Nếu khách mô tả nhu cầu theo tiêu chí (khoảng giá, dung lượng, màu sắc, hãng, còn hàng) mà không nêu tên sản phẩm cụ thể:
+   gọi `search_products` MỘT lần (giá tính bằng VND, ví dụ "dưới 25 triệu" là max_price=25000000, "còn hàng" là min_stock=1).
+4. Nếu khách muốn mua hoặc đặt hàng ("muốn mua", "đặt mua", "chốt đơn"): gọi `reserve_and_create_order` ĐÚNG MỘT lần với product,
+   storage, color, quantity (mặc định 1) và customer_name, conversation_id lấy từ 'initial_context_data'.
+   Công cụ tự kiểm tra tồn kho, giữ hàng, tạo order_id và tính giá; không tự tính giá hay tạo order_id, không gọi lại công cụ.
+5. Các lệnh gọi công cụ không phụ thuộc nhau (ví dụ kiểm tra nhiều sản phẩm) hãy gọi cùng lúc trong một lượt.
+6. Khi đã đủ thông tin, trả lời khách bằng ngôn ngữ tự nhiên, thân thiện, gọi tên khách nếu 'initial_context_data' có.
+   Chỉ dùng thông tin tồn kho, giá, sản phẩm thay thế và đơn hàng từ kết quả của công cụ, không được bịa ra.
+   Nếu có thông tin khách hàng, đừng nhắc lại tên sản phẩm khách đã từng mua.
+""".strip()
+
+USER_PROMPT = """
+Yêu cầu của khách hàng: '{customer_input}'
+initial_context_data: {initial_context_data}
+""".strip()
+
+
+def tool_spec(name: str, tool: BaseTool) -> Dict[str, Any]:
+    """OpenAI function definition of a CrewAI tool, from its description and argument schema."""
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": tool.description,
+            "parameters": tool.args_schema.model_json_schema(),
+        },
+    }
+
+
+class FunctionCallingAgent(BaseAgent):
+    """
+    Single-pass alternative to the CrewAI pipeline: one agent loop over native OpenAI tool calls.
+    The model sees the customer request once, requests tool calls (several in one turn when they
+    do not depend on each other) and writes the answer after their results, instead of four
+    ReAct tasks each re-reading the request. Tool calls of a turn run concurrently on the MCP
+    session pool's loop, through the same CrewAI tools the crews use.
+    """
+
+    def __init__(
+        self,
+        tools: Dict[str, BaseTool],
+        llm: Optional[OpenAI] = None,
+        max_turns: int = pipeline_config.function_calling_max_turns,
+    ):
+        """
+        Args:
+            tools (Dict[str, BaseTool]): Tools by function name (the MCP tool they call).
+            llm (Optional[OpenAI]): Client to use instead of the consultant endpoint's.
+            max_turns (int): Turns with tool calls before the model must answer without tools.
+        """
+        super().__init__(llm=llm, system_prompt=SYSTEM_PROMPT, prompt_template=USER_PROMPT, role=AgentRole.CONSULTANT)
+        self.tools = tools
+        self.tool_specs = [tool_spec(name, tool) for name, tool in tools.items()]
+        self.max_turns = max_turns
+
+    def chat(self, messages: List[Dict[str, Any]], tool_choice: str = "auto") -> Dict[str, Any]:
+        """
+        One chat completion with the tools offered.
+
+        Returns:
+            Dict[str, Any]: 'message' (the assistant message as a dict) and 'usage' (None when served from the completion cache).
+        """
+        request = {
+            "seed": llm_config.seed,
+            "temperature": self.temperature,
+            "top_p": llm_config.top_p,
+            "model": self.model,
+            "messages": messages,
+            "tools": self.tool_specs,
+            "tool_choice": tool_choice,
+        }
+        usage = []
+
+        def create_completion() -> str:
+            response = self.llm.chat.completions.create(**request)
+            usage.append(response.usage)
+            return response.choices[0].message.model_dump_json(exclude_none=True)
+
+        cache = get_completion_cache()
+        if cache is None:
+            message = create_completion()
+        else:
+            message = cache.complete({**request, "base_url": str(self.llm.base_url)}, create_completion)
+        return {"message": json.loads(message), "usage": usage[0] if usage else None}
+
+    async def _execute_one(self, call: Dict[str, Any]) -> str:
+        name = call["function"]["name"]
+        tool = self.tools.get(name)
+        if tool is None:
+            return json.dumps({"status": "error", "error": f"Unknown tool '{name}'"})
+        try:
+            arguments = tool.args_schema.model_validate(json.loads(call["function"].get("arguments") or "{}"))
+        except (ValueError, ValidationError) as e:
+            # Returned to the model, which can correct the arguments on its next turn.
+            return json.dumps({"status": "error", "error": f"Invalid arguments for '{name}': {str(e)}"}, ensure_ascii=False)
+        return await tool._arun(**arguments.model_dump(exclude_none=True))
+
+    async def _execute(self, calls: List[Dict[str, Any]]) -> List[str]:
+        return list(await asyncio.gather(*(self._execute_one(call) for call in calls)))
+
+    def run(self, customer_input: str, initial_context_data: Optional[dict] = None, emitter: Optional[RunEmitter] = None) -> Dict[str, Any]:
+        """
+        Answer one customer request.
+
+        Returns:
+            Dict[str, Any]: 'customer_response', 'tool_calls' (name, arguments and result of each
+            executed call, in order), 'token_usage' and 'turns'.
+        """
+        messages = [
+            {"role": Role.SYSTEM.value, "content": self.system_prompt},
+            {"role": Role.USER.value, "content": self.prompt_template.format(
+                customer_input=customer_input, initial_context_data=request_json(initial_context_data)
+            )},
+        ]
+        executed = []
+        token_usage = {"total_tokens": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0, "successful_requests": 0}
+
+        turn = 0
+        while True:
+            if emitter is not None:
+                emitter.check_cancelled()
+            # Out of turns: the model answers from the results it has.
+            reply = self.chat(messages, tool_choice="auto" if turn < self.max_turns else "none")
+            self._add_usage(token_usage, reply["usage"])
+            message = reply["message"]
+            calls = message.get("tool_calls") or []
+            if not calls or turn >= self.max_turns:
+                break
+            turn += 1
+
+            messages.append({"role": Role.ASSISTANT.value, "content": message.get("content"), "tool_calls": calls})
+            start = time.perf_counter()
+            results = get_session_pool().submit(self._execute(calls)).result()
+            logger.info(f"Executed {len(calls)} tool call(s) in {(time.perf_counter() - start) * 1000:.1f}ms: {[call['function']['name'] for call in calls]}")
+            for call, result in zip(calls, results):
+                messages.append({"role": "tool", "tool_call_id": call["id"], "content": result})
+                executed.append({"name": call["function"]["name"], "arguments": call["function"].get("arguments"), "result": result})
+                if emitter is not None:
+                    emitter.emit({
+                        "type": "tool_result",
+                        "thought": message.get("content") or "",
+                        "tool": call["function"]["name"],
+                        "tool_input": call["function"].get("arguments"),
+                        "result": result,
+                    })
+
+        customer_response = message.get("content") or ""
+        if emitter is not None:
+            emitter.emit({"type": "token", "content": customer_response})
+        return {"customer_response": customer_response, "tool_calls": executed, "token_usage": token_usage, "turns": turn + 1}
+
+    @staticmethod
+    def _add_usage(token_usage: Dict[str, int], usage) -> None:
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        token_usage["total_tokens"] += usage.total_tokens or 0
+        token_usage["prompt_tokens"] += usage.prompt_tokens or 0
+        token_usage["cached_prompt_tokens"] += (getattr(details, "cached_tokens", None) or 0) if details else 0
+        token_usage["completion_tokens"] += usage.completion_tokens or 0
+        token_usage["successful_requests"] += 1
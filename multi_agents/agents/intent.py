@@ -0,0 +1,340 @@
+import json
+from loguru import logger
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from multi_agents.config.settings import mcp_config
+from multi_agents.utils.text import normalize_search_key
+from multi_agents.db.resolver import COLOR_ALIASES, STOPWORDS, TOKEN_ALIASES, _dice, _expand, _storage_key, _trigrams
+from multi_agents.mcp.session_pool import get_session_pool, result_text
+
+ORDER = "order"
+PRICE = "price"
+STOCK = "stock"
+GREETING = "greeting"
+FILLER = "filler"
+COLOR = "color"
+# Negators ("không", "đừng", "thôi"); anywhere but as a closing question particle they make a refusal.
+NEGATION = "negation"
+# Requests the rules do not model (advice, comparisons, criteria search, several products,
+# after-sales, cancellations); the LLM task handles them.
+FALL_THROUGH = "fall_through"
+
+# Phrases on normalized tokens (lower case, no diacritics), since customers often type without accents.
+LEXICON = {
+    ORDER: [
+        "muon mua", "dat mua", "dat hang", "dat don", "dat don hang", "len don", "chot don", "chot",
+        "mua", "dat", "order", "lay cho", "lay",
+    ],
+    PRICE: ["gia", "gia ca", "bao nhieu", "bao nhieu tien", "bao tien", "nhieu tien", "gia bao nhieu"],
+    STOCK: [
+        "con hang", "con khong", "con ko", "con k", "con may", "con bao nhieu", "co san", "co hang",
+        "het hang", "ton kho", "con hang khong",
+    ],
+    GREETING: ["xin chao", "chao", "hello", "hi", "alo", "cam on", "thank", "thanks"],
+    COLOR: ["mau"],
+    NEGATION: ["khong", "ko", "k", "chua", "dung", "dung co", "thoi"],
+    FALL_THROUGH: [
+        "huy", "doi tra", "bao hanh", "tra gop",
+        "giao hang", "ship", "khuyen mai", "giam gia", "uu dai", "so sanh", "nen", "tu van", "khac nhau",
+        "tot", "hay hon", "loai nao", "cai nao", "con nao", "may nao", "hay", "hoac", "va", "duoi", "tren",
+        "khoang", "tam", "trieu", "tr", "cu", "don hang", "review", "danh gia", "cau hinh", "pin", "camera",
+    ],
+    FILLER: [
+        "toi", "minh", "em", "anh", "chi", "ban", "shop", "ad", "oi", "a", "ah", "ak", "nhe", "nha", "nhi",
+        "vay", "the", "nao", "the nao", "cho", "hoi", "xem", "voi", "cai", "chiec", "con", "may", "dien thoai",
+        "dt", "loai", "phien ban", "dung luong", "la", "co", "duoc", "di", "ha", "ve", "cua", "nay",
+        "thi", "can", "muon", "san pham", "sp", "mot", "ma", "luon", "gium", "giup", "dum", "nua", "ngay",
+    ],
+}
+_PHRASES: Dict[Tuple[str, ...], str] = {
+    tuple(phrase.split()): category for category, phrases in LEXICON.items() for phrase in phrases
+}
+_LONGEST_PHRASE = max(len(phrase) for phrase in _PHRASES)
+STORAGE_UNITS = {"gb": "GB", "g": "GB", "tb": "TB", "t": "TB"}
+# Particles that may close a sentence after a question "không" ("còn hàng không ạ").
+SENTENCE_PARTICLES = {"a", "ah", "ak", "nhe", "nha", "nhi", "vay", "the", "ha", "oi"}
+# Negators that double as the question particle closing a yes/no question ("giá bao nhiêu vậy ko").
+QUESTION_NEGATORS = {"khong", "ko", "k", "chua"}
+# Words counting a quantity ("2 chiếc"); the number and the word are part of the request, not the product.
+# "con" and "may" are left out: "iPhone 12 còn hàng", "Xiaomi 14 máy".
+QUANTITY_WORDS = {"cai", "chiec", "sp"}
+# An exact, unambiguous match scores about 1; this is where the resolver's ranking is trusted.
+CONFIDENT_SCORE = 0.8
+AMBIGUITY_MARGIN = 0.1
+TOKEN_MATCH_DICE = 0.5
+
+Resolve = Callable[[str, Optional[str], Optional[str]], List[Dict[str, Any]]]
+
+
+def _is_power_of_two(number: int) -> bool:
+    return number > 0 and number & (number - 1) == 0
+
+
+def resolve_with_mcp(product: str, storage: Optional[str] = None, color: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Catalog matches of a mention from the MCP server's resolve_product tool."""
+    arguments = {key: value for key, value in (("product", product), ("storage", storage), ("color", color)) if value}
+    payload = json.loads(result_text(get_session_pool().call_tool("resolve_product", {**arguments, "limit": 2})))
+    if payload.get("status") != "success":
+        raise RuntimeError(payload.get("error", "resolve_product failed"))
+    return payload["matches"]
+
+
+class IntentClassifier:
+    """
+    Rule-based stand-in for Task 1 on simple messages ("Tôi muốn mua iPhone 15 Pro Max 256GB màu
+    Titan tự nhiên", "ip 15 pm còn hàng ko"): intent from a Vietnamese keyword lexicon, storage from
+    the text, product and color resolved against the catalog with resolve_product. It returns Task 1's
+    JSON with a confidence; anything it does not fully explain (advice, comparisons, price ranges,
+    several products, unknown words) gets a low confidence and is left to the LLM.
+    """
+
+    def __init__(self, resolve: Resolve = resolve_with_mcp, min_score: float = mcp_config.resolve_min_score):
+        """
+        Args:
+            resolve (Resolve): Ranks catalog products for (product, storage, color), best first,
+                like ProductResolver.resolve.
+            min_score (float): Resolver score below which the product counts as not found.
+        """
+        self.resolve = resolve
+        self.min_score = min_score
+
+    @staticmethod
+    def _tag(tokens: List[str]) -> List[Optional[str]]:
+        """Category of each token: lexicon phrases (longest first), storage, quantities; None if unexplained."""
+        tags: List[Optional[str]] = [None] * len(tokens)
+        i = 0
+        while i < len(tokens):
+            if tokens[i].isdigit() and i + 1 < len(tokens):
+                # Capacities are powers of two, which keeps model names like "13T" out.
+                if tokens[i + 1] in STORAGE_UNITS and _is_power_of_two(int(tokens[i])):
+                    tags[i] = tags[i + 1] = "storage"
+                    i += 2
+                    continue
+                if tokens[i + 1] in QUANTITY_WORDS:
+                    tags[i] = tags[i + 1] = "quantity"
+                    i += 2
+                    continue
+            if len(tokens[i]) == 1 and i + 1 < len(tokens) and tokens[i + 1].isdigit():
+                # A model letter split from its number ("A35" -> "a 35"), not the particle "ạ".
+                i += 1
+                continue
+            for length in range(min(_LONGEST_PHRASE, len(tokens) - i), 0, -1):
+                category = _PHRASES.get(tuple(tokens[i:i + length]))
+                if category is not None:
+                    tags[i:i + length] = [category] * length
+                    i += length
+                    break
+            else:
+                i += 1
+        return tags
+
+    @staticmethod
+    def _same_token(a: str, b: str) -> bool:
+        """Equal, or a typo of each other; tokens with digits are model numbers and must be equal."""
+        if a == b:
+            return True
+        # A much longer token is several words run together ("plussamsung"), not a typo.
+        if any(char.isdigit() for char in a + b) or abs(len(a) - len(b)) > 2:
+            return False
+        if len(a) >= 4 and sorted(a) == sorted(b):
+            return True
+        return _dice(_trigrams([a]), _trigrams([b])) >= TOKEN_MATCH_DICE
+
+    def _explained_by(self, token: str, name_tokens: Set[str]) -> bool:
+        """Whether a mention token is (a shorthand or typo of) a token of the product name."""
+        return all(
+            piece in STOPWORDS or any(self._same_token(piece, name_token) for name_token in name_tokens)
+            for piece in _expand([token], TOKEN_ALIASES)
+        )
+
+    def unexplained(self, mention: List[str], product: str) -> List[str]:
+        """Tokens of a mention that the product name does not explain, such as a color written without "màu"."""
+        name_tokens = set(normalize_search_key(product).split())
+        return [token for token in mention if not self._explained_by(token, name_tokens)]
+
+    def _missing(self, mention: List[str], product: str) -> int:
+        """Tokens of the product name the mention does not contain ("iPhone 15" lacks "Pro" of "iPhone 15 Pro")."""
+        name_tokens = {token for token in normalize_search_key(product).split() if token not in STOPWORDS}
+        pieces = _expand(mention, TOKEN_ALIASES)
+        return sum(not any(self._same_token(piece, name_token) for piece in pieces) for name_token in name_tokens)
+
+    def _mismatch(self, mention: List[str], product: str) -> int:
+        """Tokens of the product name missing from the mention plus mention tokens the name does not explain."""
+        return self._missing(mention, product) + len(self.unexplained(mention, product))
+
+    @staticmethod
+    def _refuses(tokens: List[str], tags: List[Optional[str]]) -> bool:
+        """
+        Whether a negator makes the message a refusal or anything but a plain request ("không cần nữa",
+        "đừng đặt"). The only negator allowed is a question "không"/"chưa" closing the sentence after
+        an order, price or stock phrase ("đặt được không", "giá bao nhiêu vậy ko").
+        """
+        negators = [i for i, tag in enumerate(tags) if tag == NEGATION]
+        if not negators:
+            return False
+        last = negators[-1]
+        question = (
+            len(negators) == 1
+            and tokens[last] in QUESTION_NEGATORS
+            and all(token in SENTENCE_PARTICLES for token in tokens[last + 1:])
+            and any(tag in (ORDER, PRICE, STOCK) for tag in tags[:last])
+        )
+        return not question
+
+    def _parse(self, text: str) -> Optional[Tuple[List[str], List[Optional[str]], Optional[str], Optional[str]]]:
+        """Tokens, their tags, storage and color of a message; None if it is empty or outside the rules."""
+        tokens = normalize_search_key(text).split()
+        if not tokens:
+            return None
+        tags = self._tag(tokens)
+        if FALL_THROUGH in tags:
+            return None
+
+        storage = None
+        for i, tag in enumerate(tags):
+            if tag == "storage":
+                if storage is not None and storage != f"{tokens[i]}{STORAGE_UNITS[tokens[i + 1]]}":
+                    return None
+                storage = f"{tokens[i]}{STORAGE_UNITS[tokens[i + 1]]}"
+                tags[i + 1] = "unit"
+        # The color is the run of unexplained tokens after "màu".
+        color_tokens = []
+        for i, tag in enumerate(tags):
+            if tag == COLOR:
+                j = i + 1
+                while j < len(tokens) and tags[j] is None:
+                    color_tokens.append(tokens[j])
+                    tags[j] = "color_value"
+                    j += 1
+        return tokens, tags, storage, " ".join(color_tokens) or None
+
+    def extract_mention(self, text: str) -> Optional[Dict[str, Optional[str]]]:
+        """
+        Product mention, storage and color of a message by the rules alone, without a catalog
+        lookup ("ip 15 pm 256gb màu titan" -> product 'ip 15 pm', storage '256GB', color 'titan').
+
+        Returns:
+            Optional[Dict[str, Optional[str]]]: product, storage and color, or None when the
+            message names no product or is outside what the rules handle.
+        """
+        parsed = self._parse(text)
+        if parsed is None:
+            return None
+        tokens, tags, storage, color = parsed
+        mention = [token for token, tag in zip(tokens, tags) if tag is None]
+        if not mention:
+            return None
+        return {"product": " ".join(mention), "storage": storage, "color": color}
+
+    def describes(self, text: str, product: str, storage: Optional[str] = None, color: Optional[str] = None) -> bool:
+        """
+        Whether a product description such as Task 1's product_details names exactly this catalog
+        variant: the product name word for word (shorthand and typos allowed), and the same storage
+        and color, or none of them when they are None.
+        """
+        parsed = self._parse(text)
+        if parsed is None:
+            return False
+        tokens, tags, asked_storage, asked_color = parsed
+        mention = [token for token, tag in zip(tokens, tags) if tag is None]
+        if not mention:
+            return False
+        color_pieces = set(_expand(normalize_search_key(color).split(), COLOR_ALIASES))
+        if asked_color is None and color_pieces:
+            # A color written without "màu" ("iPhone 15 Pro Max 256GB Titan tự nhiên").
+            named = [token for token in mention if set(_expand([token], COLOR_ALIASES)) <= color_pieces]
+            mention = [token for token in mention if token not in named]
+            asked_color = " ".join(named) or None
+        if (asked_storage is None) != (storage is None) or (asked_color is None) != (color is None):
+            return False
+        if storage is not None and _storage_key(asked_storage) != _storage_key(storage):
+            return False
+        if color is not None and not set(_expand(normalize_search_key(asked_color).split(), COLOR_ALIASES)) <= color_pieces:
+            return False
+        return self._mismatch(mention, product) == 0
+
+    def classify(self, text: str) -> Tuple[Optional[Dict[str, Any]], float]:
+        """
+        Task 1's analysis of a customer message, if the rules can produce it.
+
+        Returns:
+            Tuple[Optional[Dict[str, Any]], float]: The analysis (product_details, customer_intent,
+            original_query, requires_inventory_check, requires_order_placement) and its confidence
+            in [0, 1], or (None, 0.0) when the message is outside what the rules handle.
+        """
+        parsed = self._parse(text)
+        if parsed is None:
+            return None, 0.0
+        tokens, tags, storage, color = parsed
+
+        order, price, stock = ORDER in tags, PRICE in tags, STOCK in tags
+        if self._refuses(tokens, tags):
+            # "Tôi không muốn mua ...", "... không cần nữa": a refusal, never an order or a lookup.
+            return None, 0.0
+        if "quantity" in tags:
+            # Task 1's analysis has no quantity field; the LLM passes "2 chiếc" on to the order task.
+            return None, 0.0
+        mention = [token for token, tag in zip(tokens, tags) if tag is None]
+        if not mention:
+            if GREETING in tags and not (order or price or stock or storage or color):
+                return self._analysis(text, "", "general_query", False, False), 0.95
+            return None, 0.0
+
+        try:
+            matches = self.resolve(" ".join(mention), storage, color)
+        except Exception as e:
+            logger.warning(f"Fast-path product resolution failed: {str(e)}")
+            return None, 0.0
+        if not matches or matches[0]["score"] < self.min_score:
+            return None, 0.0
+        best = matches[0]
+        runner_up = matches[1] if len(matches) > 1 and matches[1]["product"] != best["product"] else None
+        if self._missing(mention, best["product"]) and (order or (runner_up and not self.unexplained(mention, runner_up["product"]))):
+            # A model family ("iPhone 15") short of the best match's name ("iPhone 15 Pro"): never
+            # ordered on a guess, nor looked up when it also prefixes another product ("iPhone 15 Pro Max").
+            return None, 0.0
+        leftover = self.unexplained(mention, best["product"])
+
+        resolved_color = best.get("color")
+        if leftover and color is None:
+            # A color written without "màu" ("ip 15 pm titan xanh").
+            try:
+                retried = self.resolve(best["product"], storage, " ".join(leftover))
+            except Exception as e:
+                logger.warning(f"Fast-path product resolution failed: {str(e)}")
+                return None, 0.0
+            if retried and retried[0]["product"] == best["product"] and retried[0].get("color"):
+                color, resolved_color, leftover = " ".join(leftover), retried[0]["color"], []
+
+        if color and not resolved_color:
+            # A color the catalog does not list for the product; only its folded form is known here
+            # ("den"), so the LLM writes product_details from the message instead.
+            return None, 0.0
+
+        explained = len(tokens) - len(leftover)
+        confidence = min(1.0, best["score"] / CONFIDENT_SCORE) * (explained / len(tokens)) ** 2
+        if runner_up and best["score"] - runner_up["score"] < AMBIGUITY_MARGIN:
+            # "Galaxy Z Flip5" is close to "Galaxy Z Flip5 Plus" too, but only the former matches it word for word.
+            if self._mismatch(mention, best["product"]) >= self._mismatch(mention, runner_up["product"]):
+                confidence *= 0.5
+        if storage and not best.get("storage"):
+            # Asked for a storage the catalog does not list; Task 2 will report it, but be less sure.
+            confidence *= 0.9
+        if not (order or price or stock):
+            # A bare product name: Task 1 checks stock and price for it.
+            confidence *= 0.9
+
+        details = " ".join(part for part in (best["product"], best.get("storage") or storage, resolved_color) if part)
+        intent = "place_order" if order else "check_inventory_price"
+        analysis = self._analysis(text, details, intent, price or stock or not order, order)
+        return analysis, round(confidence, 3)
+
+    @staticmethod
+    def _analysis(text: str, details: str, intent: str, inventory: bool, order: bool) -> Dict[str, Any]:
+        return {
+            "product_details": details,
+            "customer_intent": intent,
+            "original_query": text,
+            "requires_inventory_check": inventory,
+            "requires_order_placement": order,
+        }
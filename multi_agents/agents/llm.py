@@ -0,0 +1,62 @@
+from crewai import LLM
+from typing import Any, Dict, List, Optional, Union
+from crewai.utilities.events import crewai_event_bus
+from crewai.utilities.events.llm_events import LLMStreamChunkEvent
+
+from multi_agents.cache.completion_cache import CompletionCache, get_completion_cache
+
+
+class AgentLLM(LLM):
+    """
+    crewai.LLM used by the agents. Text completions go through the completion cache
+    (when LLM_CACHE_MODE is not off), so identical prompts skip the LLM round trip.
+    """
+
+    def __init__(self, *args, cache: Optional[CompletionCache] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache = cache
+
+    @property
+    def openai_client(self) -> Optional[Any]:
+        """Pooled OpenAI client the requests go through (passed as `client` by LLMClientRegistry), if any."""
+        return self.additional_params.get("client")
+
+    def _cache_key_parts(self, messages: List[Dict[str, str]], tools: Optional[List[dict]]) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "base_url": self.base_url,
+            "messages": messages,
+            "temperature": self.temperature,
+            "top_p": self.top_p,
+            "seed": self.seed,
+            "max_tokens": self.max_tokens,
+            "stop": self.stop,
+            "response_format": str(self.response_format) if self.response_format else None,
+            "tools": tools,
+        }
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+    ) -> Union[str, Any]:
+        cache = self.cache or get_completion_cache()
+        # Calls that execute functions have side effects and cannot be replayed.
+        if cache is None or available_functions:
+            return super().call(messages, tools, callbacks, available_functions)
+
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        missed = []
+
+        def call_llm():
+            missed.append(True)
+            return super(AgentLLM, self).call(messages, tools, callbacks, available_functions)
+
+        response = cache.complete(self._cache_key_parts(messages, tools), call_llm)
+        if not missed and self.stream and isinstance(response, str):
+            # Keep streaming consumers working: a cached answer arrives as a single chunk.
+            crewai_event_bus.emit(self, event=LLMStreamChunkEvent(chunk=response))
+        return response
@@ -0,0 +1,138 @@
+import atexit
+import httpx
+import litellm
+import threading
+from loguru import logger
+from openai import OpenAI
+from typing import Dict, Optional, Tuple
+
+from multi_agents.agents.llm import AgentLLM
+from multi_agents.agents.llm_router import LLMRouter, split_endpoints
+from multi_agents.config.settings import AgentRole, agent_model_config, api_config, llm_client_config
+
+
+def litellm_model_name(model: str) -> str:
+    """Model names of the OpenAI-compatible endpoints (e.g. 'Qwen/Qwen3-8B') need litellm's 'openai/' provider prefix."""
+    if model.split("/", 1)[0] in litellm.provider_list:
+        return model
+    return f"openai/{model}"
+
+
+class LLMClientRegistry:
+    """
+    Process-wide owner of LLM HTTP clients.
+
+    One httpx.Client is kept per endpoint and shared by every OpenAI client and agent LLM that
+    talks to it, so runs reuse warm keep-alive connections instead of opening a new TCP/TLS
+    connection per request. An endpoint may be a comma-separated list of replicas; its client
+    then routes each request through an LLMRouter. Agent LLMs are built once per role from
+    `agent_model_config`.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = llm_client_config.max_connections,
+        max_keepalive_connections: int = llm_client_config.max_keepalive_connections,
+        keepalive_expiry: float = llm_client_config.keepalive_expiry,
+        connect_timeout: float = llm_client_config.connect_timeout,
+        read_timeout: float = llm_client_config.read_timeout,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+
+        self._lock = threading.Lock()
+        self._http_clients: Dict[str, httpx.Client] = {}
+        self._routers: Dict[str, LLMRouter] = {}
+        self._openai_clients: Dict[Tuple[str, str], OpenAI] = {}
+        self._llms: Dict[AgentRole, AgentLLM] = {}
+
+    @staticmethod
+    def _endpoint(base_url: str) -> str:
+        return ",".join(split_endpoints(base_url))
+
+    @staticmethod
+    def primary_url(base_url: str) -> str:
+        """URL the clients are configured with; the router re-targets requests from it to the chosen replica."""
+        return split_endpoints(base_url)[0]
+
+    def http_client(self, base_url: str) -> httpx.Client:
+        endpoint = self._endpoint(base_url)
+        with self._lock:
+            client = self._http_clients.get(endpoint)
+            if client is None:
+                router = LLMRouter(split_endpoints(base_url), self.limits)
+                client = httpx.Client(transport=router, timeout=self.timeout)
+                self._routers[endpoint] = router
+                self._http_clients[endpoint] = client
+                logger.info(f"Opened pooled HTTP client for LLM endpoint(s) {endpoint}")
+            return client
+
+    def openai_client(self, base_url: str = api_config.base_url_llm, api_key: str = api_config.api_key) -> OpenAI:
+        """OpenAI client for the endpoint, sharing that endpoint's connection pool."""
+        key = (self._endpoint(base_url), api_key)
+        client = self._openai_clients.get(key)
+        if client is None:
+            http_client = self.http_client(base_url)
+            with self._lock:
+                client = self._openai_clients.get(key)
+                if client is None:
+                    client = OpenAI(base_url=self.primary_url(base_url), api_key=api_key, http_client=http_client, timeout=self.timeout)
+                    self._openai_clients[key] = client
+        return client
+
+    def llm(self, role: AgentRole) -> AgentLLM:
+        """The shared AgentLLM of an agent role, created on first use."""
+        role = AgentRole(role)
+        llm = self._llms.get(role)
+        if llm is None:
+            settings = agent_model_config.for_role(role)
+            client = self.openai_client(settings["base_url"], settings["api_key"])
+            with self._lock:
+                llm = self._llms.get(role)
+                if llm is None:
+                    llm = AgentLLM(
+                        model=litellm_model_name(settings["model"]),
+                        base_url=self.primary_url(settings["base_url"]),
+                        api_key=settings["api_key"],
+                        temperature=settings["temperature"],
+                        stream=api_config.stream,
+                        # Forwarded to litellm, which then sends the request through the pooled client.
+                        client=client,
+                    )
+                    self._llms[role] = llm
+                    logger.info(f"LLM for role '{role.value}': model={settings['model']}, endpoint={settings['base_url']}")
+        return llm
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            "endpoints": {endpoint: router.stats() for endpoint, router in self._routers.items()},
+            "roles": {role.value: {"model": llm.model, "base_url": llm.base_url} for role, llm in self._llms.items()},
+        }
+
+    def close(self):
+        with self._lock:
+            for client in self._http_clients.values():
+                client.close()
+            self._http_clients.clear()
+            self._routers.clear()
+            self._openai_clients.clear()
+            self._llms.clear()
+
+
+_registry: Optional[LLMClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_llm_registry() -> LLMClientRegistry:
+    """Process-wide LLM client registry, shared by every MultiAgents instance."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = LLMClientRegistry()
+                atexit.register(_registry.close)
+    return _registry
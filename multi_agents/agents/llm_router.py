@@ -0,0 +1,251 @@
+import time
+import httpx
+import random
+import threading
+from loguru import logger
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Set
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from multi_agents.config.settings import llm_client_config
+
+
+def split_endpoints(base_url: str) -> List[str]:
+    """'http://a/v1, http://b/v1' -> ['http://a/v1', 'http://b/v1']"""
+    return [url.strip().rstrip("/") for url in base_url.split(",") if url.strip()]
+
+
+class Replica:
+    """One OpenAI-compatible endpoint with its own connection pool and health/latency state."""
+
+    def __init__(self, base_url: str, transport: httpx.BaseTransport):
+        self.base_url = base_url
+        self.transport = transport
+        self.in_flight = 0
+        self.ewma_latency: Optional[float] = None
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+
+    def available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+    def score(self) -> float:
+        # Unmeasured replicas score 0 so every replica gets probed early on.
+        return (self.ewma_latency or 0.0) * (self.in_flight + 1)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 2) if self.ewma_latency is not None else None,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+            "ejected": not self.available(time.monotonic()),
+        }
+
+
+class _TrackedStream(httpx.SyncByteStream):
+    """
+    Keeps a request counted as in flight until its (possibly streamed) body is closed, and hands
+    out the body chunk already read by the router ahead of the rest.
+    """
+
+    def __init__(self, stream: httpx.SyncByteStream, chunks: Iterator[bytes], head: bytes, on_close):
+        self._stream = stream
+        self._chunks = chunks
+        self._head = head
+        self._on_close = on_close
+
+    def __iter__(self):
+        if self._head:
+            head, self._head = self._head, b""
+            yield head
+        yield from self._chunks
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                on_close()
+
+
+class LLMRouter(httpx.BaseTransport):
+    """
+    httpx transport that spreads LLM requests over several OpenAI-compatible replicas.
+
+    Clients are created with the first replica as base URL; each request is re-targeted to the
+    replica with the lowest EWMA latency x (in-flight + 1). Replicas failing
+    `eject_after_failures` times in a row are skipped for `eject_duration` seconds. Latency is
+    measured to the first body chunk: with streaming (LLM_STREAM) a server sends its headers
+    right away, and the first chunk carries the first token. When no body has arrived after the
+    `hedge_percentile` latency, the same request is sent to a second replica; the first response
+    wins and the other one is closed, which makes the server abort that generation.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[str],
+        limits: httpx.Limits,
+        ewma_alpha: float = llm_client_config.ewma_alpha,
+        eject_after_failures: int = llm_client_config.eject_after_failures,
+        eject_duration: float = llm_client_config.eject_duration,
+        hedge_enabled: bool = llm_client_config.hedge_enabled,
+        hedge_percentile: float = llm_client_config.hedge_percentile,
+        hedge_min_delay: float = llm_client_config.hedge_min_delay,
+        hedge_min_samples: int = llm_client_config.hedge_min_samples,
+    ):
+        if not endpoints:
+            raise ValueError("LLMRouter needs at least one endpoint")
+        self.base_url = endpoints[0]
+        self.replicas = [Replica(url, httpx.HTTPTransport(limits=limits)) for url in endpoints]
+        self.ewma_alpha = ewma_alpha
+        self.eject_after_failures = eject_after_failures
+        self.eject_duration = eject_duration
+        self.hedge_enabled = hedge_enabled and len(self.replicas) > 1
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=512)
+        self._executor = ThreadPoolExecutor(max_workers=2 * limits.max_connections, thread_name_prefix="llm-hedge") if self.hedge_enabled else None
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def _pick(self, exclude: Set[Replica] = frozenset()) -> Optional[Replica]:
+        now = time.monotonic()
+        with self._lock:
+            candidates = [r for r in self.replicas if r not in exclude and r.available(now)]
+            if not candidates:
+                if exclude:
+                    return None
+                # Everything is ejected: try the replica that comes back first rather than failing outright.
+                candidates = [min(self.replicas, key=lambda r: r.ejected_until)]
+            best = min(r.score() for r in candidates)
+            replica = random.choice([r for r in candidates if r.score() == best])
+            replica.in_flight += 1
+            replica.requests += 1
+            return replica
+
+    def _release(self, replica: Replica):
+        with self._lock:
+            replica.in_flight -= 1
+
+    def _record_success(self, replica: Replica, latency: float):
+        with self._lock:
+            replica.consecutive_failures = 0
+            if replica.ewma_latency is None:
+                replica.ewma_latency = latency
+            else:
+                replica.ewma_latency += self.ewma_alpha * (latency - replica.ewma_latency)
+            self._latencies.append(latency)
+
+    def _record_failure(self, replica: Replica, reason: str):
+        with self._lock:
+            replica.failures += 1
+            replica.consecutive_failures += 1
+            if replica.consecutive_failures >= self.eject_after_failures and replica.available(time.monotonic()):
+                replica.ejected_until = time.monotonic() + self.eject_duration
+                replica.ejections += 1
+                logger.warning(f"Ejecting LLM replica {replica.base_url} for {self.eject_duration}s after {replica.consecutive_failures} failures ({reason})")
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait for a response body before hedging, or None while there is too little latency data."""
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            samples = sorted(self._latencies)
+        index = min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))
+        return max(self.hedge_min_delay, samples[index])
+
+    def _retarget(self, request: httpx.Request, replica: Replica) -> httpx.Request:
+        url = str(request.url)
+        if url.startswith(self.base_url):
+            url = replica.base_url + url[len(self.base_url):]
+        # Drop the Host header of the original target so the replica's own host is sent.
+        headers = [(name, value) for name, value in request.headers.raw if name.lower() != b"host"]
+        return httpx.Request(request.method, url, headers=headers, content=request.content, extensions=request.extensions)
+
+    def _send(self, replica: Replica, request: httpx.Request) -> httpx.Response:
+        start = time.monotonic()
+        response = None
+        try:
+            response = replica.transport.handle_request(self._retarget(request, replica))
+            # Wait for the first body chunk, not just the headers a streaming server sends at once.
+            chunks = iter(response.stream)
+            head = next(chunks, b"")
+        except Exception as e:
+            if response is not None:
+                response.close()
+            self._release(replica)
+            self._record_failure(replica, type(e).__name__)
+            raise
+        if response.status_code >= 500:
+            self._record_failure(replica, f"HTTP {response.status_code}")
+        else:
+            self._record_success(replica, time.monotonic() - start)
+        response.stream = _TrackedStream(response.stream, chunks, head, lambda: self._release(replica))
+        return response
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()
+        primary = self._pick()
+        delay = self.hedge_delay() if self.hedge_enabled else None
+        if delay is None:
+            return self._send(primary, request)
+
+        first = self._executor.submit(self._send, primary, request)
+        done, _ = wait([first], timeout=delay)
+        secondary = None if done else self._pick(exclude={primary})
+        if secondary is None:
+            return first.result()
+
+        self.hedged += 1
+        second = self._executor.submit(self._send, secondary, request)
+        attempts = [first, second]
+        pending = set(attempts)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((f for f in attempts if f in done and self._succeeded(f)), None)
+            if winner is not None:
+                if winner is second:
+                    self.hedge_wins += 1
+                for loser in attempts:
+                    if loser is not winner:
+                        loser.add_done_callback(self._discard)
+                return winner.result()
+
+        # Both attempts failed: prefer surfacing an HTTP error response over a transport exception.
+        outcome = first if first.exception() is None else second
+        for attempt in attempts:
+            if attempt is not outcome:
+                self._discard(attempt)
+        return outcome.result()
+
+    @staticmethod
+    def _succeeded(future: Future) -> bool:
+        return future.exception() is None and future.result().status_code < 500
+
+    @staticmethod
+    def _discard(future: Future):
+        if future.exception() is None:
+            future.result().close()
+
+    def stats(self) -> Dict[str, dict]:
+        return {
+            "replicas": {replica.base_url: replica.stats() for replica in self.replicas},
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay_ms": round(delay * 1000, 2) if (delay := self.hedge_delay()) is not None else None,
+        }
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        for replica in self.replicas:
+            replica.transport.close()
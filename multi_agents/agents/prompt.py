@@ -0,0 +1,35 @@
+import json
+from textwrap import dedent
+from typing import Any
+
+
+class TaskPrompt:
+    """
+    Task description laid out for the LLM server's prefix cache. CrewAI sends the agent's system
+    prompt, then the task description, then expected_output and the context of earlier tasks, so
+    the description starts with the instructions and output format, identical for every request
+    and joined once per process, and the request data is appended after them. expected_output is
+    a short static line; the full format lives in the cached prefix.
+    """
+
+    def __init__(self, instructions: str, output_format: str, request: str, expected_output: str):
+        """
+        Args:
+            instructions (str): What the task does; must not contain request data.
+            output_format (str): Format of the final answer.
+            request (str): str.format template of the request data, appended last.
+            expected_output (str): Static expected_output of the task.
+        """
+        self.prefix = f"{dedent(instructions).strip()}\n\n{dedent(output_format).strip()}"
+        self.request = dedent(request).strip()
+        self.expected_output = expected_output
+
+    def description(self, **request: Any) -> str:
+        if not self.request:
+            return self.prefix
+        return f"{self.prefix}\n\n{self.request.format(**request)}"
+
+
+def request_json(data: Any) -> str:
+    """Request data rendered deterministically (sorted keys), so identical requests produce identical prompts."""
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, default=str)
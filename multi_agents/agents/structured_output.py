@@ -0,0 +1,115 @@
+import threading
+from loguru import logger
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, Optional, Tuple, Type
+from crewai.tasks.task_output import TaskOutput
+from crewai.utilities.converter import Converter, ConverterError
+
+from multi_agents.config.settings import llm_config, Role
+from multi_agents.cache.completion_cache import get_completion_cache
+from multi_agents.utils.parser import repair_json_object
+
+structured_output_stats = {"outputs": 0, "repaired": 0, "guided": 0, "failed": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str):
+    with _stats_lock:
+        structured_output_stats[key] += 1
+
+
+def structured_output_metrics() -> Dict[str, Any]:
+    """Task outputs seen, how many needed the local repair or a guided conversion call, and how many stayed unparsed."""
+    with _stats_lock:
+        stats = dict(structured_output_stats)
+    outputs = stats["outputs"]
+    stats["conversion_call_rate"] = round(stats["guided"] / outputs, 4) if outputs else None
+    stats["parse_failure_rate"] = round(stats["failed"] / outputs, 4) if outputs else None
+    return stats
+
+
+def repair_model(text: str, model: Type[BaseModel]) -> Optional[BaseModel]:
+    """The answer as `model` after the local repair pass (see repair_json_object), or None."""
+    value = repair_json_object(text)
+    if value is None:
+        return None
+    try:
+        return model.model_validate(value)
+    except ValidationError:
+        return None
+
+
+def json_schema_format(model: Type[BaseModel]) -> Dict[str, Any]:
+    """response_format constraining a completion to the model's JSON schema (guided decoding on vLLM)."""
+    return {"type": "json_schema", "json_schema": {"name": model.__name__, "schema": model.model_json_schema()}}
+
+
+class TaskOutputConverter(Converter):
+    """
+    Converter CrewAI falls back to when a task's answer does not validate against its
+    output_pydantic model. CrewAI's own converter asks the agent's LLM to rewrite the answer,
+    up to max_attempts times; here the answer is first repaired locally (<think> blocks, code
+    fences, trailing commas, Python literals, string booleans and prices, a truncated object).
+    Only an answer that cannot be repaired costs one LLM call, constrained to the model's JSON
+    schema when LLM_GUIDED_DECODING is on, so its result always validates.
+    """
+
+    def to_pydantic(self, current_attempt=1):
+        repaired = repair_model(self.text, self.model)
+        if repaired is not None:
+            _count("repaired")
+            return repaired
+        client = getattr(self.llm, "openai_client", None)
+        if not llm_config.guided_decoding or client is None:
+            return ConverterError(f"Could not repair the answer into {self.model.__name__}")
+        try:
+            converted = self._guided_conversion(client)
+        except Exception as e:
+            logger.warning(f"Guided conversion into {self.model.__name__} failed: {str(e)}")
+            return ConverterError(f"Guided conversion into {self.model.__name__} failed: {str(e)}")
+        _count("guided")
+        return converted
+
+    def to_json(self, current_attempt=1):
+        result = self.to_pydantic(current_attempt)
+        return result if isinstance(result, ConverterError) else result.model_dump()
+
+    def _guided_conversion(self, client) -> BaseModel:
+        # LLMClientRegistry prefixes model names with litellm's 'openai/' provider; the endpoint expects the bare name.
+        model = self.llm.model.removeprefix("openai/")
+        request = {
+            "seed": llm_config.seed,
+            "temperature": 0.0,
+            "model": model,
+            "messages": [
+                {"role": Role.SYSTEM, "content": self.instructions},
+                {"role": Role.USER, "content": self.text},
+            ],
+            "response_format": json_schema_format(self.model),
+        }
+
+        def create_completion():
+            response = client.chat.completions.create(**request)
+            return response.choices[0].message.content
+
+        cache = get_completion_cache()
+        if cache is None:
+            content = create_completion()
+        else:
+            content = cache.complete({**request, "base_url": str(client.base_url)}, create_completion)
+        return self.model.model_validate(repair_json_object(content) or {})
+
+
+def canonical_output(output: TaskOutput) -> Tuple[bool, Any]:
+    """
+    Task guardrail: replaces the raw answer with the validated model's JSON, so later tasks, the
+    result dict and the UI read one clean object instead of the LLM's text around it. An answer
+    that could not be converted is passed on as is rather than re-running the whole task.
+    """
+    _count("outputs")
+    if output.pydantic is None:
+        _count("failed")
+        logger.warning(f"Task output could not be parsed into its model: {output.raw[:200]}")
+        return True, output
+    output.raw = output.pydantic.model_dump_json(exclude_none=True)
+    return True, output
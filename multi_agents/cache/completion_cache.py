@@ -0,0 +1,167 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from loguru import logger
+from typing import Any, Callable, Dict, Optional
+
+from multi_agents.config.settings import cache_config, CacheMode
+
+
+class CacheMiss(Exception):
+    """Raised in replay mode when a completion was never recorded."""
+
+
+class CompletionCache:
+    """
+    Persistent LLM completion cache on SQLite.
+
+    Entries are keyed on a hash of everything that determines a completion (model, messages,
+    sampling parameters, tools). Entries expire after `ttl` seconds and the least recently used
+    ones are evicted once the stored responses exceed `max_bytes`.
+
+    Modes:
+        record: always call the LLM and (re)store the response.
+        replay: only serve stored responses; a miss raises CacheMiss (offline benchmarks, CI).
+        read_through: serve stored responses, call and store on a miss.
+    """
+
+    def __init__(
+        self,
+        path: str = cache_config.llm_cache_path,
+        max_bytes: int = cache_config.llm_cache_max_bytes,
+        ttl: float = cache_config.llm_cache_ttl,
+        mode: CacheMode = cache_config.llm_cache_mode,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.mode = CacheMode(mode)
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expired = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS completions_last_access ON completions(last_access)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        encoded = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, size, created_at FROM completions WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            response, size, created_at = row
+            if now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE completions SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return response
+
+    def put(self, key: str, response: str):
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute("SELECT size FROM completions WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, response, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now),
+            )
+            self._total_bytes += size - (previous[0] if previous else 0)
+            self.stores += 1
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute("SELECT key, size FROM completions ORDER BY last_access LIMIT 64").fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+                if self._total_bytes <= self.max_bytes:
+                    return
+
+    def complete(self, key_parts: Dict[str, Any], call: Callable[[], Any]) -> Any:
+        """Serve a completion according to the cache mode, calling the LLM through `call` when needed."""
+        if self.mode == CacheMode.OFF:
+            return call()
+
+        key = self.make_key(**key_parts)
+        if self.mode in (CacheMode.REPLAY, CacheMode.READ_THROUGH):
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+            if self.mode == CacheMode.REPLAY:
+                raise CacheMiss(f"No recorded completion for key {key[:12]} (model={key_parts.get('model')})")
+
+        response = call()
+        if isinstance(response, str) and response:
+            self.put(key, response)
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        return {
+            "mode": self.mode.value,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expired": self.expired,
+            "entries": entries,
+            "bytes": self._total_bytes,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[CompletionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_completion_cache() -> Optional[CompletionCache]:
+    """Process-wide completion cache, or None when LLM_CACHE_MODE is off."""
+    global _cache
+    if cache_config.llm_cache_mode == CacheMode.OFF:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = CompletionCache()
+                logger.info(f"LLM completion cache enabled: mode={_cache.mode.value}, path={_cache.path}")
+    return _cache
@@ -0,0 +1,138 @@
+import copy
+import json
+import time
+import hashlib
+import threading
+from loguru import logger
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from multi_agents.utils.text import normalize_search_key
+from multi_agents.config.settings import response_cache_config
+
+
+class ResponseCache:
+    """
+    In-memory LRU cache of final pipeline results for non-ordering queries.
+
+    Keys combine the normalized query with the parts of initial_context_data that change the
+    answer. Each entry remembers the catalog version it was computed against; when products
+    change (the version moves on) the entry is discarded on its next lookup.
+    """
+
+    def __init__(
+        self,
+        version_source: Callable[[], int],
+        max_entries: int = response_cache_config.max_entries,
+        ttl: float = response_cache_config.ttl,
+        version_check_interval: float = response_cache_config.version_check_interval,
+        context_keys: Optional[List[str]] = None,
+    ):
+        """
+        Args:
+            version_source (Callable[[], int]): Returns the current catalog version.
+            max_entries (int): Maximum number of cached results.
+            ttl (float): Seconds an entry stays valid regardless of the catalog version.
+            version_check_interval (float): Seconds a fetched catalog version is reused.
+            context_keys (List[str]): initial_context_data keys included in the cache key.
+        """
+        self.version_source = version_source
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version_check_interval = version_check_interval
+        if context_keys is None:
+            context_keys = [key.strip() for key in response_cache_config.context_keys.split(",") if key.strip()]
+        self.context_keys = context_keys
+
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._version_checked_at = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.version_errors = 0
+
+    def make_key(self, customer_input: str, initial_context_data: Optional[dict]) -> str:
+        context = initial_context_data or {}
+        relevant = {key: context.get(key) for key in self.context_keys if context.get(key) is not None}
+        payload = json.dumps([normalize_search_key(customer_input), relevant], sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def catalog_version(self) -> Optional[int]:
+        """Current catalog version, refreshed at most every `version_check_interval` seconds; None if unavailable."""
+        now = time.monotonic()
+        if self._version is not None and now - self._version_checked_at < self.version_check_interval:
+            return self._version
+        try:
+            version = self.version_source()
+        except Exception as e:
+            self.version_errors += 1
+            logger.warning(f"Cannot read catalog version, bypassing response cache: {str(e)}")
+            self._version = None
+            return None
+        self._version, self._version_checked_at = version, now
+        return version
+
+    def get(self, key: str, version: Optional[int]) -> Optional[Dict[str, Any]]:
+        if version is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry["version"] != version or time.monotonic() - entry["stored_at"] > self.ttl:
+                del self._entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry["result"])
+
+    def put(self, key: str, version: Optional[int], result: Dict[str, Any]):
+        if version is None:
+            return
+        with self._lock:
+            self._entries[key] = {"result": copy.deepcopy(result), "version": version, "stored_at": time.monotonic()}
+            self._entries.move_to_end(key)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "version_errors": self.version_errors,
+            "catalog_version": self._version,
+        }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide response cache validated against the MCP catalog version, or None when disabled."""
+    global _cache
+    if not response_cache_config.enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                from multi_agents.mcp.catalog import fetch_catalog_version
+                _cache = ResponseCache(fetch_catalog_version)
+    return _cache
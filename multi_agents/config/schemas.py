@@ -1,5 +1,19 @@
-from typing import Optional
-from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+from multi_agents.utils.parser import as_bool, as_vnd
+
+def _none_as_empty(value):
+    return "" if value is None else value
+
+def _as_stock_status(value):
+    """'in stock', 'In-Stock' -> 'in_stock'."""
+    if isinstance(value, str):
+        return "_".join(value.strip().lower().replace("-", " ").split())
+    return value
+
+def _empty_as_none(value):
+    return None if value == {} else value
 
 class CreateOrderInput(BaseModel):
     order_details: str = Field(..., description="Order details in JSON format.")
@@ -7,4 +21,104 @@ class CreateOrderInput(BaseModel):
 class CheckInventoryInput(BaseModel):
     product: str = Field(..., description="Name of the product (e.g., 'iPhone 15 Pro Max')")
     storage: Optional[str] = Field(None, description="Storage capacity (e.g., '256GB')")
-    color: Optional[str] = Field(None, description="Color of the product (e.g., 'Titan tự nhiên')")
\ No newline at end of file
+    color: Optional[str] = Field(None, description="Color of the product (e.g., 'Titan tự nhiên')")
+
+class ProductRecord(BaseModel):
+    model_config = ConfigDict(extra="allow", coerce_numbers_to_str=True)
+
+    product_id: str = Field(..., min_length=1, description="Unique product identifier")
+    product: str = Field(..., min_length=1, description="Product name (e.g., 'iPhone 15 Pro Max')")
+    storage: str = Field(..., description="Storage capacity (e.g., '256GB')")
+    color: str = Field(..., description="Color of the product (e.g., 'Titan tự nhiên')")
+    price: int = Field(..., ge=0, description="Unit price in VND")
+    quantity: int = Field(..., ge=0, description="Units in stock")
+
+class SearchProductsInput(BaseModel):
+    min_price: Optional[int] = Field(None, description="Minimum price in VND (e.g., 10000000 for 10 triệu)")
+    max_price: Optional[int] = Field(None, description="Maximum price in VND (e.g., 25000000 for 25 triệu)")
+    storage: Optional[str] = Field(None, description="Storage capacity (e.g., '512GB')")
+    color: Optional[str] = Field(None, description="Color (e.g., 'xanh', 'Titan tự nhiên')")
+    brand: Optional[str] = Field(None, description="Brand or product line (e.g., 'Apple', 'Samsung', 'iPhone')")
+    min_stock: Optional[int] = Field(None, description="Minimum units in stock; 1 for products still in stock ('còn hàng')")
+    sort_by: str = Field("price", description="Sort field: 'price', 'quantity' or 'storage'")
+    descending: bool = Field(False, description="Sort from the largest value (e.g., most expensive first)")
+    limit: int = Field(10, description="Number of products to return")
+
+class SimilarProductsInput(BaseModel):
+    product: str = Field(..., description="Name of the out-of-stock product (e.g., 'iPhone 15 Pro Max')")
+    storage: Optional[str] = Field(None, description="Storage capacity (e.g., '256GB')")
+    color: Optional[str] = Field(None, description="Color of the product (e.g., 'Titan tự nhiên')")
+    limit: int = Field(3, description="Number of alternatives to return")
+
+class ReserveOrderInput(BaseModel):
+    product: str = Field(..., description="Name of the product to order (e.g., 'iPhone 15 Pro Max')")
+    storage: Optional[str] = Field(None, description="Storage capacity (e.g., '256GB')")
+    color: Optional[str] = Field(None, description="Color of the product (e.g., 'Titan tự nhiên')")
+    quantity: int = Field(1, description="Number of units to order")
+    customer_name: str = Field(..., description="Customer name from the conversation context")
+    conversation_id: str = Field(..., description="Conversation ID from the conversation context")
+
+class ProductOption(BaseModel):
+    model_config = ConfigDict(extra="allow", coerce_numbers_to_str=True)
+
+    product: str = Field(..., description="Product name")
+    storage: Optional[str] = Field(None, description="Storage capacity")
+    color: Optional[str] = Field(None, description="Color")
+    price: Optional[int] = Field(None, description="Unit price in VND")
+    quantity: Optional[int] = Field(None, description="Units in stock")
+
+    _price = field_validator("price", mode="before")(as_vnd)
+
+class RequestAnalysis(BaseModel):
+    """Output of Task 1 (analysis of the customer request); decides which stages run."""
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    product_details: str = Field("", description="Product the customer asks about (e.g., 'iPhone 13 128GB màu xanh'); empty for greetings and general questions")
+    customer_intent: str = Field(..., description="'check_inventory_price', 'place_order' or 'general_query'")
+    requires_inventory_check: bool = Field(..., description="Whether stock and price must be checked")
+    requires_order_placement: bool = Field(..., description="Whether the customer wants to place an order")
+    original_query: str = Field("", description="The customer's original message")
+    shortlist: Optional[List[ProductOption]] = Field(None, description="Products found with 'Search products'")
+
+    _flags = field_validator("requires_inventory_check", "requires_order_placement", mode="before")(as_bool)
+    _texts = field_validator("product_details", "original_query", mode="before")(_none_as_empty)
+
+class InventoryCheck(BaseModel):
+    """Output of Task 2 (inventory and price check)."""
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    product_name: str = Field("", description="Name of the checked product")
+    color: Optional[str] = Field(None, description="Color of the product")
+    storage: Optional[str] = Field(None, description="Storage capacity of the product")
+    stock_status: Literal["in_stock", "out_of_stock", "low_stock", "not_checked"] = Field(..., description="Stock status")
+    price: Optional[int] = Field(None, description="Unit price in VND, if checked")
+    alternatives: Optional[List[ProductOption]] = Field(None, description="In-stock alternatives from 'Similar products'")
+    message: str = Field("", description="Additional message (e.g., 'Không đủ thông tin để kiểm tra')")
+
+    _price = field_validator("price", mode="before")(as_vnd)
+    _status = field_validator("stock_status", mode="before")(_as_stock_status)
+    _message = field_validator("product_name", "message", mode="before")(_none_as_empty)
+
+class OrderDetails(BaseModel):
+    model_config = ConfigDict(extra="allow", coerce_numbers_to_str=True)
+
+    order_id: str = Field(..., description="Order ID returned by the order tool")
+    product: str = Field(..., description="Ordered product")
+    color: Optional[str] = Field(None, description="Color")
+    storage: Optional[str] = Field(None, description="Storage capacity")
+    quantity: int = Field(1, description="Units ordered")
+    unit_price: Optional[int] = Field(None, description="Unit price in VND")
+    total_price: Optional[int] = Field(None, description="Total price in VND")
+    remaining_stock: Optional[int] = Field(None, description="Units left in stock after the order")
+
+    _prices = field_validator("unit_price", "total_price", mode="before")(as_vnd)
+
+class OrderResult(BaseModel):
+    """Output of Task 3 (order placement)."""
+    order_created: bool = Field(..., description="Whether the order was created")
+    order_details: Optional[OrderDetails] = Field(None, description="Order returned by the order tool, if created")
+    message: str = Field("", description="Order status message")
+
+    _created = field_validator("order_created", mode="before")(as_bool)
+    _details = field_validator("order_details", mode="before")(_empty_as_none)
+    _message = field_validator("message", mode="before")(_none_as_empty)
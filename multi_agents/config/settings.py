@@ -1,4 +1,5 @@
 from enum import Enum
+from typing import Optional
 from dotenv import load_dotenv
 from pydantic import Field
 from pydantic_settings import BaseSettings
@@ -7,7 +8,7 @@ load_dotenv()
 
 class APIConfig(BaseSettings):
     base_url_llm: str = Field(
-        description="Base URL for OpenAI API",
+        description="Base URL for OpenAI API; a comma-separated list load-balances across replicas",
         alias="API_URL_LLM",
     )
     api_key: str = Field(
@@ -19,6 +20,11 @@ class APIConfig(BaseSettings):
         description="Large Language model name to be used (e.g., GPT-4)",
         alias="LLM_MODEL",
     )
+    stream: bool = Field(
+        default=True,
+        description="Stream completions from the LLM endpoint so answers can be forwarded token by token",
+        alias="LLM_STREAM",
+    )
 
 class LLMConfig(BaseSettings):
     gemini_api_key: str = Field(
@@ -47,6 +53,108 @@ class LLMConfig(BaseSettings):
         description="Nucleus sampling parameter; higher values increase randomness",
     )
     seed: int = Field(default=42, alias="SEED", description="Random seed for sampling")
+    guided_decoding: bool = Field(
+        default=True,
+        description="Convert unparseable task outputs with a response_format json_schema request (vLLM, OpenAI); off for endpoints without structured outputs",
+        alias="LLM_GUIDED_DECODING",
+    )
+
+
+class LLMClientConfig(BaseSettings):
+    max_connections: int = Field(
+        default=32,
+        description="Maximum number of open HTTP connections per LLM endpoint",
+        alias="LLM_MAX_CONNECTIONS",
+    )
+    max_keepalive_connections: int = Field(
+        default=16,
+        description="Maximum number of idle keep-alive connections kept per LLM endpoint",
+        alias="LLM_MAX_KEEPALIVE_CONNECTIONS",
+    )
+    keepalive_expiry: float = Field(
+        default=60.0,
+        description="Seconds an idle keep-alive connection is kept open",
+        alias="LLM_KEEPALIVE_EXPIRY",
+    )
+    connect_timeout: float = Field(
+        default=5.0,
+        description="Timeout in seconds for opening a connection to an LLM endpoint",
+        alias="LLM_CONNECT_TIMEOUT",
+    )
+    read_timeout: float = Field(
+        default=120.0,
+        description="Timeout in seconds for reading an LLM response (between streamed chunks when streaming)",
+        alias="LLM_READ_TIMEOUT",
+    )
+    ewma_alpha: float = Field(
+        default=0.3,
+        description="Weight of the newest sample in each replica's moving-average latency",
+        alias="LLM_EWMA_ALPHA",
+    )
+    eject_after_failures: int = Field(
+        default=3,
+        description="Consecutive failures (connection errors, timeouts, 5xx) before a replica is ejected",
+        alias="LLM_EJECT_AFTER_FAILURES",
+    )
+    eject_duration: float = Field(
+        default=30.0,
+        description="Seconds an ejected replica is skipped before it is tried again",
+        alias="LLM_EJECT_DURATION",
+    )
+    hedge_enabled: bool = Field(
+        default=True,
+        description="Send a duplicate request to a second replica when the first one is slower than usual",
+        alias="LLM_HEDGE_ENABLED",
+    )
+    hedge_percentile: float = Field(
+        default=95.0,
+        description="Latency percentile after which a hedged request is sent",
+        alias="LLM_HEDGE_PERCENTILE",
+    )
+    hedge_min_delay: float = Field(
+        default=0.25,
+        description="Lower bound in seconds for the hedge delay",
+        alias="LLM_HEDGE_MIN_DELAY",
+    )
+    hedge_min_samples: int = Field(
+        default=20,
+        description="Latency samples required before hedging starts",
+        alias="LLM_HEDGE_MIN_SAMPLES",
+    )
+
+
+class AgentRole(str, Enum):
+    CONSULTANT = "consultant"
+    INVENTORY = "inventory"
+    ORDER = "order"
+
+
+class AgentModelConfig(BaseSettings):
+    """Per-role model and endpoint. Unset values fall back to API_URL_LLM, API_KEY and LLM_MODEL."""
+
+    consultant_model: Optional[str] = Field(default=None, description="Model used by the consultant agent", alias="CONSULTANT_LLM_MODEL")
+    consultant_base_url: Optional[str] = Field(default=None, description="Endpoint(s) used by the consultant agent, comma-separated for replicas", alias="CONSULTANT_LLM_URL")
+    consultant_api_key: Optional[str] = Field(default=None, description="API key for the consultant endpoint", alias="CONSULTANT_LLM_API_KEY")
+    consultant_temperature: float = Field(default=0.5, description="Sampling temperature of the consultant agent", alias="CONSULTANT_LLM_TEMPERATURE")
+
+    inventory_model: Optional[str] = Field(default=None, description="Model used by the inventory agent", alias="INVENTORY_LLM_MODEL")
+    inventory_base_url: Optional[str] = Field(default=None, description="Endpoint(s) used by the inventory agent, comma-separated for replicas", alias="INVENTORY_LLM_URL")
+    inventory_api_key: Optional[str] = Field(default=None, description="API key for the inventory endpoint", alias="INVENTORY_LLM_API_KEY")
+    inventory_temperature: float = Field(default=0.5, description="Sampling temperature of the inventory agent", alias="INVENTORY_LLM_TEMPERATURE")
+
+    order_model: Optional[str] = Field(default=None, description="Model used by the order agent", alias="ORDER_LLM_MODEL")
+    order_base_url: Optional[str] = Field(default=None, description="Endpoint(s) used by the order agent, comma-separated for replicas", alias="ORDER_LLM_URL")
+    order_api_key: Optional[str] = Field(default=None, description="API key for the order endpoint", alias="ORDER_LLM_API_KEY")
+    order_temperature: float = Field(default=0.5, description="Sampling temperature of the order agent", alias="ORDER_LLM_TEMPERATURE")
+
+    def for_role(self, role: AgentRole) -> dict:
+        role = AgentRole(role).value
+        return {
+            "model": getattr(self, f"{role}_model") or api_config.llm_model,
+            "base_url": getattr(self, f"{role}_base_url") or api_config.base_url_llm,
+            "api_key": getattr(self, f"{role}_api_key") or api_config.api_key,
+            "temperature": getattr(self, f"{role}_temperature"),
+        }
 
 
 class MCPConfig(BaseSettings):
@@ -55,7 +163,266 @@ class MCPConfig(BaseSettings):
         description="Base URL for MCP API",
         alias="MCP_SERVER_BASE_URL",
     )
+    pool_size: int = Field(
+        default=4,
+        description="Number of long-lived MCP client sessions kept in the pool",
+        alias="MCP_POOL_SIZE",
+    )
+    connect_timeout: float = Field(
+        default=5.0,
+        description="Timeout in seconds for opening and initializing an MCP session",
+        alias="MCP_CONNECT_TIMEOUT",
+    )
+    call_timeout: float = Field(
+        default=30.0,
+        description="Timeout in seconds for a single MCP tool call",
+        alias="MCP_CALL_TIMEOUT",
+    )
+    health_check_interval: float = Field(
+        default=30.0,
+        description="Interval in seconds between pings of pooled MCP sessions",
+        alias="MCP_HEALTH_CHECK_INTERVAL",
+    )
+    coalesce_window: float = Field(
+        default=0.005,
+        description="Seconds concurrent product lookups are gathered into one get_products_bulk call",
+        alias="MCP_COALESCE_WINDOW",
+    )
+    coalesce_max_batch: int = Field(
+        default=32,
+        description="Maximum lookups per coalesced get_products_bulk call",
+        alias="MCP_COALESCE_MAX_BATCH",
+    )
+    resolve_min_score: float = Field(
+        default=0.6,
+        description="Minimum resolve_product score for GetDetailTool to retry a missed lookup with the resolved product",
+        alias="MCP_RESOLVE_MIN_SCORE",
+    )
+
+
+class MCPServerConfig(BaseSettings):
+    product_tool_concurrency: int = Field(
+        default=32,
+        description="Maximum concurrent product lookups served by the MCP server",
+        alias="MCP_SERVER_PRODUCT_CONCURRENCY",
+    )
+    order_tool_concurrency: int = Field(
+        default=8,
+        description="Maximum concurrent order reads/writes served by the MCP server",
+        alias="MCP_SERVER_ORDER_CONCURRENCY",
+    )
+    tool_timeout: float = Field(
+        default=10.0,
+        description="Seconds an MCP server tool call may take, including the wait for a concurrency slot",
+        alias="MCP_SERVER_TOOL_TIMEOUT",
+    )
+    bulk_max_lookups: int = Field(
+        default=64,
+        description="Maximum lookups accepted by one get_products_bulk call",
+        alias="MCP_SERVER_BULK_MAX_LOOKUPS",
+    )
+    search_max_results: int = Field(
+        default=50,
+        description="Maximum products returned by one search_products or similar_products call",
+        alias="MCP_SERVER_SEARCH_MAX_RESULTS",
+    )
+
+
+class CatalogSnapshotConfig(BaseSettings):
+    enabled: bool = Field(
+        default=True,
+        description="Serve product lookups in the MCP server from an in-memory snapshot of the catalog",
+        alias="CATALOG_SNAPSHOT_ENABLED",
+    )
+    max_staleness: float = Field(
+        default=5.0,
+        description="Seconds since the snapshot was last confirmed current after which lookups go to MongoDB",
+        alias="CATALOG_SNAPSHOT_MAX_STALENESS",
+    )
+    poll_interval: float = Field(
+        default=1.0,
+        description="Seconds between catalog version checks when change streams are unavailable (standalone mongod)",
+        alias="CATALOG_SNAPSHOT_POLL_INTERVAL",
+    )
+    poll_overlap: float = Field(
+        default=60.0,
+        description="Seconds of updated_at overlap re-read on each poll, covering clock skew between writers",
+        alias="CATALOG_SNAPSHOT_POLL_OVERLAP",
+    )
+    full_refresh_interval: float = Field(
+        default=600.0,
+        description="Seconds between full reloads of the snapshot in polling mode",
+        alias="CATALOG_SNAPSHOT_FULL_REFRESH_INTERVAL",
+    )
+
+
+class PipelineEngine(str, Enum):
+    CREWAI = "crewai"
+    FUNCTION_CALLING = "function_calling"
+
+
+class PipelineConfig(BaseSettings):
+    engine: PipelineEngine = Field(
+        default=PipelineEngine.CREWAI,
+        description="Engine answering requests: the CrewAI task pipeline or one native function-calling agent loop",
+        alias="PIPELINE_ENGINE",
+    )
+    max_concurrent_runs: int = Field(
+        default=4,
+        description="Maximum number of pipeline runs executing at the same time",
+        alias="PIPELINE_MAX_CONCURRENT_RUNS",
+    )
+    max_queue_size: int = Field(
+        default=16,
+        description="Maximum number of runs waiting for a free slot before requests are rejected",
+        alias="PIPELINE_MAX_QUEUE_SIZE",
+    )
+    queue_timeout: float = Field(
+        default=30.0,
+        description="Seconds a run may wait for a free slot before it is rejected",
+        alias="PIPELINE_QUEUE_TIMEOUT",
+    )
+    stream_buffer_size: int = Field(
+        default=64,
+        description="Events buffered per streaming run before the run is paused for a slow client",
+        alias="PIPELINE_STREAM_BUFFER_SIZE",
+    )
+    intent_fast_path: bool = Field(
+        default=True,
+        description="Answer Task 1 with the rule-based intent classifier when it is confident enough",
+        alias="PIPELINE_INTENT_FAST_PATH",
+    )
+    intent_min_confidence: float = Field(
+        default=0.85,
+        description="Classifier confidence from which the LLM analysis task is skipped",
+        alias="PIPELINE_INTENT_MIN_CONFIDENCE",
+    )
+    speculative_inventory: bool = Field(
+        default=True,
+        description="Look up the product guessed from the customer message while the LLM runs Task 1",
+        alias="PIPELINE_SPECULATIVE_INVENTORY",
+    )
+    speculative_wait: float = Field(
+        default=2.0,
+        description="Seconds to wait after Task 1 for an unfinished speculative lookup before Task 2 looks up itself",
+        alias="PIPELINE_SPECULATIVE_WAIT",
+    )
+    function_calling_max_turns: int = Field(
+        default=4,
+        description="Turns with tool calls the function-calling engine may take before it must answer",
+        alias="PIPELINE_FUNCTION_CALLING_MAX_TURNS",
+    )
+
+
+class CacheMode(str, Enum):
+    OFF = "off"
+    RECORD = "record"
+    REPLAY = "replay"
+    READ_THROUGH = "read_through"
+
+
+class CacheConfig(BaseSettings):
+    llm_cache_mode: CacheMode = Field(
+        default=CacheMode.OFF,
+        description="LLM completion cache mode: off, record (always call, store), replay (cache only) or read_through",
+        alias="LLM_CACHE_MODE",
+    )
+    llm_cache_path: str = Field(
+        default=".cache/llm_completions.sqlite",
+        description="SQLite file backing the LLM completion cache",
+        alias="LLM_CACHE_PATH",
+    )
+    llm_cache_max_bytes: int = Field(
+        default=256 * 1024 * 1024,
+        description="Maximum total size of cached completions before least-recently-used entries are evicted",
+        alias="LLM_CACHE_MAX_BYTES",
+    )
+    llm_cache_ttl: float = Field(
+        default=7 * 24 * 3600,
+        description="Seconds a cached completion stays valid",
+        alias="LLM_CACHE_TTL",
+    )
+
 
+class ResponseCacheConfig(BaseSettings):
+    enabled: bool = Field(
+        default=True,
+        description="Serve repeated non-ordering queries from the final-answer cache",
+        alias="RESPONSE_CACHE_ENABLED",
+    )
+    max_entries: int = Field(
+        default=1024,
+        description="Maximum number of cached answers before least-recently-used ones are evicted",
+        alias="RESPONSE_CACHE_MAX_ENTRIES",
+    )
+    ttl: float = Field(
+        default=600.0,
+        description="Seconds a cached answer stays valid even if the catalog does not change",
+        alias="RESPONSE_CACHE_TTL",
+    )
+    version_check_interval: float = Field(
+        default=1.0,
+        description="Seconds the catalog version is reused before it is fetched again",
+        alias="RESPONSE_CACHE_VERSION_CHECK_INTERVAL",
+    )
+    context_keys: str = Field(
+        default="customer_name,previous_interactions",
+        description="Comma-separated initial_context_data keys that change the answer and are part of the cache key",
+        alias="RESPONSE_CACHE_CONTEXT_KEYS",
+    )
+
+
+class OrderConfig(BaseSettings):
+    orders_dir: str = Field(
+        default="orders",
+        description="Directory holding one JSON file per order",
+        alias="ORDERS_DIR",
+    )
+    backend: str = Field(
+        default="log",
+        description="Order storage engine: 'log' (append-only segment log) or 'file' (one JSON file per order)",
+        alias="ORDER_BACKEND",
+    )
+    log_dir: str = Field(
+        default="orders/log",
+        description="Directory holding the order log segments",
+        alias="ORDER_LOG_DIR",
+    )
+    segment_max_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        description="Size at which the active order log segment is sealed and a new one started",
+        alias="ORDER_SEGMENT_MAX_BYTES",
+    )
+    group_commit_window: float = Field(
+        default=0.0002,
+        description="Seconds the log waits to gather concurrent order writes into one fsync (writes arriving during an fsync always share the next one)",
+        alias="ORDER_GROUP_COMMIT_WINDOW",
+    )
+    fsync: bool = Field(
+        default=True,
+        description="fsync the order log before acknowledging writes",
+        alias="ORDER_FSYNC",
+    )
+    index_path: str = Field(
+        default="orders/.index.sqlite",
+        description="SQLite file indexing orders by order_id, conversation_id and customer name",
+        alias="ORDER_INDEX_PATH",
+    )
+    list_limit: int = Field(
+        default=50,
+        description="Maximum number of orders returned by the list tools",
+        alias="ORDER_LIST_LIMIT",
+    )
+    reservation_ttl: float = Field(
+        default=300.0,
+        description="Seconds after which a stock hold whose order was never confirmed saved is resolved by the reservation sweep",
+        alias="ORDER_RESERVATION_TTL",
+    )
+    reservation_sweep_interval: float = Field(
+        default=30.0,
+        description="Minimum seconds between sweeps for expired stock holds, run by reserve_and_create_order",
+        alias="ORDER_RESERVATION_SWEEP_INTERVAL",
+    )
 
 class MongodbConfig(BaseSettings):
     mongo_uri: str = Field(
@@ -66,6 +433,18 @@ class MongodbConfig(BaseSettings):
         default="inventory",
         description="Database name for MongoDB",
     )
+    mongo_max_pool_size: int = Field(
+        default=50,
+        description="Maximum number of pooled connections of the async MongoDB client",
+    )
+    mongo_min_pool_size: int = Field(
+        default=2,
+        description="Connections the async MongoDB client keeps open when idle",
+    )
+    mongo_timeout_ms: int = Field(
+        default=5000,
+        description="Client-side time limit in milliseconds for each async MongoDB operation",
+    )
 
 
 class Role(str, Enum):
@@ -76,5 +455,13 @@ class Role(str, Enum):
 
 api_config = APIConfig()
 llm_config = LLMConfig()
+llm_client_config = LLMClientConfig()
+agent_model_config = AgentModelConfig()
 mcp_config = MCPConfig()
+mcp_server_config = MCPServerConfig()
+catalog_snapshot_config = CatalogSnapshotConfig()
+pipeline_config = PipelineConfig()
+cache_config = CacheConfig()
+response_cache_config = ResponseCacheConfig()
+order_config = OrderConfig()
 db_config = MongodbConfig()
@@ -0,0 +1,436 @@
+import re
+import numpy as np
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from multi_agents.db.connector import public_product
+from multi_agents.utils.text import normalize_search_key
+from multi_agents.db.resolver import COLOR_ALIASES, STOPWORDS, TOKEN_ALIASES
+
+# Product lines that do not start with the brand name, on normalized tokens.
+BRAND_ALIASES = {
+    "iphone": "apple",
+    "ipad": "apple",
+    "macbook": "apple",
+    "imac": "apple",
+    "airpods": "apple",
+    "galaxy": "samsung",
+    "redmi": "xiaomi",
+    "poco": "xiaomi",
+    "pixel": "google",
+}
+SORT_FIELDS = ("price", "quantity", "storage")
+COLUMNS = SORT_FIELDS + ("brand", "color", "family")
+# Result sets up to 1/SPARSE_RATIO of the catalog are sorted directly; larger ones are read off a presorted order.
+SPARSE_RATIO = 256
+# Price and stock updates a presorted order tolerates before it is rebuilt, as a fraction of the catalog.
+RESORT_RATIO = 0.01
+_STORAGE = re.compile(r"(\d+) ?(gb|g|tb|t)?\b")
+# Tier words left out of the model family, so 'iPhone 15 Pro Max' and 'iPhone 15' are one family.
+TIER_WORDS = {"pro", "max", "promax", "plus", "ultra", "mini", "lite", "fe"}
+
+# Distance between SKUs for similar(): brand, family and color mismatches, plus price (per unit of
+# ln price, 0.36 for 20% apart) and storage (per doubling) differences.
+WEIGHT_BRAND = 1.0
+WEIGHT_FAMILY = 1.0
+WEIGHT_COLOR = 0.2
+WEIGHT_PRICE = 2.0
+WEIGHT_STORAGE = 0.3
+# Other brands are first looked for within this ln price distance (x1.5 either way).
+SIMILAR_PRICE_BAND = float(np.log(1.5))
+
+
+def brand_of(text: Optional[str]) -> str:
+    """'Samsung Galaxy S23' -> 'samsung', 'iPhone 15' and 'Apple' -> 'apple', 'ss' -> 'samsung'."""
+    tokens = [token for token in " ".join(TOKEN_ALIASES.get(token, token) for token in normalize_search_key(text).split()).split()
+              if token not in STOPWORDS]
+    return BRAND_ALIASES.get(tokens[0], tokens[0]) if tokens else ""
+
+
+def storage_gb(storage: Optional[str]) -> Optional[int]:
+    """'256GB' -> 256, '1TB' -> 1024, a bare '512' -> 512; None if there is no number."""
+    match = _STORAGE.search(normalize_search_key(storage))
+    if not match:
+        return None
+    number, unit = match.groups()
+    return int(number) * (1024 if unit in ("tb", "t") else 1)
+
+
+def family_of(key: str) -> str:
+    """Model family of a normalized product key: 'samsung galaxy s 23 ultra' -> 'samsung galaxy s 23'."""
+    family = []
+    for token in key.split():
+        if token in TIER_WORDS or token in STOPWORDS:
+            continue
+        family.append(token)
+        if token.isdigit():
+            break
+    return " ".join(family)
+
+
+def _features(price: np.ndarray, storage: np.ndarray) -> np.ndarray:
+    """Feature vectors of SKUs for similar(): ln price and log2 storage in GB."""
+    return np.column_stack([np.log(np.maximum(price, 1)), np.log2(np.maximum(storage, 1))]).astype(np.float32)
+
+
+def _dtype_for(low: int, high: int):
+    """Smallest integer dtype holding [low, high]: comparisons over 1M int8 take a quarter of int32."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _clamp(value: int, dtype):
+    """`value` limited to the range of `dtype`, as a scalar of that dtype so NumPy does not upcast the array."""
+    info = np.iinfo(dtype)
+    return np.dtype(dtype).type(min(max(value, info.min), info.max))
+
+
+def _color_tokens(color: Optional[str]) -> set:
+    tokens = set()
+    for token in normalize_search_key(color).split():
+        tokens.add(token)
+        tokens.update(COLOR_ALIASES.get(token, "").split())
+    return tokens
+
+
+class ColumnarCatalog:
+    """
+    Column-oriented copy of the catalog for structured search: price, stock and storage (in GB)
+    as NumPy integer arrays in the narrowest dtype that fits, brand and color as category codes,
+    one row per SKU. A search combines vectorized masks over the columns; the top rows of a large
+    result are read off a presorted order of the sort column, stopping after `limit` matches, so
+    no search sorts or partitions the whole catalog.
+
+    The same rows carry the model family code and a feature vector (ln price, log2 storage) used
+    by similar() to find the nearest in-stock alternatives of a SKU.
+
+    SKUs are added, changed and removed in place. Rows changed since an order was sorted are set
+    aside from it and compared on their current values in every search until enough accumulate
+    to re-sort; removed rows stay behind as tombstones until the catalog is rebuilt.
+    """
+
+    def __init__(self, products: Iterable[Dict[str, Any]] = ()):
+        """
+        Args:
+            products (Iterable[Dict]): Product documents, either from MongoDB or the catalog snapshot.
+                They are kept by reference and only copied for the rows a search returns.
+        """
+        self._documents: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._live = np.zeros(0, dtype=bool)
+        self.removed = 0
+        for field in COLUMNS:
+            setattr(self, field, np.zeros(0, dtype=np.int8))
+
+        # Category codes index these lists; the dicts memoize the conversion of document values.
+        self.brands: List[str] = []
+        self.colors: List[str] = []
+        self.families: List[str] = []
+        self._brand_codes: Dict[str, int] = {}
+        self._color_codes: Dict[str, int] = {}
+        self._family_codes: Dict[str, int] = {}
+        self._name_families: Dict[str, int] = {}
+        self._color_tokens: List[set] = []
+        self._word_brands: Dict[str, str] = {}
+        self._name_brands: Dict[str, str] = {}
+        self._storages: Dict[str, int] = {}
+        self.features = np.zeros((0, 2), dtype=np.float32)
+
+        # Row ids sorted by each sort field and the sorted values, built on first use; `_moved` holds rows changed since.
+        self._orders: Dict[str, np.ndarray] = {}
+        self._sorted: Dict[str, np.ndarray] = {}
+        self._moved: Dict[str, Set[int]] = {field: set() for field in SORT_FIELDS}
+
+        self.upsert(products)
+
+    @staticmethod
+    def _id(document: Dict[str, Any]) -> str:
+        return str(document.get("_id") or document.get("product_id"))
+
+    @staticmethod
+    def _code(values: List[str], codes: Dict[str, int], value: str) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def _brand(self, name: str) -> str:
+        # Names of one product line share their first word, so the brand is normally resolved once per word.
+        first = name.split(maxsplit=1)[0] if name.strip() else ""
+        brand = self._word_brands.get(first)
+        if brand is None:
+            brand = self._word_brands[first] = brand_of(first)
+        if not brand:
+            # Starts with a filler word ("Điện thoại iPhone 15").
+            brand = self._name_brands.get(name)
+            if brand is None:
+                brand = self._name_brands[name] = brand_of(name)
+        return brand
+
+    def _storage_gb(self, storage: str) -> int:
+        gb = self._storages.get(storage)
+        if gb is None:
+            gb = self._storages[storage] = storage_gb(storage) or -1
+        return gb
+
+    def _family(self, document: Dict[str, Any]) -> int:
+        name = str(document.get("product") or "")
+        code = self._name_families.get(name)
+        if code is None:
+            # Snapshot documents carry the normalized name; MongoDB results are normalized here.
+            key = (document.get("search") or {}).get("product") or normalize_search_key(name)
+            code = self._name_families[name] = self._code(self.families, self._family_codes, family_of(key))
+        return code
+
+    def _values(self, document: Dict[str, Any]) -> Tuple[int, ...]:
+        """Column values of a document, in COLUMNS order."""
+        return (
+            int(document.get("price") or 0),
+            int(document.get("quantity") or 0),
+            self._storage_gb(str(document.get("storage") or "")),
+            self._code(self.brands, self._brand_codes, self._brand(str(document.get("product") or ""))),
+            self._code(self.colors, self._color_codes, str(document.get("color") or "")),
+            self._family(document),
+        )
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def upsert(self, documents: Iterable[Dict[str, Any]]):
+        """Add new SKUs and apply the current values of known ones."""
+        appended: List[Dict[str, Any]] = []
+        for document in documents:
+            product_id = self._id(document)
+            row = self._rows.get(product_id)
+            if row is None:
+                self._rows[product_id] = len(self._documents) + len(appended)
+                appended.append(document)
+            elif row >= len(self._documents):
+                appended[row - len(self._documents)] = document
+            else:
+                self._documents[row] = document
+                for field, value in zip(COLUMNS, self._values(document)):
+                    self._assign(field, row, value)
+        if appended:
+            self._append(appended)
+
+    def _append(self, documents: List[Dict[str, Any]]):
+        start = len(self._documents)
+        values = np.array([self._values(document) for document in documents], dtype=np.int64)
+        for index, field in enumerate(COLUMNS):
+            column, added = getattr(self, field), values[:, index]
+            dtype = np.promote_types(column.dtype, _dtype_for(int(added.min()), int(added.max())))
+            setattr(self, field, np.concatenate([column.astype(dtype, copy=False), added.astype(dtype)]))
+        self._live = np.concatenate([self._live, np.ones(len(documents), dtype=bool)])
+        self.features = np.concatenate([self.features, _features(values[:, 0], values[:, 2])])
+        self._documents.extend(documents)
+        for field in self._orders:
+            self._moved[field].update(range(start, len(self._documents)))
+
+    def _assign(self, field: str, row: int, value: int):
+        column = getattr(self, field)
+        if column[row] == value:
+            return
+        if _clamp(value, column.dtype) != value:
+            column = column.astype(np.promote_types(column.dtype, _dtype_for(value, value)))
+            setattr(self, field, column)
+        column[row] = value
+        if field in ("price", "storage"):
+            self.features[row] = _features(self.price[row:row + 1], self.storage[row:row + 1])
+        if field in self._orders:
+            self._moved[field].add(row)
+
+    def remove(self, product_ids: Iterable[str]):
+        """Drop SKUs from search results; their rows stay as tombstones."""
+        for product_id in product_ids:
+            row = self._rows.pop(str(product_id), None)
+            if row is not None:
+                self._live[row] = False
+                self._documents[row] = None
+                self.removed += 1
+
+    def _order(self, field: str) -> np.ndarray:
+        order = self._orders.get(field)
+        if order is None or len(self._moved[field]) > RESORT_RATIO * len(self._documents):
+            column = getattr(self, field)
+            order = self._orders[field] = np.argsort(column, kind="stable")
+            self._sorted[field] = column[order]
+            self._moved[field].clear()
+        return order
+
+    def _matching_colors(self, color: str) -> List[int]:
+        """Colors containing every word of `color`, each word also matching its English/Vietnamese alias."""
+        self._color_tokens.extend(_color_tokens(name) for name in self.colors[len(self._color_tokens):])
+        wanted = [{token} | set(COLOR_ALIASES.get(token, "").split()) for token in normalize_search_key(color).split()]
+        return [code for code, tokens in enumerate(self._color_tokens) if all(options & tokens for options in wanted)]
+
+    def _mask(self, min_price, max_price, storage_gb, color, brand, min_stock) -> Optional[np.ndarray]:
+        """Rows matching every given filter; None when there is no filter and no removed row."""
+        mask = self._live.copy() if self.removed else None
+
+        def narrow(condition: np.ndarray):
+            nonlocal mask
+            mask = condition if mask is None else np.logical_and(mask, condition, out=mask)
+
+        if brand:
+            code = self._brand_codes.get(brand_of(brand))
+            narrow(self.brand == code if code is not None else np.zeros(len(self._documents), dtype=bool))
+        if color:
+            codes = self._matching_colors(color)
+            if len(codes) > 4:
+                table = np.zeros(len(self.colors), dtype=bool)
+                table[codes] = True
+                narrow(table[self.color])
+            else:
+                matches = np.zeros(len(self._documents), dtype=bool)
+                for code in codes:
+                    np.logical_or(matches, self.color == code, out=matches)
+                narrow(matches)
+        if storage_gb is not None:
+            narrow(self.storage == storage_gb)
+        if min_price is not None:
+            narrow(self.price >= min_price)
+        if max_price is not None:
+            narrow(self.price <= max_price)
+        if min_stock is not None:
+            narrow(self.quantity >= min_stock)
+        return mask
+
+    def _top(self, mask: Optional[np.ndarray], total: int, sort_by: str, bounds: Tuple[Optional[int], Optional[int]],
+             descending: bool, limit: int) -> np.ndarray:
+        """Rows of the first `limit` matches by (sort_by, row), reversed when descending."""
+        column = getattr(self, sort_by)
+        if total <= max(limit, len(self._documents) // SPARSE_RATIO):
+            candidates = np.flatnonzero(mask) if mask is not None else np.arange(len(self._documents))
+        else:
+            order = self._order(sort_by)
+            # Rows outside the filter range of the sort field cannot match; unchanged rows are where the sort left them.
+            low, high = bounds
+            keys = self._sorted[sort_by]
+            start = np.searchsorted(keys, _clamp(low, keys.dtype), "left") if low is not None else 0
+            stop = np.searchsorted(keys, _clamp(high, keys.dtype), "right") if high is not None else len(order)
+            order = order[start:stop][::-1] if descending else order[start:stop]
+            moved = np.fromiter(self._moved[sort_by], dtype=np.int64, count=len(self._moved[sort_by]))
+            # Expected to hold `limit` matches when matches are spread evenly over the order.
+            step = max(1024, 2 * limit * len(order) // total)
+            hits, found, position = [], 0, 0
+            while found < limit and position < len(order):
+                chunk = order[position:position + step]
+                chunk = chunk[mask[chunk]] if mask is not None else chunk
+                if len(moved):
+                    chunk = chunk[~np.isin(chunk, moved)]
+                hits.append(chunk)
+                found += len(chunk)
+                position += step
+                step *= 2
+            # Changed rows sit at stale positions in the order: compare them on their current values.
+            candidates = np.concatenate(hits + [moved[mask[moved]] if mask is not None else moved])
+        ranked = np.lexsort((candidates, column[candidates]))
+        if descending:
+            ranked = ranked[::-1]
+        return candidates[ranked[:limit]]
+
+    def search(
+        self,
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        storage: Optional[str] = None,
+        color: Optional[str] = None,
+        brand: Optional[str] = None,
+        min_stock: Optional[int] = None,
+        sort_by: str = "price",
+        descending: bool = False,
+        limit: int = 10,
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Filter the catalog and return the top `limit` SKUs by `sort_by`.
+
+        Args:
+            min_price, max_price (int): Inclusive price range in VND.
+            storage (str): Storage capacity, e.g. '512GB' or '1TB'.
+            color (str): Color words, in Vietnamese or English ('xanh', 'titan', 'black').
+            brand (str): Brand or product line ('Apple', 'iPhone', 'Samsung').
+            min_stock (int): Minimum units in stock; 1 keeps only products in stock.
+            sort_by (str): One of SORT_FIELDS.
+            descending (bool): Largest first instead of smallest first.
+            limit (int): Number of SKUs returned.
+
+        Returns:
+            Tuple[int, List[Dict]]: Number of matching SKUs and the returned ones, in order.
+
+        Raises:
+            ValueError: If sort_by is not one of SORT_FIELDS or storage has no number.
+        """
+        if sort_by not in SORT_FIELDS:
+            raise ValueError(f"sort_by must be one of {', '.join(SORT_FIELDS)}, got '{sort_by}'")
+        gb = None
+        if storage:
+            gb = storage_gb(storage)
+            if gb is None:
+                raise ValueError(f"Unrecognized storage '{storage}', expected e.g. '256GB' or '1TB'")
+        mask = self._mask(min_price, max_price, gb, color, brand, min_stock)
+        total = int(np.count_nonzero(mask)) if mask is not None else len(self._documents)
+        if limit <= 0 or total == 0:
+            return total, []
+        bounds = {"price": (min_price, max_price), "quantity": (min_stock, None), "storage": (gb, gb)}[sort_by]
+        top = self._top(mask, total, sort_by, bounds, descending, limit)
+        return total, [public_product(self._documents[row]) for row in top.tolist()]
+
+    def _distance(self, row: int, rows: np.ndarray) -> np.ndarray:
+        distance = WEIGHT_BRAND * (self.brand[rows] != self.brand[row])
+        distance = distance + WEIGHT_FAMILY * (self.family[rows] != self.family[row])
+        distance = distance + WEIGHT_COLOR * (self.color[rows] != self.color[row])
+        difference = np.abs(self.features[rows] - self.features[row])
+        return distance + WEIGHT_PRICE * difference[:, 0] + WEIGHT_STORAGE * difference[:, 1]
+
+    def similar(self, product_id: str, limit: int = 5, min_stock: int = 1) -> List[Dict[str, Any]]:
+        """
+        SKUs closest to `product_id` by brand, model family, storage, price and color that have at
+        least `min_stock` units, e.g. alternatives for an out-of-stock product.
+
+        The search widens from the product's family to its brand, to other brands within the price
+        band and finally to the whole catalog, and stops as soon as nothing outside the rows scored
+        so far can be closer than the current top `limit`; the result is the exact nearest set.
+
+        Returns:
+            List[Dict]: Up to `limit` products, closest first, each with a 'similarity' in (0, 1].
+        """
+        row = self._rows.get(str(product_id))
+        if row is None or limit <= 0:
+            return []
+        available = self.quantity >= min_stock
+        if self.removed:
+            np.logical_and(available, self._live, out=available)
+        available[row] = False
+
+        # (rows of the stage, least distance of any row outside all stages so far)
+        stages = (
+            (lambda: self.family == self.family[row], WEIGHT_FAMILY),
+            (lambda: self.brand == self.brand[row], WEIGHT_BRAND + WEIGHT_FAMILY),
+            (lambda: np.abs(self.features[:, 0] - self.features[row, 0]) <= SIMILAR_PRICE_BAND,
+             WEIGHT_BRAND + WEIGHT_FAMILY + WEIGHT_PRICE * SIMILAR_PRICE_BAND),
+            (lambda: np.ones(len(self._documents), dtype=bool), np.inf),
+        )
+        candidates = np.zeros(0, dtype=np.int64)
+        distances = np.zeros(0, dtype=np.float32)
+        for stage, bound in stages:
+            selected = stage()
+            rows = np.flatnonzero(np.logical_and(available, selected, out=selected))
+            # Rows of this stage are not scored again by the wider ones.
+            available[rows] = False
+            candidates = np.concatenate([candidates, rows])
+            distances = np.concatenate([distances, self._distance(row, rows)])
+            if len(candidates) > limit:
+                # Keep the `limit` nearest, and rows tied with the last of them so ties still break by row.
+                nearest = distances <= np.partition(distances, limit - 1)[limit - 1]
+                candidates, distances = candidates[nearest], distances[nearest]
+            ranked = np.lexsort((candidates, distances))[:limit]
+            candidates, distances = candidates[ranked], distances[ranked]
+            if len(candidates) == limit and distances[-1] < bound:
+                break
+        return [
+            {**public_product(self._documents[candidate]), "similarity": round(float(np.exp(-distance)), 3)}
+            for candidate, distance in zip(candidates.tolist(), distances.tolist())
+        ]
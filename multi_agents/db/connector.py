@@ -1,12 +1,136 @@
-from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
-from typing import List, Dict, Any, Optional
+import re
+import json
+import hashlib
+import pymongo
+from datetime import datetime, timezone
+from pymongo.errors import BulkWriteError, ConnectionFailure, OperationFailure
+from typing import Any, Callable, Dict, List, Optional
+from pymongo import AsyncMongoClient, MongoClient, ASCENDING, ReturnDocument, UpdateOne
 
 from multi_agents.config.settings import db_config
 from multi_agents.utils.logging import setup_logger
+from multi_agents.utils.text import normalize_search_key
 
 logger = setup_logger()
 
+# Bump when normalize_search_key changes so ensure_indexes() re-backfills existing documents.
+SEARCH_KEY_VERSION = 1
+SEARCH_FIELDS = ("product", "storage", "color")
+INTERNAL_FIELDS = ("_id", "search", "content_hash", "updated_at", "holds")
+INTERNAL_FIELDS_PROJECTION = {"search": 0, "content_hash": 0, "updated_at": 0, "holds": 0}
+# Bulk lookups keep the search keys to match documents back to lookups; they are stripped afterwards.
+BULK_FIELDS_PROJECTION = {"content_hash": 0, "updated_at": 0, "holds": 0}
+
+
+def content_hash(product: Dict[str, Any]) -> str:
+    """Stable hash of the catalog fields of a product, used to skip unchanged documents."""
+    payload = {key: value for key, value in product.items() if key not in INTERNAL_FIELDS}
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha1(encoded).hexdigest()
+
+
+def public_product(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a product document as returned by the tools: internal fields dropped, _id as a string."""
+    return {
+        field: str(value) if field == "_id" else value
+        for field, value in document.items() if field == "_id" or field not in INTERNAL_FIELDS
+    }
+
+
+def same_model(products: List[Dict[str, Any]], product_name: str) -> List[Dict[str, Any]]:
+    """
+    The products whose normalized name equals `product_name`, or all of them if none does. Search
+    matches model names by prefix, so 'iPhone 15 Pro' also returns every 'iPhone 15 Pro Max' SKU.
+    """
+    key = normalize_search_key(product_name)
+    exact = [product for product in products if normalize_search_key(product.get("product")) == key]
+    return exact or products
+
+
+def build_search_keys(product: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalized search keys stored alongside a product document under 'search'."""
+    keys = {field: normalize_search_key(product.get(field)) for field in SEARCH_FIELDS}
+    keys["v"] = SEARCH_KEY_VERSION
+    return keys
+
+
+def _prefix(key: str) -> Dict[str, str]:
+    # Anchored, case-sensitive prefix regexes are answered with an index range scan.
+    return {"$regex": f"^{re.escape(key)}"}
+
+
+def _contains(key: str) -> Dict[str, str]:
+    return {"$regex": re.escape(key)}
+
+
+PRODUCT_QUERY_TIERS = 2
+
+
+def product_queries(product_name: str, storage: Optional[str] = None, color: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Search tiers of get_products, most selective first: product key prefix, match anywhere.
+    There is no exact-key tier: 'iPhone 15' must still find 'iPhone 15 Pro' and 'iPhone 15 Pro Max',
+    and the exact key is covered by the prefix range scan anyway.
+    """
+    product_key = normalize_search_key(product_name)
+    filters = {}
+    if storage:
+        filters["search.storage"] = _prefix(normalize_search_key(storage))
+    if color:
+        filters["search.color"] = _prefix(normalize_search_key(color))
+
+    return [
+        {"search.product": _prefix(product_key), **filters},
+        {
+            "search.product": _contains(product_key),
+            **{field: _contains(normalize_search_key(value))
+               for field, value in (("search.storage", storage), ("search.color", color)) if value},
+        },
+    ]
+
+
+def search_filter(query: Dict[str, Any]) -> Callable[[Dict[str, Any]], bool]:
+    """Compile a product_queries() filter into a predicate over a document's search keys."""
+    conditions = []
+    for field, condition in query.items():
+        key = field.split(".", 1)[1]
+        if isinstance(condition, dict):
+            conditions.append((key, re.compile(condition["$regex"]).search))
+        else:
+            conditions.append((key, condition.__eq__))
+    return lambda search: all(test(search.get(key) or "") for key, test in conditions)
+
+
+def bulk_tier_query(lookups: List[Dict[str, Any]], pending: List[int], tier: int) -> Dict[str, Any]:
+    """One $or filter covering search tier `tier` of every pending lookup."""
+    queries = []
+    for i in pending:
+        query = product_queries(lookups[i]["product"], lookups[i].get("storage"), lookups[i].get("color"))[tier]
+        if query not in queries:
+            queries.append(query)
+    return {"$or": queries}
+
+
+def assign_bulk_results(lookups: List[Dict[str, Any]], pending: List[int], tier: int,
+                        documents: List[Dict[str, Any]], results: List[List[Dict[str, Any]]]) -> List[int]:
+    """
+    Hand the documents returned by bulk_tier_query back to the lookups whose tier filter they
+    match. Returns the lookups still without a result, which fall through to the next tier.
+    """
+    remaining = []
+    for i in pending:
+        matches = search_filter(product_queries(lookups[i]["product"], lookups[i].get("storage"), lookups[i].get("color"))[tier])
+        for document in documents:
+            if matches(document.get("search") or {}):
+                product = {key: value for key, value in document.items() if key != "search"}
+                if "_id" in product:
+                    product["_id"] = str(product["_id"])
+                results[i].append(product)
+        if not results[i]:
+            remaining.append(i)
+    return remaining
+
+
 class MongoDBClient:
     def __init__(self, uri: str = db_config.mongo_uri, db_name: str = db_config.db_name):
         """
@@ -41,13 +165,140 @@ class MongoDBClient:
             if missing_fields:
                 raise ValueError(f"Missing required fields: {', '.join(missing_fields)}")
 
+            product = {
+                **product,
+                "search": build_search_keys(product),
+                "content_hash": content_hash(product),
+                "updated_at": datetime.now(timezone.utc),
+            }
             result = self.db.products.insert_one(product)
+            self.bump_catalog_version()
             logger.info(f"Inserted product with ID: {result.inserted_id}")
             return str(result.inserted_id)
         except Exception as e:
             logger.error(f"Error inserting product: {str(e)}")
             raise
 
+    def bulk_upsert_products(self, products: List[Dict[str, Any]], skip_unchanged: bool = False) -> Dict[str, Any]:
+        """
+        Upsert a batch of validated products keyed on product_id with one unordered bulk_write.
+
+        Args:
+            products (List[Dict[str, Any]]): Products to write; each must have a product_id.
+            skip_unchanged (bool): Fetch stored content hashes first and skip products whose content is unchanged.
+
+        Returns:
+            Dict[str, Any]: Counters ('inserted', 'updated', 'unchanged') and per-document 'errors'.
+        """
+        hashes = {product["product_id"]: content_hash(product) for product in products}
+
+        unchanged = set()
+        if skip_unchanged:
+            stored = self.db.products.find(
+                {"product_id": {"$in": list(hashes)}},
+                {"product_id": 1, "content_hash": 1, "_id": 0},
+            )
+            unchanged = {doc["product_id"] for doc in stored if doc.get("content_hash") == hashes[doc["product_id"]]}
+
+        written = [product for product in products if product["product_id"] not in unchanged]
+        now = datetime.now(timezone.utc)
+        updates = [
+            UpdateOne(
+                {"product_id": product["product_id"]},
+                {"$set": {
+                    **product,
+                    "search": build_search_keys(product),
+                    "content_hash": hashes[product["product_id"]],
+                    "updated_at": now,
+                }},
+                upsert=True,
+            )
+            for product in written
+        ]
+        summary = {"inserted": 0, "updated": 0, "unchanged": len(unchanged), "errors": []}
+        if not updates:
+            return summary
+
+        try:
+            details = self.db.products.bulk_write(updates, ordered=False).bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            summary["errors"] = [
+                {"product_id": written[error["index"]]["product_id"], "error": error.get("errmsg")}
+                for error in details.get("writeErrors", [])
+            ]
+
+        summary["inserted"] = details.get("nUpserted", 0)
+        summary["updated"] = details.get("nModified", 0)
+        summary["unchanged"] += details.get("nMatched", 0) - details.get("nModified", 0)
+        if summary["inserted"] or summary["updated"]:
+            self.bump_catalog_version()
+        return summary
+
+    def get_catalog_version(self) -> int:
+        """
+        Return the catalog version, a counter bumped by every write that changes products.
+        Caches derived from product data compare it to detect stale entries.
+        """
+        meta = self.db.catalog_meta.find_one({"_id": "catalog"})
+        return int(meta["version"]) if meta else 0
+
+    def bump_catalog_version(self) -> int:
+        meta = self.db.catalog_meta.find_one_and_update(
+            {"_id": "catalog"},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return int(meta["version"])
+
+    def ensure_indexes(self, backfill_batch_size: int = 1000) -> None:
+        """
+        Create the search-key index and backfill search keys for documents written
+        before they existed (or with an older SEARCH_KEY_VERSION). Safe to call on every startup:
+        the backfill, a collection scan, only runs while the version recorded in catalog_meta
+        differs from SEARCH_KEY_VERSION.
+
+        Args:
+            backfill_batch_size (int): Number of updates sent per bulk_write.
+        """
+        self.db.products.create_index(
+            [("search.product", ASCENDING), ("search.storage", ASCENDING), ("search.color", ASCENDING)],
+            name="search_keys",
+        )
+        try:
+            self.db.products.create_index("product_id", unique=True, name="product_id")
+        except OperationFailure as e:
+            # Collections loaded by the old insert-only loader may hold duplicate product_ids.
+            logger.warning(f"Cannot create unique product_id index, falling back to non-unique: {str(e)}")
+            self.db.products.create_index("product_id", name="product_id_non_unique")
+        # Lets catalog snapshots on standalone servers fetch only recently written products.
+        self.db.products.create_index("updated_at", name="updated_at")
+        # Lets the reservation sweep find expired stock holds without a collection scan.
+        self.db.products.create_index("holds.expires_at", name="holds_expires_at", sparse=True)
+
+        meta = self.db.catalog_meta.find_one({"_id": "search_keys"})
+        if meta is not None and meta.get("version") == SEARCH_KEY_VERSION:
+            return
+
+        stale = self.db.products.find(
+            {"search.v": {"$ne": SEARCH_KEY_VERSION}},
+            {field: 1 for field in SEARCH_FIELDS},
+        )
+        updates, backfilled = [], 0
+        for product in stale:
+            updates.append(UpdateOne({"_id": product["_id"]}, {"$set": {"search": build_search_keys(product)}}))
+            if len(updates) >= backfill_batch_size:
+                self.db.products.bulk_write(updates, ordered=False)
+                backfilled += len(updates)
+                updates = []
+        if updates:
+            self.db.products.bulk_write(updates, ordered=False)
+            backfilled += len(updates)
+        if backfilled:
+            logger.info(f"Backfilled search keys for {backfilled} products")
+        self.db.catalog_meta.update_one({"_id": "search_keys"}, {"$set": {"version": SEARCH_KEY_VERSION}}, upsert=True)
+
     def get_products(
         self,
         product_name: str,
@@ -57,6 +308,11 @@ class MongoDBClient:
         """
         Retrieve products from MongoDB based on name, storage, and color.
 
+        All inputs are normalized like the stored search keys (case, accents, spacing), so
+        'titan tu nhien' matches 'Titan tự nhiên'. Lookups try, in order: a product-name prefix
+        match served by the 'search_keys' index, so 'iPhone 15' also returns the Pro and Pro Max
+        models, and then an unanchored match anywhere in the keys, which needs a collection scan.
+
         Args:
             product_name (str): Name of the product (case-insensitive).
             storage (Optional[str]): Storage capacity (e.g., '256GB').
@@ -66,20 +322,206 @@ class MongoDBClient:
             List[Dict[str, Any]]: List of matching products.
         """
         try:
-            query = {"product": {"$regex": product_name, "$options": "i"}}
-            if storage:
-                query["storage"] = {"$regex": storage, "$options": "i"}
-            if color:
-                query["color"] = {"$regex": color, "$options": "i"}
+            queries = product_queries(product_name, storage, color)
+            result = []
+            for query in queries:
+                for product in self.db.products.find(query, INTERNAL_FIELDS_PROJECTION):
+                    if "_id" in product:
+                        product["_id"] = str(product["_id"])
+                    result.append(product)
+                if result:
+                    break
+            logger.debug(f"Query: {query}, Found: {len(result)} products")
+            return result
+        except Exception as e:
+            logger.error(f"Error querying products: {str(e)}")
+            raise
+
+    def get_products_bulk(self, lookups: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        get_products for many lookups with one query per search tier instead of one per lookup.
+
+        Args:
+            lookups (List[Dict[str, Any]]): Dicts with "product" and optionally "storage" and "color".
+
+        Returns:
+            List[List[Dict[str, Any]]]: Matching products of each lookup, in the order of `lookups`.
+        """
+        try:
+            results = [[] for _ in lookups]
+            pending = list(range(len(lookups)))
+            for tier in range(PRODUCT_QUERY_TIERS):
+                if not pending:
+                    break
+                documents = list(self.db.products.find(bulk_tier_query(lookups, pending, tier), BULK_FIELDS_PROJECTION))
+                pending = assign_bulk_results(lookups, pending, tier, documents, results)
+            logger.debug(f"Bulk query: {len(lookups)} lookups, {len(pending)} without match")
+            return results
+        except Exception as e:
+            logger.error(f"Error querying products in bulk: {str(e)}")
+            raise
 
-            products = self.db.products.find(query)
+
+class AsyncMongoDBClient:
+    """
+    asyncio counterpart of MongoDBClient's read path, for the MCP server: queries run on the
+    event loop over a bounded connection pool instead of blocking it.
+    """
+
+    def __init__(
+        self,
+        uri: str = db_config.mongo_uri,
+        db_name: str = db_config.db_name,
+        max_pool_size: int = db_config.mongo_max_pool_size,
+        min_pool_size: int = db_config.mongo_min_pool_size,
+        timeout_ms: int = db_config.mongo_timeout_ms,
+    ):
+        """
+        Args:
+            uri (str): MongoDB connection URI.
+            db_name (str): Database name.
+            max_pool_size (int): Maximum pooled connections.
+            min_pool_size (int): Connections kept open when idle.
+            timeout_ms (int): Time limit for each operation, server selection included.
+        """
+        self.client = AsyncMongoClient(
+            uri,
+            maxPoolSize=max_pool_size,
+            minPoolSize=min_pool_size,
+            timeoutMS=timeout_ms,
+            serverSelectionTimeoutMS=timeout_ms,
+        )
+        self.db = self.client[db_name]
+
+    async def ping(self):
+        await self.client.admin.command("ping")
+
+    async def get_products(
+        self,
+        product_name: str,
+        storage: Optional[str] = None,
+        color: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Same lookup tiers and normalization as MongoDBClient.get_products."""
+        try:
             result = []
-            for product in products:
-                if "_id" in product:
-                    product["_id"] = str(product["_id"])
-                result.append(product)
+            for query in product_queries(product_name, storage, color):
+                async for product in self.db.products.find(query, INTERNAL_FIELDS_PROJECTION):
+                    if "_id" in product:
+                        product["_id"] = str(product["_id"])
+                    result.append(product)
+                if result:
+                    break
             logger.debug(f"Query: {query}, Found: {len(result)} products")
             return result
         except Exception as e:
             logger.error(f"Error querying products: {str(e)}")
             raise
+
+    async def get_products_bulk(self, lookups: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Same batching as MongoDBClient.get_products_bulk."""
+        try:
+            results = [[] for _ in lookups]
+            pending = list(range(len(lookups)))
+            for tier in range(PRODUCT_QUERY_TIERS):
+                if not pending:
+                    break
+                cursor = self.db.products.find(bulk_tier_query(lookups, pending, tier), BULK_FIELDS_PROJECTION)
+                documents = [document async for document in cursor]
+                pending = assign_bulk_results(lookups, pending, tier, documents, results)
+            logger.debug(f"Bulk query: {len(lookups)} lookups, {len(pending)} without match")
+            return results
+        except Exception as e:
+            logger.error(f"Error querying products in bulk: {str(e)}")
+            raise
+
+    async def get_all_products(self) -> List[Dict[str, Any]]:
+        """Every product without internal fields, e.g. to build a ProductResolver or ColumnarCatalog."""
+        with pymongo.timeout(None):
+            return [public_product(product) async for product in self.db.products.find({}, INTERNAL_FIELDS_PROJECTION)]
+
+    async def get_catalog_version(self) -> int:
+        meta = await self.db.catalog_meta.find_one({"_id": "catalog"})
+        return int(meta["version"]) if meta else 0
+
+    async def bump_catalog_version(self) -> int:
+        meta = await self.db.catalog_meta.find_one_and_update(
+            {"_id": "catalog"},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return int(meta["version"])
+
+    async def get_product_by_id(self, product_id: str) -> Optional[Dict[str, Any]]:
+        product = await self.db.products.find_one({"product_id": product_id}, INTERNAL_FIELDS_PROJECTION)
+        return public_product(product) if product else None
+
+    async def reserve_stock(self, product_id: str, quantity: int, order_id: str, expires_at: datetime) -> Optional[Dict[str, Any]]:
+        """
+        Take `quantity` units of a product in one conditional update that only matches while
+        that many are in stock, so concurrent orders can never take the same unit twice.
+        The update also records a hold for `order_id` on the product; it stays until the order
+        is saved (commit_reservation) or the units are given back (release_reservation).
+
+        Args:
+            product_id (str): Product to take the units from.
+            quantity (int): Units to take.
+            order_id (str): Order the units are held for.
+            expires_at (datetime): When an uncommitted hold may be released by the reservation sweep.
+
+        Returns:
+            Optional[Dict[str, Any]]: The product after the update, or None if it has fewer units or does not exist.
+        """
+        product = await self.db.products.find_one_and_update(
+            {"product_id": product_id, "quantity": {"$gte": quantity}},
+            {
+                "$inc": {"quantity": -quantity},
+                "$set": {"updated_at": datetime.now(timezone.utc)},
+                "$push": {"holds": {"order_id": order_id, "quantity": quantity, "expires_at": expires_at}},
+            },
+            projection=INTERNAL_FIELDS_PROJECTION,
+            return_document=ReturnDocument.AFTER,
+        )
+        return public_product(product) if product else None
+
+    async def commit_reservation(self, product_id: str, order_id: str) -> bool:
+        """Drop the hold of a saved order; its units stay taken. Returns False if there was no hold."""
+        result = await self.db.products.update_one(
+            {"product_id": product_id, "holds.order_id": order_id},
+            {"$pull": {"holds": {"order_id": order_id}}},
+        )
+        return result.modified_count == 1
+
+    async def release_reservation(self, product_id: str, order_id: str, quantity: int) -> bool:
+        """
+        Give the units held for an order back to stock. The hold is removed in the same update,
+        so releasing twice (or after commit_reservation) changes nothing and returns False.
+        The catalog version is bumped after a release, as after any other stock change.
+        """
+        result = await self.db.products.update_one(
+            {"product_id": product_id, "holds": {"$elemMatch": {"order_id": order_id, "quantity": quantity}}},
+            {
+                "$inc": {"quantity": quantity},
+                "$set": {"updated_at": datetime.now(timezone.utc)},
+                "$pull": {"holds": {"order_id": order_id}},
+            },
+        )
+        if result.modified_count != 1:
+            return False
+        await self.bump_catalog_version()
+        return True
+
+    async def expired_holds(self, now: datetime) -> List[Dict[str, Any]]:
+        """Holds past their expiry as dicts with product_id, order_id and quantity."""
+        expired = []
+        cursor = self.db.products.find({"holds.expires_at": {"$lt": now}}, {"product_id": 1, "holds": 1, "_id": 0})
+        async for product in cursor:
+            for hold in product["holds"]:
+                # Datetimes come back naive (UTC) unless the client is tz-aware.
+                if hold["expires_at"].replace(tzinfo=timezone.utc) < now:
+                    expired.append({"product_id": product["product_id"], "order_id": hold["order_id"], "quantity": hold["quantity"]})
+        return expired
+
+    async def close(self):
+        await self.client.close()
@@ -1,22 +1,199 @@
 import json
+import time
+import argparse
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, Dict, Iterator, List, TextIO
+
 from multi_agents.db.connector import MongoDBClient
+from multi_agents.utils.logging import setup_logger
+from multi_agents.config.schemas import ProductRecord
+
+logger = setup_logger()
+
+
+class LoadReport(BaseModel):
+    read: int = 0
+    invalid: int = 0
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    batches: int = 0
+    elapsed_seconds: float = 0.0
+    errors: List[Dict[str, Any]] = Field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        """Records processed per second."""
+        return self.read / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+
+class UnparsableRecord:
+    """Placeholder yielded for a JSON Lines entry that failed to parse, so it is reported rather than aborting the load."""
+
+    def __init__(self, error: str):
+        self.error = error
+
+
+def iter_json_array(f: TextIO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Stream the elements of a top-level JSON array without loading the whole file.
+    Memory is bounded by the chunk size plus the largest single element.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    started = False
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if not started and pos < len(buffer):
+            if buffer[pos] != "[":
+                raise ValueError("Expected a JSON array at the top level")
+            started, pos = True, pos + 1
+            continue
+        if started and pos < len(buffer) and buffer[pos] == "]":
+            return
+
+        try:
+            if pos >= len(buffer):
+                raise json.JSONDecodeError("Need more data", buffer, pos)
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            if eof and not buffer.strip():
+                raise ValueError("Unexpected end of file inside JSON array")
+            continue
+
+        # A value must be followed by ',' or ']'; otherwise it may be a number cut by the chunk boundary.
+        delimiter = end
+        while delimiter < len(buffer) and buffer[delimiter] in " \t\r\n":
+            delimiter += 1
+        if (delimiter == len(buffer) or buffer[delimiter] not in ",]") and not eof:
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+
+        yield item
+        pos = end
 
 
-def init_mongodb(data_path: str):
+def iter_records(data_path: str) -> Iterator[Any]:
+    """Stream records from a JSON array file or a JSON Lines file (one object per line)."""
     with open(data_path, "r", encoding="utf-8") as f:
-        products = json.load(f)
-    try:
-        db_client = MongoDBClient()
-        for product in products:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+
+        if first == "[":
+            yield from iter_json_array(f)
+            return
+
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
             try:
-                db_client.insert_product(product)
-                print(f"Inserted: {product['product']}")
-            except ValueError as e:
-                print(f"Skipping {product['product']}: {str(e)}")
-    except Exception as e:
-        print(f"Error initializing MongoDB: {str(e)}")
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                yield UnparsableRecord(f"line {line_number}: {str(e)}")
+
+
+def _validate_batch(batch: List[Any], report: LoadReport) -> List[Dict[str, Any]]:
+    valid = []
+    for record in batch:
+        if isinstance(record, UnparsableRecord):
+            report.invalid += 1
+            report.errors.append({"batch": report.batches, "error": record.error})
+            continue
+        try:
+            valid.append(ProductRecord.model_validate(record).model_dump())
+        except ValidationError as e:
+            report.invalid += 1
+            product_id = record.get("product_id") if isinstance(record, dict) else None
+            report.errors.append({
+                "batch": report.batches,
+                "product_id": product_id,
+                "error": "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()),
+            })
+    return valid
+
+
+def init_mongodb(data_path: str, batch_size: int = 1000, delta: bool = False, db_client: MongoDBClient = None) -> LoadReport:
+    """
+    Load a product catalog into MongoDB with batched, unordered upserts keyed on product_id.
+    Re-running with the same file does not create duplicates.
+
+    Args:
+        data_path (str): Path to a JSON array or JSON Lines file.
+        batch_size (int): Number of records validated and written per bulk_write.
+        delta (bool): Skip products whose content hash matches the stored document.
+        db_client (MongoDBClient): Client to write through; a new one is created if omitted.
+
+    Returns:
+        LoadReport: Counters, throughput and per-batch errors.
+    """
+    db_client = db_client or MongoDBClient()
+    db_client.ensure_indexes()
+
+    report = LoadReport()
+    start = time.perf_counter()
+
+    def flush(batch: List[Any]):
+        report.batches += 1
+        valid = _validate_batch(batch, report)
+        if not valid:
+            return
+        try:
+            summary = db_client.bulk_upsert_products(valid, skip_unchanged=delta)
+        except Exception as e:
+            report.failed += len(valid)
+            report.errors.append({"batch": report.batches, "error": str(e)})
+            logger.error(f"Batch {report.batches} failed: {str(e)}")
+            return
+        report.inserted += summary["inserted"]
+        report.updated += summary["updated"]
+        report.unchanged += summary["unchanged"]
+        report.failed += len(summary["errors"])
+        report.errors.extend({"batch": report.batches, **error} for error in summary["errors"])
+
+    batch = []
+    for record in iter_records(data_path):
+        report.read += 1
+        batch.append(record)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    report.elapsed_seconds = time.perf_counter() - start
+    logger.info(
+        f"Loaded {data_path}: read={report.read} inserted={report.inserted} updated={report.updated} "
+        f"unchanged={report.unchanged} invalid={report.invalid} failed={report.failed} "
+        f"in {report.elapsed_seconds:.2f}s ({report.throughput:.0f} records/s)"
+    )
+    return report
 
 
 if __name__ == "__main__":
-    data_path = "storage/inventory.json"
-    init_mongodb(data_path)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Load a product catalog into MongoDB.")
+    parser.add_argument("data_path", nargs="?", default="storage/inventory.json")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--delta", action="store_true", help="Skip products whose content is unchanged")
+    args = parser.parse_args()
+
+    report = init_mongodb(args.data_path, batch_size=args.batch_size, delta=args.delta)
+    print(
+        f"read={report.read} inserted={report.inserted} updated={report.updated} unchanged={report.unchanged} "
+        f"invalid={report.invalid} failed={report.failed} batches={report.batches} "
+        f"elapsed={report.elapsed_seconds:.2f}s throughput={report.throughput:.0f} records/s"
+    )
+    for error in report.errors[:20]:
+        print(f"  batch {error.get('batch')}: {error.get('product_id', '')} {error['error']}")
@@ -0,0 +1,201 @@
+import re
+import heapq
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from multi_agents.utils.text import normalize_search_key
+
+# Shorthand seen in customer messages and LLM-extracted mentions, on normalized tokens.
+TOKEN_ALIASES = {
+    "ip": "iphone",
+    "ipone": "iphone",
+    "pm": "pro max",
+    "promax": "pro max",
+    "prm": "pro max",
+    "ss": "samsung",
+    "sam": "samsung",
+    "ssg": "samsung",
+    "mbp": "macbook pro",
+    "mba": "macbook air",
+    "mb": "macbook",
+    "mac": "macbook",
+    "ultr": "ultra",
+    "ul": "ultra",
+}
+# Filler words around product names ("điện thoại", "máy tính", "con", "chiếc").
+STOPWORDS = {"dien", "thoai", "dt", "dtdd", "may", "tinh", "laptop", "con", "chiec", "cai", "ban", "mua", "hang"}
+# Vietnamese color words, so "đen" finds "Phantom Black" and "black" finds "Đen".
+COLOR_ALIASES = {
+    "den": "black",
+    "trang": "white",
+    "bac": "silver",
+    "vang": "gold",
+    "xanh": "blue",
+    "hong": "pink rose",
+    "tim": "purple",
+    "xam": "gray",
+    "do": "red",
+}
+_STORAGE = re.compile(r"(\d+)\s*(gb|g|tb|t)?\b")
+NUMBER_MISMATCH_PENALTY = 0.5
+
+
+def _expand(tokens: Iterable[str], aliases: Dict[str, str]) -> List[str]:
+    expanded = []
+    for token in tokens:
+        expanded.extend(aliases.get(token, token).split())
+    return expanded
+
+
+def _trigrams(tokens: Iterable[str]) -> Set[str]:
+    """Character trigrams of each token padded with spaces, so short tokens like '15' still contribute."""
+    grams = set()
+    for token in tokens:
+        padded = f" {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _token_keys(tokens: Iterable[str]) -> Set[str]:
+    """Tokens compared for exact matches; longer ones by their letters, so 'Puls' and 'Utlra' still count."""
+    return {"".join(sorted(token)) if len(token) >= 4 else token for token in tokens}
+
+
+def _dice(a: Set[str], b: Set[str]) -> float:
+    return 2 * len(a & b) / (len(a) + len(b)) if a and b else 0.0
+
+
+def _storage_key(storage: Optional[str]) -> Optional[Tuple[str, Optional[str]]]:
+    """'256GB', '256 gb', '256g' -> ('256', 'gb'); a bare '256' -> ('256', None)."""
+    match = _STORAGE.search(normalize_search_key(storage).replace(" ", ""))
+    if not match:
+        return None
+    number, unit = match.groups()
+    return number, {"g": "gb", "t": "tb"}.get(unit, unit)
+
+
+class _Name:
+    __slots__ = ("product", "tokens", "token_keys", "numbers", "trigrams", "variants")
+
+    def __init__(self, product: str):
+        self.product = product
+        self.tokens = normalize_search_key(product).split()
+        self.token_keys = _token_keys(self.tokens)
+        self.numbers = {token for token in self.tokens if token.isdigit()}
+        self.trigrams = _trigrams(self.tokens)
+        # (storage, color, product_id) of every SKU with this name
+        self.variants: List[Tuple[str, str, str]] = []
+
+
+class ProductResolver:
+    """
+    Maps a loosely written product mention ("ip 15 pm", "iphone15 pro max", "ss s23 ultra",
+    "Titan tu nhien") to canonical catalog products, ranked by score.
+
+    Names are matched on character trigrams of their normalized tokens (tolerating typos and
+    missing spaces) through an inverted index, after expanding common shorthand and dropping
+    filler words; whole tokens also count, compared by their letters so transposed typos match.
+    Model numbers matter more than their character overlap: a candidate missing
+    a number from the mention (15 vs 14) is penalized. Storage and color are then resolved
+    among the variants of each candidate.
+    """
+
+    def __init__(self, products: Iterable[Dict[str, Any]], candidates: int = 32):
+        """
+        Args:
+            products (Iterable[Dict]): Catalog products with product, storage, color and product_id.
+            candidates (int): Size of the shortlist, by trigram similarity, that is fully scored.
+        """
+        self.candidates = candidates
+        names: Dict[str, _Name] = {}
+        for product in products:
+            name = product.get("product")
+            if not name:
+                continue
+            entry = names.get(name)
+            if entry is None:
+                entry = names[name] = _Name(name)
+            entry.variants.append((str(product.get("storage") or ""), str(product.get("color") or ""), str(product.get("product_id") or "")))
+        self._names = list(names.values())
+        self._postings: Dict[str, List[int]] = {}
+        for index, entry in enumerate(self._names):
+            for gram in entry.trigrams:
+                self._postings.setdefault(gram, []).append(index)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _score(self, entry: _Name, token_keys: Set[str], grams: Set[str], numbers: Set[str]) -> float:
+        shared = len(entry.token_keys & token_keys)
+        score = 0.5 * _dice(grams, entry.trigrams) + 0.25 * shared / len(entry.token_keys) + 0.25 * shared / len(token_keys)
+        return score * NUMBER_MISMATCH_PENALTY ** len(numbers - entry.numbers)
+
+    @staticmethod
+    def _resolve_storage(entry: _Name, storage: Optional[str]) -> Optional[str]:
+        wanted = _storage_key(storage)
+        if wanted is None:
+            return None
+        for variant_storage, _, _ in entry.variants:
+            key = _storage_key(variant_storage)
+            if key and key[0] == wanted[0] and (wanted[1] is None or key[1] == wanted[1]):
+                return variant_storage
+        return None
+
+    @staticmethod
+    def _resolve_color(entry: _Name, color: Optional[str]) -> Optional[str]:
+        tokens = _expand(normalize_search_key(color).split(), COLOR_ALIASES)
+        if not tokens:
+            return None
+        grams = _trigrams(tokens)
+        best, best_score = None, 0.5
+        for variant_color in {variant[1] for variant in entry.variants}:
+            variant_tokens = _expand(normalize_search_key(variant_color).split(), COLOR_ALIASES)
+            score = _dice(grams, _trigrams(variant_tokens))
+            if score > best_score:
+                best, best_score = variant_color, score
+        return best
+
+    def resolve(self, product: str, storage: Optional[str] = None, color: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        Rank canonical products for a mention.
+
+        Returns:
+            List[Dict[str, Any]]: Up to `limit` matches, best first, each with the canonical
+            product name, its score in [0, 1], the storage and color resolved among its variants
+            (None when not given or not found) and the product_ids of the matching SKUs.
+        """
+        tokens = [token for token in _expand(normalize_search_key(product).split(), TOKEN_ALIASES) if token not in STOPWORDS]
+        if not tokens:
+            return []
+        grams = _trigrams(tokens)
+        token_keys = _token_keys(tokens)
+        numbers = {token for token in tokens if token.isdigit()}
+
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._postings.get(gram, ()))
+        # Shortlist on trigram Dice from the posting counts, then score the shortlist fully.
+        shortlist = heapq.nlargest(
+            self.candidates, shared.items(),
+            key=lambda item: item[1] / (len(grams) + len(self._names[item[0]].trigrams)),
+        )
+        scored = sorted(((self._score(self._names[index], token_keys, grams, numbers), index) for index, _ in shortlist), reverse=True)
+
+        matches = []
+        for score, index in scored[:limit]:
+            entry = self._names[index]
+            resolved_storage = self._resolve_storage(entry, storage)
+            resolved_color = self._resolve_color(entry, color)
+            product_ids = [
+                product_id for variant_storage, variant_color, product_id in entry.variants
+                if (resolved_storage is None or variant_storage == resolved_storage)
+                and (resolved_color is None or variant_color == resolved_color)
+            ]
+            matches.append({
+                "product": entry.product,
+                "score": round(score, 3),
+                "storage": resolved_storage,
+                "color": resolved_color,
+                "product_ids": product_ids,
+            })
+        return matches
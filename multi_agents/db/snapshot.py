@@ -0,0 +1,340 @@
+import time
+import asyncio
+import pymongo
+from loguru import logger
+from datetime import timedelta
+from bisect import bisect_left, insort
+from pymongo.errors import OperationFailure
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from multi_agents.db.columnar import ColumnarCatalog
+from multi_agents.db.resolver import ProductResolver
+from multi_agents.config.settings import catalog_snapshot_config
+from multi_agents.utils.text import normalize_search_key
+from multi_agents.db.connector import SEARCH_FIELDS, AsyncMongoDBClient, product_queries, public_product, search_filter
+
+# Server error code of $changeStream on a standalone mongod.
+CHANGE_STREAM_UNSUPPORTED = 40573
+SNAPSHOT_PROJECTION = {"content_hash": 0, "holds": 0}
+VARIANT_FIELDS = ("product_id", "product", "storage", "color")
+# Share of the catalog changed or removed since the columnar catalog last caught up beyond which it is rebuilt.
+COLUMNAR_REBUILD_RATIO = 0.1
+
+
+class CatalogSnapshot:
+    """
+    In-memory copy of the products collection, indexed on the normalized product key and
+    answering get_products with the same search tiers as MongoDB.
+
+    A background task on the server's event loop keeps it current. On a replica set it follows
+    a change stream. A standalone mongod has no change streams, so there it polls the catalog
+    version, re-reads the products whose updated_at moved, looks for deleted ones when the
+    collection size differs from the snapshot's, and fully reloads every `full_refresh_interval`
+    seconds. ready() reports whether the snapshot was confirmed current within `max_staleness`
+    seconds; when it was not, callers query MongoDB instead.
+    """
+
+    def __init__(
+        self,
+        db_client: AsyncMongoDBClient,
+        max_staleness: float = catalog_snapshot_config.max_staleness,
+        poll_interval: float = catalog_snapshot_config.poll_interval,
+        poll_overlap: float = catalog_snapshot_config.poll_overlap,
+        full_refresh_interval: float = catalog_snapshot_config.full_refresh_interval,
+    ):
+        """
+        Args:
+            db_client (AsyncMongoDBClient): Client the snapshot is loaded and refreshed through.
+            max_staleness (float): Seconds since the last confirmation after which reads are refused.
+            poll_interval (float): Seconds between catalog version checks in polling mode. Also the
+                longest wait for a change stream event, so a quiet stream still confirms freshness.
+            poll_overlap (float): Seconds before the newest seen updated_at that are re-read on each poll.
+            full_refresh_interval (float): Seconds between full reloads in polling mode.
+        """
+        self.db_client = db_client
+        self.max_staleness = max_staleness
+        self.poll_interval = poll_interval
+        self.poll_overlap = poll_overlap
+        self.full_refresh_interval = full_refresh_interval
+
+        self._products: Dict[str, Dict[str, Any]] = {}
+        self._by_product: Dict[str, List[str]] = {}
+        self._product_keys: List[str] = []
+        self._watermark = None
+        # Collection size the _id sets were last compared at; a mismatch the scan could not resolve
+        # (estimated counts drift after an unclean shutdown) is not rescanned every poll.
+        self._compared_count: Optional[int] = None
+        self._verified_at: Optional[float] = None
+        self._change_streams = True
+        self._task: Optional[asyncio.Task] = None
+        # Bumped when a SKU is added or removed or its name, storage or color changes; stock and price updates leave it.
+        self.generation = 0
+        self._resolver: Optional[ProductResolver] = None
+        self._resolver_generation = -1
+        self._columnar: Optional[ColumnarCatalog] = None
+        # SKUs added, changed or removed since the columnar catalog last caught up.
+        self._columnar_pending: Set[str] = set()
+
+        self.mode = "starting"
+        self.version: Optional[int] = None
+        self.full_loads = 0
+        self.last_full_load_ms: Optional[float] = None
+        self.refreshes = 0
+        self.changes_applied = 0
+        self.last_refresh_ms: Optional[float] = None
+        self.served = 0
+        self.fallbacks = 0
+
+    @staticmethod
+    def _key(document: Dict[str, Any]) -> str:
+        return (document.get("search") or {}).get("product") or ""
+
+    def load(self, documents: Iterable[Dict[str, Any]]):
+        """Replace the whole snapshot with `documents` (products including their search keys)."""
+        products, by_product = {}, {}
+        for document in documents:
+            product_id = str(document["_id"])
+            products[product_id] = document
+            by_product.setdefault(self._key(document), []).append(product_id)
+            # A periodic full reload only passes products whose updated_at moved on to the columnar catalog.
+            previous = self._products.get(product_id)
+            if previous is None or document.get("updated_at") is None or previous.get("updated_at") != document.get("updated_at"):
+                self._columnar_pending.add(product_id)
+        self._columnar_pending.update(product_id for product_id in self._products if product_id not in products)
+        self._products, self._by_product, self._product_keys = products, by_product, sorted(by_product)
+        self.generation += 1
+
+    def _remove(self, product_id: str):
+        document = self._products.pop(product_id, None)
+        if document is None:
+            return
+        self.generation += 1
+        self._columnar_pending.add(product_id)
+        key = self._key(document)
+        ids = self._by_product[key]
+        ids.remove(product_id)
+        if not ids:
+            del self._by_product[key]
+            del self._product_keys[bisect_left(self._product_keys, key)]
+
+    def upsert(self, document: Dict[str, Any]):
+        product_id = str(document["_id"])
+        previous, generation = self._products.get(product_id), self.generation
+        self._remove(product_id)
+        same_variant = previous is not None and all(previous.get(field) == document.get(field) for field in VARIANT_FIELDS)
+        self.generation = generation if same_variant else generation + 1
+        self._columnar_pending.add(product_id)
+        self._products[product_id] = document
+        key = self._key(document)
+        if key not in self._by_product:
+            self._by_product[key] = []
+            insort(self._product_keys, key)
+        self._by_product[key].append(product_id)
+
+    def _candidates(self, tier: int, key: str) -> List[str]:
+        """Product ids whose product key can satisfy search tier `tier` (prefix, contains)."""
+        if tier == 0:
+            ids = []
+            i = bisect_left(self._product_keys, key)
+            while i < len(self._product_keys) and self._product_keys[i].startswith(key):
+                ids.extend(self._by_product[self._product_keys[i]])
+                i += 1
+            return ids
+        return [product_id for product_key in self._product_keys if key in product_key for product_id in self._by_product[product_key]]
+
+    def get_products(self, product_name: str, storage: Optional[str] = None, color: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Same results as MongoDBClient.get_products, in search-key index order."""
+        self.served += 1
+        key = normalize_search_key(product_name)
+        for tier, query in enumerate(product_queries(product_name, storage, color)):
+            # Candidates already satisfy the product condition; only storage and color remain.
+            filters = {field: condition for field, condition in query.items() if field != "search.product"}
+            matches = [self._products[product_id] for product_id in self._candidates(tier, key)]
+            if filters:
+                matches_filters = search_filter(filters)
+                matches = [document for document in matches if matches_filters(document.get("search") or {})]
+            if matches:
+                matches.sort(key=lambda document: tuple((document.get("search") or {}).get(field) or "" for field in SEARCH_FIELDS))
+                return [public_product(document) for document in matches]
+        return []
+
+    def resolver(self) -> ProductResolver:
+        """ProductResolver over the snapshot, rebuilt only after the set of SKUs or their names changed."""
+        if self._resolver is None or self._resolver_generation != self.generation:
+            self._resolver = ProductResolver(self._products.values())
+            self._resolver_generation = self.generation
+        return self._resolver
+
+    def columnar(self) -> ColumnarCatalog:
+        """ColumnarCatalog over the snapshot, caught up in place with the changes since the last call."""
+        pending, limit = self._columnar_pending, COLUMNAR_REBUILD_RATIO * len(self._products)
+        if self._columnar is None or len(pending) > limit or self._columnar.removed > limit:
+            self._columnar = ColumnarCatalog(self._products.values())
+        elif pending:
+            self._columnar.remove([product_id for product_id in pending if product_id not in self._products])
+            self._columnar.upsert([self._products[product_id] for product_id in pending if product_id in self._products])
+        pending.clear()
+        return self._columnar
+
+    def age(self) -> Optional[float]:
+        """Seconds since the snapshot was last confirmed current, None before the first load."""
+        return None if self._verified_at is None else time.monotonic() - self._verified_at
+
+    def ready(self) -> bool:
+        """Start the refresh task if it is not running; True if reads may be served from the snapshot."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        age = self.age()
+        if age is None or age > self.max_staleness:
+            self.fallbacks += 1
+            return False
+        return True
+
+    async def _run(self):
+        backoff = 0.5
+        while True:
+            try:
+                if self._change_streams:
+                    await self._follow_change_stream()
+                else:
+                    await self._poll()
+                backoff = 0.5
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAM_UNSUPPORTED:
+                    logger.info("Change streams unavailable (standalone mongod), polling the catalog version instead")
+                    self._change_streams = False
+                    continue
+                logger.warning(f"Catalog snapshot refresh failed: {str(e)}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            except Exception as e:
+                logger.warning(f"Catalog snapshot refresh failed: {str(e)}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    async def _full_load(self):
+        started = time.perf_counter()
+        # Read the version first: products written during the load bump it past this value
+        # and are picked up by the next poll.
+        version = await self.db_client.get_catalog_version()
+        # The full scan may outlast the client's per-operation timeout on a large catalog.
+        with pymongo.timeout(None):
+            documents = [document async for document in self.db_client.db.products.find({}, SNAPSHOT_PROJECTION)]
+        self.load(documents)
+        self.version = version
+        self._watermark = max((document["updated_at"] for document in documents if document.get("updated_at")), default=None)
+        self._verified_at = time.monotonic()
+        self.full_loads += 1
+        self.last_full_load_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.info(f"Catalog snapshot loaded: {len(documents)} products, version {version}, {self.last_full_load_ms}ms")
+
+    async def _follow_change_stream(self):
+        products = self.db_client.db.products
+        with pymongo.timeout(None):
+            async with await products.watch(full_document="updateLookup", max_await_time_ms=int(self.poll_interval * 1000)) as stream:
+                # The stream is opened before loading, so changes made during the load are replayed after it.
+                self.mode = "change_stream"
+                await self._full_load()
+                while True:
+                    change = await stream.try_next()
+                    if change is not None:
+                        started = time.perf_counter()
+                        self._apply_change(change)
+                        self.refreshes += 1
+                        self.changes_applied += 1
+                        self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 3)
+                    self._verified_at = time.monotonic()
+
+    def _apply_change(self, change: Dict[str, Any]):
+        operation = change["operationType"]
+        if operation in ("insert", "update", "replace"):
+            document = change.get("fullDocument")
+            if document is None:
+                # Deleted again before the update lookup ran.
+                self._remove(str(change["documentKey"]["_id"]))
+            else:
+                document.pop("content_hash", None)
+                self.upsert(document)
+        elif operation == "delete":
+            self._remove(str(change["documentKey"]["_id"]))
+        elif operation in ("drop", "rename", "dropDatabase", "invalidate"):
+            raise RuntimeError(f"Products change stream ended by '{operation}'")
+
+    async def _poll(self):
+        self.mode = "poll"
+        await self._full_load()
+        next_full_load = time.monotonic() + self.full_refresh_interval
+        while time.monotonic() < next_full_load:
+            await asyncio.sleep(self.poll_interval)
+            version = await self.db_client.get_catalog_version()
+            if version != self.version:
+                if self._watermark is None:
+                    # Products written before updated_at existed: nothing to filter on.
+                    await self._full_load()
+                    continue
+                await self._load_updated(version)
+            # Neither the version nor updated_at reveals a deleted product; the collection size does.
+            await self._check_deleted()
+            self._verified_at = time.monotonic()
+
+    async def _load_updated(self, version: int):
+        started = time.perf_counter()
+        since = self._watermark - timedelta(seconds=self.poll_overlap)
+        cursor = self.db_client.db.products.find({"updated_at": {"$gte": since}}, SNAPSHOT_PROJECTION)
+        documents = [document async for document in cursor]
+        for document in documents:
+            self.upsert(document)
+            if document.get("updated_at") and document["updated_at"] > self._watermark:
+                self._watermark = document["updated_at"]
+        self.version = version
+        self.refreshes += 1
+        self.changes_applied += len(documents)
+        self.last_refresh_ms = round((time.perf_counter() - started) * 1000, 1)
+        logger.debug(f"Catalog snapshot refreshed to version {version}: {len(documents)} products re-read")
+
+    async def _check_deleted(self):
+        """
+        Compare the collection's estimated size, read from its metadata, with the snapshot and scan
+        for deleted products only when they differ. A delete offset by an insert made without a
+        version bump goes unnoticed until the next full reload.
+        """
+        stored = await self.db_client.db.products.estimated_document_count()
+        if stored != len(self._products) and stored != self._compared_count:
+            await self._remove_deleted()
+            self._compared_count = stored
+
+    async def _remove_deleted(self):
+        """Drop the products no longer in MongoDB. Reads only the _id index, not the documents."""
+        cursor = self.db_client.db.products.find({}, {"_id": 1})
+        stored = {str(document["_id"]) async for document in cursor}
+        deleted = [product_id for product_id in self._products if product_id not in stored]
+        for product_id in deleted:
+            self._remove(product_id)
+        if deleted:
+            self.changes_applied += len(deleted)
+            logger.debug(f"Catalog snapshot dropped {len(deleted)} deleted products")
+
+    def stats(self) -> Dict[str, Any]:
+        age = self.age()
+        return {
+            "enabled": True,
+            "mode": self.mode,
+            "products": len(self._products),
+            "version": self.version,
+            "age_seconds": round(age, 3) if age is not None else None,
+            "max_staleness": self.max_staleness,
+            "full_loads": self.full_loads,
+            "last_full_load_ms": self.last_full_load_ms,
+            "refreshes": self.refreshes,
+            "changes_applied": self.changes_applied,
+            "last_refresh_ms": self.last_refresh_ms,
+            "served": self.served,
+            "fallbacks": self.fallbacks,
+        }
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
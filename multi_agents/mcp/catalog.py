@@ -0,0 +1,11 @@
+import json
+
+from multi_agents.mcp.session_pool import get_session_pool, result_text
+
+
+def fetch_catalog_version() -> int:
+    """Current catalog version from the MCP server."""
+    payload = json.loads(result_text(get_session_pool().call_tool("get_catalog_version", {})))
+    if payload.get("status") != "success":
+        raise RuntimeError(payload.get("error", "Cannot read catalog version"))
+    return int(payload["version"])
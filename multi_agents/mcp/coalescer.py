@@ -0,0 +1,131 @@
+import json
+import asyncio
+import threading
+from loguru import logger
+from typing import Any, Dict, List, Optional, Tuple
+
+from multi_agents.config.settings import mcp_config
+from multi_agents.utils.text import normalize_search_key
+from multi_agents.mcp.session_pool import MCPSessionPool, get_session_pool, result_text
+
+
+class ProductLookupCoalescer:
+    """
+    Client-side batching of product lookups.
+
+    Lookups arriving within `window` seconds of each other (e.g. several crews checking stock
+    at once) are sent as one get_products_bulk call and the per-lookup results are fanned back
+    out. A lookup identical to one already in flight waits for that call instead of adding
+    another (single-flight). Everything runs on the session pool's event loop, so the batch
+    state needs no locking.
+    """
+
+    def __init__(
+        self,
+        pool: Optional[MCPSessionPool] = None,
+        window: float = mcp_config.coalesce_window,
+        max_batch: int = mcp_config.coalesce_max_batch,
+    ):
+        """
+        Args:
+            pool (MCPSessionPool): Session pool used for the tool calls (default: the process-wide pool).
+            window (float): Seconds to wait for more lookups before sending a batch.
+            max_batch (int): Batch size that triggers an immediate send.
+        """
+        self.pool = pool or get_session_pool()
+        self.window = window
+        self.max_batch = max(1, max_batch)
+
+        self._batch: List[Tuple[Tuple[str, str, str], Dict[str, Any], asyncio.Future]] = []
+        self._inflight: Dict[Tuple[str, str, str], asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.lookups = 0
+        self.deduplicated = 0
+        self.single_calls = 0
+        self.bulk_calls = 0
+
+    @staticmethod
+    def key(arguments: Dict[str, Any]) -> Tuple[str, str, str]:
+        """Lookups with the same normalized product, storage and color get the same answer from the server."""
+        return tuple(normalize_search_key(arguments.get(field)) for field in ("product", "storage", "color"))
+
+    async def _lookup(self, arguments: Dict[str, Any]) -> str:
+        self.lookups += 1
+        key = self.key(arguments)
+        future = self._inflight.get(key)
+        if future is not None:
+            self.deduplicated += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            self._inflight[key] = future
+            self._batch.append((key, arguments, future))
+            if len(self._batch) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        # Shielded: a cancelled caller must not cancel the result other callers are waiting for.
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._batch = self._batch, []
+        if batch:
+            asyncio.get_running_loop().create_task(self._send(batch))
+
+    async def _send(self, batch: List[Tuple[Tuple[str, str, str], Dict[str, Any], asyncio.Future]]):
+        try:
+            if len(batch) == 1:
+                self.single_calls += 1
+                texts = [result_text(await self.pool.acall_tool("get_product_info", batch[0][1]))]
+            else:
+                self.bulk_calls += 1
+                lookups = [arguments for _, arguments, _ in batch]
+                payload = json.loads(result_text(await self.pool.acall_tool("get_products_bulk", {"lookups": lookups})))
+                if payload.get("status") != "success":
+                    raise RuntimeError(payload.get("error", "Bulk product lookup failed"))
+                texts = [json.dumps(result, ensure_ascii=False) for result in payload["results"]]
+            for (_, _, future), text in zip(batch, texts):
+                future.set_result(text)
+        except Exception as e:
+            logger.warning(f"Coalesced product lookup of {len(batch)} items failed: {str(e)}")
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            for key, _, _ in batch:
+                self._inflight.pop(key, None)
+
+    def lookup(self, arguments: Dict[str, Any]) -> str:
+        """Blocking lookup returning the get_product_info result text."""
+        return self.pool.submit(self._lookup(arguments)).result()
+
+    async def alookup(self, arguments: Dict[str, Any]) -> str:
+        """lookup() awaitable from any event loop."""
+        return await asyncio.wrap_future(self.pool.submit(self._lookup(arguments)))
+
+    def stats(self) -> Dict[str, Any]:
+        calls = self.single_calls + self.bulk_calls
+        return {
+            "lookups": self.lookups,
+            "deduplicated": self.deduplicated,
+            "single_calls": self.single_calls,
+            "bulk_calls": self.bulk_calls,
+            "lookups_per_call": round(self.lookups / calls, 2) if calls else None,
+        }
+
+
+_coalescer: Optional[ProductLookupCoalescer] = None
+_coalescer_lock = threading.Lock()
+
+
+def get_product_coalescer() -> ProductLookupCoalescer:
+    """Return the process-wide product lookup coalescer, creating it on first use."""
+    global _coalescer
+    if _coalescer is None:
+        with _coalescer_lock:
+            if _coalescer is None:
+                _coalescer = ProductLookupCoalescer()
+    return _coalescer
@@ -1,35 +1,45 @@
 import json
-import asyncio
 from typing import Type
 from loguru import logger
-from mcp import ClientSession
 from pydantic import BaseModel
 from crewai.tools import BaseTool
-from mcp.client.sse import sse_client
 
 from multi_agents.config.schemas import CreateOrderInput
+from multi_agents.mcp.session_pool import get_session_pool, result_text
 
 
 class CreateOrderTool(BaseTool):
+    """
+    Deprecated: use ReserveOrderTool. The server's create_order now places the order through
+    reserve_and_create_order, so stock is reserved and the order_id and prices in the input are ignored.
+    """
+
     name: str = "Create order"
-    description: str = "Saves order data to a file in the 'orders' subdirectory with a standardized format. Input is a JSON string from SaveOrderInput model."
+    description: str = (
+        "Deprecated, use 'Reserve and create order'. Places an order from a JSON string with product, "
+        "storage, color, quantity and customer_info, reserving stock first."
+    )
     args_schema: Type[BaseModel] = CreateOrderInput
 
     async def _arun(self, order_details: str) -> str:
-        async with sse_client(url="http://localhost:8000/sse") as streams:
-            async with ClientSession(*streams) as session:
-                await session.initialize()
-                try:
-                    logger.debug(f"Sending order_details : {order_details} (type: {type(order_details)})")
-
-                    result = await session.call_tool("create_order", {"order_details": order_details})
-                    return str(result) if result is not None else "Error: No result from server"
-                except Exception as e:
-                    logger.error(f"Error creating order: {str(e)}")
-                    return f"Error creating order: {str(e)}"
+        try:
+            logger.debug(f"Sending order_details : {order_details} (type: {type(order_details)})")
+
+            result = await get_session_pool().acall_tool("create_order", {"order_details": order_details}, retries=0)
+            return result_text(result) if result is not None else "Error: No result from server"
+        except Exception as e:
+            logger.error(f"Error creating order: {str(e)}")
+            return f"Error creating order: {str(e)}"
 
     def _run(self, order_details: str) -> str:
-        return asyncio.run(self._arun(order_details))
+        try:
+            logger.debug(f"Sending order_details : {order_details} (type: {type(order_details)})")
+
+            result = get_session_pool().call_tool("create_order", {"order_details": order_details}, retries=0)
+            return result_text(result) if result is not None else "Error: No result from server"
+        except Exception as e:
+            logger.error(f"Error creating order: {str(e)}")
+            return f"Error creating order: {str(e)}"
     
 if __name__ == "__main__":
     tool = CreateOrderTool()
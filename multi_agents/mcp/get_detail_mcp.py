@@ -1,15 +1,55 @@
 import json
-import asyncio
-from typing import Type
-from mcp import ClientSession
 from pydantic import BaseModel
+from typing import Any, Dict, Optional, Type
 from crewai.tools import BaseTool
-from mcp.client.sse import sse_client
 
+from multi_agents.config.settings import mcp_config
 from multi_agents.config.schemas import CheckInventoryInput
+from multi_agents.mcp.coalescer import get_product_coalescer
+from multi_agents.mcp.session_pool import get_session_pool, result_text
+
+LOOKUP_FIELDS = ("product", "storage", "color")
+
+
+def _is_not_found(text: str) -> bool:
+    try:
+        return json.loads(text).get("status") == "not_found"
+    except (ValueError, AttributeError):
+        return False
+
+
+def _resolved_arguments(arguments: Dict[str, Any], resolution: str) -> Optional[Dict[str, Any]]:
+    """
+    Lookup arguments for the best resolve_product match, or None if it is not confident, changes
+    nothing, or lost a storage or color the caller gave: the resolver leaves a variant the catalog
+    does not list as None, and looking up without it would report another variant as found.
+    """
+    payload = json.loads(resolution)
+    matches = payload.get("matches") or []
+    if payload.get("status") != "success" or not matches or matches[0]["score"] < mcp_config.resolve_min_score:
+        return None
+    resolved = {field: matches[0][field] for field in LOOKUP_FIELDS}
+    if any(arguments.get(field) and not resolved[field] for field in LOOKUP_FIELDS):
+        return None
+    if resolved == {field: arguments.get(field) for field in LOOKUP_FIELDS}:
+        return None
+    return resolved
+
+
+def _with_resolution(text: str, arguments: Dict[str, Any]) -> str:
+    """Tell the agent which mention the result was resolved from."""
+    payload = json.loads(text)
+    payload["resolved_from"] = {field: arguments[field] for field in LOOKUP_FIELDS if arguments.get(field)}
+    return json.dumps(payload, ensure_ascii=False)
 
 
 class GetDetailTool(BaseTool):
+    """
+    Inventory lookup through the MCP server. A lookup that finds nothing is resolved with
+    resolve_product (shorthand, typos, missing spaces) and retried once with the canonical
+    product, instead of leaving the agent to guess spellings over extra LLM turns.
+    """
+
     name: str = "Check inventory detail"
     description: str = (
         "Retrieves inventory details from storage based on the product. "
@@ -18,17 +58,30 @@ class GetDetailTool(BaseTool):
     args_schema: Type[BaseModel] = CheckInventoryInput
 
     async def _arun(self, **kwargs) -> str:
-        async with sse_client(url="http://localhost:8000/sse") as streams:
-            async with ClientSession(*streams) as session:
-                await session.initialize()
-                try:
-                    result = await session.call_tool("get_product_info", kwargs)
-                    return result
-                except Exception as e:
-                    return json.dumps({"error": f"Failed to retrieve product info: {str(e)}", "status": "error"})
+        try:
+            text = await get_product_coalescer().alookup(kwargs)
+            if not _is_not_found(text):
+                return text
+            resolution = result_text(await get_session_pool().acall_tool("resolve_product", kwargs))
+            resolved = _resolved_arguments(kwargs, resolution)
+            if resolved is None:
+                return text
+            return _with_resolution(await get_product_coalescer().alookup(resolved), kwargs)
+        except Exception as e:
+            return json.dumps({"error": f"Failed to retrieve product info: {str(e)}", "status": "error"})
 
     def _run(self, **kwargs) -> str:
-        return asyncio.run(self._arun(**kwargs))
+        try:
+            text = get_product_coalescer().lookup(kwargs)
+            if not _is_not_found(text):
+                return text
+            resolution = result_text(get_session_pool().call_tool("resolve_product", kwargs))
+            resolved = _resolved_arguments(kwargs, resolution)
+            if resolved is None:
+                return text
+            return _with_resolution(get_product_coalescer().lookup(resolved), kwargs)
+        except Exception as e:
+            return json.dumps({"error": f"Failed to retrieve product info: {str(e)}", "status": "error"})
 
 if __name__ == "__main__":
     tool = GetDetailTool()
@@ -38,4 +91,4 @@ if __name__ == "__main__":
         "color": "Titan tự nhiên"
     }
     result = tool._run(**input_data)
-    print(result)
\ No newline at end of file
+    print(result)
@@ -0,0 +1,182 @@
+import json
+import time
+import threading
+import concurrent.futures
+from loguru import logger
+from typing import Any, Dict, Optional, Tuple
+
+from multi_agents.config.settings import mcp_config, pipeline_config
+from multi_agents.config.schemas import RequestAnalysis
+from multi_agents.agents.intent import IntentClassifier
+from multi_agents.mcp.coalescer import get_product_coalescer
+from multi_agents.mcp.get_detail_mcp import LOOKUP_FIELDS
+from multi_agents.mcp.session_pool import get_session_pool, result_text
+
+prefetch_stats = {"attempted": 0, "hits": 0, "misses": 0, "saved_ms": 0.0}
+_stats_lock = threading.Lock()
+
+
+def prefetch_metrics() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = dict(prefetch_stats)
+    claimed = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / claimed, 3) if claimed else None
+    stats["saved_ms"] = round(stats["saved_ms"], 1)
+    return stats
+
+
+class InventoryPrefetch:
+    """
+    Speculative inventory lookup for one pipeline run, started from the raw customer message while
+    Task 1 is still with the LLM. The product mention guessed by the intent rules is resolved with
+    resolve_product and looked up through the product coalescer, on the session pool's loop so the
+    run's thread is not held. If Task 1's streamed answer names a product the guess got wrong,
+    the lookup is restarted from it before the answer is finished (see refine). Once Task 1 is
+    done, the result is handed to Task 2 only if product_details names exactly the prefetched
+    variant; otherwise Task 2 looks up as usual.
+    """
+
+    def __init__(self, classifier: IntentClassifier, wait: float = pipeline_config.speculative_wait):
+        """
+        Args:
+            classifier (IntentClassifier): Extracts the product mention and matches Task 1's product_details.
+            wait (float): Seconds to wait after Task 1 for a lookup that has not finished yet.
+        """
+        self.classifier = classifier
+        self.wait = wait
+        self.guess: Optional[Dict[str, Optional[str]]] = None
+        self._future: Optional[concurrent.futures.Future] = None
+        self._started = 0.0
+        self._finished: Optional[float] = None
+        self.report: Dict[str, Any] = {"attempted": False, "hit": False}
+
+    def start(self, customer_input: str) -> bool:
+        """Start the lookup if the message names a product; returns whether it was started."""
+        return self._submit(self.classifier.extract_mention(customer_input))
+
+    def refine(self, product_details: str) -> bool:
+        """
+        Restart the lookup from Task 1's product_details, read while its answer is still streaming,
+        when the message named no product or the finished lookup would miss (another product, or
+        nothing resolved). A lookup still in flight is left alone; claim() decides on it.
+
+        Returns:
+            bool: Whether a new lookup was started.
+        """
+        if self._future is not None:
+            if not self._future.done() or self._future.cancelled():
+                return False
+            try:
+                prefetched = self._future.result()
+            except Exception:
+                prefetched = None
+            if prefetched is not None:
+                lookup, text = prefetched
+                if json.loads(text).get("status") == "success" and self.classifier.describes(
+                    product_details, **{field: lookup.get(field) for field in LOOKUP_FIELDS}
+                ):
+                    return False
+        guess = self.classifier.extract_mention(product_details)
+        if guess is None or guess == self.guess:
+            return False
+        self._finished = None
+        started = self._submit(guess)
+        if started:
+            self.report["refined"] = True
+            logger.info(f"Speculative inventory lookup restarted from Task 1's product_details: {guess}")
+        return started
+
+    def _submit(self, guess: Optional[Dict[str, Optional[str]]]) -> bool:
+        if guess is None:
+            return False
+        self.guess = guess
+        self._started = time.perf_counter()
+        try:
+            self._future = get_session_pool().submit(self._lookup(self.guess))
+        except Exception as e:
+            logger.warning(f"Could not start speculative inventory lookup: {str(e)}")
+            return False
+        if not self.report["attempted"]:
+            with _stats_lock:
+                prefetch_stats["attempted"] += 1
+        self.report.update(attempted=True, guess=self.guess)
+        return True
+
+    async def _resolve(self, arguments: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        payload = json.loads(result_text(await get_session_pool().acall_tool("resolve_product", {**arguments, "limit": 1})))
+        matches = payload.get("matches") or []
+        if payload.get("status") != "success" or not matches or matches[0]["score"] < mcp_config.resolve_min_score:
+            return None
+        return matches[0]
+
+    async def _lookup(self, guess: Dict[str, Optional[str]]) -> Optional[Tuple[Dict[str, str], str]]:
+        arguments = {field: value for field, value in guess.items() if value}
+        match = await self._resolve(arguments)
+        if match is None:
+            return None
+        leftover = self.classifier.unexplained(guess["product"].split(), match["product"])
+        if leftover and not guess["color"]:
+            # A color written without "màu" ("ip 15 pm titan xanh").
+            retried = await self._resolve({**arguments, "product": match["product"], "color": " ".join(leftover)})
+            if retried is not None and retried["product"] == match["product"] and retried["color"]:
+                match = retried
+        lookup = {field: match[field] for field in LOOKUP_FIELDS if match[field]}
+        text = await get_product_coalescer().alookup(lookup)
+        self._finished = time.perf_counter()
+        return lookup, text
+
+    def claim(self, analysis: Optional[RequestAnalysis]) -> Optional[Dict[str, Any]]:
+        """
+        The prefetched lookup, if Task 1's analysis asks for an inventory check of exactly the
+        prefetched product, storage and color.
+
+        Returns:
+            Optional[Dict[str, Any]]: 'arguments' of the lookup and its 'result', or None on a miss.
+        """
+        if self._future is None:
+            return None
+        if analysis is None or not analysis.requires_inventory_check:
+            # Nothing to look up, so neither a hit nor a miss.
+            self._future.cancel()
+            self.report["needed"] = False
+            return None
+
+        task1_done = time.perf_counter()
+        prefetched = None
+        try:
+            prefetched = self._future.result(timeout=self.wait)
+        except concurrent.futures.TimeoutError:
+            self._future.cancel()
+            self.report["reason"] = "timeout"
+        except Exception as e:
+            logger.warning(f"Speculative inventory lookup failed: {str(e)}")
+            self.report["reason"] = "error"
+        claimed = time.perf_counter()
+
+        hit = False
+        if prefetched is not None:
+            lookup, text = prefetched
+            result = json.loads(text)
+            self.report["arguments"] = lookup
+            if result.get("status") != "success":
+                self.report["reason"] = "not_found"
+            elif not self.classifier.describes(analysis.product_details, **{field: lookup.get(field) for field in LOOKUP_FIELDS}):
+                self.report["reason"] = "product_mismatch"
+            else:
+                hit = True
+        elif "reason" not in self.report:
+            self.report["reason"] = "unresolved"
+
+        # Time spent on the lookup while Task 1 was running, which Task 2 no longer waits for.
+        saved_ms = (min(self._finished, task1_done) - self._started) * 1000 if hit else 0.0
+        self.report.update(
+            hit=hit,
+            lookup_ms=round(((self._finished or claimed) - self._started) * 1000, 1),
+            waited_ms=round((claimed - task1_done) * 1000, 1),
+            saved_ms=round(saved_ms, 1),
+        )
+        with _stats_lock:
+            prefetch_stats["hits" if hit else "misses"] += 1
+            prefetch_stats["saved_ms"] += saved_ms
+        logger.info(f"Speculative inventory lookup {'hit' if hit else 'missed'}: {self.report}")
+        return {"arguments": lookup, "result": result} if hit else None
@@ -0,0 +1,47 @@
+import json
+from typing import Type
+from loguru import logger
+from pydantic import BaseModel
+from crewai.tools import BaseTool
+
+from multi_agents.config.schemas import ReserveOrderInput
+from multi_agents.mcp.session_pool import get_session_pool, result_text
+
+
+class ReserveOrderTool(BaseTool):
+    """
+    Order placement through the MCP server's reserve_and_create_order: the stock check, the stock
+    decrement and the order write happen in one call, so the last unit cannot be sold twice.
+    The call is not retried, since a retry after a lost response could place the order twice.
+    """
+
+    name: str = "Reserve and create order"
+    description: str = (
+        "Places an order: checks and reserves stock, then saves the order at the current price, in one call. "
+        "Input is the product name, optionally storage, color and quantity, and the customer_name and "
+        "conversation_id from the context. Returns order_id, unit_price, total_price and remaining_stock, "
+        "or status 'out_of_stock', 'ambiguous' or 'not_found'."
+    )
+    args_schema: Type[BaseModel] = ReserveOrderInput
+
+    async def _arun(self, **kwargs) -> str:
+        try:
+            arguments = {key: value for key, value in kwargs.items() if value is not None}
+            return result_text(await get_session_pool().acall_tool("reserve_and_create_order", arguments, retries=0))
+        except Exception as e:
+            logger.error(f"Error reserving stock and creating order: {str(e)}")
+            return json.dumps({"error": f"Failed to create order: {str(e)}", "status": "error"})
+
+    def _run(self, **kwargs) -> str:
+        try:
+            arguments = {key: value for key, value in kwargs.items() if value is not None}
+            return result_text(get_session_pool().call_tool("reserve_and_create_order", arguments, retries=0))
+        except Exception as e:
+            logger.error(f"Error reserving stock and creating order: {str(e)}")
+            return json.dumps({"error": f"Failed to create order: {str(e)}", "status": "error"})
+
+if __name__ == "__main__":
+    tool = ReserveOrderTool()
+    result = tool._run(product="iPhone 15 Pro Max", storage="256GB", color="Titan tự nhiên",
+                       customer_name="Nguyễn Văn A", conversation_id="12345")
+    print(result)
@@ -0,0 +1,41 @@
+import json
+from typing import Type
+from loguru import logger
+from pydantic import BaseModel
+from crewai.tools import BaseTool
+
+from multi_agents.config.schemas import SearchProductsInput
+from multi_agents.mcp.session_pool import get_session_pool, result_text
+
+
+class SearchProductsTool(BaseTool):
+    """Structured catalog search through the MCP server, to shortlist products by criteria in one call."""
+
+    name: str = "Search products"
+    description: str = (
+        "Finds products matching criteria rather than a name: price range in VND, storage, color, brand "
+        "and stock, sorted by price, quantity or storage. Use it when the customer describes what they want "
+        "(e.g. 'điện thoại dưới 25 triệu, 512GB, còn hàng') instead of naming a product."
+    )
+    args_schema: Type[BaseModel] = SearchProductsInput
+
+    async def _arun(self, **kwargs) -> str:
+        try:
+            arguments = {key: value for key, value in kwargs.items() if value is not None}
+            return result_text(await get_session_pool().acall_tool("search_products", arguments))
+        except Exception as e:
+            logger.error(f"Error searching products: {str(e)}")
+            return json.dumps({"error": f"Failed to search products: {str(e)}", "status": "error"})
+
+    def _run(self, **kwargs) -> str:
+        try:
+            arguments = {key: value for key, value in kwargs.items() if value is not None}
+            return result_text(get_session_pool().call_tool("search_products", arguments))
+        except Exception as e:
+            logger.error(f"Error searching products: {str(e)}")
+            return json.dumps({"error": f"Failed to search products: {str(e)}", "status": "error"})
+
+if __name__ == "__main__":
+    tool = SearchProductsTool()
+    result = tool._run(max_price=25000000, storage="512GB", min_stock=1)
+    print(result)
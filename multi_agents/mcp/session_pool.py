@@ -0,0 +1,187 @@
+import atexit
+import asyncio
+import threading
+from loguru import logger
+from mcp import ClientSession
+from typing import Any, Dict, Optional
+from mcp.client.sse import sse_client
+
+from multi_agents.config.settings import mcp_config
+
+
+class _PooledSession:
+    def __init__(self, session: ClientSession, slot: int):
+        self.session = session
+        self.slot = slot
+        self.closed = asyncio.Event()
+
+    def close(self):
+        self.closed.set()
+
+
+class MCPSessionPool:
+    """
+    Process-wide pool of long-lived, initialized MCP client sessions.
+
+    Every session is owned by a slot task running on a dedicated background event loop:
+    the slot opens the SSE stream, initializes the session, pings it periodically and
+    reconnects when it breaks. Callers (sync or async) borrow an idle session for one
+    tool call instead of paying the SSE + initialize handshake each time.
+    """
+
+    def __init__(
+        self,
+        url: str = mcp_config.mcp_url,
+        size: int = mcp_config.pool_size,
+        connect_timeout: float = mcp_config.connect_timeout,
+        call_timeout: float = mcp_config.call_timeout,
+        health_check_interval: float = mcp_config.health_check_interval,
+    ):
+        """
+        Args:
+            url (str): SSE endpoint of the MCP server.
+            size (int): Number of sessions kept open.
+            connect_timeout (float): Timeout for connecting and initializing a session.
+            call_timeout (float): Timeout for a single tool call (also used to wait for an idle session).
+            health_check_interval (float): Seconds between pings of an open session.
+        """
+        self.url = url
+        self.size = max(1, size)
+        self.connect_timeout = connect_timeout
+        self.call_timeout = call_timeout
+        self.health_check_interval = health_check_interval
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="mcp-session-pool", daemon=True)
+        self._thread.start()
+
+        self._idle: Optional[asyncio.Queue] = None
+        self._slots = []
+        self._closing = False
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        return self._loop
+
+    def _ensure_started(self):
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        self._slots = [self._loop.create_task(self._run_slot(slot)) for slot in range(self.size)]
+        logger.info(f"MCP session pool started: {self.size} sessions to {self.url}")
+
+    async def _run_slot(self, slot: int):
+        backoff = 0.5
+        while not self._closing:
+            try:
+                async with sse_client(url=self.url, timeout=self.connect_timeout) as streams:
+                    async with ClientSession(*streams) as session:
+                        await asyncio.wait_for(session.initialize(), timeout=self.connect_timeout)
+                        pooled = _PooledSession(session, slot)
+                        self._idle.put_nowait(pooled)
+                        backoff = 0.5
+                        logger.debug(f"MCP session {slot} connected")
+                        await self._watch(pooled)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"MCP session {slot} disconnected: {str(e)}")
+
+            if not self._closing:
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 10.0)
+
+    async def _watch(self, pooled: _PooledSession):
+        """Keep the session open until it is closed, pinging it between health-check intervals."""
+        while not pooled.closed.is_set():
+            try:
+                await asyncio.wait_for(pooled.closed.wait(), timeout=self.health_check_interval)
+            except asyncio.TimeoutError:
+                try:
+                    await asyncio.wait_for(pooled.session.send_ping(), timeout=self.connect_timeout)
+                except Exception as e:
+                    logger.warning(f"MCP session {pooled.slot} failed health check: {str(e)}")
+                    pooled.close()
+
+    async def _borrow(self) -> _PooledSession:
+        while True:
+            pooled = await self._idle.get()
+            if not pooled.closed.is_set():
+                return pooled
+
+    async def _call_tool(self, name: str, arguments: Dict[str, Any], retries: int = 1):
+        self._ensure_started()
+        for attempt in range(retries + 1):
+            pooled = await asyncio.wait_for(self._borrow(), timeout=self.call_timeout)
+            returned = False
+            try:
+                result = await asyncio.wait_for(pooled.session.call_tool(name, arguments), timeout=self.call_timeout)
+                self._idle.put_nowait(pooled)
+                returned = True
+                return result
+            except asyncio.TimeoutError:
+                raise
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                logger.warning(f"MCP call '{name}' failed on session {pooled.slot}, retrying: {str(e)}")
+            finally:
+                # Failed, timed out or cancelled mid-call: the session may still carry the
+                # unanswered request, so it is reconnected rather than handed to the next caller.
+                if not returned:
+                    pooled.close()
+
+    def submit(self, coro):
+        """Schedule a coroutine on the pool loop and return a concurrent future."""
+        if self._closing:
+            raise RuntimeError("MCP session pool is closed")
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def call_tool(self, name: str, arguments: Dict[str, Any], retries: int = 1):
+        """Blocking tool call, safe to use from any thread that is not the pool loop. Pass retries=0 for non-idempotent tools."""
+        return self.submit(self._call_tool(name, arguments, retries)).result()
+
+    async def acall_tool(self, name: str, arguments: Dict[str, Any], retries: int = 1):
+        """Tool call awaitable from any event loop."""
+        return await asyncio.wrap_future(self.submit(self._call_tool(name, arguments, retries)))
+
+    def close(self):
+        if self._closing:
+            return
+        self._closing = True
+
+        async def _shutdown():
+            for task in self._slots:
+                task.cancel()
+            await asyncio.gather(*self._slots, return_exceptions=True)
+
+        try:
+            asyncio.run_coroutine_threadsafe(_shutdown(), self._loop).result(timeout=5)
+        except Exception as e:
+            logger.warning(f"Error closing MCP session pool: {str(e)}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+def result_text(result) -> str:
+    """Flatten a CallToolResult into the text the tool returned."""
+    if result is None:
+        return ""
+    texts = [getattr(item, "text", None) for item in getattr(result, "content", None) or []]
+    texts = [text for text in texts if text is not None]
+    return "\n".join(texts) if texts else str(result)
+
+
+_pool: Optional[MCPSessionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> MCPSessionPool:
+    """Return the process-wide MCP session pool, creating it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = MCPSessionPool()
+                atexit.register(_pool.close)
+    return _pool
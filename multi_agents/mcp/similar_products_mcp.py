@@ -0,0 +1,40 @@
+import json
+from typing import Type
+from loguru import logger
+from pydantic import BaseModel
+from crewai.tools import BaseTool
+
+from multi_agents.config.schemas import SimilarProductsInput
+from multi_agents.mcp.session_pool import get_session_pool, result_text
+
+
+class SimilarProductsTool(BaseTool):
+    """In-stock alternatives to a product from the MCP server's similarity lookup, in one call."""
+
+    name: str = "Similar products"
+    description: str = (
+        "Finds in-stock alternatives to a product that is out of stock: the closest products by brand, "
+        "model, storage, price and color. Input is the product name, and optionally storage, color and limit."
+    )
+    args_schema: Type[BaseModel] = SimilarProductsInput
+
+    async def _arun(self, **kwargs) -> str:
+        try:
+            arguments = {key: value for key, value in kwargs.items() if value is not None}
+            return result_text(await get_session_pool().acall_tool("similar_products", arguments))
+        except Exception as e:
+            logger.error(f"Error finding similar products: {str(e)}")
+            return json.dumps({"error": f"Failed to find similar products: {str(e)}", "status": "error"})
+
+    def _run(self, **kwargs) -> str:
+        try:
+            arguments = {key: value for key, value in kwargs.items() if value is not None}
+            return result_text(get_session_pool().call_tool("similar_products", arguments))
+        except Exception as e:
+            logger.error(f"Error finding similar products: {str(e)}")
+            return json.dumps({"error": f"Failed to find similar products: {str(e)}", "status": "error"})
+
+if __name__ == "__main__":
+    tool = SimilarProductsTool()
+    result = tool._run(product="iPhone 15 Pro Max", storage="256GB", color="Titan tự nhiên")
+    print(result)
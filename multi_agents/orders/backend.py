@@ -0,0 +1,77 @@
+import os
+import json
+from loguru import logger
+from abc import ABC, abstractmethod
+from typing import Any, Container, Dict, Iterator, Optional, Tuple
+
+from multi_agents.config.settings import order_config
+
+
+class OrderBackend(ABC):
+    """
+    Storage engine for orders. Backends persist the standardized order dict written by the
+    create_order tools and hand back an opaque location string that the OrderIndex stores.
+    """
+
+    scan_errors: int = 0
+
+    @abstractmethod
+    def save(self, order: Dict[str, Any]) -> str:
+        """Durably store an order and return its location."""
+
+    @abstractmethod
+    def load(self, location: str) -> Dict[str, Any]:
+        """Read back the order stored at `location`."""
+
+    @abstractmethod
+    def scan(self, known: Container[str] = ()) -> Iterator[Tuple[Optional[Dict[str, Any]], str, float]]:
+        """
+        Yield (order, location, created_at) for every stored record, in write order if the backend has one.
+        Backends may yield None instead of the order for locations in `known` to skip reading them.
+        """
+
+    @abstractmethod
+    def owns(self, location: str) -> bool:
+        """Whether `location` was produced by this backend."""
+
+    def close(self):
+        pass
+
+
+class FileOrderBackend(OrderBackend):
+    """One pretty-printed JSON file per order, named order_<order_id>_<conversation_id>.json."""
+
+    def __init__(self, orders_dir: str = order_config.orders_dir):
+        self.orders_dir = orders_dir
+
+    def save(self, order: Dict[str, Any]) -> str:
+        os.makedirs(self.orders_dir, exist_ok=True)
+        details = order["order_details"]
+        filename = f"order_{details['order_id']}_{details['customer_info']['conversation_id']}.json"
+        filepath = os.path.join(self.orders_dir, filename)
+        with open(filepath, "w", encoding="utf-8") as f:
+            json.dump(order, f, ensure_ascii=False, indent=4)
+        return filepath
+
+    def load(self, location: str) -> Dict[str, Any]:
+        with open(location, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def scan(self, known: Container[str] = ()) -> Iterator[Tuple[Optional[Dict[str, Any]], str, float]]:
+        self.scan_errors = 0
+        if not os.path.isdir(self.orders_dir):
+            return
+        with os.scandir(self.orders_dir) as entries:
+            paths = [e.path for e in entries if e.is_file() and e.name.startswith("order_") and e.name.endswith(".json")]
+        for path in paths:
+            if path in known:
+                yield None, path, 0.0
+                continue
+            try:
+                yield self.load(path), path, os.path.getmtime(path)
+            except Exception as e:
+                self.scan_errors += 1
+                logger.warning(f"Cannot read order file {path}: {str(e)}")
+
+    def owns(self, location: str) -> bool:
+        return location.endswith(".json")
@@ -0,0 +1,154 @@
+import os
+import time
+import sqlite3
+import threading
+from loguru import logger
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+from multi_agents.config.settings import order_config
+
+if TYPE_CHECKING:
+    from multi_agents.orders.backend import OrderBackend
+
+
+class OrderIndex:
+    """
+    SQLite index mapping order_id, conversation_id and customer name to where the order is
+    stored (a file path or a segment log position). Lookups are B-tree seeks instead of a
+    directory scan.
+
+    The index is updated on every write and reconciled with the storage backends by sync().
+    """
+
+    def __init__(self, path: str = order_config.index_path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS orders ("
+            "order_id TEXT PRIMARY KEY, conversation_id TEXT, customer_name TEXT COLLATE NOCASE, "
+            "location TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS orders_conversation ON orders(conversation_id, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS orders_customer ON orders(customer_name, created_at)")
+
+    @staticmethod
+    def _entry(order: Dict[str, Any]) -> Dict[str, Optional[str]]:
+        details = order.get("order_details", order)
+        customer_info = details.get("customer_info") or {}
+        return {
+            "order_id": str(details["order_id"]),
+            "conversation_id": str(customer_info["conversation_id"]) if customer_info.get("conversation_id") is not None else None,
+            "customer_name": customer_info.get("customer_name"),
+        }
+
+    def add(self, order: Dict[str, Any], location: str, created_at: Optional[float] = None):
+        """Index a stored order (the standardized dict written by create_order) at `location`."""
+        entry = self._entry(order)
+        if created_at is None:
+            created_at = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO orders (order_id, conversation_id, customer_name, location, created_at) VALUES (?, ?, ?, ?, ?)",
+                (entry["order_id"], entry["conversation_id"], entry["customer_name"], location, created_at),
+            )
+
+    def locate(self, order_id: str) -> Optional[str]:
+        """Location of an order. Like the old filename scan, a prefix of the id also matches (first match wins)."""
+        with self._lock:
+            row = self._conn.execute("SELECT location FROM orders WHERE order_id = ?", (order_id,)).fetchone()
+            if row is None and order_id:
+                row = self._conn.execute(
+                    "SELECT location FROM orders WHERE order_id >= ? AND order_id < ? ORDER BY order_id LIMIT 1",
+                    (order_id, order_id + "\U0010ffff"),
+                ).fetchone()
+        return row[0] if row else None
+
+    def _list(self, column: str, value: str, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT order_id, conversation_id, customer_name, location, created_at FROM orders "
+                f"WHERE {column} = ? ORDER BY created_at DESC LIMIT ?",
+                (value, limit),
+            ).fetchall()
+        keys = ("order_id", "conversation_id", "customer_name", "location", "created_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def by_conversation(self, conversation_id: str, limit: int = order_config.list_limit) -> List[Dict[str, Any]]:
+        return self._list("conversation_id", str(conversation_id), limit)
+
+    def by_customer(self, customer_name: str, limit: int = order_config.list_limit) -> List[Dict[str, Any]]:
+        """Orders of a customer, newest first; names match case-insensitively."""
+        return self._list("customer_name", customer_name, limit)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def relocate(self, order_id: str, old_location: str, new_location: str) -> bool:
+        """Point an order at its new location, unless it was overwritten meanwhile."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE orders SET location = ? WHERE order_id = ? AND location = ?",
+                (new_location, order_id, old_location),
+            )
+        return cursor.rowcount == 1
+
+    def sync(self, backends: Iterable["OrderBackend"]) -> Dict[str, int]:
+        """
+        Reconcile the index with what the storage backends hold: index orders written without
+        it (or before it existed) and drop entries whose stored record is gone.
+
+        Returns:
+            Dict[str, int]: Number of orders added, entries removed and unreadable records.
+        """
+        summary = {"added": 0, "removed": 0, "errors": 0}
+        with self._lock:
+            known = {row[0] for row in self._conn.execute("SELECT location FROM orders")}
+
+        # Later records of the same order supersede earlier ones (scan order, then backend order).
+        latest: Dict[str, tuple] = {}
+        removed = []
+        for backend in backends:
+            stored = set()
+            for order, location, created_at in backend.scan(known):
+                stored.add(location)
+                if order is None:
+                    continue
+                try:
+                    entry = self._entry(order)
+                except Exception as e:
+                    summary["errors"] += 1
+                    logger.warning(f"Cannot index order at {location}: {str(e)}")
+                    continue
+                latest[entry["order_id"]] = (entry, location, created_at)
+            summary["errors"] += backend.scan_errors
+            removed.extend((location,) for location in known if backend.owns(location) and location not in stored)
+
+        added = [
+            (entry["order_id"], entry["conversation_id"], entry["customer_name"], location, created_at)
+            for entry, location, created_at in latest.values()
+            if location not in known
+        ]
+
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany("DELETE FROM orders WHERE location = ?", removed)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO orders (order_id, conversation_id, customer_name, location, created_at) VALUES (?, ?, ?, ?, ?)",
+                added,
+            )
+            self._conn.execute("COMMIT")
+        summary["added"], summary["removed"] = len(added), len(removed)
+        if added or removed:
+            logger.info(f"Order index synced: {summary}")
+        return summary
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
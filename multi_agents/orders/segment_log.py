@@ -0,0 +1,337 @@
+import os
+import json
+import time
+import zlib
+import fcntl
+import threading
+from loguru import logger
+from typing import Any, Callable, Container, Dict, Iterator, List, Optional, Tuple
+
+from multi_agents.config.settings import order_config
+from multi_agents.orders.backend import OrderBackend
+
+LOCATION_PREFIX = "log:"
+SEGMENT_PREFIX = "segment_"
+SEGMENT_SUFFIX = ".jsonl"
+
+
+class SegmentLogBackend(OrderBackend):
+    """
+    Append-only order log split into rotating segment files.
+
+    Each order is one compact line, "<crc32 hex> <json>\\n", where the JSON envelope holds the
+    write timestamp and the order. Writers append under a lock and then wait for a flusher
+    thread that fsyncs once per group-commit window, so concurrent writes share one fsync.
+    The segment with the highest number is the active one; the others are sealed.
+
+    Segments have a single writer process. Its lock is taken on the first write (or compaction),
+    so other processes can open the log to read it (load, scan, stats) while the MCP server
+    writes; compaction writes, so it runs in the server process or while the server is stopped.
+    When the writer starts, the active segment is scanned and a torn or corrupt tail (a crash
+    mid-write) is truncated. compact() rewrites the live records of sealed segments into a
+    single segment.
+    """
+
+    def __init__(
+        self,
+        log_dir: str = order_config.log_dir,
+        segment_max_bytes: int = order_config.segment_max_bytes,
+        group_commit_window: float = order_config.group_commit_window,
+        fsync: bool = order_config.fsync,
+    ):
+        self.log_dir = log_dir
+        self.segment_max_bytes = segment_max_bytes
+        self.group_commit_window = group_commit_window
+        self.fsync = fsync
+        os.makedirs(log_dir, exist_ok=True)
+
+        self.appends = 0
+        self.fsyncs = 0
+        self.recovered_bytes = 0
+
+        self._cond = threading.Condition()
+        self._written_seq = 0
+        # Records up to _handled_seq have been through a flush, which succeeded up to _synced_seq.
+        self._handled_seq = 0
+        self._synced_seq = 0
+        self._sync_error: Optional[BaseException] = None
+        self._closed = False
+
+        self._lock_file = None
+        self._file = None
+        self._flusher: Optional[threading.Thread] = None
+        segments = self._segment_ids()
+        self._active_id = segments[-1] if segments else 1
+        self._offset = 0
+
+    def _open_writer(self):
+        """Become the log's writer: take the lock, recover the active segment and start the flusher. Caller holds the lock."""
+        if self._file is not None:
+            return
+        # Segments have a single writer: a second process appending would interleave records.
+        lock_file = open(os.path.join(self.log_dir, "LOCK"), "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise RuntimeError(
+                f"Order log {self.log_dir} is written by another process; write orders through the MCP server "
+                "and compact it there or while the server is stopped"
+            )
+        self._lock_file = lock_file
+
+        for name in os.listdir(self.log_dir):
+            if name.endswith(".tmp"):
+                # Output of a compaction that never completed; its inputs are still in place.
+                os.remove(os.path.join(self.log_dir, name))
+        segments = self._segment_ids()
+        self._active_id = segments[-1] if segments else 1
+        self._recover(self._active_id)
+        self._file = open(self._segment_path(self._active_id), "ab")
+        self._offset = self._file.tell()
+
+        self._flusher = threading.Thread(target=self._flush_loop, name="order-log-flusher", daemon=True)
+        self._flusher.start()
+
+    @staticmethod
+    def _segment_name(segment_id: int) -> str:
+        return f"{SEGMENT_PREFIX}{segment_id:06d}{SEGMENT_SUFFIX}"
+
+    def _segment_path(self, segment_id: int) -> str:
+        return os.path.join(self.log_dir, self._segment_name(segment_id))
+
+    def _segment_ids(self) -> List[int]:
+        ids = []
+        for name in os.listdir(self.log_dir):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                ids.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+        return sorted(ids)
+
+    @staticmethod
+    def encode(order: Dict[str, Any], created_at: float) -> bytes:
+        payload = json.dumps({"ts": created_at, "order": order}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+    @staticmethod
+    def decode(line: bytes) -> Dict[str, Any]:
+        """Parse one record line; raises ValueError on a torn or corrupt record."""
+        if len(line) < 10 or not line.endswith(b"\n") or line[8:9] != b" ":
+            raise ValueError("truncated record")
+        payload = line[9:-1]
+        if int(line[:8], 16) != zlib.crc32(payload):
+            raise ValueError("checksum mismatch")
+        return json.loads(payload)
+
+    def _records(self, segment_id: int) -> Iterator[Tuple[int, Optional[Dict[str, Any]], bytes]]:
+        """Yield (offset, record or None if invalid, raw line) for a segment."""
+        with open(self._segment_path(segment_id), "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    record = self.decode(line)
+                except ValueError:
+                    record = None
+                yield offset, record, line
+                offset += len(line)
+
+    def _recover(self, segment_id: int):
+        path = self._segment_path(segment_id)
+        if not os.path.exists(path):
+            return
+        valid_end = 0
+        for offset, record, line in self._records(segment_id):
+            if record is None:
+                break
+            valid_end = offset + len(line)
+        size = os.path.getsize(path)
+        if valid_end < size:
+            self.recovered_bytes = size - valid_end
+            logger.warning(f"Order log {path}: truncating {size - valid_end} bytes of torn records at offset {valid_end}")
+            with open(path, "r+b") as f:
+                f.truncate(valid_end)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def _location(self, segment_id: int, offset: int) -> str:
+        return f"{LOCATION_PREFIX}{self._segment_name(segment_id)}:{offset}"
+
+    def _parse_location(self, location: str) -> Tuple[str, int]:
+        name, offset = location[len(LOCATION_PREFIX):].rsplit(":", 1)
+        return os.path.join(self.log_dir, name), int(offset)
+
+    def _rotate(self, next_id: Optional[int] = None):
+        """Seal the active segment and start `next_id` (default: the next number). Caller holds the lock."""
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+            self.fsyncs += 1
+        self._file.close()
+        self._active_id = next_id or self._active_id + 1
+        self._file = open(self._segment_path(self._active_id), "ab")
+        self._offset = 0
+
+    def save(self, order: Dict[str, Any]) -> str:
+        line = self.encode(order, time.time())
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Order log is closed")
+            self._open_writer()
+            if self._offset and self._offset + len(line) > self.segment_max_bytes:
+                self._rotate()
+            location = self._location(self._active_id, self._offset)
+            self._file.write(line)
+            self._offset += len(line)
+            self.appends += 1
+            self._written_seq += 1
+            seq = self._written_seq
+            self._cond.notify_all()
+            while self._handled_seq < seq:
+                self._cond.wait()
+            if self._synced_seq < seq:
+                raise RuntimeError(f"Order log write failed: {self._sync_error}")
+        return location
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                while self._handled_seq == self._written_seq and not self._closed:
+                    self._cond.wait()
+                if self._closed and self._handled_seq == self._written_seq:
+                    return
+            # Let more writers join this commit group.
+            if self.group_commit_window > 0:
+                time.sleep(self.group_commit_window)
+            fd = None
+            with self._cond:
+                target = self._written_seq
+                try:
+                    self._file.flush()
+                    # fsync a duplicate descriptor outside the lock; it stays valid if the segment rotates meanwhile.
+                    fd = os.dup(self._file.fileno()) if self.fsync else None
+                    error = None
+                except Exception as e:
+                    error = e
+            if error is None and fd is not None:
+                try:
+                    os.fsync(fd)
+                except Exception as e:
+                    error = e
+                finally:
+                    os.close(fd)
+            with self._cond:
+                if error is None:
+                    self._synced_seq = max(self._synced_seq, target)
+                    if fd is not None:
+                        self.fsyncs += 1
+                else:
+                    # Fail this commit group's writers; the flusher stays up for the next one.
+                    self._sync_error = error
+                    logger.error(f"Order log flush failed for {target - self._handled_seq} record(s): {str(error)}")
+                self._handled_seq = max(self._handled_seq, target)
+                self._cond.notify_all()
+
+    def load(self, location: str) -> Dict[str, Any]:
+        path, offset = self._parse_location(location)
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return self.decode(f.readline())["order"]
+
+    def scan(self, known: Container[str] = ()) -> Iterator[Tuple[Optional[Dict[str, Any]], str, float]]:
+        self.scan_errors = 0
+        for segment_id in self._segment_ids():
+            with open(self._segment_path(segment_id), "rb") as f:
+                offset = 0
+                for line in f:
+                    location = self._location(segment_id, offset)
+                    offset += len(line)
+                    if location in known:
+                        # Already indexed: only its location is needed, not the decoded record.
+                        yield None, location, 0.0
+                        continue
+                    try:
+                        record = self.decode(line)
+                    except ValueError:
+                        if not line.endswith(b"\n"):
+                            # The writer's append in progress, seen from a reader.
+                            continue
+                        self.scan_errors += 1
+                        logger.warning(f"Skipping corrupt order record in {self._segment_name(segment_id)} at offset {offset - len(line)}")
+                        continue
+                    yield record["order"], location, record["ts"]
+
+    def owns(self, location: str) -> bool:
+        return location.startswith(LOCATION_PREFIX)
+
+    def compact(self, is_live: Callable[[Dict[str, Any], str], bool]) -> Tuple[List[Tuple[Dict[str, Any], str, str]], Callable[[], None]]:
+        """
+        Rewrite the live records of all sealed segments into one new segment.
+
+        The active segment is sealed first and the compacted output takes the number just
+        below the new active segment, so write order between segments is preserved.
+
+        Args:
+            is_live (Callable): Called with (order, location); False drops the record (e.g. it was superseded).
+
+        Returns:
+            A list of (order, old_location, new_location) for the moved records, and a function
+            deleting the compacted input segments. Call it only after the index points at the
+            new locations.
+        """
+        with self._cond:
+            self._open_writer()
+            # Seal the active segment, skipping one number for the compacted output.
+            output_id = self._active_id + 1
+            self._rotate(next_id=output_id + 1)
+        inputs = [segment_id for segment_id in self._segment_ids() if segment_id < output_id]
+
+        moved = []
+        tmp_path = self._segment_path(output_id) + ".tmp"
+        with open(tmp_path, "wb") as out:
+            offset = 0
+            for segment_id in inputs:
+                for old_offset, record, line in self._records(segment_id):
+                    if record is None:
+                        continue
+                    old_location = self._location(segment_id, old_offset)
+                    if not is_live(record["order"], old_location):
+                        continue
+                    out.write(line)
+                    moved.append((record["order"], old_location, self._location(output_id, offset)))
+                    offset += len(line)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, self._segment_path(output_id))
+        logger.info(f"Compacted {len(inputs)} order log segments into {self._segment_name(output_id)}: kept {len(moved)} records")
+
+        def remove_inputs():
+            for segment_id in inputs:
+                os.remove(self._segment_path(segment_id))
+
+        return moved, remove_inputs
+
+    def stats(self) -> Dict[str, Any]:
+        segments = self._segment_ids()
+        active_id = self._active_id if self._file is not None or not segments else segments[-1]
+        return {
+            "active_segment": self._segment_name(active_id),
+            "segments": len(segments),
+            "appends": self.appends,
+            "fsyncs": self.fsyncs,
+            "appends_per_fsync": round(self.appends / self.fsyncs, 2) if self.fsyncs else None,
+            "recovered_bytes": self.recovered_bytes,
+        }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._flusher is not None:
+            self._flusher.join(timeout=5)
+        with self._cond:
+            if self._file is not None:
+                self._file.flush()
+                if self.fsync:
+                    os.fsync(self._file.fileno())
+                self._file.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
@@ -0,0 +1,136 @@
+import threading
+from loguru import logger
+from typing import Any, Dict, List, Optional
+
+from multi_agents.orders.index import OrderIndex
+from multi_agents.orders.segment_log import SegmentLogBackend
+from multi_agents.orders.backend import FileOrderBackend, OrderBackend
+from multi_agents.config.settings import order_config
+
+
+class OrderStore:
+    """
+    Orders as seen by the create/get/list tools: a storage backend for new writes, the
+    OrderIndex for lookups, and read access to the other backends so orders written before a
+    backend switch (e.g. legacy one-file-per-order JSON) stay readable.
+    """
+
+    def __init__(self, backend: OrderBackend, index: OrderIndex, readers: Optional[List[OrderBackend]] = None):
+        """
+        Args:
+            backend (OrderBackend): Backend new orders are written to.
+            index (OrderIndex): Index over all backends.
+            readers (List[OrderBackend]): Additional read-only backends, listed before `backend`
+                so that its records win when the same order exists in both.
+        """
+        self.backend = backend
+        self.index = index
+        self.backends = [*(readers or []), backend]
+
+    def _backend_for(self, location: str) -> OrderBackend:
+        for backend in self.backends:
+            if backend.owns(location):
+                return backend
+        raise ValueError(f"No order backend owns location {location}")
+
+    def sync(self) -> Dict[str, int]:
+        return self.index.sync(self.backends)
+
+    def save(self, order: Dict[str, Any]) -> str:
+        """Store a standardized order (see create_order) and index it. Returns its location."""
+        location = self.backend.save(order)
+        self.index.add(order, location)
+        return location
+
+    def get(self, order_id: str) -> Optional[Dict[str, Any]]:
+        location = self.index.locate(order_id)
+        if location is None:
+            return None
+        try:
+            return self._backend_for(location).load(location)
+        except FileNotFoundError:
+            logger.warning(f"Indexed order {order_id} is missing at {location}")
+            return None
+
+    def _load_all(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        orders = []
+        for entry in entries:
+            try:
+                orders.append(self._backend_for(entry["location"]).load(entry["location"]))
+            except FileNotFoundError:
+                logger.warning(f"Indexed order {entry['order_id']} is missing at {entry['location']}")
+        return orders
+
+    def list_by_conversation(self, conversation_id: str, limit: int = order_config.list_limit) -> List[Dict[str, Any]]:
+        return self._load_all(self.index.by_conversation(conversation_id, limit))
+
+    def list_by_customer(self, customer_name: str, limit: int = order_config.list_limit) -> List[Dict[str, Any]]:
+        return self._load_all(self.index.by_customer(customer_name, limit))
+
+    def compact(self) -> int:
+        """
+        Compact the sealed segments of a log backend, dropping records superseded by a later
+        write of the same order. Returns the number of records kept.
+        """
+        if not isinstance(self.backend, SegmentLogBackend):
+            return 0
+
+        def is_live(order: Dict[str, Any], location: str) -> bool:
+            return self.index.locate(str(order["order_details"]["order_id"])) == location
+
+        moved, remove_inputs = self.backend.compact(is_live)
+        for order, old_location, new_location in moved:
+            self.index.relocate(str(order["order_details"]["order_id"]), old_location, new_location)
+        remove_inputs()
+        return len(moved)
+
+    def close(self):
+        for backend in self.backends:
+            backend.close()
+        self.index.close()
+
+
+_store: Optional[OrderStore] = None
+_store_lock = threading.Lock()
+
+
+def create_order_backend(name: str = order_config.backend) -> OrderBackend:
+    if name == "log":
+        return SegmentLogBackend()
+    if name == "file":
+        return FileOrderBackend()
+    raise ValueError(f"Unknown order backend '{name}', expected 'log' or 'file'")
+
+
+def get_order_store() -> OrderStore:
+    """Process-wide order store using ORDER_BACKEND, synced with the stored orders when first opened."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                backend = create_order_backend()
+                # Orders written as JSON files before switching to the log stay readable.
+                readers = [FileOrderBackend()] if not isinstance(backend, FileOrderBackend) else []
+                store = OrderStore(backend, OrderIndex(), readers)
+                store.sync()
+                _store = store
+    return _store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Maintain the order store",
+        epilog="sync and stats can run next to the MCP server; compact writes the log, so stop the server first.",
+    )
+    parser.add_argument("command", choices=["sync", "compact", "stats"])
+    args = parser.parse_args()
+
+    store = get_order_store()
+    if args.command == "compact":
+        print(f"Kept {store.compact()} records")
+    elif args.command == "sync":
+        print(store.sync())
+    print({"orders": store.index.count(), **(store.backend.stats() if isinstance(store.backend, SegmentLogBackend) else {})})
+    store.close()
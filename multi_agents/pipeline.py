@@ -1,142 +1,591 @@
+import asyncio
+import functools
+import contextlib
 from loguru import logger
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 from crewai import Crew, Task, Process
+from crewai.tasks.task_output import TaskOutput
+from crewai.types.usage_metrics import UsageMetrics
 
-from multi_agents.mcp.create_order_mcp import CreateOrderTool
+from multi_agents.config.settings import pipeline_config, PipelineEngine
+from multi_agents.config.schemas import InventoryCheck, OrderResult, RequestAnalysis
+from multi_agents.utils.concurrency import AdmissionController
+from multi_agents.utils.parser import StreamingJSONParser, as_bool, repair_json_object
+from multi_agents.utils.streaming import FINAL_ANSWER_MARKER, PipelineCancelled, RunEmitter, bind_emitter, listen_chunks
+from multi_agents.agents.prompt import TaskPrompt, request_json
+from multi_agents.agents.intent import IntentClassifier
+from multi_agents.agents.function_calling import FunctionCallingAgent
+from multi_agents.agents.structured_output import TaskOutputConverter, canonical_output
 from multi_agents.mcp.get_detail_mcp import GetDetailTool
+from multi_agents.mcp.prefetch import InventoryPrefetch, prefetch_metrics
+from multi_agents.mcp.reserve_order_mcp import ReserveOrderTool
+from multi_agents.mcp.search_products_mcp import SearchProductsTool
+from multi_agents.mcp.similar_products_mcp import SimilarProductsTool
+from multi_agents.cache.response_cache import get_response_cache
 from multi_agents.agents.agents import ConsultantAgent, InventoryAgent, OrderAgent
 
 
+STAGE_ANALYZE = "analyze_request"
+STAGE_INVENTORY = "check_inventory"
+STAGE_ORDER = "place_order"
+STAGE_RESPONSE = "final_response"
+
+# Stage each function-calling tool stands in for.
+FUNCTION_TOOL_STAGES = {
+    "search_products": STAGE_ANALYZE,
+    "get_product_info": STAGE_INVENTORY,
+    "similar_products": STAGE_INVENTORY,
+    "reserve_and_create_order": STAGE_ORDER,
+}
+
+# Task prompts: instructions first, identical for every request so the LLM server's prefix cache
+# reuses them, then the request data (see TaskPrompt). Request data must not go into instructions.
+ANALYZE_PROMPT = TaskPrompt(
+    instructions="""
+        Phân tích kỹ lưỡng yêu cầu của khách hàng (ở cuối mô tả này, sau 'Yêu cầu của khách hàng').
+        Xác định các thông tin quan trọng như:
+        1. Tên sản phẩm hoặc loại sản phẩm khách hàng quan tâm.
+        2. Ý định chính của khách hàng (ví dụ: hỏi thông tin, kiểm tra tồn kho, hỏi giá, muốn đặt hàng).
+        3. Bất kỳ chi tiết cụ thể nào khác (optional) (màu sắc, dung lượng, v.v.).
+
+        Dựa trên phân tích, hãy chuẩn bị một bản tóm tắt rõ ràng.
+        Nếu 'initial_context_data' ở cuối mô tả có thông tin khách hàng, hãy dựa vào thông tin đó để tư vấn cho khách hàng, nhưng đừng nhắc lại tên sản phẩm khách đã từng mua.
+        - Nếu khách hàng đề cập đến từ "muốn mua", "đặt mua", hoặc tương tự, hãy đánh giá là họ có ý định đặt hàng (requires_order_placement=true).
+        - Nếu khách hàng hỏi về giá hoặc tồn kho, hãy đánh giá là họ có ý định kiểm tra kho/giá (requires_inventory_check=true).
+        - Nếu khách hàng chỉ nhắc đến tên sản phẩm mà không cung cấp thêm thông tin khác, hãy tìm thông tin sản phẩm đó trong kho và tư vấn thêm thông tin khác về sản phẩm đó (requires_inventory_check=true).
+        - Nếu khách hàng mô tả nhu cầu theo tiêu chí (khoảng giá, dung lượng, màu sắc, hãng, còn hàng) mà không nêu tên sản phẩm cụ thể, hãy gọi công cụ "Search products" MỘT lần với các tiêu chí đó (giá tính bằng VND, ví dụ "dưới 25 triệu" là max_price=25000000, "còn hàng" là min_stock=1) và đưa các sản phẩm tìm được vào 'shortlist'.
+        """,
+    output_format="""
+        Kết quả là một đối tượng JSON thuần túy (không bọc trong markdown) chứa:
+        'product_details': (string) mô tả sản phẩm khách quan tâm (ví dụ: 'iPhone 13 128GB màu xanh'),
+        'customer_intent': (string) ý định của khách (ví dụ: 'check_inventory_price', 'place_order', 'general_query'),
+        'requires_inventory_check': (boolean) liệu có cần kiểm tra kho/giá không,
+        'requires_order_placement': (boolean) liệu khách có ý định đặt hàng không,
+        'original_query': (string) câu hỏi gốc của khách hàng,
+        'shortlist': (array, tùy chọn) các sản phẩm phù hợp tìm được bằng công cụ 'Search products' (product, storage, color, price, quantity).
+
+        CHÚ Ý:
+        - Phản hồi của bạn PHẢI là một đối tượng JSON thuần túy, KHÔNG bao gồm bất kỳ định dạng markdown nào như ```json hoặc ```.
+        - Chỉ trả về đối tượng JSON với các trường như mô tả, không thêm văn bản trước hoặc sau JSON.
+        """,
+    request="""
+        Yêu cầu của khách hàng: '{customer_input}'
+        initial_context_data: {initial_context_data}
+        """,
+    expected_output="Một đối tượng JSON thuần túy (không bọc trong markdown) với các trường đã mô tả.",
+)
+
+INVENTORY_PROMPT = TaskPrompt(
+    instructions="""
+        Dựa trên kết quả phân tích từ Task 1 (đặc biệt là 'product_details' và 'requires_inventory_check'):
+        - Nếu 'requires_inventory_check' là true và 'product_details' có thông tin:
+        Nếu ở cuối mô tả này đã có kết quả tra cứu trước của công cụ "Check inventory detail" cho đúng sản phẩm đó,
+        hãy dùng luôn kết quả này và KHÔNG gọi lại công cụ.
+        Nếu không, hãy sử dụng công cụ "Check inventory detail" để kiểm tra thông tin tồn kho và giá của sản phẩm.
+        Đảm bảo cung cấp các thông tin như:
+        - product: Tên sản phẩm từ Task 1 (ví dụ: 'iPhone 15 Pro Max').
+        - color: Màu sắc, nếu được đề cập (ví dụ: 'Titan tự nhiên').
+        - storage: Dung lượng, nếu được đề cập (ví dụ: '256GB').
+        - Nếu sản phẩm hết hàng (quantity bằng 0), hãy gọi công cụ "Similar products" MỘT lần với cùng product, storage, color
+        và đưa các sản phẩm còn hàng tìm được vào 'alternatives'. Không tự nghĩ ra sản phẩm thay thế.
+        - Nếu 'requires_inventory_check' là false hoặc không có thông tin sản phẩm rõ ràng:
+        Trả về thông báo cho biết không cần kiểm tra kho hoặc không đủ thông tin.
+        """,
+    output_format="""
+        Kết quả là một đối tượng JSON thuần túy (không bọc trong markdown) chứa:
+        'product_name': (string) tên sản phẩm đã kiểm tra,
+        'color': (string) màu sắc của sản phẩm (nếu có),
+        'storage': (string) dung lượng của sản phẩm (nếu có),
+        'stock_status': (string) 'in_stock', 'out_of_stock', 'low_stock', hoặc 'not_checked',
+        'price': (number) giá sản phẩm (nếu có và đã kiểm tra),
+        'alternatives': (array, tùy chọn) sản phẩm thay thế còn hàng từ công cụ 'Similar products' khi hết hàng (product, storage, color, price),
+        'message': (string) thông báo bổ sung (ví dụ: 'Không đủ thông tin để kiểm tra').
+
+        CHÚ Ý:
+        - Phản hồi của bạn PHẢI trả về dạng JSON, ví dụ {"product": "iPhone 12", "storage": "512GB", "color": "Black"}.
+        - Nếu không có thông tin về màu sắc và dung lượng, hãy đảm bảo rằng chỉ có trường 'product' được trả về.
+        """,
+    request="""
+        Kết quả tra cứu trước của công cụ "Check inventory detail": {prefetched}
+        """,
+    expected_output="Một đối tượng JSON thuần túy (không bọc trong markdown) với các trường đã mô tả.",
+)
+
+ORDER_PROMPT = TaskPrompt(
+    instructions="""
+        Dựa trên kết quả phân tích từ Task 1 ('customer_intent', 'requires_order_placement', 'product_details')
+        và kết quả kiểm tra kho từ Task 2 nếu có:
+        - Nếu 'requires_order_placement' là true và có đủ thông tin sản phẩm:
+        1. Gọi công cụ `Reserve and create order` ĐÚNG MỘT lần với:
+            - `product`: Tên sản phẩm (ví dụ: 'iPhone 15 Pro Max').
+            - `storage`, `color`: Dung lượng và màu sắc, nếu được đề cập.
+            - `quantity`: Mặc định là 1, hoặc số lượng khách hàng chỉ định.
+            - `customer_name`, `conversation_id`: lấy từ 'initial_context_data' ở cuối mô tả này.
+        Công cụ tự kiểm tra tồn kho, giữ hàng, tạo `order_id` và tính giá; không tự tính giá hay tạo `order_id`.
+        2. Nếu kết quả có status 'success': đặt `order_created` là True và lấy `order_details` từ kết quả
+        (order_id, product, color, storage, quantity, unit_price, total_price, remaining_stock).
+        3. Nếu status là 'out_of_stock', 'ambiguous', 'not_found' hoặc lỗi: đặt `order_created` là False,
+        giải thích trong `message` (số lượng còn lại 'available', hoặc các phiên bản 'products' để khách chọn). Không gọi lại công cụ.
+        - Nếu không đủ điều kiện đặt hàng (ví dụ: khách không muốn đặt, thiếu thông tin):
+        Đặt `order_created` là False và cung cấp `message` giải thích.
+        """,
+    output_format="""
+        Kết quả là một đối tượng JSON thuần túy (không bọc trong markdown) chứa:
+        'order_created': (boolean) đơn hàng có được tạo không,
+        'order_details': (object) chi tiết đơn hàng từ công cụ nếu được tạo,
+        'message': (string) thông báo về trạng thái tạo đơn hàng.
+        Ví dụ: {"order_created": true, "order_details": {"order_id": "a1b2c3d4-e5f6-7890-1234-567890abcdef", "product": "iPhone 15 Pro Max", "color": "Titan tự nhiên", "storage": "256GB", "quantity": 1, "unit_price": 32990000, "total_price": 32990000, "remaining_stock": 4}, "message": "Đơn hàng đã được tạo."}
+
+        CHÚ Ý:
+        - Phản hồi của bạn PHẢI là một đối tượng JSON thuần túy, KHÔNG bao gồm bất kỳ định dạng markdown nào như ```json hoặc ```.
+        - Chỉ trả về đối tượng JSON với các trường như mô tả, không thêm văn bản trước hoặc sau JSON.
+        """,
+    request="""
+        initial_context_data: {initial_context_data}
+        """,
+    expected_output="Một đối tượng JSON thuần túy (không bọc trong markdown) với các trường đã mô tả.",
+)
+
+RESPONSE_PROMPT = TaskPrompt(
+    instructions="""
+        Tổng hợp tất cả thông tin từ các bước trước để đưa ra câu trả lời cuối cùng cho khách hàng.
+        - Dựa trên kết quả từ Task 1 ('customer_intent', 'product_details'), Task 2 ('stock_status', 'price'), và Task 3 ('order_created', 'order_details', 'message'):
+        1. Nếu đơn hàng được tạo thành công ('order_created' là true):
+            Thông báo rằng đơn hàng đã được đặt, bao gồm thông tin sản phẩm, giá, và bất kỳ chi tiết nào từ Task 3 ('order_details').
+        2. Nếu không đặt được đơn hàng:
+            Giải thích lý do (hết hàng, thiếu thông tin, khách không muốn đặt, v.v.) dựa trên 'message' từ Task 3 hoặc các task trước.
+        3. Nếu khách chỉ hỏi thông tin hoặc giá sản phẩm:
+            Cung cấp thông tin chi tiết về sản phẩm, giá cả, và tình trạng kho từ Task 2.
+            Cung cấp câu trả lời rõ ràng và tư vấn cụ thể về sản phẩm, tình trạng kho, và giá (từ Task 2).
+        4. Nếu Task 1 có 'shortlist':
+            Giới thiệu các sản phẩm trong 'shortlist' kèm giá và tình trạng kho, chỉ dùng đúng thông tin trong đó.
+        5. Nếu sản phẩm hết hàng và Task 2 có 'alternatives':
+            Gợi ý các sản phẩm thay thế đó kèm giá, chỉ dùng đúng thông tin trong 'alternatives'.
+        - Đảm bảo câu trả lời thân thiện, dễ hiểu, và phù hợp với ngữ cảnh của khách hàng.
+        - Nếu 'initial_context_data' ở cuối mô tả có thông tin, hãy sử dụng nó để cá nhân hóa câu trả lời (ví dụ: gọi tên khách hàng).
+        - Làm theo 'Ghi chú về các bước' ở cuối mô tả.
+        Dựa trên toàn bộ quá trình, hãy soạn một câu trả lời hoàn chỉnh, thân thiện và chính xác cho câu hỏi ban đầu của khách hàng.
+        Nếu có bất kỳ vấn đề hoặc thông tin nào không rõ ràng, hãy giải thích một cách lịch sự.
+        """,
+    output_format="""
+        Kết quả là một chuỗi (string) là câu trả lời cuối cùng bằng ngôn ngữ tự nhiên để gửi cho khách hàng.
+        """,
+    request="""
+        Câu hỏi ban đầu của khách hàng: '{customer_input}'
+        initial_context_data: {initial_context_data}
+        Ghi chú về các bước: {skipped_note}
+        """,
+    expected_output="Một chuỗi (string) là câu trả lời cuối cùng bằng ngôn ngữ tự nhiên để gửi cho khách hàng.",
+)
+
+
+class _RunAgents:
+    """Agents owned by a single pipeline run, so token accounting and callbacks never leak between runs."""
+
+    def __init__(self, consultant_tools: list, inventory_tools: list, order_tools: list, retry_on_error: bool = True):
+        self.consultant = ConsultantAgent(tools=consultant_tools)
+        self.inventory = InventoryAgent(tools=inventory_tools)
+        self.order = OrderAgent(tools=order_tools)
+        if not retry_on_error:
+            for agent in self.crewai_agents:
+                agent.max_retry_limit = 0
+
+    @property
+    def crewai_agents(self) -> list:
+        return [self.consultant.crewai_agent, self.inventory.crewai_agent, self.order.crewai_agent]
+
+    def token_usage(self) -> UsageMetrics:
+        usage = UsageMetrics()
+        for agent in self.crewai_agents:
+            usage.add_usage_metrics(agent._token_process.get_summary())
+        return usage
+
+
 class MultiAgents:
-    def __init__(self):
-        self.consultant = ConsultantAgent()
-        self.inventory = InventoryAgent(tools=[GetDetailTool()])
-        self.order = OrderAgent(tools=[CreateOrderTool()])
+    def __init__(
+        self,
+        max_concurrent_runs: int = pipeline_config.max_concurrent_runs,
+        max_queue_size: int = pipeline_config.max_queue_size,
+        queue_timeout: float = pipeline_config.queue_timeout,
+        engine: PipelineEngine = pipeline_config.engine,
+    ):
+        """
+        Args:
+            engine (PipelineEngine): 'crewai' runs the task crews; 'function_calling' answers each
+                request with one FunctionCallingAgent loop over the same tools.
+        """
+        self.consultant_tools = [SearchProductsTool()]
+        self.inventory_tools = [GetDetailTool(), SimilarProductsTool()]
+        self.order_tools = [ReserveOrderTool()]
+        self.engine = PipelineEngine(engine)
+        self.function_agent = None
+        if self.engine == PipelineEngine.FUNCTION_CALLING:
+            self.function_agent = FunctionCallingAgent({
+                "search_products": self.consultant_tools[0],
+                "get_product_info": self.inventory_tools[0],
+                "similar_products": self.inventory_tools[1],
+                "reserve_and_create_order": self.order_tools[0],
+            })
+        self.response_cache = get_response_cache()
+        self.intent_classifier = IntentClassifier()
+        self.intent_fast_path = pipeline_config.intent_fast_path
+        self.intent_min_confidence = pipeline_config.intent_min_confidence
+        self.speculative_inventory = pipeline_config.speculative_inventory
 
+        self.admission = AdmissionController(max_concurrent_runs, max_queue_size, queue_timeout)
+        self.stream_buffer_size = pipeline_config.stream_buffer_size
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_runs, thread_name_prefix="pipeline")
 
-    def run(self, customer_input: str, initial_context_data: dict = None, step_callback=None) -> dict:
-        logger.info(f"Pipeline started with input: '{customer_input}' and context: {initial_context_data}")
+    async def arun(self, customer_input: str, initial_context_data: dict = None, step_callback=None) -> dict:
+        """
+        Async entry point for servers: waits for an admission slot, then runs the crews on the
+        pipeline worker pool so the event loop stays free while the LLM calls are in flight.
 
+        Raises:
+            PipelineOverloaded: If the admission queue is full or the wait for a slot times out.
         """
-        Task 1: Consultant Agent phân tích yêu cầu
+        async with self.admission.admit() as hold_until:
+            loop = asyncio.get_running_loop()
+            run = loop.run_in_executor(
+                self._executor,
+                functools.partial(self.run, customer_input, initial_context_data=initial_context_data, step_callback=step_callback),
+            )
+            hold_until(run)
+            # Shielded: cancelling the request must not mark the run done while its thread still works.
+            return await asyncio.shield(run)
+
+    async def astream(self, customer_input: str, initial_context_data: dict = None) -> AsyncIterator[Dict[str, Any]]:
         """
-        task1_analyze_request = Task(
-            description=f"""Phân tích kỹ lưỡng yêu cầu của khách hàng: '{customer_input}'.
-            Xác định các thông tin quan trọng như:
-            1. Tên sản phẩm hoặc loại sản phẩm khách hàng quan tâm.
-            2. Ý định chính của khách hàng (ví dụ: hỏi thông tin, kiểm tra tồn kho, hỏi giá, muốn đặt hàng).
-            3. Bất kỳ chi tiết cụ thể nào khác (optional) (màu sắc, dung lượng, v.v.).
-
-            Dựa trên phân tích, hãy chuẩn bị một bản tóm tắt rõ ràng.
-            Nếu khách hàng cung cấp thông tin trong 'initial_context_data' (nếu có): {initial_context_data}, hãy dựa vào thông tin đó để tư vấn cho khách hàng, nhưng đừng nhắc lại tên sản phẩm khách đã từng mua.
-            - Nếu khách hàng đề cập đến từ "muốn mua", "đặt mua", hoặc tương tự, hãy đánh giá là họ có ý định đặt hàng (requires_order_placement=true).
-            - Nếu khách hàng hỏi về giá hoặc tồn kho, hãy đánh giá là họ có ý định kiểm tra kho/giá (requires_inventory_check=true).
-            - Nếu khách hàng chỉ nhắc đến tên sản phẩm mà không cung cấp thêm thông tin khác, hãy tìm thông tin sản phẩm đó trong kho và tư vấn thêm thông tin khác về sản phẩm đó (requires_inventory_check=true).
-
-            CHÚ Ý:
-            - Phản hồi của bạn PHẢI là một đối tượng JSON thuần túy, KHÔNG bao gồm bất kỳ định dạng markdown nào như ```json hoặc ```. 
-            - Chỉ trả về đối tượng JSON với các trường như mô tả, không thêm văn bản trước hoặc sau JSON.
-            """,
-            agent=self.consultant.crewai_agent,
-            expected_output="Một đối tượng JSON thuần túy (không bọc trong markdown) chứa: "
-                            "'product_details': (string) mô tả sản phẩm khách quan tâm (ví dụ: 'iPhone 13 128GB màu xanh'), "
-                            "'customer_intent': (string) ý định của khách (ví dụ: 'check_inventory_price', 'place_order', 'general_query'), "
-                            "'original_query': (string) câu hỏi gốc của khách hàng, "
-                            "'requires_inventory_check': (boolean) liệu có cần kiểm tra kho/giá không, "
-                            "'requires_order_placement': (boolean) liệu khách có ý định đặt hàng không."
-        )
+        Run the pipeline and yield events as they happen: 'stage', 'step', 'tool_result',
+        'token' (final answer chunks), then 'final' with the usual result dict, or 'error'.
+
+        Events pass through a bounded queue, so a slow consumer pauses the run. Closing the
+        generator (e.g. the client disconnected) cancels the run at its next step.
+
+        Raises:
+            PipelineOverloaded: If the admission queue is full or the wait for a slot times out.
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=self.stream_buffer_size)
+        emitter = RunEmitter(loop, queue)
+
+        async with self.admission.admit() as hold_until:
+            run = loop.run_in_executor(
+                self._executor,
+                functools.partial(self.run, customer_input, initial_context_data=initial_context_data, emitter=emitter),
+            )
+            # The slot stays taken until the worker thread has actually stopped, even if the
+            # consumer goes away first.
+            hold_until(run)
+            run.add_done_callback(lambda future: future.cancelled() or future.exception())
+            try:
+                while True:
+                    getter = asyncio.ensure_future(queue.get())
+                    done, _ = await asyncio.wait({getter, run}, return_when=asyncio.FIRST_COMPLETED)
+                    if getter in done:
+                        yield getter.result()
+                        continue
+                    getter.cancel()
+                    while not queue.empty():
+                        yield queue.get_nowait()
+                    break
 
+                try:
+                    result = run.result()
+                except PipelineCancelled:
+                    return
+                except Exception as e:
+                    logger.error(f"Streaming pipeline run failed: {str(e)}")
+                    yield {"type": "error", "content": str(e)}
+                    return
+                yield {"type": "final", "result": result}
+            finally:
+                emitter.cancel()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    @staticmethod
+    def route(analysis: Optional[RequestAnalysis]) -> List[str]:
         """
-        Task 2: Inventory Agent kiểm tra kho và giá (phụ thuộc vào Task 1)
+        Chọn các bước cần chạy sau Task 1 dựa trên kết quả phân tích.
+        Đặt hàng không cần Task 2: công cụ đặt hàng tự kiểm tra tồn kho, giữ hàng và trả về giá.
+        Nếu không đọc được JSON của Task 1 thì chạy đủ các bước để không bỏ sót đơn hàng.
         """
-        task2_check_inventory = Task(
-            description=f"""Dựa trên kết quả phân tích từ Task 1 (đặc biệt là 'product_details' và 'requires_inventory_check'):
-            - Nếu 'requires_inventory_check' là true và 'product_details' có thông tin:
-            Hãy sử dụng công cụ "Check inventory detail" để kiểm tra thông tin tồn kho và giá của sản phẩm.
-            Đảm bảo cung cấp các thông tin như:
-            - product: Tên sản phẩm từ Task 1 (ví dụ: 'iPhone 15 Pro Max').
-            - color: Màu sắc, nếu được đề cập (ví dụ: 'Titan tự nhiên').
-            - storage: Dung lượng, nếu được đề cập (ví dụ: '256GB').
-            - Nếu 'requires_inventory_check' là false hoặc không có thông tin sản phẩm rõ ràng:
-            Trả về thông báo cho biết không cần kiểm tra kho hoặc không đủ thông tin.
-            
-            CHÚ Ý:
-            - Phản hồi của bạn PHẢI trả về dạng JSON, ví dụ {{"product": "iPhone 12", "storage": "512GB", "color": "Black"}}. 
-            - Nếu không có thông tin về màu sắc và dung lượng, hãy đảm bảo rằng chỉ có trường 'product' được trả về.
-            """,
-            agent=self.inventory.crewai_agent,
-            expected_output="Một đối tượng JSON thuần túy (không bọc trong markdown) chứa: "
-                            "'product_name': (string) tên sản phẩm đã kiểm tra, "
-                            "'color': (string) màu sắc của sản phẩm (nếu có), "
-                            "'storage': (string) dung lượng của sản phẩm (nếu có), "
-                            "'stock_status': (string) 'in_stock', 'out_of_stock', 'low_stock', hoặc 'not_checked', "
-                            "'price': (number) giá sản phẩm (nếu có và đã kiểm tra), "
-                            "'message': (string) thông báo bổ sung (ví dụ: 'Không đủ thông tin để kiểm tra').",
-            context=[task1_analyze_request]
-        )
+        if analysis is None:
+            return [STAGE_INVENTORY, STAGE_ORDER, STAGE_RESPONSE]
+
+        stages = []
+        if analysis.requires_inventory_check:
+            stages.append(STAGE_INVENTORY)
+        if analysis.requires_order_placement:
+            stages.append(STAGE_ORDER)
+        stages.append(STAGE_RESPONSE)
+        return stages
+
+    def _fast_analysis(self, customer_input: str) -> Optional[RequestAnalysis]:
+        """Task 1's analysis from the rule-based classifier, or None to let the consultant agent run it."""
+        if not self.intent_fast_path:
+            return None
+        analysis, confidence = self.intent_classifier.classify(customer_input)
+        if analysis is None or confidence < self.intent_min_confidence:
+            logger.info(f"Intent fast path fell through (confidence {confidence:.2f}), running the analysis crew")
+            return None
+        logger.info(f"Intent fast path answered Task 1 (confidence {confidence:.2f}): {analysis}")
+        return RequestAnalysis.model_validate(analysis)
 
+    @staticmethod
+    def _loose_analysis(raw: str) -> Optional[RequestAnalysis]:
         """
-        Task 3: Order Agent xử lý việc đặt hàng (phụ thuộc vào Task 1 và Task 2)
+        Routing fields of a Task 1 answer that did not validate against RequestAnalysis, read from
+        its JSON object the way the pipeline did before the output models (missing flags are
+        false), so one malformed field does not send the run through every stage. None if the
+        answer has no JSON object.
         """
-        task3_place_order = Task(
-            description=f"""Dựa trên kết quả phân tích từ Task 1 ('customer_intent', 'requires_order_placement', 'product_details')
-            và kết quả kiểm tra kho từ Task 2 ('stock_status', 'price'):
-            - Nếu 'requires_order_placement' là true, sản phẩm có trong kho ('in_stock' hoặc 'low_stock'), và có đủ thông tin:
-            1. Tạo một `order_id` duy nhất cho đơn hàng (ví dụ: sử dụng UUID dạng chuỗi).
-            2. Tạo một cấu trúc JSON dạng Dictionary chi tiết cho đơn hàng. JSON này phải bao gồm:
-                - `order_id`: (string) ID vừa tạo.
-                - `product`: (string) Tên sản phẩm từ Task 2.
-                - `color`: (string) Màu sắc từ Task 2 (nếu có).
-                - `storage`: (string) Dung lượng từ Task 2 (nếu có).
-                - `quantity`: (number) Mặc định là 1, hoặc nếu khách hàng chỉ định.
-                - `total_price`: (number) Giá sản phẩm từ Task 2.
-                - `customer_info`: một object chứa thông tin khách hàng từ `initial_context_data`: {initial_context_data} (bao gồm `customer_name` và `conversation_id`).
-            3. Sử dụng công cụ `Create order` với input là JSON string của object trên.
-            4. Đặt `order_created` là True.
-            - Nếu không đủ điều kiện đặt hàng (ví dụ: khách không muốn đặt, hết hàng, thiếu thông tin):
-            Đặt `order_created` là False và cung cấp `message` giải thích.
-
-            CHÚ Ý: 
-            - Phản hồi của bạn PHẢI là một đối tượng JSON thuần túy, KHÔNG bao gồm bất kỳ định dạng markdown nào như ```json hoặc ```. 
-            - Ví dụ: {{"order_id": "uuid", "product": "iPhone 8", "quantity": 1, "total_price": 5990000, "customer_info": {{"conversation_id": "12345", "customer_name": "Name", "previous_interactions": "Hỏi về iPad"}}}}
-            - Chỉ trả về đối tượng JSON với các trường như mô tả, không thêm văn bản trước hoặc sau JSON.
-            """,
-            agent=self.order.crewai_agent,
-            expected_output="Một đối tượng JSON thuần túy (không bọc trong markdown) chứa: "
-                            "'order_created': (boolean) đơn hàng có được tạo không."
-                            "'order_details': (object) chi tiết đơn hàng nếu được tạo."
-                            "'message': (string) thông báo về trạng thái tạo đơn hàng."
-                            'Ví dụ: {{"order_details": {{"order_id": "a1b2c3d4-e5f6-7890-1234-567890abcdef", "product": "iPhone 15 Pro Max 256GB", "color": "Titan tự nhiên", "storage": "256Gb", "quantity": 1, "total_price": 32990000, "customer_info": {{"conversation_id": "12345", "customer_name": "Nguyễn Văn A", "previous_interactions": "Đã từng hỏi về iPad Air."}}}}}}',
-                            
-            context=[task1_analyze_request, task2_check_inventory]
+        value = repair_json_object(raw)
+        if value is None:
+            return None
+        logger.warning(f"Routing on Task 1's unvalidated answer: {value}")
+        return RequestAnalysis.model_construct(
+            product_details=str(value.get("product_details") or ""),
+            customer_intent=str(value.get("customer_intent") or ""),
+            original_query=str(value.get("original_query") or ""),
+            requires_inventory_check=as_bool(value.get("requires_inventory_check")),
+            requires_order_placement=as_bool(value.get("requires_order_placement")),
         )
 
+    @staticmethod
+    def _analysis_listener(prefetch: InventoryPrefetch) -> Callable[[str], None]:
         """
-        Task 4: Consultant Agent tổng hợp và tạo phản hồi cuối cùng cho khách hàng
+        Reads Task 1's answer while the LLM streams it: once product_details and
+        requires_inventory_check are known (the prompt puts them ahead of the long original_query
+        echo), the speculative lookup is redirected to the product Task 1 names, overlapping it
+        with the rest of the generation instead of starting after Task 1.
         """
-        task4_final_response = Task(
-            description=f"""Tổng hợp tất cả thông tin từ các bước trước để đưa ra câu trả lời cuối cùng cho khách hàng.
-            - Dựa trên kết quả từ Task 1 ('customer_intent', 'product_details'), Task 2 ('stock_status', 'price'), và Task 3 ('order_created', 'message'):
-            1. Nếu đơn hàng được tạo thành công ('order_created' là true):
-                Thông báo rằng đơn hàng đã được đặt, bao gồm thông tin sản phẩm, giá, và bất kỳ chi tiết nào từ Task 3.
-            2. Nếu không đặt được đơn hàng:
-                Giải thích lý do (hết hàng, thiếu thông tin, khách không muốn đặt, v.v.) dựa trên 'message' từ Task 3 hoặc các task trước.
-            3. Nếu khách chỉ hỏi thông tin hoặc giá sản phẩm:
-                Cung cấp thông tin chi tiết về sản phẩm, giá cả, và tình trạng kho từ Task 2.
-                Cung cấp câu trả lời rõ ràng và tư vấn cụ thể về sản phẩm, tình trạng kho, và giá (từ Task 2).
-            - Đảm bảo câu trả lời thân thiện, dễ hiểu, và phù hợp với ngữ cảnh của khách hàng.
-            - Nếu có thông tin từ 'initial_context_data': {initial_context_data}, hãy sử dụng nó để cá nhân hóa câu trả lời (ví dụ: gọi tên khách hàng).
-
-            Dựa trên toàn bộ quá trình, hãy soạn một câu trả lời hoàn chỉnh, thân thiện và chính xác cho câu hỏi ban đầu của khách hàng: '{customer_input}'.
-            Nếu có bất kỳ vấn đề hoặc thông tin nào không rõ ràng, hãy giải thích một cách lịch sự.
-            """,
-            agent=self.consultant.crewai_agent,
-            expected_output="Một chuỗi (string) là câu trả lời cuối cùng bằng ngôn ngữ tự nhiên để gửi cho khách hàng.",
-            context=[task1_analyze_request, task2_check_inventory, task3_place_order]
+        parser = StreamingJSONParser(RequestAnalysis, start_marker=FINAL_ANSWER_MARKER)
+
+        def on_chunk(chunk: str):
+            try:
+                for field, _ in parser.feed(chunk):
+                    if field not in ("product_details", "requires_inventory_check"):
+                        continue
+                    product_details = parser.fields.get("product_details")
+                    if parser.fields.get("requires_inventory_check") is True and isinstance(product_details, str):
+                        prefetch.refine(product_details)
+            except Exception as e:
+                logger.warning(f"Could not read Task 1's streamed answer: {str(e)}")
+
+        return on_chunk
+
+    @staticmethod
+    def _skipped_note(skipped_stages: List[str]) -> str:
+        if not skipped_stages:
+            return "Không có bước nào bị bỏ qua."
+        labels = {STAGE_INVENTORY: "Task 2 (kiểm tra kho)", STAGE_ORDER: "Task 3 (đặt hàng)"}
+        return (
+            f"Các bước sau đã được bỏ qua vì khách hàng không có nhu cầu: {', '.join(labels[s] for s in skipped_stages)}. "
+            "Chỉ dùng thông tin tồn kho, giá và đơn hàng từ kết quả của các bước đã chạy, không được bịa ra."
+        )
+
+    def _analyze_task(self, agents: _RunAgents, customer_input: str, initial_context_data: dict) -> Task:
+        """Task 1: Consultant Agent phân tích yêu cầu"""
+        return Task(
+            description=ANALYZE_PROMPT.description(
+                customer_input=customer_input, initial_context_data=request_json(initial_context_data)
+            ),
+            agent=agents.consultant.crewai_agent,
+            expected_output=ANALYZE_PROMPT.expected_output,
+            output_pydantic=RequestAnalysis,
+            converter_cls=TaskOutputConverter,
+            guardrail=canonical_output,
         )
 
+    def _inventory_task(self, agents: _RunAgents, context: List[Task], prefetched: Optional[dict] = None) -> Task:
+        """Task 2: Inventory Agent kiểm tra kho và giá (phụ thuộc vào Task 1)"""
+        return Task(
+            description=INVENTORY_PROMPT.description(prefetched=request_json(prefetched) if prefetched else "Không có."),
+            agent=agents.inventory.crewai_agent,
+            expected_output=INVENTORY_PROMPT.expected_output,
+            output_pydantic=InventoryCheck,
+            converter_cls=TaskOutputConverter,
+            guardrail=canonical_output,
+            context=context
+        )
+
+    def _order_task(self, agents: _RunAgents, initial_context_data: dict, context: List[Task]) -> Task:
+        """Task 3: Order Agent xử lý việc đặt hàng (phụ thuộc vào Task 1, và Task 2 nếu có)"""
+        return Task(
+            description=ORDER_PROMPT.description(initial_context_data=request_json(initial_context_data)),
+            agent=agents.order.crewai_agent,
+            expected_output=ORDER_PROMPT.expected_output,
+            output_pydantic=OrderResult,
+            converter_cls=TaskOutputConverter,
+            guardrail=canonical_output,
+            context=context
+        )
+
+    def _final_response_task(self, agents: _RunAgents, customer_input: str, initial_context_data: dict, skipped_stages: List[str], context: List[Task]) -> Task:
+        """Task 4: Consultant Agent tổng hợp và tạo phản hồi cuối cùng cho khách hàng"""
+        return Task(
+            description=RESPONSE_PROMPT.description(
+                customer_input=customer_input,
+                initial_context_data=request_json(initial_context_data),
+                skipped_note=self._skipped_note(skipped_stages),
+            ),
+            agent=agents.consultant.crewai_agent,
+            expected_output=RESPONSE_PROMPT.expected_output,
+            context=context
+        )
+
+    def run(
+        self,
+        customer_input: str,
+        initial_context_data: dict = None,
+        step_callback=None,
+        emitter: Optional[RunEmitter] = None,
+    ) -> dict:
+        if emitter is None:
+            return self._run(customer_input, initial_context_data, step_callback, None)
+        with bind_emitter(emitter):
+            return self._run(customer_input, initial_context_data, step_callback, emitter)
+
+    def _run(self, customer_input: str, initial_context_data: dict, step_callback, emitter: Optional[RunEmitter]) -> dict:
+        logger.info(f"Pipeline started with input: '{customer_input}' and context: {initial_context_data}")
+        cache_key = catalog_version = None
+        if self.response_cache is not None:
+            # Read the version before running so a catalog change during the run invalidates the stored result.
+            catalog_version = self.response_cache.catalog_version()
+            cache_key = self.response_cache.make_key(customer_input, initial_context_data)
+            cached = self.response_cache.get(cache_key, catalog_version)
+            if cached is not None:
+                logger.info(f"Response cache hit for input: '{customer_input}' (catalog version {catalog_version})")
+                cached["cached"] = True
+                if emitter is not None:
+                    emitter.emit({"type": "token", "content": cached["customer_response"]})
+                return cached
+
+        if self.function_agent is not None:
+            pipeline_result_dict, cacheable = self._run_function_calling(customer_input, initial_context_data, emitter)
+        else:
+            pipeline_result_dict, cacheable = self._run_crews(customer_input, initial_context_data, step_callback, emitter)
+
+        for key, value in pipeline_result_dict.items():
+            if not isinstance(value, (str, int, float, list, dict, bool, type(None))):
+                logger.warning(f"Giá trị cho key '{key}' có kiểu {type(value)} không thể serialize JSON trực tiếp, chuyển thành string: {str(value)[:200]}")
+                pipeline_result_dict[key] = str(value)
+
+        if self.response_cache is not None and cacheable:
+            self.response_cache.put(cache_key, catalog_version, pipeline_result_dict)
+        pipeline_result_dict["cached"] = False
+
+        return pipeline_result_dict
+
+    def _run_function_calling(self, customer_input: str, initial_context_data: dict, emitter: Optional[RunEmitter]):
+        """One FunctionCallingAgent loop; the stages and task outputs are derived from the tool calls it made."""
+        if emitter is not None:
+            emitter.stage(STAGE_ANALYZE)
+        run = self.function_agent.run(customer_input, initial_context_data, emitter=emitter)
+
+        outputs = {STAGE_ANALYZE: [], STAGE_INVENTORY: [], STAGE_ORDER: []}
+        for call in run["tool_calls"]:
+            outputs[FUNCTION_TOOL_STAGES.get(call["name"], STAGE_ANALYZE)].append(call)
+        stages = [stage for stage in (STAGE_INVENTORY, STAGE_ORDER) if outputs[stage]] + [STAGE_RESPONSE]
+        logger.info(f"Function-calling run finished in {run['turns']} turn(s), tools called: {[call['name'] for call in run['tool_calls']]}")
+
+        pipeline_result_dict = {
+            "customer_response": run["customer_response"],
+            "task1_output": request_json({"engine": self.engine.value, "tool_calls": outputs[STAGE_ANALYZE]}),
+            "task2_output": request_json(outputs[STAGE_INVENTORY]) if outputs[STAGE_INVENTORY] else self._task_output_str(None, "Task 2", ran=False),
+            "task3_output": request_json(outputs[STAGE_ORDER]) if outputs[STAGE_ORDER] else self._task_output_str(None, "Task 3", ran=False),
+            "stages_run": [STAGE_ANALYZE] + stages,
+            "analysis_fast_path": False,
+            "speculation": {"attempted": False, "hit": False, "hit_rate": prefetch_metrics()["hit_rate"]},
+            "token_usage": run["token_usage"],
+        }
+        # Only an answer that placed no order may be replayed.
+        return pipeline_result_dict, STAGE_ORDER not in stages
+
+    def _run_crews(self, customer_input: str, initial_context_data: dict, step_callback, emitter: Optional[RunEmitter]):
+        """The CrewAI task pipeline; returns the result dict and whether it may be cached."""
+        # A streaming run stops at the next step once cancelled; CrewAI must not retry it.
+        agents = _RunAgents(self.consultant_tools, self.inventory_tools, self.order_tools, retry_on_error=emitter is None)
+        if emitter is not None:
+            step_callback = self._chain_step_callbacks(emitter.on_step, step_callback)
+
+        task1_analyze_request = self._analyze_task(agents, customer_input, initial_context_data)
+        analysis = self._fast_analysis(customer_input)
+        fast_path = analysis is not None
+        prefetch = None
+        if fast_path:
+            # Later tasks read Task 1 through its output, as if the consultant agent had produced it.
+            task1_analyze_request.output = TaskOutput(
+                description=task1_analyze_request.description,
+                expected_output=task1_analyze_request.expected_output,
+                raw=analysis.model_dump_json(exclude_none=True),
+                pydantic=analysis,
+                agent=agents.consultant.crewai_agent.role,
+            )
+            if emitter is not None:
+                emitter.stage(STAGE_ANALYZE)
+        else:
+            if self.speculative_inventory:
+                # Look up the product the message seems to name while the LLM analyses it.
+                prefetch = InventoryPrefetch(self.intent_classifier)
+                prefetch.start(customer_input)
+            if emitter is not None:
+                emitter.task_stages[id(task1_analyze_request)] = STAGE_ANALYZE
+            analysis_crew = Crew(
+                agents=[agents.consultant.crewai_agent],
+                tasks=[task1_analyze_request],
+                process=Process.sequential,
+                step_callback=step_callback,
+                verbose=True
+            )
+            # Task 1's answer is parsed as it streams only when a speculative lookup can be redirected.
+            chunk_listener = contextlib.nullcontext()
+            if prefetch is not None:
+                chunk_listener = listen_chunks(self._analysis_listener(prefetch))
+            logger.info("Kicking off the analysis crew...")
+            with chunk_listener:
+                analysis_crew.kickoff()
+
+        task1_res = task1_analyze_request.output
+        if not fast_path:
+            analysis = task1_res.pydantic if task1_res else None
+            if analysis is None and task1_res is not None:
+                analysis = self._loose_analysis(task1_res.raw)
+        stages = self.route(analysis)
+        logger.info(f"Routing stages {stages} for analysis: {analysis}")
+        if emitter is not None:
+            emitter.check_cancelled()
+            emitter.emit({"type": "route", "stages": [STAGE_ANALYZE] + stages})
+
+        prefetched = prefetch.claim(analysis) if prefetch is not None else None
+
+        task2_check_inventory = task3_place_order = None
+        context = [task1_analyze_request]
+        if STAGE_INVENTORY in stages:
+            task2_check_inventory = self._inventory_task(agents, context=list(context), prefetched=prefetched)
+            context.append(task2_check_inventory)
+        if STAGE_ORDER in stages:
+            task3_place_order = self._order_task(agents, initial_context_data, context=list(context))
+            context.append(task3_place_order)
+
+        skipped_stages = [stage for stage in (STAGE_INVENTORY, STAGE_ORDER) if stage not in stages]
+        task4_final_response = self._final_response_task(
+            agents, customer_input, initial_context_data, skipped_stages, context=list(context)
+        )
+
+        if emitter is not None:
+            for task, stage in ((task2_check_inventory, STAGE_INVENTORY), (task3_place_order, STAGE_ORDER), (task4_final_response, STAGE_RESPONSE)):
+                if task is not None:
+                    emitter.task_stages[id(task)] = stage
+            emitter.final_task = task4_final_response
+
         sales_crew = Crew(
-            agents=[self.consultant.crewai_agent, self.inventory.crewai_agent, self.order.crewai_agent],
-            tasks=[task1_analyze_request, task2_check_inventory, task3_place_order, task4_final_response],
+            agents=agents.crewai_agents,
+            tasks=context[1:] + [task4_final_response],
             process=Process.sequential,
             step_callback=step_callback,
             verbose=True
@@ -160,38 +609,52 @@ class MultiAgents:
                 customer_response_str = "Không thể trích xuất phản hồi cuối cùng từ CrewOutput."
                 logger.warning("Could not extract a serializable string from CrewOutput or the last task.")
 
-        task1_res = task1_analyze_request.output
-        task2_res = task2_check_inventory.output
-        task3_res = task3_place_order.output
-
-        token_usage = getattr(final_result, 'token_usage', None)
-        if token_usage and hasattr(token_usage, '__dict__'):
-            token_usage_dict = {
-                "total_tokens": getattr(token_usage, 'total_tokens', 0),
-                "prompt_tokens": getattr(token_usage, 'prompt_tokens', 0),
-                "cached_prompt_tokens": getattr(token_usage, 'cached_prompt_tokens', 0),
-                "completion_tokens": getattr(token_usage, 'completion_tokens', 0),
-                "successful_requests": getattr(token_usage, 'successful_requests', 0)
-            }
-            logger.debug(f"Serialized token_usage: {token_usage_dict}")
-        else:
-            token_usage_dict = "Không có thông tin token usage"
-            logger.debug("No token_usage data available")
+        task2_res = task2_check_inventory.output if task2_check_inventory else None
+        task3_res = task3_place_order.output if task3_place_order else None
+
+        token_usage = agents.token_usage()
+        token_usage_dict = {
+            "total_tokens": token_usage.total_tokens,
+            "prompt_tokens": token_usage.prompt_tokens,
+            "cached_prompt_tokens": token_usage.cached_prompt_tokens,
+            "completion_tokens": token_usage.completion_tokens,
+            "successful_requests": token_usage.successful_requests
+        }
+        logger.debug(f"Serialized token_usage: {token_usage_dict}")
 
         pipeline_result_dict = {
             "customer_response": customer_response_str,
-            "task1_output": str(task1_res.raw) if task1_res and hasattr(task1_res, 'raw') else "Task 1: Output không có hoặc không có thuộc tính .raw",
-            "task2_output": str(task2_res.raw) if task2_res and hasattr(task2_res, 'raw') else "Task 2: Output không có hoặc không có thuộc tính .raw",
-            "task3_output": str(task3_res.raw) if task3_res and hasattr(task3_res, 'raw') else "Task 3: Output không có hoặc không có thuộc tính .raw",
+            "task1_output": self._task_output_str(task1_res, "Task 1", ran=True),
+            "task2_output": self._task_output_str(task2_res, "Task 2", ran=STAGE_INVENTORY in stages),
+            "task3_output": self._task_output_str(task3_res, "Task 3", ran=STAGE_ORDER in stages),
+            "stages_run": [STAGE_ANALYZE] + stages,
+            "analysis_fast_path": fast_path,
+            "speculation": {
+                **(prefetch.report if prefetch is not None else {"attempted": False, "hit": False}),
+                "hit_rate": prefetch_metrics()["hit_rate"],
+            },
             "token_usage": token_usage_dict
         }
 
-        for key, value in pipeline_result_dict.items():
-            if not isinstance(value, (str, int, float, list, dict, bool, type(None))):
-                logger.warning(f"Giá trị cho key '{key}' có kiểu {type(value)} không thể serialize JSON trực tiếp, chuyển thành string: {str(value)[:200]}")
-                pipeline_result_dict[key] = str(value)
+        # Order placement has side effects and must run every time; unparsed analyses are not trusted either.
+        return pipeline_result_dict, analysis is not None and STAGE_ORDER not in stages
 
-        return pipeline_result_dict
+    @staticmethod
+    def _chain_step_callbacks(*callbacks):
+        callbacks = [callback for callback in callbacks if callback is not None]
+
+        def step_callback(step):
+            for callback in callbacks:
+                callback(step)
+        return step_callback
+
+    @staticmethod
+    def _task_output_str(task_output, label: str, ran: bool) -> str:
+        if not ran:
+            return f"{label}: Bỏ qua vì không cần thiết cho yêu cầu này"
+        if task_output and hasattr(task_output, 'raw'):
+            return str(task_output.raw)
+        return f"{label}: Output không có hoặc không có thuộc tính .raw"
 
 if __name__ == "__main__":
     multi_agents = MultiAgents()
@@ -23,6 +23,7 @@ class GetDetailTool(BaseTool):
         super().__init__()
         try:
             self.db_client = MongoDBClient()
+            self.db_client.ensure_indexes()
             logger.info("GetDetailTool initialized with MongoDB client")
         except Exception as e:
             logger.error(f"Failed to initialize MongoDB client: {str(e)}")
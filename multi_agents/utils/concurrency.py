@@ -0,0 +1,138 @@
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+from contextlib import asynccontextmanager
+
+
+class PipelineOverloaded(Exception):
+    """Raised when a pipeline run cannot be admitted: the queue is full (429) or the wait timed out (503)."""
+
+    def __init__(self, reason: str, status_code: int, metrics: Dict):
+        super().__init__(f"Pipeline overloaded: {reason}")
+        self.reason = reason
+        self.status_code = status_code
+        self.metrics = metrics
+
+
+class AdmissionController:
+    """
+    Caps concurrently executing pipeline runs and queues the rest in FIFO order.
+    Requests beyond the queue capacity are rejected immediately instead of piling up.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._total_wait = 0.0
+
+    def metrics(self) -> Dict:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": round(self._total_wait / self.admitted * 1000, 2) if self.admitted else 0.0,
+        }
+
+    def _release(self, *_):
+        self.active -= 1
+        self.completed += 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Wait for a slot and hold it for the body of the `async with`. The body receives a
+        `hold_until(future)` callable: once called, the slot is released when that future finishes
+        instead of when the body exits, so a worker that outlives its caller (client disconnect,
+        cancelled request) still counts against `max_concurrent`.
+
+        Raises:
+            PipelineOverloaded: If the queue is full or the wait for a slot timed out.
+        """
+        if self.active + self.waiting >= self.max_concurrent + self.max_queue:
+            self.rejected += 1
+            raise PipelineOverloaded("queue_full", 429, self.metrics())
+
+        self.waiting += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise PipelineOverloaded("queue_timeout", 503, self.metrics())
+        finally:
+            self.waiting -= 1
+
+        self.admitted += 1
+        self._total_wait += time.perf_counter() - start
+        self.active += 1
+        workers = []
+        try:
+            yield workers.append
+        finally:
+            if workers:
+                workers[0].add_done_callback(self._release)
+            else:
+                self._release()
+
+
+class ToolLimiter:
+    """
+    Caps concurrent executions of one server tool and bounds each call, including the wait for
+    a free slot, to `timeout` seconds. A slow backend then fails the calls that hit it instead
+    of queueing every caller behind it.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, timeout: float):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        self.active = 0
+        self.calls = 0
+        self.timed_out = 0
+
+    async def _run_with_slot(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        async with self._semaphore:
+            self.active += 1
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                self.active -= 1
+
+    async def run(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Await fn(*args, **kwargs) within the limits.
+
+        Raises:
+            asyncio.TimeoutError: If the call, slot wait included, did not finish within `timeout`.
+        """
+        self.calls += 1
+        try:
+            return await asyncio.wait_for(self._run_with_slot(fn, *args, **kwargs), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            raise
+
+    def metrics(self) -> Dict:
+        return {
+            "active": self.active,
+            "max_concurrent": self.max_concurrent,
+            "calls": self.calls,
+            "timed_out": self.timed_out,
+        }
@@ -1,26 +1,305 @@
 import re
 import json
-from typing import Dict
+from pydantic import BaseModel, ValidationError
+from typing import Any, Dict, List, Optional, Tuple, Type
 from loguru import logger
 
 def parse_json(text: str) -> Dict:
-    pattern_think = r"<think>\n(.*?)</think>"
-    match = re.search(pattern_think, text, re.DOTALL)
-    if match:
-        json_text = match.group(1)
-        return json.loads(json_text)
-
-    pattern_output = r"<output>\n(.*?)</output>"
-    match = re.search(pattern_output, text, re.DOTALL)
-    if match:
-        json_text = match.group(1)
-        return json.loads(json_text)
-
-    pattern_action = r"<action>\n(.*?)</action>"
-    match = re.search(pattern_action, text, re.DOTALL)
-    if match:
-        json_text = match.group(1)
-        return json.loads(json_text)
+    for tag in ("think", "output", "action"):
+        match = re.search(rf"<{tag}>\s*(.*?)</{tag}>", text, re.DOTALL)
+        if match:
+            return json.loads(match.group(1))
 
     logger.error(f"=== Lỗi: Response không chứa <action> hoặc <output>: {text} ===")
-    raise ValueError("Response không hợp lệ từ LLM")
\ No newline at end of file
+    raise ValueError("Response không hợp lệ từ LLM")
+
+_THINK_BLOCK = re.compile(r"<think>.*?</think>", re.DOTALL)
+_CODE_FENCE = re.compile(r"```(?:json)?", re.IGNORECASE)
+
+
+def extract_json_object(text: str) -> Optional[Dict]:
+    """
+    Return the first JSON object found in an LLM response, tolerating a <think> block,
+    markdown code fences and text around the object. Returns None if there is none.
+    """
+    if not text:
+        return None
+    text = _CODE_FENCE.sub("", _THINK_BLOCK.sub("", text))
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+            if isinstance(value, dict):
+                return value
+        except json.JSONDecodeError:
+            pass
+        start = text.find("{", start + 1)
+    return None
+
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_PYTHON_LITERAL = re.compile(r"\b(True|False|None)\b")
+_SMART_QUOTES = str.maketrans({"\u201c": '"', "\u201d": '"', "\u2018": "'", "\u2019": "'"})
+
+
+def _close_brackets(text: str) -> str:
+    """Close the strings, arrays and objects left open by a truncated answer."""
+    stack, in_string, escaped = [], False, False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    text = text.rstrip().rstrip(",")
+    if text.endswith(":"):
+        text += " null"
+    return text + "".join(reversed(stack))
+
+
+def repair_json_object(text: str) -> Optional[Dict]:
+    """
+    extract_json_object, then the usual slips of small models: trailing commas, Python literals
+    (True/None), single or typographic quotes, and an answer cut off before its closing brackets.
+    Returns None if no object can be recovered.
+    """
+    value = extract_json_object(text)
+    if value is not None or not text:
+        return value
+    text = _CODE_FENCE.sub("", _THINK_BLOCK.sub("", text)).translate(_SMART_QUOTES)
+    start = text.find("{")
+    if start == -1:
+        return None
+    candidate = _PYTHON_LITERAL.sub(lambda match: _PYTHON_LITERALS[match.group(1)], text[start:])
+    if '"' not in candidate:
+        candidate = candidate.replace("'", '"')
+    candidate = _TRAILING_COMMA.sub(r"\1", _close_brackets(candidate))
+    try:
+        value, _ = json.JSONDecoder().raw_decode(candidate)
+    except json.JSONDecodeError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def as_vnd(value) -> Optional[int]:
+    """
+    Interpret LLM prices that may arrive as strings ('32.990.000đ', '32,99 triệu', '12.5tr',
+    '32990000.0'). Ranges ('2.000.000 - 3.000.000') and bare decimals that cannot be a VND price
+    ('12.5') give None rather than a wrong number.
+    """
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = str(value).strip().lower()
+    numbers = list(re.finditer(r"\d[\d.,]*", text))
+    if len(numbers) != 1:
+        return None
+    match = numbers[0]
+    number = match.group(0).rstrip(".,")
+    if text[match.end():].lstrip().startswith(("triệu", "trieu", "tr")):
+        try:
+            return round(float(number.replace(",", ".")) * 1_000_000)
+        except ValueError:
+            return None
+    if re.fullmatch(r"\d+[.,]\d{1,2}", number):
+        # A decimal fraction: '32990000.0' is a price, '12.5' (million?) is not.
+        amount = float(number.replace(",", "."))
+        return int(amount) if amount >= 1000 else None
+    return int(re.sub(r"[.,]", "", number))
+
+
+def as_bool(value) -> bool:
+    """Interpret LLM booleans that may arrive as strings ('true', 'false', 'có')."""
+    if isinstance(value, str):
+        return value.strip().lower() in ("true", "yes", "1", "có")
+    return bool(value)
+
+
+_THINK_OPEN, _THINK_CLOSE = "<think>", "</think>"
+_LITERALS = {"true": True, "false": False, "null": None, "True": True, "False": False, "None": None}
+
+
+class StreamingJSONParser:
+    """
+    Incremental parser for the JSON object of an answer that is still being streamed. Chunks are
+    fed as they arrive; a <think> block, code fences and text before the object (or before
+    `start_marker`, e.g. ReAct's 'Final Answer:') are skipped, and each top-level field is
+    reported as soon as its value is complete, typed by `model`'s field validators when given.
+    Each character is scanned once, so a whole answer costs one pass instead of re-parsing the
+    growing text on every chunk.
+
+    Values it cannot read (single-quoted strings, for instance) are reported as their raw text;
+    the complete answer still goes through the task's output model, so events are only hints for
+    starting work early.
+    """
+
+    def __init__(self, model: Optional[Type[BaseModel]] = None, start_marker: Optional[str] = None):
+        """
+        Args:
+            model (Optional[Type[BaseModel]]): Output model whose field validators type the values.
+            start_marker (Optional[str]): Text after which the object is expected; earlier braces are ignored.
+        """
+        self.model = model
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+        self._instance = model.model_construct() if model is not None else None
+        self._marker = start_marker
+        self._pending = ""
+        self._in_think = False
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._expect = "key"
+        self._key: Optional[str] = None
+        self._token: List[str] = []
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consume the next chunk of the answer.
+
+        Returns:
+            List[Tuple[str, Any]]: (field, value) of the top-level fields completed by this chunk.
+        """
+        if self.done or not chunk:
+            return []
+        if not self._started:
+            chunk = self._skip_preamble(chunk)
+            if chunk is None:
+                return []
+        events = []
+        for char in chunk:
+            self._scan(char, events)
+            if self.done:
+                break
+        return events
+
+    def _skip_preamble(self, chunk: str) -> Optional[str]:
+        """The chunk from the object's opening brace on, or None while it has not been reached."""
+        text = self._pending + chunk
+        while True:
+            if self._in_think:
+                end = text.find(_THINK_CLOSE)
+                if end == -1:
+                    self._pending = text[-(len(_THINK_CLOSE) - 1):]
+                    return None
+                text = text[end + len(_THINK_CLOSE):]
+                self._in_think = False
+                continue
+            target = self._marker or "{"
+            think = text.find(_THINK_OPEN)
+            found = text.find(target)
+            if think != -1 and (found == -1 or think < found):
+                text = text[think + len(_THINK_OPEN):]
+                self._in_think = True
+                continue
+            if found == -1:
+                # Keep what may be the start of a tag or marker split across chunks.
+                self._pending = text[-(max(len(target), len(_THINK_OPEN)) - 1):]
+                return None
+            if self._marker is not None:
+                text = text[found + len(self._marker):]
+                self._marker = None
+                continue
+            self._pending = ""
+            self._started = True
+            self._depth = 1
+            return text[found + 1:]
+
+    def _scan(self, char: str, events: List[Tuple[str, Any]]):
+        if self._in_string:
+            self._token.append(char)
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+                if self._depth == 1:
+                    if self._expect == "key":
+                        self._key = self._decode(self._token)
+                        self._token = []
+                        self._expect = "colon"
+                    else:
+                        self._complete(events)
+            return
+        if self._depth > 1:
+            self._token.append(char)
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 1:
+                    self._complete(events)
+            return
+
+        if self._expect == "key":
+            if char == '"':
+                self._in_string = True
+                self._token = [char]
+            elif char == "}":
+                self.done = True
+        elif self._expect == "colon":
+            if char == ":":
+                self._expect = "value"
+                self._token = []
+        elif self._expect == "value":
+            if char in ",}":
+                if self._token:
+                    self._complete(events)
+                self._expect = "key"
+                self.done = char == "}"
+            elif char.isspace():
+                return
+            else:
+                self._token.append(char)
+                if char == '"':
+                    self._in_string = True
+                elif char in "{[":
+                    self._depth += 1
+                elif "".join(self._token) in _LITERALS:
+                    # true/false/null are complete before the delimiter that follows them.
+                    self._complete(events)
+        elif char in ",}":
+            self._expect = "key"
+            self.done = char == "}"
+
+    @staticmethod
+    def _decode(token: List[str]) -> Any:
+        text = "".join(token).strip()
+        if text in _LITERALS:
+            return _LITERALS[text]
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return text
+
+    def _complete(self, events: List[Tuple[str, Any]]):
+        key, value = self._key, self._decode(self._token)
+        self._token = []
+        self._expect = "after"
+        if key is None:
+            return
+        if self.model is not None and key in self.model.model_fields:
+            try:
+                self.model.__pydantic_validator__.validate_assignment(self._instance, key, value)
+                value = getattr(self._instance, key)
+            except ValidationError:
+                pass
+        self.fields[key] = value
+        events.append((key, value))
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+import concurrent.futures
+from loguru import logger
+from typing import Any, Callable, Dict, Optional
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+
+class PipelineCancelled(Exception):
+    """Raised inside a pipeline run once its consumer has gone away."""
+
+
+class RunEmitter:
+    """
+    Bridges one pipeline run (executing on a worker thread) to an asyncio consumer.
+
+    Events are put on a bounded asyncio.Queue; when the consumer falls behind, emit() blocks
+    the run's thread, which in turn stops reading the LLM stream (backpressure). Once cancel()
+    is called the next emit() or check_cancelled() raises PipelineCancelled inside the run.
+
+    on_task_started() and on_chunk() run as CrewAI event-bus handlers, where the bus catches and
+    prints any exception, so they never raise: they drop their events once the run is cancelled,
+    and the run stops at its next step_callback (on_step) or check_cancelled() instead.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue: asyncio.Queue):
+        self.loop = loop
+        self.queue = queue
+        self.final_task = None
+        self.task_stages: Dict[int, str] = {}
+        self._cancelled = threading.Event()
+        self._streaming_final = False
+        self._final_buffer = ""
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def check_cancelled(self):
+        if self._cancelled.is_set():
+            raise PipelineCancelled()
+
+    def emit(self, event: Dict[str, Any]):
+        self.check_cancelled()
+        future = asyncio.run_coroutine_threadsafe(self.queue.put(event), self.loop)
+        while True:
+            try:
+                future.result(timeout=0.25)
+                return
+            except concurrent.futures.TimeoutError:
+                if self._cancelled.is_set():
+                    future.cancel()
+                    raise PipelineCancelled()
+
+    def stage(self, name: str, status: str = "started"):
+        self.emit({"type": "stage", "stage": name, "status": status})
+
+    def on_step(self, step):
+        """CrewAI step_callback: one event per agent thought / tool call (with its result) / final answer."""
+        if hasattr(step, "tool"):
+            self.emit({
+                "type": "tool_result",
+                "thought": getattr(step, "thought", ""),
+                "tool": step.tool,
+                "tool_input": getattr(step, "tool_input", ""),
+                "result": getattr(step, "result", None),
+            })
+        elif hasattr(step, "output"):
+            self.emit({"type": "step", "thought": getattr(step, "thought", ""), "output": str(step.output)})
+        else:
+            self.emit({"type": "step", "content": str(step)})
+
+    def _emit_from_handler(self, event: Dict[str, Any]):
+        try:
+            self.emit(event)
+        except PipelineCancelled:
+            pass
+
+    def on_task_started(self, task):
+        self._streaming_final = task is not None and task is self.final_task
+        self._final_buffer = ""
+        stage = self.task_stages.get(id(task))
+        if stage is not None and not self.cancelled:
+            self._emit_from_handler({"type": "stage", "stage": stage, "status": "started"})
+
+    def on_chunk(self, chunk: str):
+        """Forward LLM chunks of the final-response task that come after the ReAct 'Final Answer:' marker."""
+        if not self._streaming_final or not chunk or self.cancelled:
+            return
+        if self._final_buffer is not None:
+            self._final_buffer += chunk
+            marker = self._final_buffer.find(FINAL_ANSWER_MARKER)
+            if marker == -1:
+                return
+            chunk = self._final_buffer[marker + len(FINAL_ANSWER_MARKER):].lstrip()
+            self._final_buffer = None
+            if not chunk:
+                return
+        self._emit_from_handler({"type": "token", "content": chunk})
+
+
+_emitters: Dict[int, RunEmitter] = {}
+_chunk_listeners: Dict[int, Callable[[str], None]] = {}
+_handlers_registered = False
+_registry_lock = threading.Lock()
+
+
+def _current_emitter() -> Optional[RunEmitter]:
+    return _emitters.get(threading.get_ident())
+
+
+def _register_event_handlers():
+    global _handlers_registered
+    with _registry_lock:
+        if _handlers_registered:
+            return
+        from crewai.utilities.events import crewai_event_bus
+        from crewai.utilities.events.llm_events import LLMStreamChunkEvent
+        from crewai.utilities.events.task_events import TaskStartedEvent
+
+        def on_stream_chunk(source, event):
+            # Independent of each other: the bus would swallow an exception from one and skip the other.
+            try:
+                listener = _chunk_listeners.get(threading.get_ident())
+                if listener is not None and event.chunk:
+                    listener(event.chunk)
+            finally:
+                emitter = _current_emitter()
+                if emitter is not None:
+                    emitter.on_chunk(event.chunk)
+
+        def on_task_started(source, event):
+            emitter = _current_emitter()
+            if emitter is not None:
+                emitter.on_task_started(event.task)
+
+        crewai_event_bus.register_handler(LLMStreamChunkEvent, on_stream_chunk)
+        crewai_event_bus.register_handler(TaskStartedEvent, on_task_started)
+        _handlers_registered = True
+
+
+class bind_emitter:
+    """Route CrewAI stream/task events raised on the current thread to the given emitter."""
+
+    def __init__(self, emitter: RunEmitter):
+        self.emitter = emitter
+
+    def __enter__(self):
+        _register_event_handlers()
+        _emitters[threading.get_ident()] = self.emitter
+        return self.emitter
+
+    def __exit__(self, *exc):
+        _emitters.pop(threading.get_ident(), None)
+        if exc[0] is PipelineCancelled:
+            logger.info("Pipeline run cancelled by its consumer")
+        return False
+
+
+class listen_chunks:
+    """Pass the LLM chunks streamed on the current thread to `listener` (alongside any bound emitter)."""
+
+    def __init__(self, listener: Callable[[str], None]):
+        self.listener = listener
+
+    def __enter__(self):
+        _register_event_handlers()
+        _chunk_listeners[threading.get_ident()] = self.listener
+        return self.listener
+
+    def __exit__(self, *exc):
+        _chunk_listeners.pop(threading.get_ident(), None)
+        return False
@@ -0,0 +1,32 @@
+import re
+import unicodedata
+from typing import Optional
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_ALPHA_DIGIT_BOUNDARY = re.compile(r"(?<=[a-z])(?=[0-9])|(?<=[0-9])(?=[a-z])")
+
+
+def fold_diacritics(text: str) -> str:
+    """Remove Vietnamese (and other Latin) diacritics: 'Titan tự nhiên' -> 'Titan tu nhien'."""
+    text = text.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def normalize_search_key(text: Optional[str]) -> str:
+    """
+    Normalize free text into a search key: lower-cased, diacritic-folded, punctuation
+    stripped, letters and digits split into separate tokens and whitespace collapsed.
+
+    Examples:
+        'iPhone 15 Pro Max' -> 'iphone 15 pro max'
+        'iphone15  pro-max' -> 'iphone 15 pro max'
+        '256GB'             -> '256 gb'
+        'Titan Tự Nhiên'    -> 'titan tu nhien'
+    """
+    if not text:
+        return ""
+    text = fold_diacritics(str(text)).lower()
+    text = _NON_ALNUM.sub(" ", text)
+    text = _ALPHA_DIGIT_BOUNDARY.sub(" ", text)
+    return " ".join(text.split())
@@ -0,0 +1,18 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from multi_agents.db.resolver import ProductResolver
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture(scope="session")
+def inventory():
+    return json.loads((ROOT / "storage" / "inventory.json").read_text(encoding="utf-8"))
+
+
+@pytest.fixture(scope="session")
+def resolver(inventory):
+    return ProductResolver(inventory)
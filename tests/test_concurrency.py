@@ -0,0 +1,44 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from multi_agents.utils.concurrency import AdmissionController, PipelineOverloaded
+
+
+def test_slot_is_held_until_the_worker_finishes():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=0.05)
+        release = threading.Event()
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            async with admission.admit() as hold_until:
+                worker = loop.run_in_executor(executor, release.wait)
+                hold_until(worker)
+            try:
+                # The caller is gone but the worker still runs: no new run may be admitted.
+                assert admission.active == 1
+                with pytest.raises(PipelineOverloaded):
+                    async with admission.admit():
+                        pass
+            finally:
+                release.set()
+            await worker
+            await asyncio.sleep(0)
+            assert admission.active == 0
+            async with admission.admit():
+                assert admission.active == 1
+
+    asyncio.run(scenario())
+
+
+def test_slot_is_released_on_exit_without_a_worker():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=0.05)
+        with pytest.raises(RuntimeError):
+            async with admission.admit():
+                raise RuntimeError
+        assert admission.active == 0 and admission.completed == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from multi_agents.mcp.get_detail_mcp import _resolved_arguments
+
+
+def resolution(resolver, **arguments):
+    return json.dumps({"status": "success", "matches": resolver.resolve(**arguments, limit=1)}, ensure_ascii=False)
+
+
+def test_shorthand_is_resolved(resolver):
+    arguments = {"product": "ip 15 pm", "storage": "256gb", "color": "titan tu nhien"}
+    assert _resolved_arguments(arguments, resolution(resolver, **arguments)) == {
+        "product": "iPhone 15 Pro Max", "storage": "256GB", "color": "Titan tự nhiên",
+    }
+
+
+def test_product_only_is_resolved(resolver):
+    arguments = {"product": "ip 15 pm"}
+    assert _resolved_arguments(arguments, resolution(resolver, **arguments)) == {
+        "product": "iPhone 15 Pro Max", "storage": None, "color": None,
+    }
+
+
+@pytest.mark.parametrize("arguments", [
+    {"product": "iPhone 15 Pro Max", "storage": "1TB", "color": "Đỏ"},
+    {"product": "iPhone 15 Pro Max", "storage": "1TB"},
+    {"product": "ip 15 pm", "color": "Đỏ"},
+])
+def test_missing_variant_is_not_retried_without_it(resolver, arguments):
+    assert _resolved_arguments(arguments, resolution(resolver, **arguments)) is None
+
+
+def test_unchanged_arguments_are_not_retried(resolver):
+    arguments = {"product": "iPhone 15 Pro Max", "storage": "256GB", "color": "Titan tự nhiên"}
+    assert _resolved_arguments(arguments, resolution(resolver, **arguments)) is None
@@ -0,0 +1,85 @@
+import pytest
+
+from multi_agents.agents.intent import IntentClassifier
+
+
+@pytest.fixture
+def classifier(resolver):
+    return IntentClassifier(resolve=lambda product, storage, color: resolver.resolve(product, storage, color, limit=2))
+
+
+@pytest.mark.parametrize("text", [
+    "Tôi muốn mua iPhone 15 Pro Max 256GB màu Titan tự nhiên",
+    "đặt mua iPhone 15 Pro Max",
+])
+def test_order_is_answered(classifier, text):
+    analysis, confidence = classifier.classify(text)
+    assert confidence >= 0.85
+    assert analysis["customer_intent"] == "place_order"
+    assert analysis["requires_order_placement"] is True
+
+
+@pytest.mark.parametrize("text", [
+    "Tôi không muốn mua iPhone 15 Pro Max",
+    "không cần mua iPhone 15 Pro Max",
+    "anh ko lấy iPhone 15 Pro Max nữa",
+    "Tôi không mua iPhone 15 Pro Max nữa",
+    "chưa đặt iPhone 15 Pro Max đâu",
+    "thôi đừng đặt iPhone 15 Pro Max",
+    "toi khong muon mua iphone 15 pro max",
+])
+def test_negated_order_falls_through(classifier, text):
+    assert classifier.classify(text) == (None, 0.0)
+
+
+def test_negation_after_order_phrase_is_a_question(classifier):
+    analysis, confidence = classifier.classify("iPhone 15 Pro Max màu Titan tự nhiên còn hàng không")
+    assert confidence >= 0.85
+    assert analysis["requires_order_placement"] is False
+
+
+def test_quantity_falls_through(classifier):
+    assert classifier.classify("Mình muốn mua 2 chiếc iPhone 15 Pro Max") == (None, 0.0)
+
+
+def test_dung_luong_is_not_a_negation(classifier):
+    analysis, confidence = classifier.classify("muốn mua iPhone 15 Pro Max dung lượng 256GB")
+    assert confidence > 0
+    assert analysis["requires_order_placement"] is True
+
+
+@pytest.mark.parametrize("text", [
+    "Tôi muốn mua iPhone 15",
+    "iPhone 15 giá bao nhiêu",
+    "mua iPhone 12",
+])
+def test_model_family_falls_through(classifier, text):
+    assert classifier.classify(text) == (None, 0.0)
+
+
+def test_full_model_name_is_answered_next_to_a_longer_one(classifier):
+    analysis, confidence = classifier.classify("iPhone 15 Pro giá bao nhiêu")
+    assert confidence >= 0.85
+    assert analysis["product_details"] == "iPhone 15 Pro"
+
+
+@pytest.mark.parametrize("text", [
+    "iPhone 15 Pro Max không cần nữa",
+    "iPhone 15 Pro Max thôi",
+    "iPhone 15 Pro Max giá bao nhiêu, không mua đâu",
+])
+def test_negation_without_order_phrase_falls_through(classifier, text):
+    assert classifier.classify(text) == (None, 0.0)
+
+
+@pytest.mark.parametrize("text", [
+    "iPhone 15 Pro Max giá bao nhiêu vậy ko",
+    "đặt iPhone 15 Pro Max được không",
+])
+def test_closing_question_particle_is_not_a_refusal(classifier, text):
+    _, confidence = classifier.classify(text)
+    assert confidence >= 0.85
+
+
+def test_unlisted_color_falls_through(classifier):
+    assert classifier.classify("iPhone 15 Pro Max màu đen còn không") == (None, 0.0)
@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+
+import pytest
+
+from multi_agents.db.snapshot import CatalogSnapshot
+from multi_agents.db.connector import build_search_keys, same_model
+
+
+@pytest.fixture(scope="module")
+def snapshot(inventory):
+    snapshot = CatalogSnapshot(SimpleNamespace(db=None))
+    snapshot.load([dict(product, _id=str(i), search=build_search_keys(product)) for i, product in enumerate(inventory)])
+    return snapshot
+
+
+def products(results):
+    return sorted({product["product"] for product in results})
+
+
+def test_model_prefix_returns_every_variant(snapshot):
+    assert products(snapshot.get_products("iPhone 15")) == ["iPhone 15 Pro", "iPhone 15 Pro Max"]
+    assert products(snapshot.get_products("iphone 15 pro")) == ["iPhone 15 Pro", "iPhone 15 Pro Max"]
+
+
+def test_filters_apply_to_the_prefix_tier(snapshot):
+    results = snapshot.get_products("iphone 15 pro max", storage="256gb", color="titan tu nhien")
+    assert results and all((product["storage"], product["color"]) == ("256GB", "Titan tự nhiên") for product in results)
+
+
+def test_falls_back_to_match_anywhere(snapshot):
+    assert products(snapshot.get_products("pro max")) == ["iPhone 15 Pro Max"]
+
+
+def test_order_lookup_narrows_to_the_named_model(snapshot):
+    matches = snapshot.get_products("iPhone 15 Pro")
+    assert products(matches) == ["iPhone 15 Pro", "iPhone 15 Pro Max"]
+    assert products(same_model(matches, "iphone 15 pro")) == ["iPhone 15 Pro"]
+    assert products(same_model(snapshot.get_products("iPhone 15 Pro Max"), "iPhone 15 Pro Max")) == ["iPhone 15 Pro Max"]
+
+
+def test_order_lookup_keeps_every_match_without_an_exact_name(snapshot):
+    matches = snapshot.get_products("iPhone 15")
+    assert same_model(matches, "iPhone 15") == matches
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from multi_agents.mcp.session_pool import MCPSessionPool, _PooledSession
+
+
+class FakeSession:
+    def __init__(self, delay: float = 0.0, error: Exception = None):
+        self.delay = delay
+        self.error = error
+
+    async def call_tool(self, name, arguments):
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return name
+
+
+@pytest.fixture
+def pool():
+    pool = MCPSessionPool(url="http://localhost:1/sse", size=1, call_timeout=1.0)
+    # An idle queue set up front keeps the pool from opening real SSE sessions.
+    pool._idle = asyncio.Queue()
+    yield pool
+    pool.close()
+
+
+def lend(pool, session) -> _PooledSession:
+    async def put():
+        pooled = _PooledSession(session, 0)
+        pool._idle.put_nowait(pooled)
+        return pooled
+    return pool.submit(put()).result()
+
+
+def test_session_is_returned_after_a_successful_call(pool):
+    pooled = lend(pool, FakeSession())
+    assert pool.call_tool("ping", {}) == "ping"
+    assert not pooled.closed.is_set() and pool._idle.qsize() == 1
+
+
+def test_cancelled_call_closes_the_session(pool):
+    pooled = lend(pool, FakeSession(delay=10))
+    future = pool.submit(pool._call_tool("slow", {}))
+    while pool._idle.qsize():
+        pass
+    future.cancel()
+    assert pool.submit(asyncio.wait_for(pooled.closed.wait(), timeout=1)).result() is True
+    assert pool._idle.qsize() == 0
+
+
+def test_failed_call_closes_the_session(pool):
+    pooled = lend(pool, FakeSession(error=RuntimeError("broken")))
+    with pytest.raises(RuntimeError):
+        pool.call_tool("broken", {}, retries=0)
+    assert pooled.closed.is_set() and pool._idle.qsize() == 0
@@ -0,0 +1,36 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from crewai.utilities.events import crewai_event_bus
+from crewai.utilities.events.llm_events import LLMStreamChunkEvent
+
+from multi_agents.utils.streaming import PipelineCancelled, RunEmitter, bind_emitter, listen_chunks
+
+
+@pytest.fixture
+def emitter():
+    loop = asyncio.new_event_loop()
+    emitter = RunEmitter(loop, asyncio.Queue())
+    emitter.final_task = task = SimpleNamespace()
+    emitter.on_task_started(task)
+    yield emitter
+    loop.close()
+
+
+def test_handlers_drop_events_once_cancelled(emitter, capsys):
+    emitter.cancel()
+    chunks = []
+    with bind_emitter(emitter), listen_chunks(chunks.append):
+        for chunk in ("Final Answer:", " Xin", " chào"):
+            crewai_event_bus.emit(None, LLMStreamChunkEvent(chunk=chunk))
+    assert emitter.queue.empty()
+    assert chunks == ["Final Answer:", " Xin", " chào"]
+    assert "EventBus Error" not in capsys.readouterr().out
+
+
+def test_cancellation_surfaces_at_the_next_step(emitter):
+    emitter.cancel()
+    emitter.on_task_started(None)
+    with pytest.raises(PipelineCancelled):
+        emitter.on_step(SimpleNamespace(output="...", thought=""))
@@ -0,0 +1,71 @@
+import pytest
+
+from multi_agents.config.schemas import InventoryCheck, OrderResult, RequestAnalysis
+from multi_agents.agents.structured_output import repair_model
+from multi_agents.pipeline import STAGE_INVENTORY, STAGE_ORDER, STAGE_RESPONSE, MultiAgents
+from multi_agents.utils.parser import as_vnd
+
+
+@pytest.mark.parametrize("text", [
+    '{"product_details": null, "customer_intent": "general_query", "requires_inventory_check": false, "requires_order_placement": false}',
+    '{"customer_intent": "general_query", "original_query": "xin chào", "requires_inventory_check": false, "requires_order_placement": false}',
+    '<think>chào hỏi</think>\n```json\n{"customer_intent": "general_query", "requires_inventory_check": "false", "requires_order_placement": "false"}\n```',
+])
+def test_general_question_validates(text):
+    analysis = repair_model(text, RequestAnalysis)
+    assert analysis is not None
+    assert analysis.product_details == ""
+    assert MultiAgents.route(analysis) == [STAGE_RESPONSE]
+
+
+@pytest.mark.parametrize("status", ["in stock", "In-Stock", "IN_STOCK", " in_stock "])
+def test_stock_status_is_normalised(status):
+    check = repair_model(f'{{"product_name": "iPhone 13", "stock_status": "{status}", "price": "13.990.000đ"}}', InventoryCheck)
+    assert check is not None
+    assert check.stock_status == "in_stock"
+    assert check.price == 13990000
+
+
+@pytest.mark.parametrize("text", [
+    '{"order_created": false, "order_details": {}, "message": "Sản phẩm đã hết hàng"}',
+    '{"order_created": false, "message": null}',
+    '{"order_created": "false", "order_details": {}, "message": null}',
+])
+def test_failed_order_validates(text):
+    result = repair_model(text, OrderResult)
+    assert result is not None
+    assert result.order_created is False
+    assert result.order_details is None
+
+
+def test_unvalidated_analysis_routes_on_its_flags():
+    # customer_intent missing: the model rejects it, the flags still route it.
+    raw = 'Final Answer: {"product_details": "iPhone 13", "requires_inventory_check": true, "requires_order_placement": false}'
+    assert repair_model(raw, RequestAnalysis) is None
+    analysis = MultiAgents._loose_analysis(raw)
+    assert MultiAgents.route(analysis) == [STAGE_INVENTORY, STAGE_RESPONSE]
+    assert analysis.product_details == "iPhone 13"
+
+
+def test_answer_without_json_runs_every_stage():
+    analysis = MultiAgents._loose_analysis("Xin lỗi, tôi không hiểu.")
+    assert analysis is None
+    assert MultiAgents.route(analysis) == [STAGE_INVENTORY, STAGE_ORDER, STAGE_RESPONSE]
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("32.990.000đ", 32990000),
+    ("32,99 triệu", 32990000),
+    ("12.5tr", 12500000),
+    ("15tr", 15000000),
+    ("32990000.0", 32990000),
+    ("32,990,000 VND", 32990000),
+    (27990000, 27990000),
+    ("2.000.000 - 3.000.000", None),
+    ("từ 2 đến 3 triệu", None),
+    ("12.5", None),
+    (True, None),
+    ("liên hệ", None),
+])
+def test_as_vnd(value, expected):
+    assert as_vnd(value) == expected